@@ -15,6 +15,7 @@
 from usrconf import demCfg
 
 from core.components import *
+from core.logger import Logger
 
 from database.influxDB import InfluxDB
 import util.helpers
@@ -39,6 +40,17 @@ class Core:
 		self.environments = []
 		self.components = []
 
+		# Order in which entities were added, used to announce tickets in a deterministic order
+		self.entityOrder = {}
+		self.entityCounter = 0
+
+		# Lookup tables for entities by name, in total and per type (the keys match the lists above)
+		self.entityNames = {}
+		self.typeIndex = {'devices': {}, 'controllers': {}, 'meters': {}, 'flows': {}, 'costs': {}, 'environments': {}, 'components': {}}
+
+		# Reverse references: for each entity, the entities that hold a reference to it
+		self.entityReferences = {}
+
 		self.db = InfluxDB(self)
 		self.enablePersistence = False
 
@@ -63,6 +75,10 @@ class Core:
 		self.writeError = False
 		self.writeDebug = True
 
+		# Log messages are formatted only for enabled levels, files are written by a writer thread, see core/logger.py
+		self.logger = Logger(self)
+		self.flushLogsPerTick = False # Write all log files at the end of each tick, otherwise whenever the writer is idle
+
 		# How to deal with multithreading / concurrency
 		self.useThreads = False	# By default we use the state of the host
 		self.maxThreads = 100
@@ -108,92 +124,48 @@ class Core:
 
 	def logMsg(self, msg):
 		if self.enableMsg:
-			t = self.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%X")
-			sys.stderr.write(t+" | MESSAGE: "+msg+"\n")
-			sys.stderr.flush()
-
-			if self.writeMsg:
-				name = self.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%Y%m%d")
-				filename = demCfg['var']['log'] + name + '.log'
-
-				os.makedirs(os.path.dirname(demCfg['var']['log']), exist_ok=True)
-				f = open(filename, 'a')
-				f.write(t+" | MESSAGE: "+msg+"\n")
-				f.close()
+			self.logger.log("MESSAGE", msg, self.writeMsg)
 
 	def logWarning(self, msg):
 		if self.enableWarning:
-			t = self.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%X")
-			sys.stderr.write(t + " | WARNING: " + msg + "\n")
-			sys.stderr.flush()
-
-			if self.writeWarning:
-				name = self.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%Y%m%d")
-				filename = demCfg['var']['log'] + name + '.warning'
-
-				os.makedirs(os.path.dirname(demCfg['var']['log']), exist_ok=True)
-				f = open(filename, 'a')
-				f.write(t + " | WARNING: " + msg + "\n")
-				f.close()
+			self.logger.log("WARNING", msg, self.writeWarning)
 
 	def logError(self, msg):
 		if self.enableError:
-			t = self.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%X")
-			sys.stderr.write(t + " | ERROR: " + msg + "\n")
-			sys.stderr.flush()
-
-			if self.writeError:
-				name = self.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%Y%m%d")
-				filename = demCfg['var']['log'] + name + '.error'
-
-				os.makedirs(os.path.dirname(demCfg['var']['log']), exist_ok=True)
-				f = open(filename, 'a')
-				f.write(t + " | ERROR: " + msg + "\n")
-				f.close()
+			self.logger.log("ERROR", msg, self.writeError)
 
 		if self.quitOnError:
+			self.logger.close()
 			quit()
 
 	def logDebug(self, msg):
 		if self.enableDebug:
-			t = self.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%X")
-			sys.stderr.write(t + " | DEBUG: " + msg + "\n")
-			sys.stderr.flush()
-
-			if self.writeDebug:
-				name = self.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%Y%m%d")
-				filename = demCfg['var']['log'] + name + '.debug'
-
-				os.makedirs(os.path.dirname(demCfg['var']['log']), exist_ok=True)
-				f = open(filename, 'a')
-				f.write(t + " | DEBUG: " + msg + "\n")
-				f.close()
+			self.logger.log("DEBUG", msg, self.writeDebug)
 
 	# Function to write a line conveniently somewhere conveniently
 	def logLine(self, msg):
-		filename = demCfg['var']['log'] + 'output.txt'
-		os.makedirs(os.path.dirname(demCfg['var']['log']), exist_ok=True)
-		f = open(filename, 'a')
-		f.write(msg + "\n")
-		f.close()
+		self.logger.logLine(demCfg['var']['log'] + 'output.txt', msg)
 
 # Get object references, set/get variables and call functions, used for the API
-	def entityByName(self, name):
+	def entityByName(self, name, entityType=None):
 		result = None
 
 		if name == "host":
 			result = self
 
-		for e in self.entities:
-			if e.name == name:
-				result = e
-				break
+		if entityType is None:
+			e = self.entityNames.get(name)
+		else:
+			e = self.typeIndex[entityType].get(name)
+
+		if e is not None:
+			result = e
 
 		return result
 
 	def getObj(self, obj):
 		try:
-			return self.entityByName(self, obj)
+			return self.entityByName(obj)
 		except:
 			return None
 
@@ -254,6 +226,7 @@ class Core:
 		else:
 			if hasattr(o, var):
 				setattr(o, var, v)
+				self.indexReference(o, v)
 				return True
 			else:
 				return False
@@ -269,6 +242,9 @@ class Core:
 				return getattr(o, func)(*args)
 			except:
 				return None
+			finally:
+				# The call may create references, e.g. startup() of a runtime created controller appends it to its parent
+				self.indexNeighbourhood(o)
 		else:
 			return None
 
@@ -292,6 +268,8 @@ class Core:
 				return getattr(o, func)(*params)
 			except:
 				return getattr(o, func)(*args)
+			finally:
+				self.indexNeighbourhood(o)
 		else:
 			return None
 
@@ -316,6 +294,9 @@ class Core:
 			else:
 				instance = eval(obj)(*params)
 
+			if instance in self.entityOrder:
+				self.indexReferences(instance)
+
 			# instance.startup()
 			return instance
 		# except:
@@ -329,20 +310,22 @@ class Core:
 				o.shutdown()
 
 				# Now try to find all object references and delete them.
-				# This can be a quite exhaustive search. We may need to make this more efficient by local tracking
-				for e in self.entities:
+				# Only the entities known to refer to this object are searched
+				for e in list(self.entityReferences.pop(o, {})):
 					for key, value in vars(e).items():
-						if value == o:
+						if value is o:
 							# remove the reference
 							setattr(e, key, None)
 						elif isinstance(value, list):
-							if o in value:
+							while o in value:
 								value.remove(o)
 						elif isinstance(value, dict):
-							for k,v in value.items():
-								if v == o:
+							for k,v in list(value.items()):
+								if v is o:
 									del(value[k])
 
+				self.unindexReferences(o)
+
 				# Note that this may not fix all problems!
 				# FIXME: All components should properly handle a shutdown command and ideally already perform the garbage collection required!
 
@@ -414,35 +397,53 @@ class Core:
 				self.logError("Entity with this name already exists: "+entity.name)
 			else:
 				self.entities.append(entity)
+				self.entityNames[entity.name] = entity
+				self.entityOrder[entity] = self.entityCounter
+				self.entityCounter += 1
 		else:
 			assert(False) #Impossible, entities live local only
 
 	def addDevice(self, entity):
 		self.devices.append(entity)
+		self.typeIndex['devices'][entity.name] = entity
 
 	def addController(self, entity):
 		self.controllers.append(entity)
+		self.typeIndex['controllers'][entity.name] = entity
 
 	def addMeter(self, entity):
 		self.meters.append(entity)
+		self.typeIndex['meters'][entity.name] = entity
 
 	def addFlow(self, entity):
 		self.flows.append(entity)
+		self.typeIndex['flows'][entity.name] = entity
 
 	def addEnv(self, entity):
 		self.environments.append(entity)
+		self.typeIndex['environments'][entity.name] = entity
 
 	def addCost(self, entity):
 		self.costs.append(entity)
+		self.typeIndex['costs'][entity.name] = entity
 
 	def addComponent(self, entity):
 		self.components.append(entity)
+		self.typeIndex['components'][entity.name] = entity
 
 	def removeEntity(self, entity):
-		l = [self.entities, self.devices, self.controllers, self.flows, self.costs, self.environments, self.components, self.meters]
-		for lst in l:
-			if entity in lst:
-				lst.remove(entity)
+		if self.entityNames.get(entity.name) is entity:
+			self.entities.remove(entity)
+			del self.entityNames[entity.name]
+
+		# Only touch the lists that actually contain the entity
+		for key, index in self.typeIndex.items():
+			if index.get(entity.name) is entity:
+				lst = getattr(self, key)
+				while entity in lst:
+					lst.remove(entity)
+				del index[entity.name]
+		self.entityOrder.pop(entity, None)
 
 		# Check if we need to detach a controller.  Should not be needed but not tested for the touchtable
 		for controller in self.controllers:
@@ -461,6 +462,50 @@ class Core:
 		return True
 
 
+	# Bookkeeping of references between entities, used to clean up references when an entity is removed
+	def isEntity(self, obj):
+		name = getattr(obj, 'name', None)
+		return isinstance(name, str) and self.entityNames.get(name) is obj
+
+	def referencedEntities(self, entity):
+		result = []
+		for value in vars(entity).values():
+			if isinstance(value, list):
+				values = value
+			elif isinstance(value, dict):
+				values = list(value.values())
+			else:
+				values = [value]
+
+			for v in values:
+				if v is not entity and self.isEntity(v):
+					result.append(v)
+		return result
+
+	def indexReferences(self, entity):
+		for v in self.referencedEntities(entity):
+			if v not in self.entityReferences:
+				self.entityReferences[v] = {}
+			self.entityReferences[v][entity] = True
+
+	def indexReference(self, entity, value):
+		if value is not entity and self.isEntity(entity) and self.isEntity(value):
+			if value not in self.entityReferences:
+				self.entityReferences[value] = {}
+			self.entityReferences[value][entity] = True
+
+	def indexNeighbourhood(self, entity):
+		# References of an entity and of the entities it refers to, as these may have been connected to the entity
+		if self.isEntity(entity):
+			self.indexReferences(entity)
+			for v in self.referencedEntities(entity):
+				self.indexReferences(v)
+
+	def unindexReferences(self, entity):
+		for v in self.referencedEntities(entity):
+			if v in self.entityReferences:
+				self.entityReferences[v].pop(entity, None)
+
 	def clearDatabase(self):
 		self.db.clearDatabase()
 
@@ -624,6 +669,15 @@ class Core:
 				self.zCallSingle(receivers, func, *args)
 				return None
 
+	# Preparation to fork worker processes (e.g. ctrl.planningExecutor and flow.el.elLoadFlowScheduler)
+	# Stops the writer threads of the logger and the database, such that no thread holds a lock (e.g. of a queue or file)
+	# when forking. They start again when needed. Returns False if other threads still run (e.g. those of a networked
+	# host), a forked process could then inherit locks that are never released.
+	def prepareFork(self):
+		self.logger.stopWriter()
+		self.db.stopWriter()
+		return threading.active_count() == 1
+
 
 
 
@@ -732,6 +786,7 @@ class Core:
 							self.acquireLock(var, e)
 
 						setattr(e, var, val)
+						self.indexReference(e, val)
 
 						if self.useThreads and lock:
 							self.releaseLock(var, e)
@@ -749,6 +804,7 @@ class Core:
 						self.acquireLock(var, recv)
 
 					setattr(recv, var, val)
+					self.indexReference(recv, val)
 
 					if self.useThreads and lock:
 						self.releaseLock(var, recv)
@@ -768,6 +824,7 @@ class Core:
 						self.acquireLock(var, e)
 
 					setattr(e, var, val)
+					self.indexReference(e, val)
 
 					if self.useThreads and lock:
 						self.releaseLock(var, e)
@@ -782,6 +839,7 @@ class Core:
 					self.acquireLock(var, recv)
 
 				setattr(recv, var, val)
+				self.indexReference(recv, val)
 
 				if self.useThreads and lock:
 					self.releaseLock(var, recv)
@@ -875,7 +933,7 @@ class Core:
 		print("This function requires a socket implementation")
 		assert(False)
 
-	def zSendData(self, recvh, what, func, data, msgId = -1, retdict = None):
+	def zSendData(self, recvh, what, func, data, msgId = -1, retdict = None, key = None):
 		print("This function requires a socket implementation")
 		assert(False)
 
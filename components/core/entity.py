@@ -61,6 +61,7 @@ class Entity:
 	def registerTicket(self, number, func, register=True):
 		if number not in self.ticketCallback:
 			self.ticketCallback[number] = func
+			self.host.subscribeTicket(number, self)
 			if register:
 				self.host.registerTicket(number)
 
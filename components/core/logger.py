@@ -0,0 +1,206 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from usrconf import demCfg
+
+import atexit
+import threading
+import time
+import sys
+import os
+from queue import Queue
+
+# Logging of messages, warnings, errors and debug information of a host
+# Records are passed to a list of sinks. Synchronous sinks (e.g. the console) write on the calling thread.
+# Asynchronous sinks (e.g. the log files) are fed through a bounded queue that is drained by a single writer thread,
+# which keeps the files open. Each line is written with a single unbuffered write in append mode, hence lines stay whole
+# when multiple processes write the same file. Logger.flush() (also called when the program exits) waits until all queued
+# lines are written. Forked processes start their own writer thread.
+# The lines and the order of the lines within each file are the same as writing each line directly.
+
+class LogRecord():
+	def __init__(self, level, line, filename=None):
+		self.level = level 			# None for plain lines without console output, see Core.logLine()
+		self.line = line			# Formatted line, including the newline
+		self.filename = filename	# Log file, None if the line should not be written into a file
+
+class LogSink():
+	asynchronous = False
+
+	def accepts(self, record):
+		return True
+
+	def write(self, record):
+		pass
+
+	def flush(self):
+		pass
+
+	def close(self):
+		pass
+
+class ConsoleSink(LogSink):
+	def __init__(self, stream=None):
+		self.stream = stream
+
+	def accepts(self, record):
+		return record.level is not None
+
+	def write(self, record):
+		stream = self.stream
+		if stream is None:
+			stream = sys.stderr
+		stream.write(record.line)
+		stream.flush()
+
+class FileSink(LogSink):
+	asynchronous = True
+
+	def __init__(self, maxSize=0, backups=5):
+		# Rotation: files that exceed maxSize bytes are renamed to <filename>.1 (older ones to .2 etc.), 0 disables rotation
+		self.maxSize = maxSize
+		self.backups = backups
+
+		self.files = {}		# File descriptors by filename
+
+	def accepts(self, record):
+		return record.filename is not None
+
+	def write(self, record):
+		fd = self.files.get(record.filename)
+		if fd is None:
+			os.makedirs(os.path.dirname(record.filename), exist_ok=True)
+			fd = os.open(record.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+			self.files[record.filename] = fd
+
+		# A single unbuffered write in append mode, such that lines of multiple processes writing the same file stay whole
+		os.write(fd, record.line.encode())
+
+		if self.maxSize > 0 and os.fstat(fd).st_size >= self.maxSize:
+			self.rotate(record.filename)
+
+	def rotate(self, filename):
+		os.close(self.files.pop(filename))
+		for i in range(self.backups - 1, 0, -1):
+			if os.path.exists(filename + '.' + str(i)):
+				os.replace(filename + '.' + str(i), filename + '.' + str(i + 1))
+		os.replace(filename, filename + '.1')
+
+	def close(self):
+		# Close the files, such that files of previous days are not kept open
+		for fd in self.files.values():
+			os.close(fd)
+		self.files = {}
+
+class Logger():
+	def __init__(self, host, queueSize=10000):
+		self.host = host
+
+		self.sinks = [ConsoleSink(), FileSink()]
+
+		# Extension of the log file per level
+		self.extensions = {"MESSAGE": ".log", "WARNING": ".warning", "ERROR": ".error", "DEBUG": ".debug"}
+
+		# Writer thread for the asynchronous sinks
+		self.queueSize = queueSize
+		self.queue = Queue(maxsize=queueSize)	# Bounded, writing blocks if the writer cannot keep up
+		self.writer = None
+		self.writerLock = threading.Lock()
+		atexit.register(self.flush)
+		os.register_at_fork(after_in_child=self.afterFork)
+
+	def addSink(self, sink):
+		self.sinks.append(sink)
+
+	def removeSink(self, sink):
+		self.flush()
+		self.sinks.remove(sink)
+		sink.close()
+
+	def log(self, level, msg, write=False):
+		t = self.host.timeObject(time.time()).astimezone(demCfg['timezone'])
+		line = t.strftime("%X") + " | " + level + ": " + msg + "\n"
+
+		filename = None
+		if write:
+			filename = demCfg['var']['log'] + t.strftime("%Y%m%d") + self.extensions[level]
+
+		self.emit(LogRecord(level, line, filename))
+
+	def logLine(self, filename, line):
+		self.emit(LogRecord(None, line + "\n", filename))
+
+	def emit(self, record):
+		for sink in self.sinks:
+			if sink.accepts(record):
+				if sink.asynchronous:
+					self.startWriter()
+					self.queue.put((sink, record))
+				else:
+					sink.write(record)
+
+	def startWriter(self):
+		if self.writer is None:
+			with self.writerLock:
+				if self.writer is None:
+					self.writer = threading.Thread(target=self.run, name="logger", daemon=True)
+					self.writer.start()
+
+	def stopWriter(self):
+		# Write all queued records and stop the writer thread, it is started again by the next record
+		with self.writerLock:
+			if self.writer is not None and self.writer is not threading.current_thread():
+				self.queue.put(None)
+				self.writer.join()
+				self.writer = None
+
+	def afterFork(self):
+		# A forked process (e.g. a worker of ctrl.planningExecutor) does not have the writer thread of its parent,
+		# it starts its own writer with a new queue when it logs. Records still queued in the parent are written by the parent.
+		self.queue = Queue(maxsize=self.queueSize)
+		self.writer = None
+		self.writerLock = threading.Lock()
+
+	def run(self):
+		while True:
+			item = self.queue.get()
+			if item is None:
+				for s in self.sinks:
+					if s.asynchronous:
+						s.flush()
+				self.queue.task_done()
+				break
+
+			sink, record = item
+			try:
+				sink.write(record)
+				if self.queue.empty():
+					# Batch written, make it visible
+					for s in self.sinks:
+						if s.asynchronous:
+							s.flush()
+			except:
+				sys.stderr.write("Could not write log file: " + str(record.filename) + "\n")
+			finally:
+				self.queue.task_done()
+
+	def flush(self):
+		# Wait until all queued records are written and flushed
+		if self.writer is not None and self.writer is not threading.current_thread():
+			self.queue.join()
+
+	def close(self):
+		self.flush()
+		for sink in self.sinks:
+			sink.close()
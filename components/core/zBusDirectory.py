@@ -0,0 +1,59 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+
+# Directory of the hosts connected to the bus, used by tools/bus.py and core.zLocalBus
+# Hosts register with connectSlave or connectMaster, with the info of ZCore.zHostInfo() as argument:
+#	{'protocol': version, 'entities': [names], 'routing': True if the host only subscribes to its own topic}
+# Hosts of protocol version 1 do not send this info and are not registered.
+#
+# The directory is returned to the hosts, such that they address their messages to the host of an entity (see ZCore.zSendList()).
+# The PUB socket of the bus filters on the subscriptions, hence such a message is only sent to the host that owns the receiver.
+# Messages that are still addressed to an entity of a host that uses routing are rewritten into a batch for that host.
+
+class ZBusDirectory():
+	def __init__(self):
+		self.hosts = {} # Info per host
+		self.entities = {} # Host per entity
+
+	def register(self, host, info):
+		if not isinstance(info, dict):
+			return
+
+		self.unregister(host)
+		self.hosts[host] = info
+		for entity in info['entities']:
+			self.entities[entity] = host
+
+	def unregister(self, host):
+		info = self.hosts.pop(host, None)
+		if info is not None:
+			for entity in info['entities']:
+				if self.entities.get(entity) == host:
+					del self.entities[entity]
+
+	def getHosts(self):
+		return dict(self.hosts)
+
+	def route(self, data):
+		receiver = data[0][:-1].decode()
+		host = self.entities.get(receiver)
+		if host is None or not self.hosts[host].get('routing', False):
+			return data
+
+		if data[4] not in (b'func', b'getvar', b'setvar'):
+			return data
+
+		return [(host + "#").encode(), data[1], data[2], data[3], b'batch', data[5], pickle.dumps((data[4].decode(), [receiver]))] + data[6:]
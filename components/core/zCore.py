@@ -14,11 +14,14 @@
 
 from usrconf import demCfg
 from core.core import Core
+from core.zDispatcher import ZDispatcher
+import core.zProtocol as zProtocol
 
 import time
 import zmq
 import pickle
 import threading
+import bisect
 
 import time
 import random
@@ -51,12 +54,31 @@ class ZCore(Core):
 		self.zSendLock = threading.RLock()
 		self.zPubLock = threading.RLock()
 
+		# Return values of outstanding calls, a ZRetWaiter per message ID
 		self.retData = {}
+		self.retDataLock = threading.Lock()
+		self.zTimeout = -1 # Seconds to wait for return values, -1 to wait forever
+
+		# Latency of remote calls per function, as histogram with upper bounds in seconds
+		self.zLatencyBuckets = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0]
+		self.zLatency = {}
+		self.zLatencyLock = threading.Lock()
 
 		# Polling threads
 		self.retThread = None
 		self.hbThread = None
 
+		# Handling of received messages by a pool of workers, see core.zDispatcher
+		self.zDispatcher = None
+		self.zWorkers = 8
+		self.zMaxQueue = 10000 # Messages per worker
+
+		# Bus protocol, see core.zProtocol. Version 2 is used towards hosts that announced it in their messages
+		self.zProtocolVersion = zProtocol.version # Set to 1 to only use the original protocol
+		self.zHostProtocol = {} # Protocol version per remote host
+		self.zDirectory = {} # Host per remote entity, obtained from the bus and learned from return values
+		self.zHostRouting = False # Only subscribe to the topic of this host, requires that all hosts use protocol version 2
+
 		self.zConnected = False
 		self.connectionLock = threading.Lock()
 
@@ -69,6 +91,16 @@ class ZCore(Core):
 #        [5]: function name
 #        [6]: function arguments in a list
 
+#        Protocol version 2 (see core.zProtocol):
+#        [3]: Pickled dict with the sending host, its protocol version, the result address and whether a reply is requested
+#        [6:]: Pickled arguments (protocol 5) followed by the raw buffers of the arrays in it
+#        Calls to multiple entities of one host are batched in a single message to the host:
+#        [0]: host topic
+#        [4]: batch
+#        [6]: pickled tuple of (func | setvar | getvar) and the list of receivers
+#        [7:]: the arguments, encoded once
+#        The host replies with a single message, with "retvals" in [4] and a dict with a result per receiver in [6:]
+
 #        Normal ZMQ message format for DEMKit return values:
 #        [0]: topic                 # should be the original function call
 #        [1]: sender                # crosslink with recv[1]
@@ -86,60 +118,60 @@ class ZCore(Core):
 	def zDecodeFunc(self, data):
 		sender = data[1].decode()
 		receiver = data[0].decode()[:-1]
-		ret = pickle.loads(data[3])
+		ret = self.zLearn(data)
 
 		msgid = data[2].decode()
 
 		func = data[5].decode()
-		args = pickle.loads(data[6])
+		args = zProtocol.decode(data[6:])
 
 		r = self.callFunction(receiver, func, *args)
 
-		if ret != None:
+		if self.zReplyRequested(ret):
 			self.zReturn(ret, func, receiver, sender, msgid, r)
 
 	def zDecodeBroadcast(self, data):
 		sender = data[1].decode()
-		ret = pickle.loads(data[3])
+		ret = self.zLearn(data)
 		receiver = data[0].decode()[:-1]
 
 		msgid = data[2].decode()
 
 		func = data[5].decode()
-		args = pickle.loads(data[6])
+		args = zProtocol.decode(data[6:])
 
 		r = getattr(self, func)(*args)
 
 
 
-		if ret != None:
+		if self.zReplyRequested(ret):
 			self.zReturn(ret, func, receiver, sender, msgid, r)
 
 	def zDecodeGetVar(self, data):
 		sender = data[1].decode()
 		receiver = data[0].decode()[:-1]
-		ret = pickle.loads(data[3])
+		ret = self.zLearn(data)
 
 		msgid = data[2].decode()
 
 		var = data[5].decode()
 
 		r = self.getVar(receiver, var)
-		if ret != None:
+		if self.zReplyRequested(ret):
 			self.zReturn(ret, var, receiver, sender, msgid, r)
 
 	def zDecodeSetVar(self, data):
 		sender = data[1].decode()
 		receiver = data[0].decode()[:-1]
-		ret = pickle.loads(data[3])
+		ret = self.zLearn(data)
 
 		msgid = data[2].decode()
 
 		var = data[5].decode()
-		val = pickle.loads(data[6])
+		val = zProtocol.decode(data[6:])
 
 		r = self.setVar(receiver, var, val)
-		if ret != None:
+		if self.zReplyRequested(ret):
 			self.zReturn(ret, var, receiver, sender, msgid, r)
 
 	def zReturn(self, ret, func, receiver, sender, msgid, r):
@@ -160,8 +192,18 @@ class ZCore(Core):
 
 		what = "retval"
 		snd = sender+'#'
-		msg = [snd.encode(), receiver.encode(), str(msgid).encode(), pickle.dumps(None), what.encode(), func.encode(), pickle.dumps(r)]
+		protocol = self.zReplyProtocol(ret)
+		msg = [snd.encode(), receiver.encode(), str(msgid).encode(), self.zReplyInfo(protocol), what.encode(), func.encode()] + zProtocol.encode(r, protocol)
+		self.zPublish(msg)
+
+	def zReturnBatch(self, ret, func, sender, msgid, results):
+		what = "retvals"
+		snd = sender+'#'
+		protocol = self.zReplyProtocol(ret)
+		msg = [snd.encode(), self.name.encode(), str(msgid).encode(), self.zReplyInfo(protocol), what.encode(), func.encode()] + zProtocol.encode(results, protocol)
+		self.zPublish(msg)
 
+	def zPublish(self, msg):
 		success = False
 		retries = 2
 		while not success and retries > 0:
@@ -179,6 +221,87 @@ class ZCore(Core):
 				self.logWarning("Data could not be published.")
 				raise Warning("Data could not be published")
 
+	# Info in frame [3] of a call, a dict for protocol version 2 and the plain result address for version 1
+	def zInfo(self, reply=True):
+		if self.zProtocolVersion < 2:
+			return pickle.dumps(self.zResultAddress)
+		return pickle.dumps({'host': self.name, 'protocol': self.zProtocolVersion, 'address': self.zResultAddress, 'reply': reply})
+
+	def zReplyInfo(self, protocol):
+		if protocol < 2:
+			return pickle.dumps(None)
+		return self.zInfo(False)
+
+	# Reads frame [3] of a received message and registers the protocol version of the sending host
+	def zLearn(self, data):
+		info = pickle.loads(data[3])
+		if isinstance(info, dict):
+			self.zHostProtocol[info['host']] = info['protocol']
+		return info
+
+	def zReplyRequested(self, ret):
+		if isinstance(ret, dict):
+			return ret['reply']
+		return ret != None
+
+	def zReplyProtocol(self, ret):
+		if isinstance(ret, dict):
+			return min(ret['protocol'], self.zProtocolVersion)
+		return 1
+
+	# Protocol version to use for a remote receiver, version 1 until its host is known
+	def zReceiverProtocol(self, recv):
+		host = self.zDirectory.get(recv)
+		if host is None:
+			return 1
+		return min(self.zHostProtocol.get(host, 1), self.zProtocolVersion)
+
+	# Sends a call to remote receivers
+	# Receivers on a host that speaks protocol version 2 are addressed to that host, in one batch per host
+	def zSendList(self, receivers, what, func, payload, msgId = -1, retdict = None):
+		batches = {}
+		for recv in receivers:
+			protocol = self.zReceiverProtocol(recv)
+			host = self.zDirectory.get(recv)
+			if protocol >= 2 and host != recv:
+				if host not in batches:
+					batches[host] = []
+				batches[host].append(recv)
+			else:
+				msgId = self.zSendData(recv, what, func, payload.encode(protocol), msgId, retdict)
+
+		for host, recvs in batches.items():
+			header = pickle.dumps((what, recvs))
+			msgId = self.zSendData(host, "batch", func, [header] + payload.encode(2), msgId, retdict, self.zLatencyKey(what, func))
+
+		return msgId
+
+	# Info sent to the bus with connectSlave and connectMaster, see core.zBusDirectory
+	def zHostInfo(self):
+		return {'protocol': self.zProtocolVersion, 'entities': [e.name for e in self.entities], 'routing': self.zHostRouting}
+
+	def zUpdateDirectory(self, hosts):
+		for host, info in hosts.items():
+			if host != self.name:
+				self.zHostProtocol[host] = info['protocol']
+				self.zDirectory[host] = host
+				for entity in info['entities']:
+					self.zDirectory[entity] = host
+
+	# Connects to the bus with connectSlave or connectMaster and obtains the directory of the hosts
+	def zConnectBus(self, func):
+		r = self.zCall("bus", func, self.zHostInfo())
+		if isinstance(r, dict):
+			self.zUpdateDirectory(r)
+		return r
+
+	def zListOfSlaves(self):
+		r = self.zCall("bus", "listOfSlaves", True)
+		if isinstance(r, dict):
+			self.zUpdateDirectory(r['hosts'])
+			r = r['slaves']
+		return r
+
 
 	#calls are blocking and expect a return values
 	def zCall(self, receivers, func, *args):
@@ -194,6 +317,7 @@ class ZCore(Core):
 	def zCallList(self, receivers, func, *args):
 		result = {}
 		msgId = -1
+		remote = []
 
 		#cast out the function calls locally and over the bus
 		for recv in receivers:
@@ -203,12 +327,15 @@ class ZCore(Core):
 				if e != None:
 					result[recv] = getattr(e, func)(*args)
 				else:
-					msgId = self.zSendData(recv, "func", func, pickle.dumps(args), msgId, result)
+					remote.append(recv)
 
 			#assuming object here!
 			else:
 				result[recv] = getattr(recv, func)(*args)
 
+		if len(remote) > 0:
+			msgId = self.zSendList(remote, "func", func, zProtocol.Payload(args), msgId, result)
+
 		if msgId != -1:
 			return self.zRetCollector(msgId, len(receivers), useDict = True)
 		else:
@@ -221,7 +348,7 @@ class ZCore(Core):
 				return getattr(e, func)(*args)
 			else:
 				result = {}
-				msgId = self.zSendData(recv, "func", func, pickle.dumps(args), -1, result)
+				msgId = self.zSendList([recv], "func", func, zProtocol.Payload(args), -1, result)
 				return self.zRetCollector(msgId, 1)
 
 		#assuming object here!
@@ -240,6 +367,8 @@ class ZCore(Core):
 
 	#call a function on the bus and get the result(s). Requires the objects as a list!
 	def zCastList(self, receivers, func, *args):
+		remote = []
+
 		#cast out the function calls locally and over the bus
 		for recv in receivers:
 			if isinstance(recv, str):
@@ -248,19 +377,22 @@ class ZCore(Core):
 				if e != None:
 					getattr(e, func)(*args)
 				else:
-					self.zSendData(recv, "func", func, pickle.dumps(args))
+					remote.append(recv)
 
 			#assuming object here!
 			else:
 				getattr(recv, func)(*args)
 
+		if len(remote) > 0:
+			self.zSendList(remote, "func", func, zProtocol.Payload(args))
+
 	def zCastSingle(self, recv, func, *args):
 		if isinstance(recv, str):
 			e = self.entityByName(recv)
 			if e != None:
 				getattr(e, func)(*args)
 			else:
-				self.zSendData(recv, "func", func, pickle.dumps(args))
+				self.zSendList([recv], "func", func, zProtocol.Payload(args))
 
 		#assuming object here!
 		else:
@@ -280,6 +412,7 @@ class ZCore(Core):
 	def zSetList(self, receivers, var, val, lock=True):
 		result = {}
 		msgId = -1
+		remote = []
 
 		#cast out the function calls locally and over the bus
 		for recv in receivers:
@@ -292,6 +425,7 @@ class ZCore(Core):
 							self.acquireLock(var, e)
 
 						setattr(e, var, val)
+						self.indexReference(e, val)
 
 						if self.useThreads and lock:
 							self.releaseLock(var, e)
@@ -300,7 +434,7 @@ class ZCore(Core):
 					else:
 						result[recv] = False
 				else:
-					msgId = self.zSendData(recv, "setvar", var, pickle.dumps(val), msgId, result)
+					remote.append(recv)
 
 			#assuming object here!
 			else:
@@ -309,6 +443,7 @@ class ZCore(Core):
 						self.acquireLock(var, recv)
 
 					setattr(recv, var, val)
+					self.indexReference(recv, val)
 
 					if self.useThreads and lock:
 						self.releaseLock(var, recv)
@@ -317,6 +452,9 @@ class ZCore(Core):
 				else:
 					result[recv] = False
 
+		if len(remote) > 0:
+			msgId = self.zSendList(remote, "setvar", var, zProtocol.Payload(val), msgId, result)
+
 		if msgId != -1:
 			return self.zRetCollector(msgId, len(receivers), useDict = True)
 		else:
@@ -331,6 +469,7 @@ class ZCore(Core):
 						self.acquireLock(var, e)
 
 					setattr(e, var, val)
+					self.indexReference(e, val)
 
 					if self.useThreads and lock:
 						self.releaseLock(var, e)
@@ -340,7 +479,7 @@ class ZCore(Core):
 					return False
 			else:
 				result = {}
-				msgId = self.zSendData(recv, "setvar", var, pickle.dumps(val), -1, result)
+				msgId = self.zSendList([recv], "setvar", var, zProtocol.Payload(val), -1, result)
 				return self.zRetCollector(msgId, 1)
 		else:
 			if hasattr(recv, var):
@@ -348,6 +487,7 @@ class ZCore(Core):
 					self.acquireLock(var, recv)
 
 				setattr(recv, var, val)
+				self.indexReference(recv, val)
 
 				if self.useThreads and lock:
 					self.releaseLock(var, recv)
@@ -370,6 +510,7 @@ class ZCore(Core):
 	def zGetList(self, receivers, var, lock=True):
 		result = {}
 		msgId = -1
+		remote = []
 
 		#cast out the function calls locally and over the bus
 		for recv in receivers:
@@ -388,7 +529,7 @@ class ZCore(Core):
 					else:
 						result[recv] = None
 				else:
-					msgId = self.zSendData(recv, "getvar", var, pickle.dumps(None), msgId, result)
+					remote.append(recv)
 
 			#assuming object here!
 			else:
@@ -403,6 +544,9 @@ class ZCore(Core):
 				else:
 					result[recv] = None
 
+		if len(remote) > 0:
+			msgId = self.zSendList(remote, "getvar", var, zProtocol.Payload(None), msgId, result)
+
 		if msgId != -1:
 			return self.zRetCollector(msgId, len(receivers), useDict = True)
 		else:
@@ -426,7 +570,7 @@ class ZCore(Core):
 					return None
 			else:
 				result = {}
-				msgId = self.zSendData(recv, "getvar", var, pickle.dumps(None), -1, result)
+				msgId = self.zSendList([recv], "getvar", var, zProtocol.Payload(None), -1, result)
 				return self.zRetCollector(msgId, 1)
 
 		#assuming object here!
@@ -447,8 +591,8 @@ class ZCore(Core):
 
 
 	def zInit(self):
-		#Connecting people.
-		zContext = zmq.Context()
+		#Connecting people. The shared context allows inproc:// addresses for a bus within the process (see core.zLocalBus)
+		zContext = zmq.Context.instance()
 
 		# Host -> Bus connection
 		self.zPub = zContext.socket(zmq.PUB)
@@ -496,14 +640,21 @@ class ZCore(Core):
 		time.sleep(1)
 
 	def zSubscribe(self):
-		# Subscribe to all topics
-		for e in self.entities:
-			self.zSub.setsockopt_string(zmq.SUBSCRIBE, e.name+"#")
+		# Subscribe to all topics, with host routing messages for the entities are addressed to the topic of this host
+		if not self.zHostRouting:
+			for e in self.entities:
+				self.zSub.setsockopt_string(zmq.SUBSCRIBE, e.name+"#")
 
 		# ZMQ does not provide a function to check whether the socket is properly connected, so we introduce a small delay
 		time.sleep(0.01)
 
-	def zSendData(self, recvh, what, func, data, msgId = -1, retdict = None):
+	def zLatencyKey(self, what, func):
+		if what != "func":
+			return what + ":" + func
+		return func
+
+	# data is a pickled object, or a list of frames (see core.zProtocol)
+	def zSendData(self, recvh, what, func, data, msgId = -1, retdict = None, key = None):
 		# Acquire a unique message identifier
 		if msgId == -1:
 			self.zSendLock.acquire()
@@ -515,17 +666,20 @@ class ZCore(Core):
 			# release the lock
 			self.zSendLock.release()
 
-		if msgId not in self.retData:
-			# Create a dictionary entry where return values can be stored
-			if retdict is not None:
-				self.retData[msgId] = retdict
-			else:
-				# No dict given for the results, so let's set a flag indicating whether response arrived
-				self.retData[msgId] = False
+		# Create an entry where return values can be stored, casts do not wait for return values
+		if retdict is not None:
+			self.retDataLock.acquire()
+			if msgId not in self.retData:
+				if key is None:
+					key = self.zLatencyKey(what, func)
+				self.retData[msgId] = ZRetWaiter(key, retdict)
+			self.retDataLock.release()
 
 		# Dispatch the data to the queue, such that it will be published and return values can be read out.
 		recvh = recvh + "#"
-		msg = [recvh.encode(), self.name.encode(), str(msgId).encode(), pickle.dumps(self.zResultAddress), what.encode(), func.encode(), data]
+		if not isinstance(data, list):
+			data = [data]
+		msg = [recvh.encode(), self.name.encode(), str(msgId).encode(), self.zInfo(retdict is not None), what.encode(), func.encode()] + data
 
 
 		success = False
@@ -584,13 +738,57 @@ class ZCore(Core):
 
 	def zRetHandle(self, data):
 		msgId = int(data[2].decode())
+		info = self.zLearn(data)
 
-		if msgId in self.retData:
-			if self.retData[msgId] == False:
-				self.retData[msgId] = True
-			else:
-				client = data[1].decode()
-				self.retData[msgId][client] = pickle.loads(data[6])
+		self.retDataLock.acquire()
+		waiter = self.retData.get(msgId)
+		self.retDataLock.release()
+
+		if data[4] == b'retvals':
+			# Results of a batch, one per receiver
+			results = zProtocol.decode(data[6:])
+			for client in results:
+				self.zDirectory[client] = info['host']
+
+			if waiter is not None:
+				waiter.addResults(results)
+
+		else:
+			client = data[1].decode()
+			if isinstance(info, dict) and client != 'broadcast':
+				self.zDirectory[client] = info['host']
+
+			# Wake up the thread waiting for this message
+			if waiter is not None:
+				waiter.addResult(client, zProtocol.decode(data[6:]))
+
+	# Splits a batch into a call per receiver, which are handled by the workers of the receivers
+	def zDecodeBatch(self, data):
+		what, receivers = pickle.loads(data[6])
+		batch = ZBatch(self.zLearn(data), what, data[5].decode(), data[1].decode(), data[2].decode(), data[7:], len(set(receivers)))
+		for recv in receivers:
+			self.zDispatcher.dispatch((recv + "#").encode(), (batch, recv), self.zHandleBatch)
+
+	def zHandleBatch(self, item):
+		batch, receiver = item
+
+		# Every receiver obtains its own copy of the arguments, like with separate messages
+		if batch.what == 'func':
+			r = self.callFunction(receiver, batch.func, *zProtocol.decode(batch.frames))
+		elif batch.what == 'getvar':
+			r = self.getVar(receiver, batch.func)
+		elif batch.what == 'setvar':
+			r = self.setVar(receiver, batch.func, zProtocol.decode(batch.frames))
+		else:
+			self.logWarning("Incompatible batch received, command:" + str(batch.what))
+			return
+
+		if not isinstance(batch.ret, dict):
+			# Call of a host with protocol version 1 that was routed by the bus, see core.zBusDirectory
+			if self.zReplyRequested(batch.ret):
+				self.zReturn(batch.ret, batch.func, receiver, batch.sender, batch.msgId, r)
+		elif batch.addResult(receiver, r) and batch.ret['reply']:
+			self.zReturnBatch(batch.ret, batch.func, batch.sender, batch.msgId, batch.results)
 
 	def zHeartBeat(self):
 		while True:# heartbeat timeout
@@ -614,31 +812,76 @@ class ZCore(Core):
 		self.connectionLock.release()
 
 
-	def zRetCollector(self, msgId, answers, timeout = -1, useDict = False):
-		# Timeout is the number of seconds to wait
-		deadline = -1
-		if timeout > -1:
-			deadline = time.time() + timeout
+	def zRetCollector(self, msgId, answers, timeout = None, useDict = False):
+		# Timeout is the number of seconds to wait, by default self.zTimeout
+		if timeout is None:
+			timeout = self.zTimeout
 
-		try:
-			while (time.time() < deadline or deadline == -1) and len(self.retData[msgId]) < answers:
-				time.sleep(0.1)
+		self.retDataLock.acquire()
+		waiter = self.retData[msgId]
+		self.retDataLock.release()
 
-			if time.time() >= deadline and deadline > -1:
-				del self.retData[msgId]
-				self.logWarning('Timeout on receiving data')
-				raise Warning('Timeout on receiving data')
+		if timeout <= -1:
+			timeout = None
 
-			# Extract the relevant result data
-			if answers == 1 and not useDict:
-				result = list(self.retData[msgId].values())[0]
+		try:
+			# Wait until zRetHandle() delivered all answers
+			if self.zDispatcher is not None and self.zDispatcher.isWorker():
+				# Nested call while handling a message, keep handling messages of this worker in the meantime
+				waiter.wakeup = self.zDispatcher.wakeupCurrent()
+				complete = self.zDispatcher.waitFor(lambda: waiter.isComplete(answers), timeout)
 			else:
-				result = dict(self.retData[msgId])
+				complete = waiter.wait(answers, timeout)
 		except KeyboardInterrupt:
 			exit()
+		finally:
+			self.retDataLock.acquire()
+			self.retData.pop(msgId, None)
+			self.retDataLock.release()
+
+		if not complete:
+			self.logWarning('Timeout on receiving data')
+			raise Warning('Timeout on receiving data')
+
+		self.zAddLatency(waiter.key, time.time() - waiter.startTime)
+
+		# Extract the relevant result data
+		if answers == 1 and not useDict:
+			result = list(waiter.results.values())[0]
+		else:
+			result = dict(waiter.results)
 
 		return result
 
+	def zAddLatency(self, key, latency):
+		self.zLatencyLock.acquire()
+		if key not in self.zLatency:
+			self.zLatency[key] = {'count': 0, 'total': 0.0, 'max': 0.0, 'histogram': [0] * (len(self.zLatencyBuckets) + 1)}
+		stats = self.zLatency[key]
+		stats['count'] += 1
+		stats['total'] += latency
+		stats['max'] = max(stats['max'], latency)
+		stats['histogram'][bisect.bisect_left(self.zLatencyBuckets, latency)] += 1
+		self.zLatencyLock.release()
+
+	# Queue depth and handling latency of received messages
+	def zGetDispatchMetrics(self):
+		if self.zDispatcher is None:
+			return {}
+		return self.zDispatcher.getMetrics()
+
+	# Latency statistics of remote calls per function (getvar: and setvar: prefixes for variables)
+	# The histogram counts the calls up to each bucket bound in self.zLatencyBuckets, the last entry counts the rest
+	def zGetLatency(self):
+		r = {}
+		self.zLatencyLock.acquire()
+		for key, stats in self.zLatency.items():
+			r[key] = dict(stats)
+			r[key]['histogram'] = list(stats['histogram'])
+			r[key]['mean'] = stats['total'] / stats['count']
+		self.zLatencyLock.release()
+		return r
+
 
 	def zHandle(self, data):
 		receiver = data[0].decode()[:-1]
@@ -647,7 +890,7 @@ class ZCore(Core):
 
 		if sender != self.name:
 			if receiver == self.name or receiver == 'broadcast':
-				if what == 'retval':
+				if what == 'retval' or what == 'retvals':
 					self.zRetHandle(data)
 
 				else:
@@ -679,6 +922,10 @@ class ZCore(Core):
 					self.logWarning("Incompatible message received, command:" +str(what))
 
 	def zPoll(self):
+		if self.zDispatcher is None:
+			self.zDispatcher = ZDispatcher(self.zHandle, self.zWorkers, self.zMaxQueue)
+			self.zDispatcher.start()
+
 		try:
 			while True: #self.zGetConnectionState():
 				try:
@@ -686,13 +933,15 @@ class ZCore(Core):
 					if self.zSub in sock:
 						data = self.zSub.recv_multipart()
 						#print(data)
-						if threading.active_count() > self.maxThreads:
-							self.logWarning("Too many threads running. Total threads: "+str(threading.active_count()))
-							while threading.active_count() > self.maxThreads:
-								time.sleep(0.001) # Wait a little time
-
-						newThread = threading.Thread(target=self.zHandle, args=[list(data)])
-						newThread.start()
+						if data[4] == b'retval' or data[4] == b'retvals':
+							# Return values only wake up a waiting thread, handle them right away
+							self.zHandle(data)
+						elif data[4] == b'batch':
+							if data[1] != self.name.encode():
+								self.zDecodeBatch(data)
+						else:
+							# Messages for the same receiver are handled in order by the same worker
+							self.zDispatcher.dispatch(data[0], data)
 
 				except KeyboardInterrupt:
 					exit()
@@ -703,3 +952,66 @@ class ZCore(Core):
 			exit()
 
 		return False
+
+
+# Bookkeeping of a remote call that waits for return values
+# zRetHandle() adds the results and wakes up the waiting thread in zRetCollector()
+class ZRetWaiter():
+	def __init__(self, key, results):
+		self.key = key
+		self.results = results
+		self.startTime = time.time()
+		self.condition = threading.Condition()
+		self.wakeup = None # Function to wake up a dispatcher worker that waits for this call
+
+	def addResult(self, client, value):
+		self.condition.acquire()
+		self.results[client] = value
+		self.condition.notify_all()
+		self.condition.release()
+
+		if self.wakeup is not None:
+			self.wakeup()
+
+	def addResults(self, results):
+		self.condition.acquire()
+		self.results.update(results)
+		self.condition.notify_all()
+		self.condition.release()
+
+		if self.wakeup is not None:
+			self.wakeup()
+
+	def isComplete(self, answers):
+		return len(self.results) >= answers
+
+	def wait(self, answers, timeout=None):
+		self.condition.acquire()
+		try:
+			return self.condition.wait_for(lambda: len(self.results) >= answers, timeout)
+		finally:
+			self.condition.release()
+
+
+# A batched call received by a host, see ZCore.zDecodeBatch()
+# The reply is sent when the results of all receivers are available
+class ZBatch():
+	def __init__(self, ret, what, func, sender, msgId, frames, parts):
+		self.ret = ret
+		self.what = what
+		self.func = func
+		self.sender = sender
+		self.msgId = msgId
+		self.frames = frames
+		self.parts = parts
+
+		self.results = {}
+		self.lock = threading.Lock()
+
+	# Returns True for the result that completes the batch
+	def addResult(self, receiver, value):
+		self.lock.acquire()
+		self.results[receiver] = value
+		complete = len(self.results) == self.parts
+		self.lock.release()
+		return complete
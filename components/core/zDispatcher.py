@@ -0,0 +1,222 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import queue
+import threading
+import time
+import zlib
+
+# Dispatcher for messages received from the bus, used by ZCore.zPoll()
+# Messages are handled by a fixed pool of worker threads, each with a bounded queue.
+# All messages for the same receiver are handled by the same worker, such that they are handled in the order of arrival.
+# When a worker waits for return values of a remote call, it continues to handle messages from its own queue (see waitFor()),
+# such that calls back into this host cannot deadlock. Messages for the receiver that waits are handed over to a helper
+# thread of that receiver, which handles them in their order while the handler waits (e.g. a call from the parent back
+# into the waiting controller), as the thread per message of the original zPoll() did. Handlers that need a lock that is
+# held while waiting block the helper only. Later messages for the receiver go to the helper as long as it has messages,
+# such that the order is kept. A helper that waits itself hands its messages over to a new helper in the same way.
+
+class DispatchHelper():
+	def __init__(self):
+		self.queue = queue.Queue()
+		self.pending = 0		# Messages handed over to this helper that are not yet handled
+
+class ZDispatcher():
+	def __init__(self, handler, workers=8, maxQueue=10000):
+		self.handler = handler
+		self.workers = workers
+		self.maxQueue = maxQueue
+
+		self.queues = []
+		self.threads = []
+		self.local = threading.local()
+
+		self.helpers = {}		# Helper per receiver, see handOver()
+		self.helpersLock = threading.Lock()
+
+		# Metrics
+		self.metricsLock = threading.Lock()
+		self.handled = 0
+		self.totalLatency = 0.0
+		self.maxLatency = 0.0
+
+	def start(self):
+		for i in range(0, self.workers):
+			q = queue.Queue(maxsize=self.maxQueue)
+			t = threading.Thread(target=self.run, args=[q], daemon=True)
+			self.queues.append(q)
+			self.threads.append(t)
+			t.start()
+
+	def stop(self):
+		for q in self.queues:
+			q.put(False)
+		for t in self.threads:
+			t.join()
+		self.queues = []
+		self.threads = []
+
+	def dispatch(self, key, data, handler=None):
+		# Blocks when the queue of the worker is full
+		# The handler overrides the default handler for this message
+		q = self.queues[zlib.crc32(key) % self.workers]
+		q.put((time.time(), key, data, handler))
+
+	def run(self, q):
+		self.local.queue = q
+		self.local.helper = None
+		self.local.active = []		# Receivers of the messages that are being handled by this thread
+		while True:
+			item = q.get()
+			if item is False:
+				break
+			if item is not None and not self.handOver(item):
+				self.handle(item)
+
+	def runHelper(self, key, helper):
+		self.local.queue = helper.queue
+		self.local.helper = helper
+		self.local.active = []
+		while True:
+			self.helpersLock.acquire()
+			if helper.pending == 0:
+				if self.helpers.get(key) is helper:
+					del self.helpers[key]
+				self.helpersLock.release()
+				break
+			self.helpersLock.release()
+
+			item = helper.queue.get()
+			if item is None:
+				continue
+			self.handle(item)
+
+			self.helpersLock.acquire()
+			helper.pending -= 1
+			self.helpersLock.release()
+
+	def handOver(self, item, start=False):
+		# Hands a message over to the helper of its receiver, returns False if there is none and start is False
+		# Helpers are only started by the thread that handles the receiver, hence the check without the lock suffices
+		key = item[1]
+		if not start and key not in self.helpers:
+			return False
+
+		self.helpersLock.acquire()
+		helper = self.helpers.get(key)
+		if helper is None and not start:
+			self.helpersLock.release()
+			return False
+
+		previous = None
+		if helper is None or helper is self.local.helper:
+			# New helper, or a nested one if this thread is the helper of the receiver and waits itself
+			previous = helper
+			helper = DispatchHelper()
+			self.helpers[key] = helper
+			threading.Thread(target=self.runHelper, args=[key, helper], daemon=True).start()
+
+		helper.pending += 1
+		helper.queue.put(item)
+
+		if previous is not None:
+			# Move the later messages of the previous helper, in their order
+			while True:
+				try:
+					i = previous.queue.get_nowait()
+				except queue.Empty:
+					break
+				if i is not None:
+					previous.pending -= 1
+					helper.pending += 1
+					helper.queue.put(i)
+			previous.queue.put(None)	# Keep a wakeup that may have been moved
+		self.helpersLock.release()
+		return True
+
+	def handle(self, item):
+		received, key, data, handler = item
+		if handler is None:
+			handler = self.handler
+		self.local.active.append(key)
+		try:
+			handler(data)
+		except:
+			pass
+		finally:
+			self.local.active.pop()
+
+		latency = time.time() - received
+		self.metricsLock.acquire()
+		self.handled += 1
+		self.totalLatency += latency
+		self.maxLatency = max(self.maxLatency, latency)
+		self.metricsLock.release()
+
+	def isWorker(self):
+		return getattr(self.local, 'queue', None) is not None
+
+	# Wait in a worker or helper until done() is true, handling the messages of its queue in the meantime
+	# Messages for the receivers that are being handled by this thread are handed over to a helper, see handOver()
+	# Returns the result of done(), also on a timeout
+	def waitFor(self, done, timeout=None):
+		q = self.local.queue
+		deadline = None
+		if timeout is not None:
+			deadline = time.time() + timeout
+
+		while not done():
+			try:
+				if deadline is None:
+					item = q.get()
+				else:
+					item = q.get(timeout=max(0.0, deadline - time.time()))
+			except queue.Empty:
+				break
+
+			if item is False:
+				# Stop the worker after this wait
+				q.put(False)
+				break
+			if item is None:
+				continue
+			if not self.handOver(item, item[1] in self.local.active):
+				self.handle(item)
+
+		return done()
+
+	# Function to wake up the current worker when it waits in waitFor()
+	def wakeupCurrent(self):
+		q = self.local.queue
+		def wakeup():
+			try:
+				q.put_nowait(None)
+			except queue.Full:
+				pass	# The worker will wake up for the queued messages
+		return wakeup
+
+	def getMetrics(self):
+		self.metricsLock.acquire()
+		r = {}
+		r['workers'] = self.workers
+		r['queues'] = [q.qsize() for q in self.queues]
+		r['queue'] = sum(r['queues'])
+		r['helpers'] = len(self.helpers)
+		r['handled'] = self.handled
+		r['latency'] = 0.0
+		if self.handled > 0:
+			r['latency'] = self.totalLatency / self.handled
+		r['maxLatency'] = self.maxLatency
+		self.metricsLock.release()
+		return r
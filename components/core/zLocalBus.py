@@ -0,0 +1,125 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import zmq
+import pickle
+import threading
+
+from core.zBusDirectory import ZBusDirectory
+
+# Message bus within one process, a stand-in for tools/bus.py to test and benchmark the bus protocol without separate processes
+# Usage:
+#	bus = ZLocalBus()
+#	bus.start()
+#	bus.attach(host)	# for each ZCore host, before host.zInit()
+#	...
+#	bus.stop()
+#
+# Messages are forwarded like tools/bus.py does, including the routing of core.zBusDirectory.
+# Calls to "bus" for the registration of slaves and the master are answered as well.
+
+class ZLocalBus():
+	def __init__(self, name="localbus"):
+		self.name = name
+		self.pubAddress = "inproc://" + name + "-pub"	# Hosts subscribe here
+		self.subAddress = "inproc://" + name + "-sub"	# Hosts publish here
+
+		self.slaves = []
+		self.master = ""
+		self.directory = ZBusDirectory()
+
+		self.forwarded = 0
+
+		self.thread = None
+		self.running = False
+		self.ready = threading.Event()
+
+	def attach(self, host):
+		host.zPubAddress = self.pubAddress
+		host.zSubAddress = self.subAddress
+
+	def start(self):
+		self.running = True
+		self.thread = threading.Thread(target=self.run, daemon=True)
+		self.thread.start()
+		self.ready.wait()
+
+	def stop(self):
+		self.running = False
+		if self.thread is not None:
+			self.thread.join()
+			self.thread = None
+
+	def run(self):
+		context = zmq.Context.instance()
+
+		rx = context.socket(zmq.SUB)
+		rx.bind(self.subAddress)
+		rx.setsockopt(zmq.SUBSCRIBE, b'')
+
+		tx = context.socket(zmq.PUB)
+		tx.bind(self.pubAddress)
+
+		poller = zmq.Poller()
+		poller.register(rx, zmq.POLLIN)
+		self.ready.set()
+
+		while self.running:
+			if rx in dict(poller.poll(10)):
+				data = rx.recv_multipart()
+				if data[0] == b"bus#":
+					reply = self.handle(data)
+					if reply is not None:
+						tx.send_multipart(reply)
+				else:
+					# Counted before sending, such that the count includes every message a host has received
+					self.forwarded += 1
+					tx.send_multipart(self.directory.route(data))
+
+		rx.close(linger=0)
+		tx.close(linger=0)
+
+	def handle(self, data):
+		sender = data[1].decode()
+		what = data[5].decode()
+
+		args = pickle.loads(data[6])
+
+		r = None
+		if what == "listOfSlaves":
+			r = list(self.slaves)
+			if len(args) > 0 and args[0]:
+				r = {'slaves': r, 'hosts': self.directory.getHosts()}
+		elif what == "connectSlave":
+			if sender not in self.slaves:
+				self.slaves.append(sender)
+			if len(args) > 0:
+				self.directory.register(sender, args[0])
+				r = self.directory.getHosts()
+		elif what == "disconnectSlave":
+			if sender in self.slaves:
+				self.slaves.remove(sender)
+			self.directory.unregister(sender)
+		elif what == "connectMaster":
+			self.master = sender
+			if len(args) > 0:
+				self.directory.register(sender, args[0])
+				r = self.directory.getHosts()
+		elif what == "disconnectMaster":
+			self.master = ""
+			self.directory.unregister(sender)
+		elif what == "heartbeat":
+			r = "alive"
+
+		return [(sender + "#").encode(), data[0], data[2], pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(r)]
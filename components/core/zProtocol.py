@@ -0,0 +1,91 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import pickle
+import numpy as np
+
+from data.psData import PSData, profileAttributes
+
+# Serialization of the bus protocol, see ZCore for the message formats
+# Version 1: Every argument and return value is a single pickled frame
+# Version 2: Objects are pickled with protocol 5, NumPy arrays are sent as separate raw frames after the pickled header.
+#            Profiles in PSData objects are converted to arrays for the transport, and back into lists on arrival.
+#            Calls to multiple entities of the same host are sent as one batched message.
+# Version 2 is only used towards hosts that announced it, such that hosts that speak version 1 keep working.
+
+version = 2
+
+# Lists shorter than this are pickled as usual, the arrays do not pay off for these
+minArrayLength = 16
+
+def packProfile(profile):
+	# Returns the profile with lists of complex or float values replaced by arrays, and the commodities that were replaced
+	result = dict(profile)
+	packed = []
+	for c, values in profile.items():
+		if isinstance(values, list) and len(values) >= minArrayLength:
+			t = type(values[0])
+			if (t is complex or t is float) and all(type(v) is t for v in values):
+				result[c] = np.array(values, dtype=t)
+				packed.append(c)
+	return result, packed
+
+def unpackPSData(state, packed):
+	obj = PSData.__new__(PSData)
+	obj.__dict__.update(state)
+	for attr, commodities in packed.items():
+		for c in commodities:
+			obj.__dict__[attr][c] = obj.__dict__[attr][c].tolist()
+	return obj
+
+class ZPickler(pickle.Pickler):
+	def reducer_override(self, obj):
+		if type(obj) is PSData:
+			state = dict(obj.__dict__)
+			packed = {}
+			for attr in profileAttributes:
+				if isinstance(state.get(attr), dict):
+					state[attr], commodities = packProfile(state[attr])
+					if len(commodities) > 0:
+						packed[attr] = commodities
+			return (unpackPSData, (state, packed))
+		return NotImplemented
+
+def encode(obj, protocol=version):
+	# Returns the list of frames for an object
+	if protocol < 2:
+		return [pickle.dumps(obj)]
+
+	buffers = []
+	f = io.BytesIO()
+	ZPickler(f, protocol=5, buffer_callback=buffers.append).dump(obj)
+	return [f.getvalue()] + [b.raw() for b in buffers]
+
+def decode(frames):
+	# Decodes the frames of both protocol versions
+	# The buffers are copied such that received arrays are writable
+	return pickle.loads(frames[0], buffers=[bytearray(b) for b in frames[1:]])
+
+# Arguments of a call, encoded at most once per protocol version
+class Payload():
+	def __init__(self, obj):
+		self.obj = obj
+		self.frames = {}
+
+	def encode(self, protocol):
+		protocol = min(protocol, version)
+		if protocol not in self.frames:
+			self.frames[protocol] = encode(self.obj, protocol)
+		return self.frames[protocol]
@@ -70,8 +70,7 @@ class AggregatorCtrl(Entity):
 		self.currentFunction.clear()
 
 		results = self.zCall(self.children, 'requestDemandFunction')
-		for r in results.values():
-			self.currentFunction.addFunction(r)
+		self.currentFunction.addFunctions(list(results.values()))
 
 		# Create function to send upwards in the tree
 		self.updatedFunction = copy.deepcopy(self.currentFunction)
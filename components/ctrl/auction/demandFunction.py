@@ -13,6 +13,32 @@
 # limitations under the License.
 
 from collections import OrderedDict
+import numpy as np
+
+# Demand functions are stored as two parallel NumPy arrays, sorted by price: self.prices (integers) and self.demands.
+# Demands are kept as integers as long as only integers are added, such that the results equal the original dict based implementation.
+
+# Demand for each price in the array query of the piecewise linear function through the points (prices, demands)
+def evaluate(prices, demands, query):
+	n = len(prices)
+	if n == 0:
+		return np.zeros(len(query), dtype=int) # no options.
+	elif n == 1:
+		return np.full(len(query), demands[0], dtype=demands.dtype) # Only one option, so this is easy too.
+
+	idx = prices.searchsorted(query)
+	result = demands[np.minimum(idx, n - 1)]
+
+	# Direct hits and overflow on either side do not require interpolation
+	interpolate = (query > prices[0]) & (query < prices[-1]) & (prices[np.minimum(idx, n - 1)] != query)
+	if not interpolate.any():
+		return result
+
+	result = result.astype(float)
+	right = idx[interpolate]
+	left = right - 1
+	result[interpolate] = demands[left] - (((demands[left] - demands[right]) / (prices[right] - prices[left])) * (query[interpolate] - prices[left]))
+	return result
 
 class DemandFunction():
 	def __init__(self, minPrice = -2000, maxPrice = 2000, minComfort = -1000, maxComfort = 1000):
@@ -21,23 +47,39 @@ class DemandFunction():
 		self.maxPrice = maxPrice
 		self.minComfort = minComfort
 		self.maxComfort = maxComfort
-		self.function = OrderedDict()
-	
+		self.prices = np.zeros(0, dtype=int)
+		self.demands = np.zeros(0, dtype=int)
+
+	# The function as {price: demand}, for inspection only
+	@property
+	def function(self):
+		return OrderedDict(zip(self.prices.tolist(), self.demands.tolist()))
+
 	def sort(self):
-		# A sort function, this is all we need and the default solution (the one below) just is ugly.
-		self.function = OrderedDict(sorted(self.function.items(), key=lambda t: t[0]))
+		# The arrays are kept sorted, this is only required if they are altered directly
+		order = np.argsort(self.prices, kind='stable')
+		self.prices = self.prices[order]
+		self.demands = self.demands[order]
 	
 	def clear(self):
-		self.function = OrderedDict()
+		self.prices = np.zeros(0, dtype=int)
+		self.demands = np.zeros(0, dtype=int)
 	
 	def checkFunction(self):
 		pass
 	
 	def removePoint(self, price):
-		if price in self.function:
-			del self.function[price]
+		keep = self.prices != price
+		if not keep.all():
+			self.prices = self.prices[keep]
+			self.demands = self.demands[keep]
 			return True
 		return False
+
+	# Inserts points at the sorted position idx, the arrays are replaced such that copies sharing them are not altered
+	def insertPoints(self, idx, prices, demands):
+		self.demands = np.concatenate((self.demands[:idx], np.array(demands, dtype=np.result_type(self.demands, *demands)), self.demands[idx:]))
+		self.prices = np.concatenate((self.prices[:idx], np.array(prices, dtype=int), self.prices[idx:]))
 	
 	# Add a point, be careful, it will remove (new)illegal points after addition!    
 	def addPoint(self, demand, price):
@@ -46,11 +88,8 @@ class DemandFunction():
 		assert(price >= self.minPrice)
 		assert(price <= self.maxPrice)
 		
-		if price in self.function:
-			del self.function[price]
-
-		self.function[price] = demand
-		self.sort()
+		self.removePoint(price)
+		self.insertPoints(int(self.prices.searchsorted(price)), [price], [demand])
 		self.fixLeftRight(price)
 		
 	# Again: Caution, this will simply overwrite stuff!    
@@ -64,227 +103,173 @@ class DemandFunction():
 		assert(minDemand <= maxDemand)
 				
 		#First remove all points in the range:
-		for price in list(self.function.keys()):
-			if price >= minPrice and price <= maxPrice:
-				del self.function[price]
+		keep = (self.prices < minPrice) | (self.prices > maxPrice)
+		self.prices = self.prices[keep]
+		self.demands = self.demands[keep]
 		
 		#Now add the two points
-		self.function[minPrice] = maxDemand
-		self.function[maxPrice] = minDemand
-		self.sort()
+		idx = int(self.prices.searchsorted(minPrice))
+		if minPrice == maxPrice:
+			self.insertPoints(idx, [maxPrice], [minDemand])
+		else:
+			self.insertPoints(idx, [minPrice, maxPrice], [maxDemand, minDemand])
 		self.fixLeft(minPrice)
 		self.fixRight(maxPrice)
-		
-	def addFunction(self, other, overwrite = True):
+
+	# Demands of both functions for the union of their prices, as in the original point by point merge
+	def combine(self, other, subtract = False):
+		prices = np.union1d(self.prices, other.prices)
+		if subtract:
+			return prices, self.evaluate(prices) - other.evaluate(prices)
+		return prices, self.evaluate(prices) + other.evaluate(prices)
+
+	def combineFunction(self, other, overwrite, subtract):
 		# Note, we assume the same market here as also considered by Koen Kok on the PowerMatcher
 		assert(self.minPrice == other.minPrice)
 		assert(self.maxPrice == other.maxPrice)
 		
 		#check if this function is empty:
-		if len(self.function) == 0:
-			self.function = other.function
+		if len(self.prices) == 0:
+			self.prices = other.prices
+			self.demands = other.demands
 			return True
 		
 		#Check if the other function is empty:
-		if len(other.function) == 0:
+		if len(other.prices) == 0:
 			# Move along, nothing to see here!
 			return True
 		
 		#otherwise, let us merge the two:
-		result = OrderedDict()
-		
-		#obtain a list of all keys in both functions:
-		for price in list(self.function.keys()):
-			result[price] = self.demandForPrice(price) + other.demandForPrice(price)
-
-		for price in list(other.function.keys()):
-			if price not in self.function:
-				result[price] = self.demandForPrice(price) + other.demandForPrice(price)
-								
+		prices, demands = self.combine(other, subtract)
+					
 		if overwrite:			
-			self.function = result  
-			self.sort()
+			self.prices = prices
+			self.demands = demands
 			return True    
 		else:
 			r = DemandFunction()
-			r.function = result
-			r.sort()
+			r.prices = prices
+			r.demands = demands
 			r.minPrice = self.minPrice
 			r.maxPrice = self.maxPrice
 			return r
 		
-		return False
+	def addFunction(self, other, overwrite = True):
+		return self.combineFunction(other, overwrite, False)
 	
 	def subtractFunction(self, other, overwrite = True):
-		# Note, we assume the same market here as also considered by Koen Kok on the PowerMatcher
-		assert(self.minPrice == other.minPrice)
-		assert(self.maxPrice == other.maxPrice)
-		
-		#check if this function is empty:
-		if len(self.function) == 0:
-			self.function = other.function
-			return True
-		
-		#Check if the other function is empty:
-		if len(other.function) == 0:
-			# Move along, nothing to see here!
+		return self.combineFunction(other, overwrite, True)
+
+	# Aggregate many functions at once, e.g. the functions of all children of an aggregator
+	# The breakpoints of all functions are merged once, after which the functions are added in order to the aggregate.
+	# The result is identical to calling addFunction() for each function in turn.
+	def addFunctions(self, functions):
+		for other in functions:
+			assert(self.minPrice == other.minPrice)
+			assert(self.maxPrice == other.maxPrice)
+
+		functions = [f for f in functions if len(f.prices) > 0]
+		if len(self.prices) == 0 and len(functions) > 0:
+			self.prices = functions[0].prices
+			self.demands = functions[0].demands
+			functions = functions[1:]
+		if len(functions) == 0:
 			return True
-		
-		#otherwise, let us merge the two:
-		result = OrderedDict()
-		
-		#obtain a list of all keys in both functions:
-		for price in list(self.function.keys()):
-			result[price] = self.demandForPrice(price) - other.demandForPrice(price)
 
-		for price in list(other.function.keys()):
-			if price not in self.function:
-				result[price] = self.demandForPrice(price) - other.demandForPrice(price)
-					
-		if overwrite:			
-			self.function = result  
-			self.sort()
-			return True    
-		else:
-			r = DemandFunction()
-			r.function = result
-			r.sort()
-			r.minPrice = self.minPrice
-			r.maxPrice = self.maxPrice
-			return r
-		
-		return False   
-					
+		prices = np.unique(np.concatenate([self.prices] + [f.prices for f in functions]))
+		active = np.isin(prices, self.prices, assume_unique=True) # Prices that are breakpoints of the aggregate so far
+		demands = np.zeros(len(prices), dtype=self.demands.dtype)
+		demands[active] = self.demands
+
+		for other in functions:
+			new = np.isin(prices, other.prices, assume_unique=True) & ~active
+			values = other.evaluate(prices[active])
+			if new.any():
+				# New breakpoints are interpolated on the aggregate so far
+				added = evaluate(prices[active], demands[active], prices[new]) + other.evaluate(prices[new])
+				demands = demands.astype(np.result_type(demands, values, added), copy=False)
+				demands[active] += values
+				demands[new] = added
+				active |= new
+			else:
+				demands = demands.astype(np.result_type(demands, values), copy=False)
+				demands[active] += values
+
+		self.prices = prices
+		self.demands = demands
+		return True
+
+	def evaluate(self, prices):
+		return evaluate(self.prices, self.demands, prices)
 					
 	def demandForPrice(self, price):
 		assert(price >= self.minPrice)
 		assert(price <= self.maxPrice)
-		
-		items = list(self.function.items())
 
-		#check if the bidding function provides options anyway:
-		if len(items) == 0:
-			return 0 # no options.
-		elif len(items) == 1:
-			return items[0][1] #Only one option, so this is easy too.
-		
-		if price in self.function:
-			return self.function[price]
-		elif price <= items[0][0]: #Check the first item
-			return items[0][1]
-		elif price >= items[-1][0]: #or overflow on the other side
-			return items[-1][1]
-		else:
-			#Unfortunately, we do not have a direct hit... Let's interpolate between the points
-			idx = 1
-			while items[idx][0] < price: #loop through the list to find the two corresponding indices
-				idx += 1
-				assert(idx < len(items))
-				
-			#now we should have the correct index, get left and right:
-			left = idx - 1
-			right = idx
-			
-			demandDelta = items[left][1] - items[right][1]
-			priceDelta = items[right][0] - items[left][0]
-			assert(priceDelta > 0)
-			
-			demand = items[left][1] - ((demandDelta / priceDelta) * (price - items[left][0]))
-			return demand
-	
-		return 0 #We should never get here though
-	
+		return evaluate(self.prices, self.demands, np.array([price]))[0].item()
 	
 	def priceForDemand(self, demand):
-		# First make a convenient list of the items
-		items = list(self.function.items())   
-		
 		#check if the bidding function provides options anyway:
-		if len(items) <= 1:
+		if len(self.prices) <= 1:
 			return 0 # no options, price doesn't really matter...
 		
 		#check if we are out of bounds:
-		if demand >= items[0][1]:
+		if demand >= self.demands[0]:
 			return self.minPrice
-		elif demand <= items[-1][1]:
+		elif demand <= self.demands[-1]:
 			return self.maxPrice
 		
-		#Otherwise, iterate but check for exact matches as well:
-		idx = 0
-		while items[idx][1] >= demand:
-			if items[idx][1] == demand:
-				return items[idx][0]
-			idx += 1
-			assert(idx < len(items))
+		#Otherwise, find the first point below this demand but check for exact matches before it as well:
+		idx = int(np.argmax(self.demands < demand))
+		exact = np.flatnonzero(self.demands[:idx] == demand)
+		if len(exact) > 0:
+			return self.prices[exact[0]].item()
 		
 		#Indices in which this demand lies:
 		left = idx-1    
 		right = idx
 		
-		demandDelta = items[left][1] - items[right][1]
-		priceDelta = items[right][0] - items[left][0]
+		demandDelta = self.demands[left].item() - self.demands[right].item()
+		priceDelta = self.prices[right].item() - self.prices[left].item()
 
 		# Straight line, we need to avoid division by 0:
 		if demandDelta == 0:
 			# Select the lowest price:
-			return items[left][0]
+			return self.prices[left].item()
 			
-		price = items[left][0] + ((priceDelta / demandDelta) * (items[left][1] - demand))
+		price = self.prices[left].item() + ((priceDelta / demandDelta) * (self.demands[left].item() - demand))
 		return price
 		
 	# Fixes the function to make it concave after the insertion of a point/line
 	# Note: The developer of the demand function is responsible for the demand function creation and should know what he/she is doing!
 	def fixLeft(self, price):
-		items = list(self.function.items()) 
-		
-		if len(items) < 2:
+		if len(self.prices) < 2:
 			return
 		
 		#first find the spot were we need to start
-		idx = 0
-		while items[idx][0] < price:
-			idx += 1
-			assert(idx < len(items))
-			
-		#Get the demand for the last addition    
-		demand = items[idx][1]
+		idx = int(self.prices.searchsorted(price))
+		assert(idx < len(self.prices))
+		if idx == 0:
+			return
 			
 		#And now check the left side of the price spectrum, demand needs to increase    
-		idx -= 1
-		if(idx >= 0):
-			assert(items[idx][0] < price)
-				
-			while idx >= 0:
-				if(items[idx][1] < demand):
-					self.function[items[idx][0]] = demand
-				demand = self.function[items[idx][0]]
-				idx -= 1           
+		demands = self.demands.copy()
+		demands[:idx + 1] = np.maximum.accumulate(demands[idx::-1])[::-1]
+		self.demands = demands
 	
 	def fixRight(self, price):
-		items = list(self.function.items()) 
-		
-		if len(items) < 2:
+		if len(self.prices) < 2:
 			return
 		
 		#first find the spot were we need to start
-		idx = len(items) - 1
-		while items[idx][0] > price:
-			idx -= 1
-			assert(idx < len(items))
-			
-		#Get the demand for the last addition    
-		demand = items[idx][1]
+		idx = int(self.prices.searchsorted(price, side='right')) - 1
+		if idx >= len(self.prices) - 1:
+			return
 			
-		#And now check the left side of the price spectrum, demand needs to increase    
-		idx += 1
-		if(idx < len(items)):
-			assert(items[idx][0] > price)
-				
-			while idx < len(items):
-				if(items[idx][1] > demand):
-					self.function[items[idx][0]] = demand
-				demand = self.function[items[idx][0]]
-				idx += 1 
+		#And now check the right side of the price spectrum, demand needs to decrease
+		demands = self.demands.copy()
+		demands[idx:] = np.minimum.accumulate(demands[idx:])
+		self.demands = demands
 		
 	def fixLeftRight(self, price):
 		#Check if the left side is consistent
@@ -292,7 +277,7 @@ class DemandFunction():
 		
 		#Check if the right side is consistent
 		self.fixRight(price)    
-	
+
 	
 	# Calculates the difference between two functions, required to see the change
 	def difference(self, other):
@@ -301,7 +286,7 @@ class DemandFunction():
 		assert(self.maxPrice == other.maxPrice)
 		
 		# Note: next comment is a trick to speedup things, however it should be tested more whether it is useful in practice.
-		# if(len(self.function)+len(other.function)) > 50:
+		# if(len(self.prices)+len(other.prices)) > 50:
 		# 	return 1000000 #just return a big number, this triggers a new function request to clean up! ;)
 
 		#Create a new temp function in which we subtract the two functions
@@ -323,9 +308,7 @@ class DemandFunction():
 		result = 0
 		
 		# Make a list of all keys (prices) in the both functions
-		prices = []
-		for price in list(self.function.keys()):
-			prices.append(price)
+		prices = self.prices.tolist()
 				
 		# Make sure that both ends of the price spectrum are included
 		if self.minPrice not in prices:
@@ -338,10 +321,11 @@ class DemandFunction():
 			zeroPrice = self.priceForDemand(0)
 			if zeroPrice not in prices:
 				prices.append(zeroPrice)
-			
+
+		demands = [self.demandForPrice(price) for price in prices]
 		for i in range(0, (len(prices)-1)):
-			left = self.demandForPrice(prices[i])
-			right = self.demandForPrice(prices[i+1])
+			left = demands[i]
+			right = demands[i+1]
 			
 			#first calculate the rectangle:
 			result += abs(min(left, right) * (prices[i+1] - prices[i]))
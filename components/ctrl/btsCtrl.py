@@ -86,7 +86,7 @@ class BtsCtrl(TsCtrl):
 
 		# Now we call Thijs vd Klauw's buffer planning algorithms
 		# But we scale all to Wtau instead of Wh
-		opt = OptAlg()
+		opt = OptAlg(self.vectorizedPlanning)
 
 		# FIXME: We should add in efficiencies, just like with the battery
 		# Discrete mode of charging
@@ -32,6 +32,8 @@ class BufConvCtrl(BufCtrl):
 
 		self.useReactiveControl = False #Heat pumps dont do this
 
+		self.planningState += ["predictor"]
+
 		# persistence
 		if self.persistence != None:
 			self.watchlist += ["devData", "devDataUpdate", "predictor"]
@@ -48,6 +50,10 @@ class BufConvCtrl(BufCtrl):
 			data = list(self.zCall(self.dev, 'readValues', time , time + (4*7*24*3600), None, self.timeBase) )
 			self.predictor.addSamples(data, time, self.timeBase)
 
+		# Perfect predictions are read from the device, which is only up to date in the host process
+		if self.perfectPredictions:
+			self.parallelPlanning = False
+
 	def timeTick(self, time, deltatime=0):
 		# Add a sample to the predictor
 		if (time % self.timeBase == 0):
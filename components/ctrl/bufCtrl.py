@@ -46,6 +46,10 @@ class BufCtrl(DevCtrl):
 		# temporary test
 		self.capacitylimits = None
 
+		# The buffer planning only depends on the device data, hence it can be executed in another process
+		self.parallelPlanning = True
+		self.planningState += ["nextPlan"]
+
 
 	def timeTick(self, time, deltatime=0):
 		if self.useEventControl:
@@ -73,6 +77,10 @@ class BufCtrl(DevCtrl):
 
 		self.lockPlanning.release()
 
+	def drawPlanningRandom(self):
+		# New plan interval of bufPlanning()
+		return [random.randint(self.replanInterval[0], self.replanInterval[1])]
+
 	def doPlanning(self, signal, requireImprovement = True):
 		self.lockPlanning.acquire()
 
@@ -152,7 +160,7 @@ class BufCtrl(DevCtrl):
 		cons = self.weaveMultiply(consumption, commodities)
 
 		# Now we call Thijs vd Klauw's buffer planning magic
-		opt = OptAlg()
+		opt = OptAlg(self.vectorizedPlanning)
 
 		# Adjust the target SoC according to the desired profile
 		# This automatically ensures that the buffers act based on powerlimits as well
@@ -281,7 +289,7 @@ class BufCtrl(DevCtrl):
 		profileResult = self.unweaveVec(p, commodities)
 
 		# select a random new plan interval
-		self.nextPlan = self.host.time() + random.randint(self.replanInterval[0], self.replanInterval[1])
+		self.nextPlan = self.host.time() + self.planningRandint(self.replanInterval[0], self.replanInterval[1])
 
 		#calculate the improvement
 		improvement = 0.0
@@ -15,6 +15,7 @@
 
 from ctrl.optCtrl import OptCtrl
 from util.funcReader import FuncReader
+from data.timeProfile import TimeProfile
 
 import copy
 import numpy as np
@@ -47,6 +48,8 @@ class DevCtrl(OptCtrl):
 		self.localWeight = { 'ELECTRICITY':0, 'EL1': 0, 'EL2': 0, 'EL3': 0, 'HEAT': 0, 'NATGAS': 0 }
 		self.localProfileWeight = None
 
+		# The device data is obtained by the host when planning in another process, see preparePlanningState()
+		self.planningState += ["devData", "devDataPlanning"]
 
 
 		# persistence
@@ -124,10 +127,8 @@ class DevCtrl(OptCtrl):
 			self.lockPlanning.acquire()
 
 			for c in self.commodities:
-				self.realized[c] = {}
-				for i in range(0,  len(r['profile'][c])):
-					t = int(signal.time - (signal.time%self.timeBase) + i*self.timeBase)
-					self.realized[c][t] = r['profile'][c][i]
+				self.realized[c] = TimeProfile(self.timeBase)
+				self.realized[c].setRange(int(signal.time - (signal.time%self.timeBase)), r['profile'][c])
 
 			self.planningTimestamp = self.host.time()
 			if self.staticDevice:
@@ -151,15 +152,23 @@ class DevCtrl(OptCtrl):
 
 	#planning functions
 	def doInitialPlanning(self,  signal, parents = []):
-		time = signal.time
-		timeBase = signal.timeBase
+		result = self.initialPlanning(signal)
+		return self.finishInitialPlanning(result, signal, parents)
 
+	# The initial planning is split such that the planning itself can be executed in another process
+	def initialPlanning(self, signal):
 		self.candidatePlanning[self.name] = self.genZeroes(signal.planHorizon)
-		result = copy.deepcopy(self.doPlanning(signal,  False))
+		return copy.deepcopy(self.doPlanning(signal,  False))
+
+	def finishInitialPlanning(self, result, signal, parents = []):
 		self.candidatePlanning[self.name] = copy.deepcopy(result['profile'])
-				
-		self.setPlanningWinner(time, timeBase, self.name, parents)
+
+		self.setPlanningWinner(signal.time, signal.timeBase, self.name, parents)
 		return result
+
+	# Device data for a planning in another process
+	def preparePlanningState(self):
+		self.updateDeviceProperties()
 			
 	def doPlanning(self,  signal,  requireImprovement = True):
 		print("this function must be overridden")	
@@ -223,9 +232,13 @@ class DevCtrl(OptCtrl):
 			devPlan = []
 			
 			if c not in self.realized:
-				self.realized[c] = {}
+				self.realized[c] = TimeProfile(self.timeBase)
 			if c not in self.plan:
-				self.plan[c] = {}
+				self.plan[c] = TimeProfile(self.timeBase)
+
+			#create the plan for the controller, which has to synchronize with the timebase of the controller
+			if self.useEventControl:
+				self.realized[c].setRange(int(time - (time%timeBase)), plan[c], timeBase)
 
 			for i in range(0,  len(plan[c])):
 				#create the local plan for the device. 
@@ -233,11 +246,7 @@ class DevCtrl(OptCtrl):
 				tup = (t, plan[c][i])
 				devPlan.append(tup)
 				
-				#create the plan for the controller, which has to synchronize with the timebase of the controller
 				if self.useEventControl:
-					t = int(time - (time%timeBase) + i*timeBase)
-					self.realized[c][t] = plan[c][i]
-
 					if self.forwardLogging:
 						self.logValue("W-power.realized.imag.c." + c,self.realized[c][t].real,t)
 						if self.host.extendedLogging:
@@ -252,7 +261,8 @@ class DevCtrl(OptCtrl):
 		self.zCall(self.dev, 'setPlan', result)
 
 	def updateDeviceProperties(self):
-		if self.devDataUpdate < self.host.time():
+		# A copy in a worker process uses the device data of the host, its device is not up to date
+		if self.devDataUpdate < self.host.time() and not self.planningWorker:
 			self.devData = self.zCall(self.dev, 'getProperties')
 
 		return self.devData
@@ -277,7 +287,7 @@ class DevCtrl(OptCtrl):
 
 		# Add the current profile
 		for c in self.commodityIntersection(signal.commodities):
-			s.desired[c] = list(np.array(signal.desired[c])*(1-self.localWeight[c]) + np.array(self.localDesired[c].readValues(s.time, s.time+s.planHorizon*s.timeBase, timeBase=s.timeBase))*(self.localWeight[c]) + np.array(list(realized[c][(len(realized[c])-len(s.desired[c])):])))
+			s.desired[c] = list(np.array(signal.desired[c])*(1-self.localWeight[c]) + self.localDesired[c].readArray(s.time, s.time+s.planHorizon*s.timeBase, timeBase=s.timeBase)*(self.localWeight[c]) + np.array(list(realized[c][(len(realized[c])-len(s.desired[c])):])))
 			#s.desired[c] = list(np.array(signal.desired[c]) + np.array(list(realized[c][(len(realized[c])-len(s.desired[c])):]))) # FIXME: Backup if above line does not work. Remove if no issues are found
 
 		# Add the profile steering limits
@@ -295,7 +305,7 @@ class DevCtrl(OptCtrl):
 		# Adapt prices if local prices exist
 		if self.localPrices is not None:
 			if c in self.localPrices:
-				s.prices[c] = list(np.array(s.prices[c]) + np.array(self.localPrices[c].readValues(s.time, s.time+s.planHorizon*s.timeBase, timeBase=s.timeBase)) )
+				s.prices[c] = list(np.array(s.prices[c]) + self.localPrices[c].readArray(s.time, s.time+s.planHorizon*s.timeBase, timeBase=s.timeBase) )
 
 		if self.localProfileWeight is not None:
 			s.profileWeight = self.localProfileWeight
@@ -20,8 +20,9 @@ import threading
 import copy
 
 from ctrl.optCtrl import OptCtrl
-from data.psData import PSData
+from data.psData import PSData, copyProfile
 from util.funcReader import FuncReader
+from data.timeProfile import TimeProfile
 
 class GroupCtrl(OptCtrl):
 	def __init__(self, name, host, parent=None, congestionPoint=None, dev=None):
@@ -69,6 +70,9 @@ class GroupCtrl(OptCtrl):
 
 		self.lockSyncPlanning = threading.Lock()
 
+		# Optional ctrl.planningExecutor.PlanningExecutor to plan the children in parallel processes
+		self.planningExecutor = None
+
 		# persistence
 		if self.persistence != None:
 			self.watchlist = self.watchlist + ['nextPlan', 'alignNextPlan']
@@ -207,16 +211,12 @@ class GroupCtrl(OptCtrl):
 		s.time = self.host.time() - (self.host.time() % self.timeBase)
 		s.timeBase = self.timeBase
 
-		# Stimuli:
-		desired = {}
+		# Stimuli, read in bulk. The lists are created by the readers, hence they do not need to be copied
+		s.desired = {}
+		s.prices = {}
 		for c in self.commodities:
-			desired[c] = self.desired[c].readValues(s.time, s.time + s.planHorizon * s.timeBase, timeBase=s.timeBase)
-		prices = {}
-		for c in self.commodities:
-			prices[c] = self.prices[c].readValues(s.time, s.time + s.planHorizon * s.timeBase, timeBase=s.timeBase)
-
-		s.desired = copy.deepcopy(desired)
-		s.prices = copy.deepcopy(prices)
+			s.desired[c] = self.desired[c].readValues(s.time, s.time + s.planHorizon * s.timeBase, timeBase=s.timeBase)
+			s.prices[c] = self.prices[c].readValues(s.time, s.time + s.planHorizon * s.timeBase, timeBase=s.timeBase)
 
 		# Synchronize data used for planning
 		self.startSynchronizedPlanning(s)
@@ -242,13 +242,13 @@ class GroupCtrl(OptCtrl):
 		time = signal.time
 		result = {}
 		self.planningWinners = []
-		parents = copy.deepcopy(parents)
+		parents = list(parents)
 		parents.append(self.name)
 
 		# Preparing the dictionaries
 		for c in signal.commodities:
-			if c not in self.plan:
-				self.plan[c] = {}
+			if not isinstance(self.plan.get(c), TimeProfile):
+				self.plan[c] = TimeProfile(self.timeBase, self.plan.get(c))
 
 		# Resetting the intermediate vectors for the new planning
 		self.candidatePlanning[self.name] = self.genZeroes(signal.planHorizon)
@@ -258,21 +258,29 @@ class GroupCtrl(OptCtrl):
 		s = copy.deepcopy(signal)
 
 		# Initialization of all children by requesting theur planning
-		results = self.zCall(self.children, 'doInitialPlanning', s, list(parents))
+		if self.planningExecutor is not None:
+			results = self.planningExecutor.doInitialPlanning(self.children, s, list(parents))
+		else:
+			results = self.zCall(self.children, 'doInitialPlanning', s, list(parents))
 
+		# Sum the profiles of the children in preallocated arrays
+		profile = {}
 		for k, r in results.items():
 			for c in self.commodityIntersection(r['profile'].keys()):
-				self.candidatePlanning[self.name][c] = copy.deepcopy(list(np.array(self.candidatePlanning[self.name][c]) + np.array(r['profile'][c])))
-		self.planning = copy.deepcopy(self.candidatePlanning[self.name])
+				if c not in profile:
+					profile[c] = np.array(self.candidatePlanning[self.name][c], dtype=complex)
+				profile[c] += np.array(r['profile'][c])
+		for c in profile:
+			self.candidatePlanning[self.name][c] = list(profile[c])
+		self.planning = copyProfile(self.candidatePlanning[self.name])
 
 		# Bookkeeping
 		for p in parents:
-			self.candidatePlanning[p] = copy.deepcopy(self.planning)
+			self.candidatePlanning[p] = copyProfile(self.planning)
 
 		# Set the timestamped plan vector. To be removed when a profile-steering datatype+function class is introduced which does so by default
 		for c in self.commodities:
-			for i in range(0, len(self.planning[c])):
-				self.plan[c][int(time + i * self.timeBase)] = self.planning[c][i]
+			self.plan[c].setRange(int(time), self.planning[c])
 
 		# Communicate the results back according to the PS interface
 		result['boundImprovement'] = 0.0
@@ -286,7 +294,6 @@ class GroupCtrl(OptCtrl):
 		# We need to reset if we are planning, reset = False during initial planning to establish a feasible starting point!
 
 		result = {}
-		result['profile'] = copy.deepcopy(self.candidatePlanning[self.name])
 		s = copy.deepcopy(signal)
 
 		# FIXME congestionpoints should have the option to provide a vector of bounds instead. T211
@@ -339,7 +346,10 @@ class GroupCtrl(OptCtrl):
 		timeBase = signal.timeBase
 		signal = copy.deepcopy(signal)
 
-		iterationPlanning = copy.deepcopy(self.candidatePlanning[self.name])
+		# The planning of this iteration is kept in preallocated arrays that are updated in place
+		iterationPlanning = {}
+		for c, profile in self.candidatePlanning[self.name].items():
+			iterationPlanning[c] = np.array(profile, dtype=complex)
 
 		# Preparing steering data and local variables
 		participatingChildren = list(self.children)
@@ -358,17 +368,20 @@ class GroupCtrl(OptCtrl):
 		# Adjust the desired profile and local profile into the desired profile (signal) and limits
 		if self.parent is not None and self.parentConnected:
 			for c in self.commodities:
-				signal.desired[c] = list(np.array(signal.desired[c]) + np.array(list(iterationPlanning[c])))
+				signal.desired[c] = list(np.array(signal.desired[c]) + iterationPlanning[c])
 
 				# Add limits:
 				if c in signal.upperLimits:
 					assert (len(signal.upperLimits[c]) == signal.planHorizon)
-					signal.upperLimits[c] = list(np.array(signal.upperLimits[c]) + np.array(list(iterationPlanning[c])))
+					signal.upperLimits[c] = list(np.array(signal.upperLimits[c]) + iterationPlanning[c])
 				if c in signal.lowerLimits:
 					assert (len(signal.lowerLimits[c]) == signal.planHorizon)
-					signal.lowerLimits[c] = list(np.array(signal.lowerLimits[c]) + np.array(list(iterationPlanning[c])))
+					signal.lowerLimits[c] = list(np.array(signal.lowerLimits[c]) + iterationPlanning[c])
 
-		signal = copy.deepcopy(signal)
+		# The desired profile including the local objective does not change between iterations
+		desired = {}
+		for c in self.commodities:
+			desired[c] = np.array(signal.desired[c]) * (1 - self.localWeight[c]) + self.localDesired[c].readArray(signal.time, signal.time + signal.planHorizon * signal.timeBase, timeBase=signal.timeBase) * (self.localWeight[c])
 
 		#####################################
 		#  Iterative Profile Steering algorithm
@@ -384,13 +397,10 @@ class GroupCtrl(OptCtrl):
 			# Adapting the local steering signal
 			s = copy.deepcopy(signal)
 			s.source = self.name
-			s.upperLimits = copy.deepcopy(signal.upperLimits)
-			s.lowerLimits = copy.deepcopy(signal.lowerLimits)
 
 			for c in self.commodities:
 				# Add in the local objective
-				s.desired[c] = list(np.array(signal.desired[c]) * (1 - self.localWeight[c]) + np.array(self.localDesired[c].readValues(s.time, s.time + s.planHorizon * s.timeBase, timeBase=s.timeBase)) * (self.localWeight[c]))
-				s.desired[c] = list(np.array(s.desired[c]) - np.array(iterationPlanning[c]))
+				d = desired[c] - iterationPlanning[c]
 
 				# Determining the sctricter bounds
 				if self.congestionPoint is not None:
@@ -419,17 +429,13 @@ class GroupCtrl(OptCtrl):
 
 
 				# Determining the steering signals that should be sent to the children.
-				if simultaneousCommits > 0:
-					for j in range(0, len(s.desired[c])):
-						s.desired[c][j] = (s.desired[c][j] / simultaneousCommits)
+				s.desired[c] = list(d / simultaneousCommits)
 
-					if c in s.upperLimits and len(s.upperLimits[c]) == s.planHorizon:
-						for j in range(0, len(s.upperLimits[c])):
-							s.upperLimits[c][j] = (s.upperLimits[c][j].real / simultaneousCommits) - (iterationPlanning[c][j] / simultaneousCommits)
+				if c in s.upperLimits and len(s.upperLimits[c]) == s.planHorizon:
+					s.upperLimits[c] = list(np.real(s.upperLimits[c]) / simultaneousCommits - iterationPlanning[c] / simultaneousCommits)
 
-					if c in s.lowerLimits and len(s.lowerLimits[c]) == s.planHorizon:
-						for j in range(0, len(s.lowerLimits[c])):
-							s.lowerLimits[c][j] = (s.lowerLimits[c][j].real / simultaneousCommits) - (iterationPlanning[c][j] / simultaneousCommits)
+				if c in s.lowerLimits and len(s.lowerLimits[c]) == s.planHorizon:
+					s.lowerLimits[c] = list(np.real(s.lowerLimits[c]) / simultaneousCommits - iterationPlanning[c] / simultaneousCommits)
 
 			improvements = {}
 			boundImprovements = {}
@@ -442,7 +448,10 @@ class GroupCtrl(OptCtrl):
 			#####################################
 			# Ask all children to perform a planning
 			self.zCall(participatingChildren, "resetIteration", self.name)
-			results = self.zCall(participatingChildren, 'doPlanning', s)
+			if self.planningExecutor is not None:
+				results = self.planningExecutor.doPlanning(participatingChildren, s)
+			else:
+				results = self.zCall(participatingChildren, 'doPlanning', s)
 
 			# Sort the contribution of all devices
 			for child, val in results.items():
@@ -468,7 +477,7 @@ class GroupCtrl(OptCtrl):
 							# Perform bookkeeping and updating profiles
 							childData = self.zCall(child, 'setIterationWinner', self.name, None)
 							for c in self.commodityIntersection(childData['profile'].keys()):
-								iterationPlanning[c] = list(np.array(iterationPlanning[c]) + np.array(childData['profile'][c]))
+								iterationPlanning[c] += np.array(childData['profile'][c])
 
 							# Finalize the planning when we are the root controller
 							if self.parent is None or self.parentConnected == False:
@@ -488,7 +497,7 @@ class GroupCtrl(OptCtrl):
 						# Perform bookkeeping and updating profiles
 						childData = self.zCall(child, 'setIterationWinner', self.name, None)
 						for c in self.commodityIntersection(childData['profile'].keys()):
-							iterationPlanning[c] = list(np.array(iterationPlanning[c]) + np.array(childData['profile'][c]))
+							iterationPlanning[c] += np.array(childData['profile'][c])
 
 						# Finalize the planning when we are the root controller
 						if self.parent is None or self.parentConnected == False:
@@ -522,10 +531,13 @@ class GroupCtrl(OptCtrl):
 				improvement = 0.0
 
 		# Returning the result
-		self.candidatePlanning[self.name] = copy.deepcopy(iterationPlanning)
+		self.candidatePlanning[self.name] = {}
+		result['profile'] = {}
+		for c in iterationPlanning:
+			self.candidatePlanning[self.name][c] = list(iterationPlanning[c])
+			result['profile'][c] = list(iterationPlanning[c])
 		result['boundImprovement'] = boundImprovement
 		result['improvement'] = improvement
-		result['profile'] = dict(iterationPlanning)
 
 		return result
 
@@ -576,20 +588,23 @@ class GroupCtrl(OptCtrl):
 					s.lowerLimits[c] = []
 
 			# Now fill the vectors with the steering signal and the limits
+			start = self.host.time() - (self.host.time() % self.timeBase)
+			plan = self.readProfile(self.plan, c, start, intervals)
+			realized = self.readProfile(self.realized, c, start, intervals)
 			# FIXME: HAVE ANOTHER LOOK AT THE TRY-EXCEPT STATEMENTS. THEY SHOULD NOT BE REQUIRED
 			for i in range(0, intervals):
 				try:
 					desiredPlan[c].append(complex(0, 0))
 					time = (self.host.time() - (self.host.time() % self.timeBase)) + i * self.timeBase
-					desiredPlan[c][i] = (self.plan[c][time] - self.realized[c][time])
+					desiredPlan[c][i] = (plan[i] - realized[i])
 
 					try:
 						# Add limits:
 						if self.congestionPoint is not None:
 							if self.congestionPoint.hasUpperLimit(c):
-								s.upperLimits[c].append(complex(self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real, self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag))
+								s.upperLimits[c].append(complex(self.congestionPoint.getUpperLimit(c).real - realized[i].real, self.congestionPoint.getUpperLimit(c).imag - realized[i].imag))
 							if self.congestionPoint.hasLowerLimit(c):
-								s.lowerLimits[c].append(complex(self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real, self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag))
+								s.lowerLimits[c].append(complex(self.congestionPoint.getLowerLimit(c).real - realized[i].real, self.congestionPoint.getLowerLimit(c).imag - realized[i].imag))
 
 							# Make sure that the steering signal obeys the bounds
 							if desiredPlan[c][i].real > s.upperLimits[c][i].real or desiredPlan[c][i].real < s.lowerLimits[c][i].real:
@@ -678,6 +693,7 @@ class GroupCtrl(OptCtrl):
 					s.lowerLimits[c] = []
 
 				# Fill vectors
+				realized = self.readProfile(self.realized, c, self.host.time() - (self.host.time() % self.timeBase), s.planHorizon)
 				for i in range(0, s.planHorizon):
 					time = (self.host.time() - (self.host.time() % self.timeBase)) + i * self.timeBase
 					# Check the strictness of bounds and correct them if applicable
@@ -687,13 +703,13 @@ class GroupCtrl(OptCtrl):
 							if c in signal.upperLimits:
 								# The else clause is the original (v3) code. Event based with limits must be tested!
 								if self.congestionPoint.hasLowerLimit(c):
-									s.upperLimits[c][i] = complex(min((self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real), max(self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real), signal.upperLimits[c][i].real),
-																  min((self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag), max(self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag), signal.upperLimits[c][i].imag))
+									s.upperLimits[c][i] = complex(min((self.congestionPoint.getUpperLimit(c).real - realized[i].real), max(self.congestionPoint.getLowerLimit(c).real - realized[i].real), signal.upperLimits[c][i].real),
+																  min((self.congestionPoint.getUpperLimit(c).imag - realized[i].imag), max(self.congestionPoint.getLowerLimit(c).imag - realized[i].imag), signal.upperLimits[c][i].imag))
 								else:
-									s.upperLimits[c][i] = complex(min(signal.upperLimits[c][i].real, (self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real)),
-															  	   min(signal.upperLimits[c][i].imag, (self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag)))
+									s.upperLimits[c][i] = complex(min(signal.upperLimits[c][i].real, (self.congestionPoint.getUpperLimit(c).real - realized[i].real)),
+															  	   min(signal.upperLimits[c][i].imag, (self.congestionPoint.getUpperLimit(c).imag - realized[i].imag)))
 							else:
-								s.upperLimits[c][i] = complex(self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real, self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag)
+								s.upperLimits[c][i] = complex(self.congestionPoint.getUpperLimit(c).real - realized[i].real, self.congestionPoint.getUpperLimit(c).imag - realized[i].imag)
 						except:
 							pass
 
@@ -703,13 +719,13 @@ class GroupCtrl(OptCtrl):
 							if c in signal.lowerLimits:
 								# The else clause is the original (v3) code. Event based with limits must be tested!
 								if self.congestionPoint.hasUpperLimit(c):
-									s.lowerLimits[c][i] = complex(max((self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real), min((self.congestionPoint.getUpperLimit(c).real - self.realized[c][time].real), signal.lowerLimits[c][i].real)),
-																  max((self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag), min((self.congestionPoint.getUpperLimit(c).imag - self.realized[c][time].imag), signal.lowerLimits[c][i].imag)))
+									s.lowerLimits[c][i] = complex(max((self.congestionPoint.getLowerLimit(c).real - realized[i].real), min((self.congestionPoint.getUpperLimit(c).real - realized[i].real), signal.lowerLimits[c][i].real)),
+																  max((self.congestionPoint.getLowerLimit(c).imag - realized[i].imag), min((self.congestionPoint.getUpperLimit(c).imag - realized[i].imag), signal.lowerLimits[c][i].imag)))
 								else:
-									s.lowerLimits[c][i] = complex(max(signal.lowerLimits[c][i].real, (self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real)),
-																   max(signal.lowerLimits[c][i].imag, (self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag)))
+									s.lowerLimits[c][i] = complex(max(signal.lowerLimits[c][i].real, (self.congestionPoint.getLowerLimit(c).real - realized[i].real)),
+																   max(signal.lowerLimits[c][i].imag, (self.congestionPoint.getLowerLimit(c).imag - realized[i].imag)))
 							else:
-								s.lowerLimits[c][i] = complex(self.congestionPoint.getLowerLimit(c).real - self.realized[c][time].real, self.congestionPoint.getLowerLimit(c).imag - self.realized[c][time].imag)
+								s.lowerLimits[c][i] = complex(self.congestionPoint.getLowerLimit(c).real - realized[i].real, self.congestionPoint.getLowerLimit(c).imag - realized[i].imag)
 						except:
 							pass
 
@@ -722,29 +738,38 @@ class GroupCtrl(OptCtrl):
 
 		return s
 
+	# Values of the plan or realized profile of a commodity for the next intervals, None for intervals that do not exist (anymore)
+	def readProfile(self, profiles, c, time, intervals):
+		if isinstance(profiles.get(c), TimeProfile):
+			return profiles[c].getRange(time, intervals, self.timeBase)
+		return [profiles.get(c, {}).get(time + i * self.timeBase) for i in range(0, intervals)]
+
 	# Push an update of a prediction that is considered to be a realized profile (e.g.static loads adjusted based on current measurements)
 	def updateRealized(self, profile):
 		self.lockPlanning.acquire()
 
 		for c in self.commodityIntersection(profile.keys()):
-			for i in range(0, len(profile[c])):
-				time = (self.host.time() - (self.host.time() % self.timeBase)) + i * self.timeBase
-				# FIXME: Check why this try is required here. Shouldn't be required (perhaps the profiles class will resolve this)
-				try:
-					if i == 0:
-						# Weight for time elapsed:
-						w = (self.timeBase - (self.host.time() % self.timeBase)) / self.timeBase
-						profile[c][i] *= w
-
-					self.realized[c][time] += profile[c][i]
-
-					# Write the result for real-time tracking on a grafana dasboard
-					if self.forwardLogging:
+			start = self.host.time() - (self.host.time() % self.timeBase)
+			# FIXME: Check why this try is required here. Shouldn't be required (perhaps the profiles class will resolve this)
+			try:
+				if len(profile[c]) > 0:
+					# Weight for time elapsed:
+					w = (self.timeBase - (self.host.time() % self.timeBase)) / self.timeBase
+					profile[c][0] *= w
+
+				# Only intervals that are in the realized profile are updated
+				self.realized[c].addRange(start, profile[c])
+			except:
+				continue
+
+			# Write the result for real-time tracking on a grafana dasboard
+			if self.forwardLogging:
+				for i in range(0, len(profile[c])):
+					time = start + i * self.timeBase
+					if time in self.realized[c]:
 						self.logValue("W-power.realized.real.c." + c, self.realized[c][time].real, time)
 						if self.host.extendedLogging:
 							self.logValue("W-power.realized.imag.c." + c, self.realized[c][time].imag, time)
-				except:
-					pass
 
 		self.lockPlanning.release()
 
@@ -13,9 +13,12 @@
 # limitations under the License.
 
 from core.entity import Entity
+from data.psData import copyProfile
+from data.timeProfile import TimeProfile
 
 import numpy as np
 import math
+import random
 import threading
 import copy
 
@@ -64,6 +67,16 @@ class OptCtrl(Entity):
 		# Default persistence items
 		self.watchlist = ["planning", "candidatePlanning", "plan", "realized", "planningWinners", "lastPlannedTime"]
 
+		# Parallel planning, see ctrl.planningExecutor
+		self.parallelPlanning = False				# True if doPlanning() can be executed in another process
+		self.planningState = ["candidatePlanning"]	# State that is used or changed by doPlanning(), kept in sync with the worker
+		self.planningRandom = []					# Random numbers for doPlanning() that were drawn beforehand, see drawPlanningRandom()
+		self.planningWorker = False					# True for the copy of the controller in a worker process
+
+		# Use the NumPy implementations of the buffer planning algorithms, see opt.optAlg.OptAlg
+		# These are faster for long horizons, but plans differ in the floating point rounding from the default implementation
+		self.vectorizedPlanning = False
+
 		# Locks
 		self.lockPlanning = threading.Lock()
 
@@ -133,13 +146,8 @@ class OptCtrl(Entity):
 			for data in r.values():
 				for c in data:
 					if c not in result:
-						result[c] = dict(data[c])
-					else:
-						for t in data[c].keys():
-							if t in result[c]:
-								result[c][t] += data[c][t]
-							else:
-								result[c][t] = data[c][t]
+						result[c] = TimeProfile(self.timeBase)
+					result[c].add(data[c])
 			self.realized = copy.deepcopy(result)
 
 		# Perform forward logging to track the results
@@ -174,8 +182,8 @@ class OptCtrl(Entity):
 			child = self.name
 
 		for c in self.commodities:
-			result['profile'][c] = copy.deepcopy(list(np.array(self.candidatePlanning[child][c]) - np.array(self.candidatePlanning[source][c])))
-		self.candidatePlanning[source] = copy.deepcopy(self.candidatePlanning[child])
+			result['profile'][c] = list(np.array(self.candidatePlanning[child][c]) - np.array(self.candidatePlanning[source][c]))
+		self.candidatePlanning[source] = copyProfile(self.candidatePlanning[child])
 
 		self.zCall(self.planningWinners, 'setIterationWinner', source, child, list(parents))
 
@@ -184,26 +192,25 @@ class OptCtrl(Entity):
 	def setPlanningWinner(self, time,  timeBase, source, parents=[]):
 		# Clean up datasets
 		self.lockPlanning.acquire()
-		self.planning = copy.deepcopy(self.candidatePlanning[source])
+		self.planning = copyProfile(self.candidatePlanning[source])
 		self.prunePlan()
 
 		# Create timestamped plan (FIXME to be removed with the new library)
 		for c in self.commodities:
-			if c not in self.plan:
-				self.plan[c] = {}
+			if not isinstance(self.plan.get(c), TimeProfile):
+				self.plan[c] = TimeProfile(self.timeBase, self.plan.get(c))
 
-			for i in range(0,  len(self.planning[c])):
-				t = int((time - time%timeBase) +i*timeBase)
-				self.plan[c][t] = self.planning[c][i]
+			self.plan[c].setRange(int(time - time%timeBase), self.planning[c], timeBase)
 
-				if self.forwardLogging and self.host.logControllers:
+			if self.forwardLogging and self.host.logControllers:
+				for i in range(0,  len(self.planning[c])):
 					self.logValue("W-power.plan.real.c." + c, self.plan[c][int(time + i * self.timeBase)].real,int(time + i * timeBase))
 					if self.host.extendedLogging:
 						self.logValue("W-power.plan.imag.c." + c, self.plan[c][int(time + i * self.timeBase)].imag,int(time + i * timeBase))
 
 		# Synchronize all candidates profiles, should not be needed tho.
 		for p in parents:
-			self.candidatePlanning[p] = copy.deepcopy(self.planning)
+			self.candidatePlanning[p] = copyProfile(self.planning)
 
 		if not self.useEventControl:
 			self.setPlan(self.planning, time, timeBase)
@@ -212,16 +219,32 @@ class OptCtrl(Entity):
 		self.zCall(self.planningWinners, 'setPlanningWinner', time, timeBase, source, list(parents))
 
 	def resetIteration(self, source, parents = []):
-		self.candidatePlanning[self.name] = copy.deepcopy(self.candidatePlanning[source])
+		self.candidatePlanning[self.name] = copyProfile(self.candidatePlanning[source])
 
-		parents = copy.deepcopy(parents)
+		parents = list(parents)
 		for p in parents:
 			self.candidatePlanning[p] = self.candidatePlanning[source]
 
 		parents.append(self.name)
 		self.zCall(self.children, 'resetIteration', source, list(parents))
 
-		self.candidatePlanning[self.name] = copy.deepcopy(self.candidatePlanning[source])
+		self.candidatePlanning[self.name] = copyProfile(self.candidatePlanning[source])
+
+	# Planning in another process
+	# Called in the host process before the planning state is sent to the worker, e.g. to obtain the device data
+	def preparePlanningState(self):
+		pass
+
+	# Random numbers drawn by one doPlanning() call, in the order in which they are drawn
+	# These are drawn in the host process when the planning is executed in another process, such that the random
+	# numbers are the same as in a sequential planning. The planning obtains them through planningRandint()
+	def drawPlanningRandom(self):
+		return []
+
+	def planningRandint(self, a, b):
+		if len(self.planningRandom) > 0:
+			return self.planningRandom.pop(0)
+		return random.randint(a, b)
 
 	def resetPlanning(self, parents = []):
 		self.planningWinners = []
@@ -230,27 +253,21 @@ class OptCtrl(Entity):
 		self.zCall(self.children, 'resetPlanning', list(parents))
 
 	def prunePlan(self):
-		try:
-			for c in self.commodities:
-				l = list(self.plan[c].keys())
-				for k in l:
-					if k <= self.host.time()-self.timeBase:
-						del self.plan[c][k]
-					else:
-						break
-		except:
-			pass # dict not filled yet, nothing to clean
-
-		try:
-			for c in self.commodities:
-				l = list(self.realized[c].keys())
-				for k in l:
-					if k <= self.host.time()-self.timeBase:
-						del self.realized[c][k]
-					else:
-						break
-		except:
-			pass # dict not filled yet, nothing to clean
+		for profiles in [self.plan, self.realized]:
+			try:
+				for c in self.commodities:
+					if isinstance(profiles[c], TimeProfile):
+						profiles[c].prune(self.host.time()-self.timeBase)
+						continue
+
+					l = list(profiles[c].keys())
+					for k in l:
+						if k <= self.host.time()-self.timeBase:
+							del profiles[c][k]
+						else:
+							break
+			except:
+				pass # dict not filled yet, nothing to clean
 
 
 
@@ -0,0 +1,274 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import multiprocessing
+import os
+import pickle
+import threading
+import traceback
+
+# Parallel planning of device controllers for profile steering
+# Usage in a model, the same executor can be shared by all group controllers of a host:
+#	executor = PlanningExecutor(sim, workers=8)
+#	groupCtrl.planningExecutor = executor
+#
+# The worker processes are forked at the first planning and keep running until shutdown(). Each controller that sets
+# OptCtrl.parallelPlanning is owned by one worker, which plans it with its own copy of the controller.
+# The state that a planning uses and changes (OptCtrl.planningState) is kept in sync between both copies by sending
+# only the entries that changed since the last call, see stateDelta(). Dicts (e.g. candidatePlanning) are compared per
+# key, hence a call sends the steering signal and mostly only the own profile of a controller in both directions.
+# Device data is obtained in this process (OptCtrl.preparePlanningState()), the workers do not use the bus.
+# Children that are not owned by a worker (e.g. group controllers, remote entities or controllers created after the
+# fork) are planned as usual in this process while the workers run.
+# Results are collected in the order of the children, such that the outcome is equal to a sequential planning.
+# Random numbers used by a planning in a worker are drawn in this process in the order of the children, see
+# OptCtrl.drawPlanningRandom(), hence they are the same as in a sequential planning.
+#
+# The writer threads of the logger and the database are stopped before forking, see Core.prepareFork(). Networked
+# hosts (ZHost) run their bus threads during the whole simulation, hence the workers are forked while these run. This is
+# safe as the workers only execute the planning of their controllers: they create new planning locks for them, the
+# logger resets itself in a forked process and none of the locks or sockets of the bus threads are used.
+# NOTE: Requires the fork start method (i.e. Linux)
+
+executorHost = None		# Host of the executor, inherited by the workers
+
+def stateDelta(entity, synced):
+	# Entries of the planning state that changed since the last synchronization, as list of ((var, key), pickled value)
+	# The key is None for a whole attribute, a value of None removes the entry. synced holds the last pickled values.
+	delta = []
+	for var in entity.planningState:
+		value = getattr(entity, var)
+		if type(value) is dict:
+			entries = [((var, key), v) for key, v in value.items()]
+		else:
+			entries = [((var, None), value)]
+
+		current = set()
+		for k, v in entries:
+			current.add(k)
+			data = pickle.dumps(v, pickle.HIGHEST_PROTOCOL)
+			if synced.get(k) != data:
+				synced[k] = data
+				delta.append((k, data))
+
+		for k in [k for k in synced if k[0] == var and k not in current]:
+			del synced[k]
+			delta.append((k, None))
+	return delta
+
+def applyDelta(entity, synced, delta):
+	for (var, key), data in delta:
+		if data is None:
+			synced.pop((var, key), None)
+			value = getattr(entity, var)
+			if key is None:
+				if type(value) is not dict:
+					setattr(entity, var, {})	# The attribute became a dict
+			elif type(value) is dict:
+				value.pop(key, None)
+			continue
+
+		synced[(var, key)] = data
+		if key is None:
+			setattr(entity, var, pickle.loads(data))
+		else:
+			if type(getattr(entity, var)) is not dict:
+				setattr(entity, var, {})
+			getattr(entity, var)[key] = pickle.loads(data)
+
+def runWorker(conn, names, synced):
+	# Main loop of a worker process, plans the controllers in names
+	# synced is the state of the controllers at the fork, which both processes use as the start of the synchronization
+	entities = {}
+	for name in names:
+		e = executorHost.entityByName(name)
+		e.lockPlanning = threading.Lock()	# Could have been held by another thread when forking
+		e.planningWorker = True
+		entities[name] = e
+
+	while True:
+		try:
+			task = conn.recv()
+		except EOFError:
+			break
+		if task is None:
+			break
+
+		func, args, currentTime, calls = task
+		try:
+			executorHost.currentTime = currentTime
+			results = []
+			for name, delta, randomValues in calls:
+				e = entities[name]
+				applyDelta(e, synced[name], delta)
+				e.planningRandom = randomValues
+				r = getattr(e, func)(*args)
+				results.append((r, stateDelta(e, synced[name])))
+			conn.send(results)
+		except:
+			conn.send(traceback.format_exc())
+	conn.close()
+
+class PlanningTask():
+	def __init__(self, worker, children):
+		self.worker = worker
+		self.children = children
+		self.results = None
+
+class PlanningExecutor():
+	def __init__(self, host, workers=None):
+		self.host = host
+
+		self.workers = workers
+		if self.workers is None:
+			self.workers = os.cpu_count()
+
+		self.processes = []
+		self.connections = []
+		self.waiting = []			# Task per worker of which the results are not yet received
+		self.owner = {}				# Worker per controller name
+		self.synced = {}			# Last synchronized planning state per controller name, see stateDelta()
+
+		self.lock = threading.RLock()
+
+	def start(self):
+		global executorHost
+
+		with self.lock:
+			if len(self.processes) > 0:
+				return
+
+			# Controllers that are planned by the workers, distributed round-robin
+			entities = [e for e in self.host.entities if getattr(e, 'parallelPlanning', False)]
+			names = [e.name for e in entities]
+			for i in range(0, len(entities)):
+				self.owner[names[i]] = i % self.workers
+				self.synced[names[i]] = {}
+				stateDelta(entities[i], self.synced[names[i]])
+
+			self.host.prepareFork()
+			executorHost = self.host
+			context = multiprocessing.get_context('fork')
+			for w in range(0, self.workers):
+				conn, child = context.Pipe()
+				p = context.Process(target=runWorker, args=(child, names[w::self.workers], self.synced), daemon=True)
+				p.start()
+				child.close()
+				self.processes.append(p)
+				self.connections.append(conn)
+				self.waiting.append(None)
+
+	def shutdown(self):
+		with self.lock:
+			for w in range(0, len(self.processes)):
+				self.receive(w)
+				self.connections[w].send(None)
+				self.processes[w].join()
+				self.connections[w].close()
+			self.processes = []
+			self.connections = []
+			self.waiting = []
+			self.owner = {}
+			self.synced = {}
+
+	def doPlanning(self, children, signal):
+		return self.execute(children, 'doPlanning', (signal,), 'doPlanning', (signal,), None, ())
+
+	def doInitialPlanning(self, children, signal, parents):
+		return self.execute(children, 'doInitialPlanning', (signal, parents), 'initialPlanning', (signal,), 'finishInitialPlanning', (signal, parents))
+
+	def execute(self, children, func, args, parallelFunc, parallelArgs, finishFunc, finishArgs):
+		self.start()
+
+		# Select the children that are planned by a worker
+		entities = {}
+		for child in children:
+			e = child
+			if isinstance(child, str):
+				e = self.host.entityByName(child)
+			if e is not None and e.name in self.owner and getattr(e, 'parallelPlanning', False):
+				entities[child] = e
+
+		# Children are handled in their order, such that random numbers are drawn in the same order as in a sequential
+		# planning. Consecutive children that are planned by the workers are sent together, the other children are
+		# planned in the meantime.
+		tasks = []
+		r = {}
+		pending = []
+		others = []
+		for child in children:
+			if child in entities:
+				if len(others) > 0:
+					r.update(self.host.zCall(others, func, *args))
+					others = []
+				pending.append(child)
+			else:
+				tasks += self.submit(pending, entities, parallelFunc, parallelArgs)
+				pending = []
+				others.append(child)
+
+		tasks += self.submit(pending, entities, parallelFunc, parallelArgs)
+		if len(others) > 0:
+			r.update(self.host.zCall(others, func, *args))
+
+		for task in tasks:
+			with self.lock:
+				if task.results is None:
+					self.receive(task.worker)
+			for child, (result, delta) in zip(task.children, task.results):
+				e = entities[child]
+				applyDelta(e, self.synced[e.name], delta)
+				r[child] = result
+
+		# Finalize in the original order
+		results = {}
+		for child in children:
+			if child in entities and finishFunc is not None:
+				r[child] = getattr(entities[child], finishFunc)(r[child], *finishArgs)
+			if child in r:
+				results[child] = r[child]
+
+		return results
+
+	def submit(self, children, entities, func, args):
+		# Sends one task per worker with the changed planning state of its controllers
+		calls = {}
+		for child in children:
+			e = entities[child]
+			e.preparePlanningState()
+			call = (e.name, stateDelta(e, self.synced[e.name]), e.drawPlanningRandom())
+			calls.setdefault(self.owner[e.name], []).append((child, call))
+
+		tasks = []
+		with self.lock:
+			for w, items in calls.items():
+				# One task per worker at a time, such that the pipes cannot fill up in both directions
+				self.receive(w)
+				task = PlanningTask(w, [child for child, call in items])
+				self.connections[w].send((func, args, self.host.currentTime, [call for child, call in items]))
+				self.waiting[w] = task
+				tasks.append(task)
+		return tasks
+
+	def receive(self, worker):
+		# Obtain the results of the waiting task of a worker
+		task = self.waiting[worker]
+		if task is None:
+			return
+		self.waiting[worker] = None
+		results = self.connections[worker].recv()
+		if isinstance(results, str):
+			raise RuntimeError("[PlanningExecutor] Planning failed in worker " + str(worker) + ":\n" + results)
+		task.results = results
@@ -262,7 +262,7 @@ class ThermalBufConvCtrl(ThermalDevCtrl):
 
 		# Now we call Thijs vd Klauw's buffer planning magic
 		# But we scale all to Wtau instead of Wh
-		opt = OptAlg()
+		opt = OptAlg(self.vectorizedPlanning)
 		if devData['discrete']:
 			p = opt.bufferPlanning(desired,
 								   devData['soc']*(3600.0/signal.timeBase),
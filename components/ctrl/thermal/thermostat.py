@@ -194,7 +194,10 @@ class Thermostat(ThermalDevCtrl):
 			temperatureSetpointHeating = self.jobs[idx][1]['setpoint']
 			temperatureSetpointCooling = self.jobs[idx][1]['setpoint']
 
-		# Fill the predictor
+		# Fill the predictor, the samples are added in bulk
+		startTime = time
+		samplesHeating = []
+		samplesCooling = []
 		while time < self.host.time():
 			j = self.jobs[idx+1][1]
 			if j['startTime']-self.preheatingTime <= time and j['setpoint'] > self.temperatureMin: # Setpoint above idletemp, preheat/precool
@@ -207,12 +210,15 @@ class Thermostat(ThermalDevCtrl):
 				idx += 1
 
 			# Add a prediction sample
-			self.predictorLower.addSample(temperatureSetpointHeating, time)
-			self.predictorUpper.addSample(temperatureSetpointCooling, time)
+			samplesHeating.append(temperatureSetpointHeating)
+			samplesCooling.append(temperatureSetpointCooling)
 
 			# Advance time
 			time += self.timeBase
 
+		self.predictorLower.addSamples(samplesHeating, startTime, self.timeBase)
+		self.predictorUpper.addSamples(samplesCooling, startTime, self.timeBase)
+
 	def doPrediction(self, startTime, endTime, producingPowers = None, timeBase = None):
 		if timeBase is None:
 			timeBase = self.timeBase
@@ -35,6 +35,15 @@ class TsCtrl(DevCtrl):
 		self.nextStart = None
 		self.staticDevice = False
 
+		# The planning only depends on the device data, hence it can be executed in another process
+		self.parallelPlanning = True
+		self.planningState += ["jobCache", "jobCacheTime", "cachedProfile", "realized"]
+
+	def preparePlanningState(self):
+		DevCtrl.preparePlanningState(self)
+		if len(self.cachedProfile) == 0:
+			self.cachedProfile = self.zCall(self.dev, 'getProfile', self.timeBase)
+
 	def doPlanning(self, signal, requireImprovement = True):
 		self.lockPlanning.acquire()
 		# Prepare the result dictionary
@@ -181,7 +190,7 @@ class TsCtrl(DevCtrl):
 		devProfile[:] = [ val*weight for val in devProfile ]
 
 		#call the algorithm
-		opt = OptAlg()
+		opt = OptAlg(self.vectorizedPlanning)
 		p = opt.timeShiftablePlanning(s.desired[c][startIdx:endIdx], devProfile, lowerLimits, upperLimits, s.prices[c][startIdx:endIdx], s.profileWeight)
 
 		#now add the profile to the result vector
@@ -15,6 +15,27 @@
 # Profile steering data structure
 
 import copy as cp
+import numpy as np
+
+# Attributes that hold profiles per commodity
+profileAttributes = ['desired', 'profile', 'prices', 'upperLimits', 'lowerLimits', 'averageProfile', 'scaledLagrangian']
+scalarTypes = {int, float, complex, bool, np.float64, np.complex128, np.int64}
+
+def copyProfile(profile):
+	# Copy a dict with a profile per commodity
+	# Values in a profile are immutable numbers, hence a copy of the list or array is equal to a deepcopy, but much cheaper
+	if not isinstance(profile, dict):
+		return cp.deepcopy(profile)
+
+	result = {}
+	for c, values in profile.items():
+		if isinstance(values, np.ndarray) and values.dtype != object:
+			result[c] = values.copy()
+		elif isinstance(values, list) and all(type(v) in scalarTypes for v in values):
+			result[c] = list(values)
+		else:
+			result[c] = cp.deepcopy(values)
+	return result
 
 class PSData():
 	def __init__(self, other = None):
@@ -96,9 +117,9 @@ class PSData():
 		# self = cp.deepcopy(other)
 
 		self.commodities = cp.deepcopy(other.commodities)
-		self.desired = cp.deepcopy(other.desired)
+		self.desired = copyProfile(other.desired)
 		self.weights = cp.deepcopy(other.weights)
-		self.prices = cp.deepcopy(other.prices)
+		self.prices = copyProfile(other.prices)
 		self.profileWeight = other.profileWeight
 		self.time = other.time
 		self.timeBase = other.timeBase
@@ -107,17 +128,28 @@ class PSData():
 		self.allowDiscomfort = other.allowDiscomfort
 		self.planHorizon = other.planHorizon
 		self.planInterval = other.planInterval
-		self.upperLimits = cp.deepcopy(other.upperLimits)
-		self.lowerLimits = cp.deepcopy(other.lowerLimits)
+		self.upperLimits = copyProfile(other.upperLimits)
+		self.lowerLimits = copyProfile(other.lowerLimits)
 		self.originalTimestamp = other.originalTimestamp
 
 		# ADMM
 		try:
 			self.rho = other.rho
-			self.averageProfile = cp.deepcopy(other.averageProfile)
-			self.scaledLagrangian = cp.deepcopy(other.scaledLagrangian)
+			self.averageProfile = copyProfile(other.averageProfile)
+			self.scaledLagrangian = copyProfile(other.scaledLagrangian)
 		except:
 			pass
+
+	def __deepcopy__(self, memo):
+		# Signals are copied many times during a planning, profiles are copied per commodity instead of per value
+		result = self.__class__.__new__(self.__class__)
+		memo[id(self)] = result
+		for key, value in self.__dict__.items():
+			if key in profileAttributes:
+				result.__dict__[key] = copyProfile(value)
+			else:
+				result.__dict__[key] = cp.deepcopy(value, memo)
+		return result
 		
 	def copyFrom(self, obj):
 		self.commodities = cp.deepcopy(obj.commodities)
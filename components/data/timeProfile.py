@@ -0,0 +1,267 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Time indexed profile, used for the timestamped plan and realized profiles of controllers
+
+import numpy as np
+
+# The values are stored in a circular NumPy buffer, starting at the timestamp self.start at position self.head.
+# Timestamps are aligned with the timeBase, an index by time, slice assignment of a horizon and pruning of old values are O(1).
+# Values are stored as floats until the first complex value is written, after which all values are complex.
+# The class behaves like the dict {timestamp: value} it replaces, values at timestamps that are not aligned with
+# the timeBase are kept in a separate dict.
+class TimeProfile():
+	def __init__(self, timeBase=900, values=None):
+		self.timeBase = timeBase
+
+		self.start = 0 		# Timestamp of the first slot
+		self.head = 0 		# Position of the first slot in the buffer
+		self.length = 0 	# Number of slots
+		self.buffer = np.zeros(0)
+		self.valid = np.zeros(0, dtype=bool)
+
+		self.unaligned = {}
+
+		if values is not None:
+			for t, v in values.items():
+				self[t] = v
+
+	def capacity(self):
+		return len(self.buffer)
+
+	def position(self, t):
+		# Returns the position of a timestamp in the buffer, or -1 if it is not in the buffer
+		if self.length == 0:
+			return -1
+		d = t - self.start
+		if d < 0 or d % self.timeBase != 0:
+			return -1
+		k = int(d // self.timeBase)
+		if k >= self.length:
+			return -1
+		return (self.head + k) % len(self.buffer)
+
+	def isAligned(self, t):
+		# The alignment is fixed by the first timestamp that is written
+		return len(self.buffer) == 0 or (t - self.start) % self.timeBase == 0
+
+	def reserve(self, first, last):
+		# Extends the buffer such that it contains the slots for the aligned timestamps first up to and including last
+		if self.length == 0:
+			self.start = first
+			self.head = 0
+
+		start = min(self.start, first)
+		length = int((max(self.start + (self.length - 1) * self.timeBase, last) - start) // self.timeBase) + 1
+		front = int((self.start - start) // self.timeBase)
+		if front == 0 and length == self.length:
+			return
+
+		if length > len(self.buffer):
+			# Reallocate, with the first slot at position 0
+			capacity = max(2 * len(self.buffer), length, 16)
+			buffer = np.zeros(capacity, dtype=self.buffer.dtype)
+			valid = np.zeros(capacity, dtype=bool)
+			if self.length > 0:
+				positions = self.positions(0, self.length)
+				buffer[front:front + self.length] = self.buffer[positions]
+				valid[front:front + self.length] = self.valid[positions]
+			self.buffer = buffer
+			self.valid = valid
+			self.head = 0
+		else:
+			# New slots may still contain pruned values
+			self.head = (self.head - front) % len(self.buffer)
+			self.valid[self.positions(0, front)] = False
+			self.valid[self.positions(front + self.length, length - front - self.length)] = False
+
+		self.start = start
+		self.length = length
+
+	def positions(self, k, n):
+		# Positions of the n slots from slot k onwards
+		return (self.head + k + np.arange(n)) % len(self.buffer)
+
+	def upgrade(self, values):
+		# Switch to complex values if needed
+		if self.buffer.dtype != complex and np.iscomplexobj(values):
+			self.buffer = self.buffer.astype(complex)
+
+	def prune(self, time):
+		# Removes all values at or before the given time
+		if self.length > 0 and time >= self.start:
+			n = min(self.length, int((time - self.start) // self.timeBase) + 1)
+			self.head = (self.head + n) % len(self.buffer)
+			self.start += n * self.timeBase
+			self.length -= n
+
+		if len(self.unaligned) > 0:
+			for t in [t for t in self.unaligned if t <= time]:
+				del self.unaligned[t]
+
+	def setRange(self, time, values, timeBase=None):
+		# Sets the values of a horizon starting at the given time
+		if timeBase is None:
+			timeBase = self.timeBase
+		if len(values) == 0:
+			return
+
+		if timeBase != self.timeBase or not self.isAligned(time):
+			for i in range(0, len(values)):
+				self[time + i * timeBase] = values[i]
+			return
+
+		values = np.asarray(values)
+		self.upgrade(values)
+		self.reserve(time, time + (len(values) - 1) * self.timeBase)
+		positions = self.positions(int((time - self.start) // self.timeBase), len(values))
+		self.buffer[positions] = values
+		self.valid[positions] = True
+
+	def getRange(self, time, n, timeBase=None):
+		# Returns the values of a horizon starting at the given time, None for timestamps without a value
+		if timeBase is None:
+			timeBase = self.timeBase
+
+		if timeBase != self.timeBase or not self.isAligned(time) or len(self.unaligned) > 0 or self.length == 0:
+			return [self.get(time + i * timeBase) for i in range(0, n)]
+
+		k = np.arange(n) + int((time - self.start) // self.timeBase)
+		inside = np.flatnonzero((k >= 0) & (k < self.length))
+		positions = (self.head + k[inside]) % len(self.buffer)
+
+		result = [None] * n
+		for i, v, valid in zip(inside.tolist(), self.buffer[positions].tolist(), self.valid[positions].tolist()):
+			if valid:
+				result[i] = v
+		return result
+
+	def addRange(self, time, values, timeBase=None):
+		# Adds values to the existing values of a horizon starting at the given time, values without an existing value are ignored
+		if timeBase is None:
+			timeBase = self.timeBase
+
+		if timeBase != self.timeBase or not self.isAligned(time) or len(self.unaligned) > 0:
+			for i in range(0, len(values)):
+				t = time + i * timeBase
+				if t in self:
+					self[t] += values[i]
+			return
+
+		# Only the part of the horizon that overlaps with the buffer
+		first = int((time - self.start) // self.timeBase)
+		skip = max(0, -first)
+		n = min(len(values), self.length - first) - skip
+		if n <= 0:
+			return
+
+		values = np.asarray(values[skip:skip + n])
+		self.upgrade(values)
+		positions = self.positions(first + skip, n)
+		mask = self.valid[positions]
+		self.buffer[positions[mask]] += values[mask]
+
+	def add(self, other):
+		# Adds another profile, timestamps that are not in this profile yet are inserted
+		if isinstance(other, TimeProfile) and other.timeBase == self.timeBase and len(other.unaligned) == 0 and len(self.unaligned) == 0 \
+				and other.length > 0 and self.isAligned(other.start):
+			positions = other.positions(0, other.length)
+			mask = other.valid[positions]
+			k = np.arange(other.length)[mask]
+			values = other.buffer[positions[mask]]
+			if len(k) == 0:
+				return
+
+			self.upgrade(values)
+			self.reserve(other.start + int(k[0]) * other.timeBase, other.start + int(k[-1]) * other.timeBase)
+			positions = self.positions(int((other.start - self.start) // self.timeBase), other.length)[k]
+			existing = self.valid[positions]
+			self.buffer[positions[existing]] += values[existing]
+			self.buffer[positions[~existing]] = values[~existing]
+			self.valid[positions] = True
+		else:
+			for t, v in other.items():
+				if t in self:
+					self[t] += v
+				else:
+					self[t] = v
+
+	def copy(self):
+		result = TimeProfile(self.timeBase)
+		result.start = self.start
+		result.head = self.head
+		result.length = self.length
+		result.buffer = self.buffer.copy()
+		result.valid = self.valid.copy()
+		result.unaligned = dict(self.unaligned)
+		return result
+
+	# Dict interface
+	def __contains__(self, t):
+		p = self.position(t)
+		if p >= 0:
+			return bool(self.valid[p])
+		return t in self.unaligned
+
+	def __getitem__(self, t):
+		p = self.position(t)
+		if p >= 0 and self.valid[p]:
+			return self.buffer[p].item()
+		return self.unaligned[t]
+
+	def __setitem__(self, t, value):
+		if not self.isAligned(t):
+			self.unaligned[t] = value
+			return
+
+		self.upgrade(value)
+		self.reserve(t, t)
+		p = self.position(t)
+		self.buffer[p] = value
+		self.valid[p] = True
+
+	def __delitem__(self, t):
+		p = self.position(t)
+		if p >= 0 and self.valid[p]:
+			self.valid[p] = False
+		else:
+			del self.unaligned[t]
+
+	def get(self, t, default=None):
+		if t in self:
+			return self[t]
+		return default
+
+	def keys(self):
+		positions = self.positions(0, self.length)
+		k = np.arange(self.length)[self.valid[positions]]
+		result = (self.start + k * self.timeBase).tolist()
+		if len(self.unaligned) > 0:
+			result = sorted(result + list(self.unaligned.keys()))
+		return result
+
+	def values(self):
+		return [self[t] for t in self.keys()]
+
+	def items(self):
+		return [(t, self[t]) for t in self.keys()]
+
+	def __iter__(self):
+		return iter(self.keys())
+
+	def __len__(self):
+		return int(np.count_nonzero(self.valid[self.positions(0, self.length)])) + len(self.unaligned)
+
+	def __repr__(self):
+		return "TimeProfile(" + repr(dict(self.items())) + ")"
@@ -0,0 +1,253 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from usrconf import demCfg
+
+import numpy as np
+import os
+import threading
+import time as tm
+
+# Columnar result store, a drop-in replacement for database.influxDB.InfluxDB for offline simulations
+# Usage in a model: sim.db = ColumnarStore(sim)
+#
+# Values are buffered per series (measurement + tags) and field in typed NumPy arrays.
+# On each flush, all buffered series are written into one compressed .npz file in path/database/, where path is
+# demCfg['var']['results'] (default: var/results/).
+# Each file contains:
+#  - "series": the series keys in the form "measurement,tag1=a,tag2=b field"
+#  - "time<i>": int64 timestamps in nanoseconds (same as Influx) for series i
+#  - "value<i>": float64 values, or unicode strings for non-numerical values, for series i
+# Data can be read back using util.columnarReader.ColumnarReader, or obtained through createReader()
+
+class ColumnarStore():
+	def __init__(self, host):
+		self.host = host
+
+		self.database = demCfg['db']['influx']['dbname']
+		self.prefix = ""
+		self.path = demCfg['var'].get('results', "var/results/") # Location of the result files
+
+		self.columns = {}
+		self.points = 0			# Number of points in memory
+		self.maxBuffer = 1000000
+		self.initialSize = 1024
+
+		self.useSysTime = False # Use system time instead of host time
+
+		self.lock = threading.Lock()
+		self.fileCounter = 0
+
+		# Metrics
+		self.startTime = tm.time()
+		self.pointsWritten = 0
+		self.bytesWritten = 0
+
+	def directory(self):
+		return self.path + self.database + "/"
+
+	def timestamp(self, time, deltatime):
+		if self.useSysTime:
+			return int(tm.time() * 1000000000)
+		return int(time * 1000000000.0) + (deltatime*1000)
+
+	def appendValue(self,  measurement, tags,  values,  time, deltatime=0):
+		tagstr = ""
+		for key,  value in tags.items():
+			tagstr += "," + key + "=" + value
+
+		ts = self.timestamp(time, deltatime)
+		for key,  value in values.items():
+			self.appendColumn(self.prefix + measurement + tagstr, key, ts, value)
+
+	def appendValuePrepared(self,  data, time, deltatime=0):
+		# Prepared data uses the Influx line format without timestamp: "measurement,tags field=value"
+		ts = self.timestamp(time, deltatime)
+		series, fields = data.split(" ", 1)
+		for field in fields.split(","):
+			key, value = field.split("=", 1)
+			self.appendColumn(self.prefix + series, key, ts, value)
+
+	def appendColumn(self, series, field, ts, value):
+		self.lock.acquire()
+		column = self.columns.get((series, field))
+		if column is None:
+			column = StoreColumn(self.initialSize)
+			self.columns[(series, field)] = column
+		column.append(ts, value)
+		self.points += 1
+		self.lock.release()
+
+	def writeData(self,  force = False):
+		if self.points > self.maxBuffer or (force and self.points > 0):
+			# Swap the buffers
+			self.lock.acquire()
+			columns = self.columns
+			points = self.points
+			self.columns = {}
+			self.points = 0
+			self.fileCounter += 1
+			filename = self.directory() + self.host.name + "-" + str(os.getpid()) + "-" + str(self.fileCounter).zfill(6) + ".npz"
+			self.lock.release()
+
+			data = {}
+			series = []
+			for (s, field), column in columns.items():
+				i = len(series)
+				series.append(s + " " + field)
+				data['time'+str(i)] = column.times[:column.size]
+				data['value'+str(i)] = column.data()
+			data['series'] = np.array(series, dtype=str)
+
+			try:
+				os.makedirs(self.directory(), exist_ok=True)
+				np.savez_compressed(filename, **data)
+				self.pointsWritten += points
+				self.bytesWritten += os.path.getsize(filename)
+			except:
+				self.host.logWarning("[ColumnarStore] Could not write results to: "+filename)
+
+	def flush(self):
+		self.writeData(True)
+
+	def shutdown(self):
+		self.flush()
+
+	def stopWriter(self):
+		# Data is written on the calling thread
+		pass
+
+	def getMetrics(self):
+		duration = max(tm.time() - self.startTime, 0.000001)
+
+		r = {}
+		r['points'] = self.pointsWritten
+		r['bytes'] = self.bytesWritten
+		r['points/s'] = self.pointsWritten / duration
+		r['bytes/s'] = self.bytesWritten / duration
+		r['queue'] = self.points
+		return r
+
+	def createReader(self, measurement, timeBase=60, value="W-power.real.c.ELECTRICITY", tags={}, aggregation='mean'):
+		from util.columnarReader import ColumnarReader
+		return ColumnarReader(measurement, path=self.path, database=self.database, timeBase=timeBase, aggregation=aggregation, value=value, tags=tags, host=self.host)
+
+	def select(self, measurement, field, tags, startTime, endTime):
+		# Obtain data from the files and the data that has not yet been written
+		times, values = readSeries(self.directory(), measurement, field, tags, startTime, endTime)
+
+		self.lock.acquire()
+		for (s, f), column in self.columns.items():
+			if f == field and matchSeries(s, measurement, tags):
+				t, v = column.times[:column.size], column.data()
+				sel = (t >= startTime) & (t < endTime)
+				times.append(t[sel])
+				values.append(v[sel])
+		self.lock.release()
+
+		return times, values
+
+	def clearDatabase(self):
+		self.host.logMsg("[ColumnarStore] Clearing database "+self.database)
+		try:
+			for filename in os.listdir(self.directory()):
+				if filename.endswith(".npz"):
+					os.remove(self.directory() + filename)
+		except:
+			pass
+
+		self.createDatabase()
+
+	def createDatabase(self):
+		try:
+			os.makedirs(self.directory(), exist_ok=True)
+		except:
+			self.host.logWarning("[ColumnarStore] Could not create folder: "+self.directory())
+
+
+class StoreColumn():
+	def __init__(self, size):
+		self.times = np.zeros(size, dtype=np.int64)
+		self.values = np.zeros(size, dtype=np.float64)
+		self.strings = None
+		self.size = 0
+
+	def append(self, ts, value):
+		if self.size >= len(self.times):
+			self.times = np.resize(self.times, 2*len(self.times))
+			if self.strings is None:
+				self.values = np.resize(self.values, 2*len(self.values))
+
+		if self.strings is None:
+			try:
+				self.values[self.size] = float(value)
+			except:
+				# Not a number, from now on this column stores strings
+				self.strings = [str(v) for v in self.values[:self.size]]
+
+		if self.strings is not None:
+			self.strings.append(str(value))
+
+		self.times[self.size] = ts
+		self.size += 1
+
+	def data(self):
+		if self.strings is None:
+			return self.values[:self.size]
+		return np.array(self.strings, dtype=str)
+
+
+def parseSeries(series):
+	parts = series.split(",")
+	tags = {}
+	for part in parts[1:]:
+		if "=" in part:
+			k, v = part.split("=", 1)
+			tags[k] = v
+	return parts[0], tags
+
+def matchSeries(series, measurement, tags):
+	m, t = parseSeries(series)
+	if m != measurement:
+		return False
+	for k, v in tags.items():
+		if t.get(k) != v:
+			return False
+	return True
+
+def readSeries(directory, measurement, field, tags, startTime, endTime):
+	times = []
+	values = []
+
+	try:
+		filenames = sorted(os.listdir(directory))
+	except:
+		return times, values
+
+	for filename in filenames:
+		if not filename.endswith(".npz"):
+			continue
+
+		with np.load(directory + filename) as f:
+			for i, key in enumerate(f['series']):
+				series, fld = str(key).rsplit(" ", 1)
+				if fld == field and matchSeries(series, measurement, tags):
+					t = f['time'+str(i)]
+					sel = (t >= startTime) & (t < endTime)
+					if sel.any():
+						times.append(t[sel])
+						values.append(f['value'+str(i)][sel])
+
+	return times, values
@@ -19,7 +19,9 @@ from usrconf import demCfg
 import os
 import sys
 import threading
-import copy
+
+from database.influxWriter import InfluxWriter
+from util.influxdbReader import InfluxDBReader
 
 class InfluxDB():
 	def __init__(self, host):
@@ -37,6 +39,15 @@ class InfluxDB():
 		self.data = []
 		self.maxBuffer = 100000
 
+		# Writer settings
+		self.batchSize = 5000		# Maximum number of points per request
+		self.maxQueue = 4			# Maximum number of buffers waiting to be written
+		self.blockOnFull = True		# Wait for the writer when the queue is full, otherwise the buffer is stored in a backup file
+		self.compress = False		# Send gzip compressed requests
+		self.compressionLevel = 5
+		self.poolSize = 2			# Number of connections to keep open
+		self.timeout = 5.0
+
 		self.storeBackup = False 	# Store data by default in a backup file
 		self.restoreBackup = True	# Restore backup when connection to DB is restored
 		self.autoCleanup = True 	# Cleanup text files when data is restored after a hiccup
@@ -46,8 +57,7 @@ class InfluxDB():
 
 		self.useSysTime = False # Use system time instead of host time
 
-		self.threadCountLock = threading.Lock()
-		self.activeThreads = 0
+		self.writer = InfluxWriter(self)
 
 		self.restoring = threading.Lock()
 
@@ -91,29 +101,45 @@ class InfluxDB():
 		self.data.append(dataToBeAdded)
 
 	def writeData(self,  force = False):
-		if len(self.data) > self.maxBuffer or force:
-			# Make a copy and clear
+		if len(self.data) > self.maxBuffer or (force and len(self.data) > 0):
+			# Swap the buffer and hand it over to the writer
+			d = self.data
+			self.data = []
+
+			if not self.writer.put(d):
+				# Writer cannot keep up, store the data in the backup files to restore it later
+				self.host.logWarning("[InfluxDB] Write queue full, storing data in backup files")
+				self.writeTextFile(d)
+				self.errorFlag = True
+
+	def flush(self):
+		self.writeData(True)
+		self.writer.flush()
 
-			self.threadCountLock.acquire()
-			if self.activeThreads == 0: # For now we limit this to one thread for writing
-				self.activeThreads += 1
-				self.threadCountLock.release()
+	def shutdown(self):
+		self.flush()
+		self.writer.stop()
 
-				d = copy.deepcopy(self.data)
-				self.data = []
+	def stopWriter(self):
+		# Write all queued data and stop the writer thread, it is started again by the next writeData()
+		self.writer.stop()
 
-				# Write data in a thread:
-				self.host.runInThread(self, 'writeDataThread', d)
-			else:
-				self.threadCountLock.release()
+	def getMetrics(self):
+		return self.writer.getMetrics()
 
+	def createReader(self, measurement, timeBase=60, value="W-power.real.c.ELECTRICITY", tags={}, aggregation='mean'):
+		return InfluxDBReader(measurement, address=self.address, port=self.port, database=self.database, timeBase=timeBase, aggregation=aggregation, value=value, tags=tags, host=self.host)
 
 	def writeDataThread(self, data):
-		success = self.writeToDatabase(data)
-		if not success or self.storeBackup:
-			self.writeTextFile()
-			if not success:
-				self.errorFlag = True
+		success = True
+		for i in range(0, len(data), self.batchSize):
+			batch = data[i:i+self.batchSize]
+			r = self.writeToDatabase(batch)
+			if not r or self.storeBackup:
+				self.writeTextFile(batch)
+				if not r:
+					self.errorFlag = True
+			success = success and r
 
 		if success:
 			if self.errorFlag:
@@ -121,16 +147,10 @@ class InfluxDB():
 				if self.restoring.acquire(blocking=False):
 					self.host.runInThread(self, 'loadTextFiles') #self.loadTextFiles()
 
-		self.threadCountLock.acquire()
-		self.activeThreads -= 1
-		self.threadCountLock.release()
-
-
 	def writeToDatabase(self, data):
 		result = True
-		toSend = ("\n".join(data) + "\n")
 		try:
-			r = requests.post(self.address+ ':'+self.port+ '/write?db='+self.database,  auth=(self.username, self.password), data=toSend, timeout=5.0)
+			r = self.writer.post(data)
 			if r.status_code != 204:
 				self.host.logWarning("[InfluxDB] Could not write to database. Errorcode: "+str(r.status_code)+ "\t\t" + r.text)
 				result = False
@@ -175,7 +195,7 @@ class InfluxDB():
 
 
 
-	def writeTextFile(self):
+	def writeTextFile(self, data):
 		# Writing into files based on the date, YYYYMMDD:
 		name = self.host.timeObject().astimezone(demCfg['timezone']).strftime("%Y%m%d")
 		self.filename = self.filepath+name+'.dem'
@@ -183,7 +203,7 @@ class InfluxDB():
 		try:
 			os.makedirs(os.path.dirname(self.filename), exist_ok=True)
 			f = open(self.filename, 'a')
-			f.write(self.data)
+			f.write("\n".join(data) + "\n")
 			f.close()
 		except:
 			self.host.logWarning("[InfluxDB] Could not find or create backup file: "+self.filename)
@@ -206,17 +226,20 @@ class InfluxDB():
 					if os.path.isfile(self.filepath+filename):
 						f = open(self.filepath+filename, 'r')
 
-						# Read file and write when the size exceeds the size
-						data = ""
+						# Read file and write when the size exceeds the batch size
+						data = []
 						for line in f:
-							data += line
-							if len(data) > self.maxBuffer:
+							line = line.rstrip("\n")
+							if line != "":
+								data.append(line)
+							if len(data) >= self.batchSize:
 								self.writeToDatabase(data)
-								data = ""
+								data = []
 
 						# Flush the last part
-						self.writeToDatabase(data)
-						data = ""
+						if len(data) > 0:
+							self.writeToDatabase(data)
+						data = []
 						f.close()
 
 						# After all data is written, let's delete the file if required
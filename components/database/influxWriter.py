@@ -0,0 +1,149 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import gzip
+import queue
+import threading
+import time as tm
+
+# Background writer for the InfluxDB connector
+# Buffers handed over by InfluxDB.writeData() are placed in a bounded queue and written by a single thread.
+# The buffers are handed over as a whole (no copies) and split into batches for the HTTP requests.
+# All requests share one session, such that the connections to the database are reused.
+
+class InfluxWriter():
+	def __init__(self, db):
+		self.db = db
+		self.host = db.host
+
+		self.queue = None
+		self.thread = None
+		self.session = None
+
+		self.startLock = threading.Lock()
+
+		# Metrics
+		self.metricsLock = threading.Lock()
+		self.startTime = None
+		self.points = 0
+		self.bytes = 0
+		self.requests = 0
+
+	def start(self):
+		self.startLock.acquire()
+		if self.thread is None:
+			self.queue = queue.Queue(maxsize=self.db.maxQueue)
+
+			self.session = requests.Session()
+			adapter = HTTPAdapter(pool_connections=self.db.poolSize, pool_maxsize=self.db.poolSize)
+			self.session.mount("http://", adapter)
+			self.session.mount("https://", adapter)
+
+			if self.startTime is None:
+				self.startTime = tm.time()
+
+			self.thread = threading.Thread(target=self.run, daemon=True)
+			self.thread.start()
+		self.startLock.release()
+
+	def run(self):
+		while True:
+			data = self.queue.get()
+			try:
+				if data is None:
+					break
+				self.db.writeDataThread(data)
+			except:
+				self.host.logWarning("[InfluxDB] Could not write buffer")
+			finally:
+				self.queue.task_done()
+
+	def put(self, data):
+		self.start()
+
+		if self.db.blockOnFull:
+			# Backpressure: wait until the writer has room for another buffer
+			self.queue.put(data)
+			return True
+		else:
+			try:
+				self.queue.put_nowait(data)
+				return True
+			except queue.Full:
+				return False
+
+	def flush(self):
+		if self.thread is not None:
+			self.queue.join()
+
+	def stop(self):
+		if self.thread is not None:
+			self.queue.put(None)
+			self.thread.join()
+			self.thread = None
+
+			self.session.close()
+			self.session = None
+
+	def post(self, lines):
+		body = ("\n".join(lines) + "\n").encode()
+
+		headers = {}
+		if self.db.compress:
+			body = gzip.compress(body, compresslevel=self.db.compressionLevel)
+			headers['Content-Encoding'] = 'gzip'
+
+		session = self.session
+		if session is None:
+			session = requests
+
+		r = session.post(self.db.address+ ':'+self.db.port+ '/write?db='+self.db.database,  auth=(self.db.username, self.db.password), data=body, headers=headers, timeout=self.db.timeout)
+
+		if r.status_code == 204:
+			self.metricsLock.acquire()
+			self.points += len(lines)
+			self.bytes += len(body)
+			self.requests += 1
+			self.metricsLock.release()
+
+		return r
+
+	def queueDepth(self):
+		if self.queue is None:
+			return 0
+		return self.queue.qsize()
+
+	def getMetrics(self):
+		self.metricsLock.acquire()
+		duration = 0.0
+		if self.startTime is not None:
+			duration = max(tm.time() - self.startTime, 0.000001)
+
+		r = {}
+		r['points'] = self.points
+		r['bytes'] = self.bytes
+		r['requests'] = self.requests
+		r['points/s'] = 0.0
+		r['bytes/s'] = 0.0
+		if duration > 0:
+			r['points/s'] = self.points / duration
+			r['bytes/s'] = self.bytes / duration
+		r['queue'] = self.queueDepth()
+		self.metricsLock.release()
+
+		return r
@@ -108,13 +108,18 @@ class SolarPanelDev(CurtDev):
 			timeBase = self.timeBase
 
 		# Function used for predictions
-		result = []
+		times = []
 		time = startTime
 		while time < endTime:
-			result.append(self.calculateProduction(time))
+			times.append(time)
 			time += timeBase
 
-		return result
+		if len(times) == 0:
+			return []
+
+		# Calculate the irradiance for the whole horizon at once
+		production = self.sun.powerOnPlanes([(self.inclination, self.azimuth)], times)[0]
+		return (-1 * production * (self.efficiency/100.0) * self.size).tolist()
 
 ### Local control (e..g Droop control)
 	def localControl(self, time):
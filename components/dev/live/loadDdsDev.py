@@ -26,7 +26,6 @@ from cyclonedds.util import duration
 import logging.handlers as handlers
 import logging
 
-from util.influxdbReader import InfluxDBReader
 
 from dev.loadDev import LoadDev
 from dev.device import Device
@@ -59,8 +58,8 @@ class LoadDdsDev(LoadDev):
 		self.lockState.acquire()
 		if self.reader == None:
 			if self.influx:
-				self.reader = InfluxDBReader(self.host.db.prefix + self.type, timeBase=self.timeBase, host=self.host, database=self.host.db.database, value="W-power.real.c." + self.commodities[0])
-				self.readerReactive = InfluxDBReader(self.host.db.prefix + self.type, timeBase=self.timeBase, host=self.host, database=self.host.db.database, value="W-power.imag.c." + self.commodities[0])
+				self.reader = self.host.db.createReader(self.host.db.prefix + self.type, timeBase=self.timeBase, value="W-power.real.c." + self.commodities[0])
+				self.readerReactive = self.host.db.createReader(self.host.db.prefix + self.type, timeBase=self.timeBase, value="W-power.imag.c." + self.commodities[0])
 				if self.infuxTags is None:
 					self.reader.tags = {"name": self.name}
 					self.readerReactive.tags = {"name": self.name}
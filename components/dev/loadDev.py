@@ -13,7 +13,6 @@
 # limitations under the License.
 
 
-from util.influxdbReader import InfluxDBReader
 from util.clientCsvReader import ClientCsvReader
 import util.helpers
 
@@ -51,8 +50,8 @@ class LoadDev(Device):
 		self.lockState.acquire()
 		if self.reader == None:
 			if self.influx:
-				self.reader = InfluxDBReader(self.host.db.prefix+self.type, timeBase=self.timeBase, host=self.host, database=self.host.db.database, value = "W-power.real.c."+self.commodities[0])
-				self.readerReactive = InfluxDBReader(self.host.db.prefix+self.type, timeBase=self.timeBase, host=self.host, database=self.host.db.database, value="W-power.imag.c." + self.commodities[0])
+				self.reader = self.host.db.createReader(self.host.db.prefix + self.type, timeBase=self.timeBase, value="W-power.real.c."+self.commodities[0])
+				self.readerReactive = self.host.db.createReader(self.host.db.prefix + self.type, timeBase=self.timeBase, value="W-power.imag.c." + self.commodities[0])
 				if self.infuxTags is None:
 					self.reader.tags = {"name": self.name}
 					self.readerReactive.tags = {"name": self.name}
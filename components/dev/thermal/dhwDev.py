@@ -106,9 +106,12 @@ class DhwDev(ThermalDevice):
 
 	def initializePredictors(self):
 		time = self.host.time() - (4*7*24*3600)
+		startTime = time
+		samples = []
 		while time < self.host.time():
-			self.predictor.addSample(self.dhwReader.readValue(time)*self.scaling, time)
+			samples.append(self.dhwReader.readValue(time)*self.scaling)
 			time += self.timeBase
+		self.predictor.addSamples(samples, startTime, self.timeBase)
 
 	# FIXME: We should move predictions to controllers. See T215
 	def doPrediction(self, startTime, endTime, timeBase = None):
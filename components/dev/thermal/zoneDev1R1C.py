@@ -17,12 +17,27 @@ from util.clientCsvReader import ClientCsvReader
 from dev.thermal.thermalDev import ThermalDevice
 
 from util.windowPredictor import WindowPredictor
+from dev.thermal.zoneFleet import sharedZoneFleet, fleetProperty, heatSupplyProperty
 
 import numpy as np
 
 # Model for a temperature zone
 class ZoneDev1R1C(ThermalDevice):
-	def __init__(self,  name,  weather, sun, host):
+	# The state and parameters are stored in a fleet of zones that is simulated at once, see dev.thermal.zoneFleet
+	temperature = fleetProperty('temperature')
+	rEnvelope = fleetProperty('rEnvelope')
+	cZone = fleetProperty('cZone')
+	gainSupply = fleetProperty('gainSupply')
+	ventilationSupply = fleetProperty('ventilationSupply')
+	windowGain = fleetProperty('windowGain')
+	heatSupply = heatSupplyProperty()
+
+	def __init__(self,  name,  weather, sun, host, fleet=None):
+		if fleet is None:
+			fleet = sharedZoneFleet(host, "1R1C")
+		self.fleet = fleet
+		self.fleetIndex = fleet.register(self)
+
 		ThermalDevice.__init__(self,  name,  host)
 		self.devtype = "Load"
 
@@ -85,7 +100,7 @@ class ZoneDev1R1C(ThermalDevice):
 
 		# Initialize the consumption and heat supply variables for the initial state
 		self.consumption[self.commodities[0]] = 0.0
-		self.heatSupply[self.commodities[0]] = 0.0 # Note: HeatSupply will be set by the heat source and should therefore be considered read only
+		self.heatSupply = {self.commodities[0]: 0.0} # Note: HeatSupply will be set by the heat source and should therefore be considered read only
 		self.heatTemperature[self.commodities[0]] = 0.0
 
 		# Initialize the file readers based on the configuration input
@@ -116,43 +131,25 @@ class ZoneDev1R1C(ThermalDevice):
 
 		self.lockState.release()
 
+		self.fleet.activate(self)
+
 		ThermalDevice.startup(self)
 
+	def shutdown(self):
+		# The fleet no longer advances this zone, e.g. when it is removed with Core.removeObject()
+		self.fleet.unregister(self)
+
+		ThermalDevice.shutdown(self)
+
 	# PreTick is called before the actual time simulation.
 	# Use this to update the state based on the state selected in the previous interval
 	def preTick(self, time, deltatime=0):
-		newTemperature = 0.0
-
-		self.lockState.acquire()
-
 		# INFORMATION ON THIS MODEL
 		# Model based on Richard P. van Leeuwen PhD thesis Chapter 2, 1R1C model (pp. 28)
 		# More information on heat models (simple) https://learn.openenergymonitor.org/sustainable-energy/building-energy-model/dynamicmodel.md
 
-		# Useful variables within this model:
-		# self.temperature : This holds the current temperature (determined in the last ineterval) in the zone
-
-		# This will hold the power (in W) and temperature at which the heat energy is supplied
-		heatSupply = self.heatSupply[self.commodities[0]]
-		heatTemperature = self.heatTemperature[self.commodities[0]]
-
-		self.windowGain = 0.0
-		for w in self.windows:
-			self.windowGain += w['surface'] * w['shadingCoeff'] * 0.87 * self.sun.powerOnPlane(w['inclination'], w['azimuth'])
-		# NOTE: 0.87 is the Shading Coefficient to SHGC conversion factor as per https://en.wikipedia.org/wiki/Shading_coefficient and ASHREA Fundamentals 2013
-
-		# Determining infiltration losses
-
-		# Determine the new zone temperature:
-		newTemperature = 		self.temperature + ( \
-								( (self.weather.temperature - self.temperature) / (self.rEnvelope * self.cZone) ) + \
-							  	( ( self.ventilationSupply + self.gainSupply + self.windowGain + heatSupply) / self.cZone) \
-								) * self.host.timeBase
-
-		# Update the temperature at the end of the preTick
-		self.temperature = newTemperature
-
-		self.lockState.release()
+		# The temperatures of all zones in the fleet are updated at once, see ZoneFleet.advance()
+		self.fleet.preTick(time)
 
 
 	# TimeTick is called after all control actions
@@ -209,6 +206,8 @@ class ZoneDev1R1C(ThermalDevice):
 		self.windows.append(dict(window))
 		self.lockState.release()
 
+		self.fleet.invalidate()
+
 #### INTERFACING TO READ THE STATE BY A CONTROLLER
 	# E.G. this is used by a thermostat device to read the current temperature and see if heating is required
 	def getProperties(self):
@@ -221,15 +220,21 @@ class ZoneDev1R1C(ThermalDevice):
 		if not self.perfectPredictions:
 			time = self.host.time() - (4*7*24*3600)
 			if self.gainFile != None:
+				startTime = time
+				samples = []
 				while time < self.host.time():
-					self.predictorGain.addSample(self.gainReader.readValue(time), time)
+					samples.append(self.gainReader.readValue(time))
 					time += self.timeBase
+				self.predictorGain.addSamples(samples, startTime, self.timeBase)
 
 			time = self.host.time() - (4*7*24*3600)
 			if self.ventilationFile != None:
+				startTime = time
+				samples = []
 				while time < self.host.time():
-					self.predictorVentilation.addSample(self.ventilationReader.readValue(time), time)
+					samples.append(self.ventilationReader.readValue(time))
 					time += self.timeBase
+				self.predictorVentilation.addSamples(samples, startTime, self.timeBase)
 
 	def doGainPrediction(self, startTime, endTime, timeBase = None):
 		if self.gainFile != None:
@@ -275,61 +280,5 @@ class ZoneDev1R1C(ThermalDevice):
 		if timeBase == None:
 			timeBase = self.timeBase
 
-		demand =  [0.0] * int((endTime -  startTime)/timeBase)
-
-		### FIRST WE NEED TO GATHER ALL DATA FOR THE PREDICTION IN (ALIGNED) VECTORS
-		# Perform a weather prediction
-		ambientTemperature = self.weather.doTemperaturePrediction(startTime, endTime, timeBase, self.perfectPredictions)
-
-		# Calculate all gains
-		gains = [0.0] * int((endTime -  startTime)/timeBase)    # Initialize the vector with the proper length with all 0.0 elements
-
-		# Heat gains from people and appliances
-		if self.gainFile != None:
-			gains = self.doGainPrediction(startTime, endTime, timeBase)
-
-		# Heat gains from all the windows
-		for w in self.windows:
-			t = startTime
-			idx = 0
-			while t < endTime:
-				gains[idx] = gains[idx] + (w['surface'] * w['shadingCoeff'] * 0.87 * self.sun.powerOnPlane(w['inclination'], w['azimuth'], t, self.perfectPredictions))
-				t += timeBase
-				idx += 1
-
-		# Now obtain the ventilation flow, which is temperature dependent.
-		ventilationFlow = [0.0] * int((endTime -  startTime)/timeBase)
-		if self.ventilationFile != None:
-			ventilationFlow = self.doVentilationPrediction(startTime, endTime, timeBase)
-
-		### NOW WE CAN SIMULATE THE ZONE TO GET THE HEAT DEMAND
-		zoneTemperature = self.temperature		 # Fetch current state
-
-		# Simulate the zone
-		for i in range(0, len(gains)):
-			# Update the gain to include ventilation
-			# FIXME would be nice to add this as a separate function to improve the thermostat control
-			gains[i] = gains[i] + ( (ventilationFlow[i] / 3600.0) * 1.25 * 1005 * (ambientTemperature[i] - zoneTemperature) )
-
-			# *TODO add the infiltration to the gains[i]!!!
-
-			# Calculate the loss in heat energy
-			# heatLoss = ( ( ( ambientTemperature[i] - zoneTemperature) /  (self.rEnvelope * self.cZone) ) * self.cZone ) + gains[i]
-			heatLoss = ((ambientTemperature[i] - zoneTemperature) / self.rEnvelope) + gains[i]
-
-			# Calculate how much heat we should add/subtract
-			if zoneTemperature < lowerSetpoints[i]:
-				demand[i] = min(maxPower, max( 0.0, (( ( lowerSetpoints[i] - zoneTemperature ) * (self.cZone) ) / timeBase ) - heatLoss ) )
-			elif zoneTemperature > upperSetpoints[i]:
-				demand[i] = max(minPower, min( 0.0, (( ( upperSetpoints[i] - zoneTemperature ) * (self.cZone) ) / timeBase ) - heatLoss ) )
-
-			gains[i] += demand[i]
-
-			# Simulate the zone to determine the next state
-			newZoneTemperature = 	zoneTemperature + ( \
-									( (ambientTemperature[i] - zoneTemperature) / (self.rEnvelope * self.cZone) ) + \
-									( ( gains[i] ) / self.cZone) ) * timeBase
-
-			zoneTemperature = newZoneTemperature
-
-		return demand
+		# The zone model is simulated by the fleet, see ZoneFleet.doPredictions() to predict many zones at once
+		return self.fleet.doPredictions([self], startTime, endTime, [lowerSetpoints], [upperSetpoints], [minPower], [maxPower], timeBase)[0]
@@ -0,0 +1,386 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import threading
+import numpy as np
+
+# Engine that simulates a fleet of thermal zones (ZoneDev1R1C or ZoneDev2R2C) at once.
+# The state and parameters of all zones are stored in a structured NumPy array, the zone devices are views onto their row.
+# The first zone that receives a preTick advances all zones of the fleet with vectorized updates, the other zones only read their new state.
+# Predictions for many zones can be made in one call with doPredictions(), looping over time and vectorized over the zones.
+# Results are identical to the scalar models of the zones, including the order in which all terms are added.
+
+zoneFields = [
+	('temperature', float),
+	('floorTemperature', float),
+	('rFloor', float),
+	('rEnvelope', float),
+	('cFloor', float),
+	('cZone', float),
+	('heatSupply', float),
+	('gainSupply', float),
+	('ventilationSupply', float),
+	('windowGain', float),
+	('active', bool)
+]
+
+# Fleet shared by all zones of a model on a host
+# The fleets are stored on the host (host.zoneFleets), such that they are released together with the host
+def sharedZoneFleet(host, model):
+	if not hasattr(host, 'zoneFleets'):
+		host.zoneFleets = {}
+	if model not in host.zoneFleets:
+		host.zoneFleets[model] = ZoneFleet(model)
+	return host.zoneFleets[model]
+
+def fleetProperty(field):
+	# Property of a zone device that is stored in the row of the zone in the fleet
+	def get(self):
+		return self.fleet.data[field][self.fleetIndex].item()
+	def set(self, value):
+		self.fleet.data[field][self.fleetIndex] = value
+	return property(get, set)
+
+def heatSupplyProperty():
+	# The heat supply is set as dict with the commodity as key (see HeatSourceDev), only the value is stored in the fleet
+	def get(self):
+		return {self.commodities[0]: self.fleet.data['heatSupply'][self.fleetIndex].item()}
+	def set(self, value):
+		if len(value) > 0:
+			self.fleet.data['heatSupply'][self.fleetIndex] = value[self.commodities[0]]
+	return property(get, set)
+
+class ZoneFleet():
+	def __init__(self, model = "2R2C"):
+		assert(model in ["1R1C", "2R2C"])
+		self.model = model
+
+		self.zones = []
+		self.data = np.zeros(16, dtype=zoneFields)
+
+		self.lastTick = None
+		self.lock = threading.Lock()
+
+		# Grouping of the zones by the weather and sun they use, rebuilt when zones or windows change
+		self.changed = True
+		self.weatherGroups = []
+		self.sunGroups = []
+
+	def register(self, zone):
+		self.lock.acquire()
+		if len(self.zones) == len(self.data):
+			data = np.zeros(2 * len(self.data), dtype=zoneFields)
+			data[:len(self.zones)] = self.data
+			self.data = data
+
+		self.zones.append(zone)
+		self.changed = True
+		self.lock.release()
+
+		return len(self.zones) - 1
+
+	def unregister(self, zone):
+		# The zone is no longer advanced, e.g. when it is removed with Core.removeObject()
+		# Its row is kept, such that the properties of the zone remain readable, but the fleet releases the zone itself
+		self.lock.acquire()
+		if self.zones[zone.fleetIndex] is zone:
+			self.data['active'][zone.fleetIndex] = False
+			self.zones[zone.fleetIndex] = None
+			self.changed = True
+		self.lock.release()
+
+	def activate(self, zone):
+		self.data['active'][zone.fleetIndex] = True
+		self.changed = True
+
+	def invalidate(self):
+		self.changed = True
+
+	def preTick(self, time):
+		# Advances all active zones once per interval
+		self.lock.acquire()
+		if time != self.lastTick:
+			self.lastTick = time
+			self.advance()
+		self.lock.release()
+
+	def advance(self):
+		if self.changed:
+			self.group()
+
+		idx = np.flatnonzero(self.data['active'])
+		if len(idx) == 0:
+			return
+		d = self.data[idx]
+		timeBase = self.zones[idx[0]].host.timeBase
+
+		# Ambient temperature from the weather of each zone
+		ambient = np.zeros(len(self.data))
+		for weather, zones in self.weatherGroups:
+			ambient[zones] = weather.temperature
+		ambient = ambient[idx]
+
+		# Solar gains through the windows, the irradiance on all windows that share a sun is calculated at once
+		# NOTE: 0.87 is the Shading Coefficient to SHGC conversion factor as per https://en.wikipedia.org/wiki/Shading_coefficient and ASHREA Fundamentals 2013
+		windowGain = np.zeros(len(self.data))
+		for sun, planes, slots in self.sunGroups:
+			power = sun.powerOnPlanes(planes)[:, 0]
+			for windows, zones, coefficients in slots:
+				windowGain[zones] += coefficients * power[windows]
+		windowGain = windowGain[idx]
+
+		temperature = d['temperature']
+		if self.model == "2R2C":
+			floorTemperature = d['floorTemperature']
+			newFloorTemperature = 	floorTemperature + ( \
+									( (temperature - floorTemperature) / (d['rFloor'] * d['cFloor']) ) + \
+									( d['heatSupply'] / d['cFloor']) \
+									) * timeBase
+
+			newTemperature = 		temperature + ( \
+									( (ambient - temperature) / (d['rEnvelope'] * d['cZone']) ) + \
+									( (floorTemperature - temperature) / (d['rFloor'] * d['cZone'] ) ) + \
+									( ( d['ventilationSupply'] + d['gainSupply'] + windowGain ) / d['cZone']) \
+									) * timeBase
+
+			self.data['floorTemperature'][idx] = newFloorTemperature
+		else:
+			newTemperature = 		temperature + ( \
+									( (ambient - temperature) / (d['rEnvelope'] * d['cZone']) ) + \
+									( ( d['ventilationSupply'] + d['gainSupply'] + windowGain + d['heatSupply']) / d['cZone']) \
+									) * timeBase
+
+		self.data['temperature'][idx] = newTemperature
+		self.data['windowGain'][idx] = windowGain
+
+	def group(self):
+		indices = [i for i in range(0, len(self.zones)) if self.zones[i] is not None]
+		self.weatherGroups = self.groupZones(indices, lambda zone: zone.weather)
+		# The slots of groupWindows() contain positions in indices, advance() uses the indices in the fleet
+		rows = np.array(indices, dtype=int)
+		self.sunGroups = [(sun, planes, [(windows, rows[zones], coefficients) for windows, zones, coefficients in slots]) for sun, planes, slots in self.groupWindows(indices, lambda zone: zone.sun)]
+		self.changed = False
+
+	def groupZones(self, indices, key):
+		# Groups the zones at the given indices by a shared object, returns a list with (object, array of indices)
+		groups = {}
+		for i in indices:
+			obj = key(self.zones[i])
+			if id(obj) not in groups:
+				groups[id(obj)] = (obj, [])
+			groups[id(obj)][1].append(i)
+		return [(obj, np.array(zones, dtype=int)) for obj, zones in groups.values()]
+
+	def groupWindows(self, indices, key):
+		# Groups the windows of the zones at the given indices by a shared object (the sun), returns a list with (object, planes, slots)
+		# Each slot contains the k-th window of the zones with at least k windows, such that gains are added in the order of the windows
+		groups = {}
+		for row, i in enumerate(indices):
+			zone = self.zones[i]
+			if len(zone.windows) == 0:
+				continue
+			obj = key(zone)
+			if id(obj) not in groups:
+				groups[id(obj)] = (obj, [], [])
+			planes = groups[id(obj)][1]
+			slots = groups[id(obj)][2]
+			for k, w in enumerate(zone.windows):
+				if k == len(slots):
+					slots.append(([], [], []))
+				slots[k][0].append(len(planes))
+				slots[k][1].append(row)
+				slots[k][2].append(w['surface'] * w['shadingCoeff'] * 0.87)
+				planes.append((w['inclination'], w['azimuth']))
+
+		result = []
+		for obj, planes, slots in groups.values():
+			result.append((obj, planes, [(np.array(s[0], dtype=int), np.array(s[1], dtype=int), np.array(s[2], dtype=float)) for s in slots]))
+		return result
+
+	# The prediction of the heat demand of the zones, as ZoneDev.doPrediction(), for many zones at once
+	# Setpoints, minPowers and maxPowers are given per zone, the result is a list with the demand per zone
+	def doPredictions(self, zones, startTime, endTime, lowerSetpoints, upperSetpoints, minPowers, maxPowers, timeBase):
+		intervals = int((endTime -  startTime)/timeBase)
+		indices = [zone.fleetIndex for zone in zones]
+
+		### FIRST WE NEED TO GATHER ALL DATA FOR THE PREDICTION IN (ALIGNED) VECTORS
+		ambientTemperature = np.zeros((len(zones), intervals))
+		gains = np.zeros((len(zones), intervals))
+		ventilationFlow = np.zeros((len(zones), intervals))
+
+		# Perform a weather prediction, once per weather
+		predictions = {}
+		for row, zone in enumerate(zones):
+			key = (id(zone.weather), zone.perfectPredictions)
+			if key not in predictions:
+				predictions[key] = zone.weather.doTemperaturePrediction(startTime, endTime, timeBase, zone.perfectPredictions)
+			ambientTemperature[row] = predictions[key]
+
+			# Heat gains from people and appliances
+			if zone.gainFile != None:
+				gains[row] = zone.doGainPrediction(startTime, endTime, timeBase)
+
+			# Ventilation flow, which is temperature dependent.
+			if zone.ventilationFile != None:
+				ventilationFlow[row] = zone.doVentilationPrediction(startTime, endTime, timeBase)
+
+		# Heat gains from all the windows, the irradiance on all windows that share a sun is calculated at once for the whole horizon
+		times = []
+		t = startTime
+		while t < endTime:
+			times.append(t)
+			t += timeBase
+
+		for perfect in [False, True]:
+			rows = [row for row, zone in enumerate(zones) if zone.perfectPredictions == perfect]
+			for sun, planes, slots in self.groupWindows([indices[row] for row in rows], lambda zone: zone.sun):
+				power = sun.powerOnPlanes(planes, times, perfect)
+				for windows, groupRows, coefficients in slots:
+					r = np.array(rows, dtype=int)[groupRows]
+					gains[r] = gains[r] + (coefficients.reshape(-1, 1) * power[windows])
+
+		### NOW WE CAN SIMULATE THE ZONES TO GET THE HEAT DEMAND
+		if len(zones) == 1:
+			# NumPy has too much overhead for a single zone, e.g. the predictions of a thermostat
+			return [self.doPredictionZone(zones[0], ambientTemperature[0].tolist(), gains[0].tolist(), ventilationFlow[0].tolist(), lowerSetpoints[0], upperSetpoints[0], minPowers[0], maxPowers[0], timeBase)]
+
+		d = self.data[indices]
+		rEnvelope = d['rEnvelope']
+		cZone = d['cZone']
+		rFloor = d['rFloor']
+		cFloor = d['cFloor']
+		minPower = np.array(minPowers, dtype=float)
+		maxPower = np.array(maxPowers, dtype=float)
+		lowerSetpoints = np.array(lowerSetpoints, dtype=float).reshape(len(zones), -1)
+		upperSetpoints = np.array(upperSetpoints, dtype=float).reshape(len(zones), -1)
+
+		floorTemperature = d['floorTemperature'] # Fetch current state
+		zoneTemperature = d['temperature']		 # Fetch current state
+
+		# Note that max(0.0, x) and min(maxPower, x) are written out with np.where to obtain the same results as the scalar models
+		demand = np.zeros((len(zones), intervals))
+		limited = np.zeros((len(zones), intervals), dtype=bool)
+		for i in range(0, intervals):
+			# Update the gain to include ventilation
+			gain = gains[:, i] + ( (ventilationFlow[:, i] / 3600.0) * 1.25 * 1005 * (ambientTemperature[:, i] - zoneTemperature) )
+
+			# Calculate the loss in heat energy
+			heatLoss =  ( ( ambientTemperature[:, i] - zoneTemperature) /  rEnvelope )  + gain
+
+			# Calculate how much heat we should add/subtract
+			heating = zoneTemperature < lowerSetpoints[:, i]
+			cooling = ~heating & (zoneTemperature > upperSetpoints[:, i])
+			if self.model == "2R2C":
+				heatDemand = (( ( lowerSetpoints[:, i] - zoneTemperature ) * (cZone + cFloor ) ) / timeBase ) - (heatLoss - ( ( floorTemperature - zoneTemperature ) * cFloor  ) / timeBase)
+				coolDemand = (( ( upperSetpoints[:, i] - zoneTemperature ) * (cZone + cFloor ) ) / timeBase ) - (heatLoss + ( ( floorTemperature - zoneTemperature ) * cFloor  ) / timeBase)
+			else:
+				heatDemand = (( ( lowerSetpoints[:, i] - zoneTemperature ) * (cZone) ) / timeBase ) - heatLoss
+				coolDemand = (( ( upperSetpoints[:, i] - zoneTemperature ) * (cZone) ) / timeBase ) - heatLoss
+			heatDemand = np.where(heatDemand > 0.0, heatDemand, 0.0)
+			heatDemand = np.where(heatDemand < maxPower, heatDemand, maxPower)
+			coolDemand = np.where(coolDemand < 0.0, coolDemand, 0.0)
+			coolDemand = np.where(coolDemand > minPower, coolDemand, minPower)
+			demand[:, i] = np.where(heating, heatDemand, np.where(cooling, coolDemand, 0.0))
+			limited[:, i] = (heating & (heatDemand == maxPower)) | (cooling & (coolDemand == minPower))
+
+			# Simulate the zones to determine the next state
+			if self.model == "2R2C":
+				newFloorTemperature = 	floorTemperature + ( \
+										( (zoneTemperature - floorTemperature) / (rFloor * cFloor) ) + \
+										( demand[:, i] / cFloor) \
+										) * timeBase
+
+				newZoneTemperature = 	zoneTemperature + ( \
+										( (ambientTemperature[:, i] - zoneTemperature) / (rEnvelope * cZone) ) + \
+										( (floorTemperature - zoneTemperature) / (rFloor * cZone ) ) + \
+										( ( gain ) / cZone) \
+										) * timeBase
+
+				floorTemperature = newFloorTemperature
+			else:
+				gain = gain + demand[:, i]
+				newZoneTemperature = 	zoneTemperature + ( \
+										( (ambientTemperature[:, i] - zoneTemperature) / (rEnvelope * cZone) ) + \
+										( ( gain ) / cZone) ) * timeBase
+
+			zoneTemperature = newZoneTemperature
+
+		# The scalar models return the limit itself when the demand is limited, which may be an int
+		result = demand.tolist()
+		for row, i in zip(*np.nonzero(limited)):
+			if result[row][i] == maxPowers[row]:
+				result[row][i] = maxPowers[row]
+			else:
+				result[row][i] = minPowers[row]
+		return result
+
+	def doPredictionZone(self, zone, ambientTemperature, gains, ventilationFlow, lowerSetpoints, upperSetpoints, minPower, maxPower, timeBase):
+		# Scalar version of the simulation in doPredictions() for a single zone
+		demand = [0.0] * len(gains)
+
+		zoneTemperature = zone.temperature		 # Fetch current state
+		rEnvelope = zone.rEnvelope
+		cZone = zone.cZone
+		if self.model == "2R2C":
+			floorTemperature = zone.floorTemperature # Fetch current state
+			rFloor = zone.rFloor
+			cFloor = zone.cFloor
+
+		for i in range(0, len(gains)):
+			# Update the gain to include ventilation
+			gains[i] = gains[i] + ( (ventilationFlow[i] / 3600.0) * 1.25 * 1005 * (ambientTemperature[i] - zoneTemperature) )
+
+			# Calculate the loss in heat energy
+			heatLoss =  ( ( ambientTemperature[i] - zoneTemperature) /  rEnvelope )  + gains[i]
+
+			if self.model == "2R2C":
+				# Calculate how much heat we should add/subtract
+				if zoneTemperature < lowerSetpoints[i]:
+					heatLoss -=  ( ( floorTemperature - zoneTemperature ) * cFloor  ) / timeBase
+					demand[i] = min(maxPower, max( 0.0, (( ( lowerSetpoints[i] - zoneTemperature ) * (cZone + cFloor ) ) / timeBase ) - heatLoss ) )
+				elif zoneTemperature > upperSetpoints[i]:
+					heatLoss +=  ( ( floorTemperature - zoneTemperature ) * cFloor  ) / timeBase
+					demand[i] = max(minPower, min( 0.0, (( ( upperSetpoints[i] - zoneTemperature ) * (cZone + cFloor ) ) / timeBase ) - heatLoss ) )
+
+				# Simulate the zone to determine the next state
+				newFloorTemperature = 	floorTemperature + ( \
+										( (zoneTemperature - floorTemperature) / (rFloor * cFloor) ) + \
+										( demand[i] / cFloor) \
+										) * timeBase
+
+				newZoneTemperature = 	zoneTemperature + ( \
+										( (ambientTemperature[i] - zoneTemperature) / (rEnvelope * cZone) ) + \
+										( (floorTemperature - zoneTemperature) / (rFloor * cZone ) ) + \
+										( ( gains[i] ) / cZone) \
+										) * timeBase
+
+				floorTemperature = newFloorTemperature
+			else:
+				# Calculate how much heat we should add/subtract
+				if zoneTemperature < lowerSetpoints[i]:
+					demand[i] = min(maxPower, max( 0.0, (( ( lowerSetpoints[i] - zoneTemperature ) * (cZone) ) / timeBase ) - heatLoss ) )
+				elif zoneTemperature > upperSetpoints[i]:
+					demand[i] = max(minPower, min( 0.0, (( ( upperSetpoints[i] - zoneTemperature ) * (cZone) ) / timeBase ) - heatLoss ) )
+
+				gains[i] += demand[i]
+
+				# Simulate the zone to determine the next state
+				newZoneTemperature = 	zoneTemperature + ( \
+										( (ambientTemperature[i] - zoneTemperature) / (rEnvelope * cZone) ) + \
+										( ( gains[i] ) / cZone) ) * timeBase
+
+			zoneTemperature = newZoneTemperature
+
+		return demand
@@ -18,7 +18,6 @@ from environment.weatherEnv import WeatherEnv
 import requests
 import threading
 
-from util.influxdbReader import InfluxDBReader
 
 class OpenWeatherEnv(WeatherEnv):
 	def __init__(self,  name,  host):
@@ -181,7 +180,7 @@ class OpenWeatherEnv(WeatherEnv):
 			return result
 
 	def initializeReaders(self):
-		self.reader = InfluxDBReader(self.host.db.prefix + self.type, database=self.host.db.database, timeBase=self.timeBase, tags={"name": self.name}, value=self.varMapping["temperature"])
+		self.reader = self.host.db.createReader(self.host.db.prefix + self.type, timeBase=self.timeBase, tags={"name": self.name}, value=self.varMapping["temperature"])
 
 	def readValue(self, time, filename=None, timeBase=None, field=None):
 		if field != None:
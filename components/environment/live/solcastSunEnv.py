@@ -13,12 +13,12 @@
 # limitations under the License.
 
 
-from environment.sunEnv import SunEnv
+from environment.sunEnv import SunEnv, irradiationProperties
 import pytz
 import requests
-from util.influxdbReader import InfluxDBReader
 
 import threading
+import numpy as np
 
 
 from datetime import datetime
@@ -84,6 +84,15 @@ class SolcastSunEnv(SunEnv):
 	def getIrradiation(self, time):
 		return dict(self.radiationSolcast(time))
 
+	def getIrradiations(self, times):
+		# The Solcast data is updated during the simulation, hence these values are not cached
+		result = {k: [] for k in irradiationProperties}
+		for time in np.asarray(times).tolist():
+			r = self.radiationSolcast(time)
+			for k in irradiationProperties:
+				result[k].append(r[k])
+		return {k: np.asarray(v, dtype=float) for k, v in result.items()}
+
 
 	# These radiation functions calculate the radiation values for a specific time
 	# FIXME make async
@@ -203,7 +212,7 @@ class SolcastSunEnv(SunEnv):
 	
 	def initializeReaders(self):
 		if self.reader is None:
-			self.reader = InfluxDBReader(self.host.db.prefix + self.type, timeBase=self.timeBase, host=self.host,  database=self.host.db.database, tags={"name": self.name}, value=self.varMapping["elevation"])
+			self.reader = self.host.db.createReader(self.host.db.prefix + self.type, timeBase=self.timeBase, tags={"name": self.name}, value=self.varMapping["elevation"])
 
 	def readValue(self, time, filename=None, timeBase=None, field=None):
 		if field != None:
@@ -20,11 +20,89 @@ import util.helpers
 import pytz
 
 import math
+import threading
+import numpy as np
+from collections import OrderedDict
 from datetime import datetime
 
 from astral import Astral
 from astral import Location
 
+# Properties of the sun as returned by getIrradiation(), in the order of the columns of the cache
+irradiationProperties = ['elevation', 'azimuth', 'zenith', 'GHI', 'DNI', 'DHI']
+
+def mathArray(f, *args):
+	# Applies a function of the math module elementwise.
+	# The SIMD implementations of NumPy for tan, acos, asin and pow may differ in the last bit from the math module (and thus Astral),
+	# using the math variant keeps the horizon results identical to the original scalar calculations.
+	return np.frompyfunc(f, len(args), 1)(*args).astype(float)
+
+def solarPosition(times, latitude, longitude):
+	# NumPy port of the solar position as calculated by Astral 1.x (Location.solar_elevation(), solar_azimuth() and solar_zenith())
+	# for an array of UTC timestamps. Returns arrays with the elevation, azimuth and zenith in degrees.
+	# Note that Astral adds the time of day twice in the Julian century, which is replicated here to obtain identical results.
+	latitude = min(89.8, max(-89.8, latitude))
+
+	seconds = np.floor(np.asarray(times, dtype=float)).astype(np.int64)
+	days = seconds // 86400
+	seconds = seconds % 86400
+	hour = seconds // 3600
+	minute = (seconds % 3600) // 60
+	second = seconds % 60
+
+	# Julian day and century, 719163 is the ordinal of 1970-01-01 and 693596 the ordinal of 1900-01-01
+	jd = (days + (719163 - 693596 + 2)) + 2415018.5 + ((hour * 3600.0 + minute * 60.0 + second) / (24.0 * 3600.0)) - 0.0
+	timenow = hour + (minute / 60.0) + (second / 3600.0)
+	jc = ((jd + timenow / 24.0) - 2451545.0) / 36525.0
+
+	# Declination and equation of time
+	l0 = (280.46646 + jc * (36000.76983 + 0.0003032 * jc)) % 360.0
+	m = 357.52911 + jc * (35999.05029 - 0.0001537 * jc)
+	e = 0.016708634 - jc * (0.000042037 + 0.0000001267 * jc)
+	mrad = np.radians(m)
+	c = np.sin(mrad) * (1.914602 - jc * (0.004817 + 0.000014 * jc)) + np.sin(mrad + mrad) * (0.019993 - 0.000101 * jc) + np.sin(mrad + mrad + mrad) * 0.000289
+	omega = 125.04 - 1934.136 * jc
+	apparentLong = (l0 + c) - 0.00569 - 0.00478 * np.sin(np.radians(omega))
+	obliquitySeconds = 21.448 - jc * (46.815 + jc * (0.00059 - jc * (0.001813)))
+	obliquity = (23.0 + (26.0 + (obliquitySeconds / 60.0)) / 60.0) + 0.00256 * np.cos(np.radians(omega))
+	declination = np.degrees(mathArray(math.asin, np.sin(np.radians(obliquity)) * np.sin(np.radians(apparentLong))))
+
+	y = mathArray(math.tan, np.radians(obliquity) / 2.0)
+	y = y * y
+	sinm = np.sin(np.radians(m))
+	eqtime = np.degrees(y * np.sin(2.0 * np.radians(l0)) - 2.0 * e * sinm + 4.0 * e * y * sinm * np.cos(2.0 * np.radians(l0)) - 0.5 * y * y * np.sin(4.0 * np.radians(l0)) - 1.25 * e * e * np.sin(2.0 * np.radians(m))) * 4.0
+
+	# Hour angle
+	trueSolarTime = hour * 60.0 + minute + second / 60.0 + ((eqtime - (4.0 * -longitude)) + (60 * -0.0))
+	while (trueSolarTime > 1440).any():
+		trueSolarTime = np.where(trueSolarTime > 1440, trueSolarTime - 1440, trueSolarTime)
+	hourangle = trueSolarTime / 4.0 - 180.0
+	hourangle = np.where(hourangle < -180, hourangle + 360.0, hourangle)
+
+	csz = np.sin(np.radians(latitude)) * np.sin(np.radians(declination)) + np.cos(np.radians(latitude)) * np.cos(np.radians(declination)) * np.cos(np.radians(hourangle))
+	zenith = np.degrees(mathArray(math.acos, np.clip(csz, -1.0, 1.0)))
+
+	# Azimuth
+	azDenom = np.cos(np.radians(latitude)) * np.sin(np.radians(zenith))
+	valid = np.abs(azDenom) > 0.001
+	azRad = ((np.sin(np.radians(latitude)) * np.cos(np.radians(zenith))) - np.sin(np.radians(declination))) / np.where(valid, azDenom, 1.0)
+	azimuth = 180.0 - np.degrees(mathArray(math.acos, np.clip(azRad, -1.0, 1.0)))
+	azimuth = np.where(hourangle > 0.0, -azimuth, azimuth)
+	azimuth = np.where(valid, azimuth, 180.0 if latitude > 0.0 else 0.0)
+	azimuth = np.where(azimuth < 0.0, azimuth + 360.0, azimuth)
+
+	# Elevation, including the atmospheric refraction
+	exoatmElevation = 90.0 - zenith
+	te = mathArray(math.tan, np.radians(exoatmElevation))
+	with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+		refraction = np.where(exoatmElevation > 5.0, 58.1 / te - 0.07 / (te * te * te) + 0.000086 / (te * te * te * te * te),
+					np.where(exoatmElevation > -0.575, 1735.0 + exoatmElevation * (-518.2 + exoatmElevation * (103.4 + exoatmElevation * (-12.79 + exoatmElevation * 0.711))),
+					-20.774 / te))
+	refraction = np.where(exoatmElevation > 85.0, 0.0, refraction / 3600.0)
+	elevation = 90.0 - (zenith - refraction)
+
+	return elevation, azimuth, 90.0 - elevation
+
 class SunEnv(EnvEntity):
 	def __init__(self,  name,  host):
 		EnvEntity.__init__(self,  name, host)
@@ -57,6 +135,12 @@ class SunEnv(EnvEntity):
 
 		self.currentState = {}
 
+		# Cache with the properties of the sun per timestamp, used by getIrradiations()
+		self.useCache = True
+		self.cacheSize = 50000 	# Number of timestamps to keep, the oldest are evicted first
+		self.cache = OrderedDict()
+		self.cacheLock = threading.Lock()
+
 		self.timeBase = 3600 # Default of most weather information sources
 
 		self.irradianceFile = None
@@ -111,67 +195,112 @@ class SunEnv(EnvEntity):
 		self.lockState.release()
 
 	def getIrradiation(self, time):
-		result = {}
-		if self.useInterpolation:
-			result = dict(self.radiationInterpolation(time))
+		if self.useCache:
+			self.cacheLock.acquire()
+			row = self.cache.get(time)
+			self.cacheLock.release()
+			if row is not None:
+				return dict(zip(irradiationProperties, row.tolist()))
+
+		result = self.getIrradiations([time])
+		return {k: result[k][0].item() for k in irradiationProperties}
+
+	def getIrradiations(self, times):
+		# Horizon version of getIrradiation(), returns a dict with an array per property for the given times
+		# Results are cached per timestamp, such that devices sharing this environment do not recalculate them
+		times = np.asarray(times)
+		rows = np.zeros((len(times), len(irradiationProperties)))
+
+		self.cacheLock.acquire()
+		if self.useCache:
+			missing = []
+			for i, t in enumerate(times.tolist()):
+				row = self.cache.get(t)
+				if row is None:
+					missing.append(i)
+				else:
+					rows[i] = row
 		else:
-			result = dict(self.radiationSimple(time))
-		return result
+			missing = list(range(0, len(times)))
+
+		if len(missing) > 0:
+			missingTimes = times[missing]
+			if self.useInterpolation:
+				result = self.radiationInterpolationArray(missingTimes)
+			else:
+				result = self.radiationSimpleArray(missingTimes)
+			rows[missing] = np.column_stack([result[k] for k in irradiationProperties])
+
+			if self.useCache:
+				for i, t in zip(missing, missingTimes.tolist()):
+					self.cache[t] = rows[i].copy()
+				while len(self.cache) > self.cacheSize:
+					self.cache.popitem(last=False)
+		self.cacheLock.release()
+
+		return {k: rows[:, i] for i, k in enumerate(irradiationProperties)}
+
+	def clearCache(self):
+		self.cacheLock.acquire()
+		self.cache.clear()
+		self.cacheLock.release()
 
 	# These radiation functions calculate the radiation values for a specific time
 	def radiationSimple(self, time):
+		result = self.radiationSimpleArray(np.asarray([time]))
+		return {k: result[k][0].item() for k in irradiationProperties}
+
+	def radiationInterpolation(self, time):
+		result = self.radiationInterpolationArray(np.asarray([time]))
+		return {k: result[k][0].item() for k in irradiationProperties}
+
+	def radiationSimpleArray(self, times):
 		# Noninterpolated variant
 		# Hourly averages do not give appropriate results, so we pick a static time based on the timebase to calculate all values
 		# Since the middle of a time interval gives the best representation, this value is used
 		result = {}
-		modeltime = int(time - (time % self.timeBase) + (self.timeBase / 2))
+		modeltimes = (times - (times % self.timeBase) + (self.timeBase / 2)).astype(np.int64)
 
-		d = datetime.fromtimestamp(time, tz=pytz.utc)
-		result['elevation'] = self.location.solar_elevation(d)
-		result['azimuth'] = self.location.solar_azimuth(d)
-		result['zenith'] = self.location.solar_zenith(d)
+		result['elevation'], result['azimuth'], result['zenith'] = solarPosition(times, self.location.latitude, self.location.longitude)
 
-		result['GHI'] = self.irradianceReader.readValue(modeltime)
+		result['GHI'] = self.readIrradiance(self.irradianceReader, modeltimes)
 		if self.irradianceKNMI:
 			result['GHI'] = ( result['GHI'] * 10000 ) / float(self.irradianceTimeBase)
 
 		# Get diffuse and direct irradiance
 		if self.irradianceDHIFile != None and self.irradianceDNIFile != None:
-			result['DNI'] = self.irradianceDNIReader.readValue(modeltime)
-			result['DHI'] = self.irradianceDHIReader.readValue(modeltime)
+			result['DNI'] = self.readIrradiance(self.irradianceDNIReader, modeltimes)
+			result['DHI'] = self.readIrradiance(self.irradianceDHIReader, modeltimes)
 		else:
 			# No files, estimate these values:
-			result.update(self.directIrradiation(result['elevation'], result['azimuth'], result['zenith'], result['GHI']) ) # Note, update merges two dicts
+			result.update(self.directIrradiationArray(result['elevation'], result['GHI']))
 
 		return result
 
-	def radiationInterpolation(self, time):
+	def radiationInterpolationArray(self, times):
 		result = {}
 
-		d = datetime.fromtimestamp(time, tz=pytz.utc)
-		result['elevation'] = self.location.solar_elevation(d)
-		result['azimuth'] = self.location.solar_azimuth(d)
-		result['zenith'] = self.location.solar_zenith(d)
+		result['elevation'], result['azimuth'], result['zenith'] = solarPosition(times, self.location.latitude, self.location.longitude)
 
-		t1 = (time - (time%self.timeBase)) - int(self.timeBase/2)
-		t2 = (time - (time%self.timeBase)) + int(self.timeBase/2)
-		if (time % self.timeBase) >= int(self.timeBase/2):
-			t1 += self.timeBase
-			t2 += self.timeBase
+		t1 = (times - (times%self.timeBase)) - int(self.timeBase/2)
+		t2 = (times - (times%self.timeBase)) + int(self.timeBase/2)
+		second = (times % self.timeBase) >= int(self.timeBase/2)
+		t1 = np.where(second, t1 + self.timeBase, t1)
+		t2 = np.where(second, t2 + self.timeBase, t2)
 
-		assert(t1 <= time <= t2)
+		assert((t1 <= times).all() and (times <= t2).all())
 
-		result['GHI'] = util.helpers.interpolatePoint(self.irradianceReader.readValue(t1), self.irradianceReader.readValue(t2), t1, t2, time)
+		result['GHI'] = self.interpolateIrradiance(self.irradianceReader, t1, t2, times)
 		if self.irradianceKNMI:
 			result['GHI'] = ( result['GHI'] * 10000 ) / float(self.irradianceTimeBase)
 
 		# Get diffuse and direct irradiance
 		if self.irradianceDNIReader != None and self.irradianceDHIReader != None:
-			result['DNI'] = util.helpers.interpolatePoint(self.irradianceDNIReader.readValue(t1), self.irradianceDNIReader.readValue(t2), t1, t2, time)
-			result['DHI'] = util.helpers.interpolatePoint(self.irradianceDHIReader.readValue(t1), self.irradianceDHIReader.readValue(t2), t1, t2, time)
+			result['DNI'] = self.interpolateIrradiance(self.irradianceDNIReader, t1, t2, times)
+			result['DHI'] = self.interpolateIrradiance(self.irradianceDHIReader, t1, t2, times)
 		else:
 			# No files, estimate these values:
-			result.update(self.directIrradiation(result['elevation'], result['azimuth'], result['zenith'], result['GHI']) ) # Note, update merges two dicts
+			result.update(self.directIrradiationArray(result['elevation'], result['GHI']))
 
 		return result
 
@@ -275,6 +404,42 @@ class SunEnv(EnvEntity):
 		return result
 
 
+	def directIrradiationArray(self, elevation, GHI):
+		# Array version of directIrradiation(), see the references there
+		result = {}
+		Gmax = 1367 * np.sin(np.radians(elevation))
+
+		# Determine the clearness index
+		with np.errstate(divide='ignore', invalid='ignore'):
+			clearnessIndex = np.where(Gmax > 0.0, GHI / np.where(Gmax > 0.0, Gmax, 1.0), 0.0)
+
+		# Calculate the diffuse fraction
+		diffuseFraction = np.full(len(clearnessIndex), 0.165)
+		mid = (clearnessIndex > 0.22) & (clearnessIndex <= 0.8)
+		if mid.any():
+			c = clearnessIndex[mid]
+			diffuseFraction[mid] = ( 0.9511-0.1604*c + \
+						   4.388 * mathArray(math.pow, c, 2) - \
+						   16.638 * mathArray(math.pow, c, 3) + \
+						   12.336 * (mathArray(math.pow, c, 4)) )
+		diffuseFraction = np.where(clearnessIndex <= 0.22, (1.0-0.09*clearnessIndex), diffuseFraction)
+		diffuseFraction = np.where(clearnessIndex <= 0.0001, 0.0, diffuseFraction)
+
+		# irradiance based on this fraction
+		DHI =  diffuseFraction * GHI # Diffuse Horizontal Irradiance
+
+		# Beam radiation
+		irradiationBeam = GHI - DHI
+
+		# And now calculate DNI based on the elevation of the sun
+		high = elevation > 2
+		DNI = np.zeros(len(elevation))
+		DNI[high] = np.minimum(1367.0, ( irradiationBeam[high] * 1 / np.sin(np.radians(elevation[high])) ) )
+
+		result['DHI'] = DHI
+		result['DNI'] = DNI
+		return result
+
 	def powerOnPlane(self, inclination, azimuth, time = None, perfect = True):
 		# Calculate the direct irradiance on a plane (e.g. solar panel, window)
 
@@ -319,6 +484,83 @@ class SunEnv(EnvEntity):
 		# Now we can add these and return out results
 		return max(0.0, Gdir + Gdfs + Gref)
 
+	def powerOnPlanes(self, planes, times = None, perfect = True):
+		# Horizon version of powerOnPlane() for many planes at once, e.g. all windows of a zone or a fleet of solar panels
+		# planes is a list of (inclination, azimuth) tuples, the result is a matrix with a row per plane and a column per time
+		if times is None:
+			sunProps = {k: np.asarray([self.currentState[k]]) for k in irradiationProperties}
+		else:
+			sunProps = self.predictIrradiations(times, perfect)
+
+		inclinations = [p[0] for p in planes]
+		azimuths = [p[1] for p in planes]
+		return self.irradianceOnPlanes(sunProps, inclinations, azimuths)
+
+	def predictIrradiations(self, times, perfect = True):
+		# Properties of the sun for the given times, future values are the average with the day before if predictions are not perfect
+		times = np.asarray(times)
+		sunProps = self.getIrradiations(times)
+
+		if not perfect:
+			future = np.flatnonzero(times > self.host.time())
+			if len(future) > 0:
+				sunProps2 = self.getIrradiations(times[future] - 3600*24)
+				for k in sunProps.keys():
+					sunProps[k] = sunProps[k].copy()
+					sunProps[k][future] = 0.5 * sunProps[k][future] + 0.5*sunProps2[k]
+
+		return sunProps
+
+	def irradianceOnPlanes(self, sunProps, inclinations, azimuths):
+		# Irradiance on the given planes for the given properties of the sun, as a matrix with a row per plane
+		inclination = np.asarray(inclinations, dtype=float).reshape(-1, 1)
+		azimuth = np.asarray(azimuths, dtype=float).reshape(-1, 1)
+		zenith = sunProps['zenith']
+
+		# NOTE: Azimuth is defined from the north = 0 degrees, running east (i.e. east is 90 degrees).
+		# No power (significant) irradiation / avoid division by 0.
+		dark = (sunProps['GHI'] < 0.001) | (sunProps['elevation'] <= 1)
+
+		# Calculate Incidence Angle (theta_i)
+		planeIncidence = np.degrees( mathArray(math.acos, np.clip( \
+									np.cos(np.radians(zenith)) * np.cos(np.radians(inclination)) + \
+									( np.sin(np.radians(zenith)) * np.sin(np.radians(inclination)) * \
+									  np.cos(np.radians(sunProps['azimuth'] - azimuth))	), \
+									-1.0, 1.0) ) )
+
+		# Calculate Gdir
+		Gdir = sunProps['DNI'] * np.cos(np.radians(planeIncidence))
+
+		# Calculate the diffuse irradiance (Gdfs)
+		with np.errstate(divide='ignore', invalid='ignore'):
+			factorF = 1 - mathArray(math.pow, np.where(dark, 0.0, sunProps['DHI'] / np.where(dark, 1.0, sunProps['GHI'])), 2)
+
+		Gdfs = sunProps['DHI'] * 	( \
+						( ( 1 + np.cos(np.radians(inclination))) / 2.0 ) * \
+						( 1 + factorF * mathArray(math.pow, np.sin(np.radians(inclination / 2.0)), 3) ) * \
+						( 1 + factorF * mathArray(math.pow, np.cos(np.radians(planeIncidence)), 2) * mathArray(math.pow, np.sin(np.radians(zenith)), 3) ) \
+						)
+
+		# Ground reflected Irradiance Gref
+		Gref = sunProps['GHI'] * self.rhoGround * ( (1 - np.cos(np.radians(inclination))) / 2.0 )
+
+		# Now we can add these and return out results
+		result = np.maximum(0.0, Gdir + Gdfs + Gref)
+		result[:, dark] = 0.0
+		return result
+
+	def readIrradiance(self, reader, times):
+		# Reads the values of a reader for an array of times, every distinct time is read only once
+		# Gaps in the data are represented by NaN
+		unique, inverse = np.unique(times, return_inverse=True)
+		values = np.array([reader.readValue(t) for t in unique.tolist()], dtype=float)
+		return values[inverse.reshape(-1)]
+
+	def interpolateIrradiance(self, reader, t1, t2, times):
+		# Array version of util.helpers.interpolatePoint() with the values of the reader at t1 and t2
+		in1 = self.readIrradiance(reader, t1)
+		in2 = self.readIrradiance(reader, t2)
+		return in1 + ((in2-in1)/(t2-t1))*(times-t1)
 
 	def readValue(self, time, filename=None, timeBase=None, field=None):
 		if field != None:
@@ -343,9 +585,15 @@ class SunEnv(EnvEntity):
 		# FIXME: Could use predictions
 		# We can simply use the original function, just loop through all desired time intervals :)
 		# For now we do not consider
+		times = []
 		time = startTime
 		while time < endTime:
-			result.append(self.getIrradiation(time))
+			times.append(time)
 			time += timeBase
 
+		if len(times) > 0:
+			sunProps = self.getIrradiations(times)
+			for i in range(0, len(times)):
+				result.append({k: sunProps[k][i].item() for k in irradiationProperties})
+
 		return result
\ No newline at end of file
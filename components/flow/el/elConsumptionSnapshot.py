@@ -0,0 +1,72 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+
+from flow.el.elNode import ElNode
+
+# Snapshot of the consumption of all meters connected to the nodes of an ElLoadFlow
+# Meter data cannot change within a loadflow, yet ElNode.getConsumption() is called in every backward sweep.
+# The snapshot obtains the consumption of all meters with a single zGet, such that remote meters are requested
+# in one batch per remote host (see ZCore.zSendList()), instead of one request per node, meter list and iteration.
+# The per phase consumption of each node is stored in consumption[index[node]], using the same arithmetic as
+# ElNode.meterConsumption(). The snapshot is only valid during ElLoadFlow.executeLoadflow().
+# Nodes that override getConsumption() keep obtaining their own meter data.
+
+class ElConsumptionSnapshot():
+	def __init__(self, flowSim):
+		self.flowSim = flowSim
+
+		self.nodes = []
+		self.index = {}
+		self.consumption = None		# Complex consumption per node (rows) and conductor (columns), index 0 is the neutral
+
+		self.valid = False
+		self.time = None
+
+	def supported(self, node):
+		return isinstance(node, ElNode) and type(node).getConsumption is ElNode.getConsumption
+
+	def update(self):
+		# Nodes and meters are collected on every update, such that changes to the grid are taken into account
+		self.nodes = [node for node in self.flowSim.nodes if self.supported(node)]
+		self.index = {}
+
+		meters = []
+		for node in self.nodes:
+			meters.extend(node.meterList())
+		meters = list(dict.fromkeys(meters))
+
+		results = {}
+		if len(meters) > 0:
+			results = self.flowSim.zGet(meters, 'consumption')
+
+		self.consumption = np.zeros((len(self.nodes), 4), dtype=complex)
+		for k in range(0, len(self.nodes)):
+			node = self.nodes[k]
+			self.index[node] = k
+			self.consumption[k, 0:node.phases+1] = node.meterConsumption(results)
+
+		self.time = self.flowSim.host.time()
+		self.valid = True
+
+	def clear(self):
+		self.valid = False
+
+	def holds(self, node):
+		return self.valid and self.time == self.flowSim.host.time() and node in self.index
+
+	def nodeConsumption(self, node):
+		return self.consumption[self.index[node], 0:node.phases+1].tolist()
@@ -19,6 +19,9 @@ import math
 
 from flow.flowSimulator import FlowSimulator
 from flow.el.mvLvTransformer import MvLvTransformer
+from flow.el.elSweepEngine import ElSweepEngine
+from flow.el.elConsumptionSnapshot import ElConsumptionSnapshot
+from flow.el.reliability.cableThermalEngine import CableThermalEngine
 
 class ElLoadFlow(FlowSimulator):
 	def __init__(self,  name,  host):
@@ -57,6 +60,29 @@ class ElLoadFlow(FlowSimulator):
 		# Simulation status
 		self.currentIteration = 0
 
+		# Use the compiled NumPy sweep engine instead of the recursive object based sweep
+		# Falls back to the object based sweep if the grid contains unsupported components
+		self.vectorized = False
+		self.sweepEngine = None
+
+		# Evaluate the thermal models of all RelLvCables in batches per cable type instead of per cable
+		# Results equal the per cable evaluation up to floating point rounding
+		self.batchedReliability = False
+		self.cableThermalEngine = None
+
+		# Obtain the consumption of all meters once per loadflow instead of in every sweep
+		# Set to None to let the nodes query their meters in every sweep
+		self.consumptionSnapshot = ElConsumptionSnapshot(self)
+
+		# Start each loadflow from the currents of the previous converged loadflow instead of a flat start
+		# Results differ from a flat start within the convergence criterion (maxError)
+		self.warmStart = False
+		self.warmVoltages = None
+		self.warmCurrents = None
+
+		# Optional flow.el.elLoadFlowScheduler.ElLoadFlowScheduler to solve multiple feeders in parallel processes
+		self.scheduler = None
+
 		# Documentation on frequency:
 		# Page 104 of this book gives some ideas
 		# https://books.google.nl/books?id=Gb1zCgAAQBAJ&pg=PA104&lpg=PA104&dq=relation+power+surplu+frequency&source=bl&ots=ausQ1cVvDp&sig=J_ysCa6eQGnX_qjwPZn9uwLEQJc&hl=nl&sa=X&ved=0ahUKEwj3lZfeiLjKAhVBBBoKHZO1CTkQ6AEIHzAA#v=onepage&q=relation%20power%20surplus%20frequency&f=false
@@ -70,7 +96,10 @@ class ElLoadFlow(FlowSimulator):
 
 	# As it seems, we can just assume a linear relation between power shortage/surplus and under/over frequency.
 	def simulate(self, time, deltatime=0):
-		iters = self.executeLoadflow(self.maxIterations, self.maxError)
+		if self.scheduler is not None:
+			iters = self.scheduler.executeLoadflow(self)
+		else:
+			iters = self.executeLoadflow(self.maxIterations, self.maxError)
 
 		# Set the frequency:
 		if self.islanding:
@@ -82,8 +111,19 @@ class ElLoadFlow(FlowSimulator):
 		for node in self.nodes:
 			node.estimateReliability()
 
-		for edge in self.edges:
-			edge.estimateReliability()
+		if self.batchedReliability and self.cableThermalEngine is None:
+			# Compiled at the first simulation step, as the cables determine their thermal model during their startup
+			self.cableThermalEngine = CableThermalEngine(self)
+			self.cableThermalEngine.compile()
+
+		if self.cableThermalEngine is not None:
+			self.cableThermalEngine.estimateReliability()
+			for edge in self.edges:
+				if not self.cableThermalEngine.handles(edge):
+					edge.estimateReliability()
+		else:
+			for edge in self.edges:
+				edge.estimateReliability()
 
 		self.logValue("n-iterations.loadflow", iters)
 
@@ -100,35 +140,83 @@ class ElLoadFlow(FlowSimulator):
 
 		self.reset()
 
+		if self.vectorized:
+			self.compileSweepEngine()
+
+	def compileSweepEngine(self):
+		self.sweepEngine = ElSweepEngine(self)
+		if not self.sweepEngine.compile():
+			self.logWarning("Grid contains components that are not supported by the vectorized sweep, using the object based sweep instead")
+			self.sweepEngine = None
+
 	def shutdown(self):
 		#Write stats at the end
 		if self.statsLogging:
 			self.logOverallStats()
 
+		if self.scheduler is not None:
+			self.scheduler.shutdown()
+
 	def executeLoadflow(self, iters, error):
+		self.startLoadflow()
+		success, numIters = self.runLoadflow(iters, error)
+		return self.endLoadflow(success, numIters)
+
+	# A loadflow is split in three steps, such that an ElLoadFlowScheduler can solve multiple feeders at once
+	def startLoadflow(self):
 		assert(self.rootNode != None)
-		success = False
 
 		self.reset(self.autoRestoreGrid)
 
+		if self.sweepEngine is not None and self.sweepEngine.changed():
+			self.compileSweepEngine()
+
+		if self.consumptionSnapshot is not None:
+			self.consumptionSnapshot.update()
+
+	def runLoadflow(self, iters, error):
+		success = False
+
 		loop = True
 		numIters = 0
+		first = True
 		while loop:
 			self.reset(False)
-			for i in range(0, iters):
-				self.currentIteration = i
-				self.doForwardBackwardSweep(self.rootNode, None)
-				numIters += 1
 
-				if i>0 and self.checkConvergence(error):
+			# Only the first solution after the restore of the grid starts from the previous loadflow
+			warm = first and self.restoreWarmState()
+			first = False
+
+			if self.sweepEngine is not None:
+				self.sweepEngine.load(warm)
+				converged, n = self.sweepEngine.solve(iters, error)
+				self.sweepEngine.store()
+				if n > 0:
+					self.currentIteration = n-1
+				numIters += n
+				if converged:
 					success = True
-					break;
+			else:
+				for i in range(0, iters):
+					self.currentIteration = i
+					self.doForwardBackwardSweep(self.rootNode, None)
+					numIters += 1
+
+					if i>0 and self.checkConvergence(error):
+						success = True
+						break;
 
 			if self.burnFuses:
 				loop = self.determinePhysicalState(self.rootNode, None)
 			else:
 				loop = False
 
+		return success, numIters
+
+	def endLoadflow(self, success, numIters):
+		if self.consumptionSnapshot is not None:
+			self.consumptionSnapshot.clear()
+
 		if self.burnFuses:
 			self.updatePhysicalState(self.rootNode, None)
 
@@ -136,8 +224,32 @@ class ElLoadFlow(FlowSimulator):
 			self.host.logWarning("Loadflow calculation did not converge to a solution!")
 			return -1
 		else:
+			if self.warmStart:
+				self.storeWarmState()
 			return numIters
 
+	# Warm start from the state of the previous converged loadflow
+	# The object based sweep starts from the previous currents, such that the first forward sweep results in voltages
+	# close to the solution. The sweep engine determines the initial currents at the previous voltages instead.
+	def storeWarmState(self):
+		self.warmVoltages = [list(node.voltage) for node in self.nodes]
+		self.warmCurrents = [list(edge.current) for edge in self.edges]
+
+	def restoreWarmState(self):
+		if not self.warmStart or self.warmCurrents is None:
+			return False
+		if len(self.warmVoltages) != len(self.nodes) or len(self.warmCurrents) != len(self.edges):
+			return False
+
+		for i in range(0, len(self.nodes)):
+			# The voltage of the rootNode is fixed
+			if self.nodes[i] is not self.rootNode and len(self.nodes[i].voltage) == len(self.warmVoltages[i]):
+				self.nodes[i].voltage = list(self.warmVoltages[i])
+		for i in range(0, len(self.edges)):
+			if len(self.edges[i].current) == len(self.warmCurrents[i]):
+				self.edges[i].current = list(self.warmCurrents[i])
+		return True
+
 	def doForwardBackwardSweep(self, thisNode, prevNode):
 		for edge in thisNode.edges:
 			nextNode = edge.otherNode(thisNode)
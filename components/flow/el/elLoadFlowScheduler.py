@@ -0,0 +1,221 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing
+import os
+
+import numpy as np
+
+from flow.el.elSweepEngine import ElSweepEngine
+
+# Parallel loadflows of independent feeders, each with its own ElLoadFlow
+# Usage in a model:
+#	scheduler = ElLoadFlowScheduler(sim, workers=8)
+#	scheduler.addFeeder(loadFlow)		# For each feeder, preferably with loadFlow.vectorized = True
+#
+# All feeders are solved at once when the first feeder of the scheduler is simulated within a ticket, the other feeders
+# use the results. Meter data is obtained and the results are stored in this process, the sweeps of feeders with a
+# compiled ElSweepEngine are executed by the worker processes. The state of such a feeder (topology, impedances,
+# voltages, currents and consumption) is kept in a shared memory block, such that tasks only contain its name.
+# The workers execute the same ElSweepEngine code, hence results are equal to those of a sequential loadflow.
+# Feeders without compiled sweep engine or with burnFuses are solved in this process while the workers run.
+# Results are kept for the time and deltatime of the host at which they were solved, a feeder that did not obtain its
+# result within that ticket never receives it in a later one.
+#
+# The writer threads of the logger and the database are stopped before the workers are forked, see Core.prepareFork().
+# As in ctrl.planningExecutor, networked hosts (ZHost) fork the workers while their bus threads run. This is safe as the
+# workers only execute the sweep engine on the shared memory and do not use any lock or socket of these threads.
+# NOTE: Requires the fork start method (i.e. Linux), see also ctrl.planningExecutor
+
+workerStates = {}	# Shared states attached by a worker, by name
+
+def solveFeeder(name, n, iterations, error):
+	if name not in workerStates:
+		state = SharedSweepState(n, name)
+		workerStates[name] = (state, state.engine())
+	state, engine = workerStates[name]
+
+	success, numIters = engine.solve(iterations, error)
+	state.prevVoltage[:] = engine.prevVoltage
+	return success, numIters
+
+class SharedSweepState():
+	# Arrays of an ElSweepEngine for n nodes: name, shape per node and type
+	layout = [('impedance', (4, 4), complex), ('parent', (), np.int64), ('depth', (), np.int64),
+			('conductorMask', (4,), bool), ('hasNeutral', (), bool),
+			('voltage', (4,), complex), ('prevVoltage', (4,), complex), ('current', (4,), complex), ('consumption', (4,), complex)]
+
+	def __init__(self, n, name=None):
+		self.n = n
+
+		offsets = []
+		size = 0
+		for field, shape, dtype in self.layout:
+			offsets.append(size)
+			size += n * int(np.prod(shape)) * np.dtype(dtype).itemsize
+			size += (-size) % 16		# Alignment
+
+		if name is None:
+			self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+		else:
+			self.memory = shared_memory.SharedMemory(name=name)
+		self.name = self.memory.name
+
+		for (field, shape, dtype), offset in zip(self.layout, offsets):
+			setattr(self, field, np.ndarray((n,) + shape, dtype=dtype, buffer=self.memory.buf, offset=offset))
+
+	def compile(self, engine):
+		# Topology and impedances of a compiled engine
+		self.impedance[:] = engine.impedance
+		self.parent[:] = engine.parent
+		self.depth[:] = 0
+		for d in range(0, len(engine.levels)):
+			self.depth[engine.levels[d]] = d + 1
+		self.conductorMask[:] = engine.conductorMask
+		self.hasNeutral[:] = engine.hasNeutral
+
+	def engine(self):
+		# Engine that operates on the shared arrays, levels as determined by ElSweepEngine.compile()
+		engine = ElSweepEngine(None)
+		engine.impedance = self.impedance
+		engine.parent = self.parent
+		engine.levels = []
+		if self.n > 1:
+			for d in range(1, int(self.depth.max()) + 1):
+				engine.levels.append(np.nonzero(self.depth == d)[0])
+		engine.conductorMask = self.conductorMask
+		engine.hasNeutral = self.hasNeutral
+		engine.voltage = self.voltage
+		engine.prevVoltage = self.prevVoltage
+		engine.current = self.current
+		engine.consumption = self.consumption
+		return engine
+
+	def close(self, unlink=False):
+		# Release the views before closing the block
+		for field, shape, dtype in self.layout:
+			setattr(self, field, None)
+		self.memory.close()
+		if unlink:
+			self.memory.unlink()
+
+class ElLoadFlowScheduler():
+	def __init__(self, host, workers=None):
+		self.host = host
+
+		self.workers = workers
+		if self.workers is None:
+			self.workers = os.cpu_count()
+
+		self.feeders = []
+		self.results = {}	# Number of iterations per feeder of the last solve, see ElLoadFlow.endLoadflow()
+		self.resultsTime = None	# Time and deltatime of the host of the last solve
+		self.states = {}	# SharedSweepState and the engine it was compiled from, per feeder
+
+		self.pool = None
+
+	def addFeeder(self, flowSim):
+		self.feeders.append(flowSim)
+		flowSim.scheduler = self
+
+	def executeLoadflow(self, flowSim):
+		# Solve all feeders when a feeder has no pending result of this time, i.e. at its first loadflow within a ticket
+		if flowSim not in self.results or self.resultsTime != (self.host.time(), self.host.deltatime):
+			self.solve()
+		return self.results.pop(flowSim)
+
+	def parallel(self, flowSim):
+		return flowSim.sweepEngine is not None and not flowSim.burnFuses
+
+	def solve(self):
+		self.results = {}
+		self.resultsTime = (self.host.time(), self.host.deltatime)
+		for flowSim in self.feeders:
+			flowSim.startLoadflow()
+
+		parallel = [flowSim for flowSim in self.feeders if self.parallel(flowSim)]
+		others = [flowSim for flowSim in self.feeders if not self.parallel(flowSim)]
+
+		# Initial state of the feeders that are solved by the workers
+		for flowSim in parallel:
+			flowSim.reset(False)
+			flowSim.sweepEngine.load(flowSim.restoreWarmState())
+
+		outcome = {}
+		if self.workers > 1 and len(parallel) > 1:
+			tasks = []
+			for flowSim in parallel:
+				state = self.sharedState(flowSim)
+				engine = flowSim.sweepEngine
+				state.voltage[:] = engine.voltage
+				state.prevVoltage[:] = engine.prevVoltage
+				state.current[:] = engine.current
+				state.consumption[:] = engine.consumption
+				tasks.append((flowSim, state))
+
+			# The pool is started after the first shared memory block is created, such that the workers share its resource tracker
+			if self.pool is None:
+				self.host.prepareFork()
+				self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('fork'))
+			futures = [self.pool.submit(solveFeeder, state.name, state.n, flowSim.maxIterations, flowSim.maxError) for flowSim, state in tasks]
+
+			# Other feeders are solved in the meantime
+			for flowSim in others:
+				outcome[flowSim] = flowSim.runLoadflow(flowSim.maxIterations, flowSim.maxError)
+
+			for (flowSim, state), future in zip(tasks, futures):
+				outcome[flowSim] = future.result()
+				engine = flowSim.sweepEngine
+				engine.voltage = np.array(state.voltage)
+				engine.prevVoltage = np.array(state.prevVoltage)
+				engine.current = np.array(state.current)
+		else:
+			for flowSim in parallel:
+				outcome[flowSim] = flowSim.sweepEngine.solve(flowSim.maxIterations, flowSim.maxError)
+			for flowSim in others:
+				outcome[flowSim] = flowSim.runLoadflow(flowSim.maxIterations, flowSim.maxError)
+
+		# Results are stored in the order of the feeders
+		for flowSim in self.feeders:
+			success, numIters = outcome[flowSim]
+			if flowSim in parallel:
+				flowSim.sweepEngine.store()
+				if numIters > 0:
+					flowSim.currentIteration = numIters-1
+			self.results[flowSim] = flowSim.endLoadflow(success, numIters)
+
+	def sharedState(self, flowSim):
+		# Shared memory is allocated when the sweep engine of a feeder has been (re)compiled
+		if flowSim in self.states:
+			state, engine = self.states[flowSim]
+			if engine is flowSim.sweepEngine:
+				return state
+			state.close(unlink=True)
+
+		state = SharedSweepState(len(flowSim.sweepEngine.nodes))
+		state.compile(flowSim.sweepEngine)
+		self.states[flowSim] = (state, flowSim.sweepEngine)
+		return state
+
+	def shutdown(self):
+		if self.pool is not None:
+			self.pool.shutdown()
+			self.pool = None
+
+		for state, engine in self.states.values():
+			state.close(unlink=True)
+		self.states = {}
@@ -140,48 +140,65 @@ class ElNode(Node):
 		cable.current = list(current)
 
 	def getConsumption(self):
-		self.consumption = [complex(0.0, 0.0)] * (self.phases+1)
+		# Within a loadflow, the consumption is obtained from the snapshot of all meters, see ElConsumptionSnapshot
+		snapshot = self.flowSim.consumptionSnapshot
+		if snapshot is not None and snapshot.holds(self):
+			self.consumption = snapshot.nodeConsumption(self)
+		else:
+			meters = self.meterList()
+			results = {}
+			if len(meters) > 0:
+				results = self.zGet(meters, 'consumption')
+			self.consumption = self.meterConsumption(results)
+
+		# Check if we are powered
+		for phase in range(1, (self.phases+1)):
+			if not self.powered[phase]:
+				self.consumption[phase] = complex(0.0, 0.0)
+
+		consSum = complex(0.0,0.0)
+		for i in range(1, (self.phases+1)):
+			consSum += self.consumption[i]
+
+		return consSum
+
+	def meterList(self):
+		return self.meters + self.metersL1 + self.metersL2 + self.metersL3
+
+	def meterConsumption(self, results):
+		# Consumption per phase given the consumption of the meters (results) as obtained with zGet
+		consumption = [complex(0.0, 0.0)] * (self.phases+1)
 
 		# Get the consumption
-		if len(self.meters) > 0:
-			results = self.zGet(self.meters, 'consumption')
-			for r in results.values():
-				for c in r:
-					for i in range(1, (self.phases+1)):
-						self.consumption[i] += r[c] / self.phases
+		for meter in dict.fromkeys(self.meters):
+			r = results[meter]
+			for c in r:
+				for i in range(1, (self.phases+1)):
+					consumption[i] += r[c] / self.phases
 
 		# Appending meters, this may crash upon errors in the model by an end user!
 		if len(self.metersL1) > 0:
 			assert(self.phases >= 1)
-			results = self.zGet(self.metersL1, 'consumption')
-			for r in results.values():
+			for meter in dict.fromkeys(self.metersL1):
+				r = results[meter]
 				for c in r:
-					self.consumption[1] += r[c]
+					consumption[1] += r[c]
 
 		if len(self.metersL2) > 0:
 			assert (self.phases >= 2)
-			results = self.zGet(self.metersL2, 'consumption')
-			for r in results.values():
+			for meter in dict.fromkeys(self.metersL2):
+				r = results[meter]
 				for c in r:
-					self.consumption[2] += r[c]
+					consumption[2] += r[c]
 
 		if len(self.metersL3) > 0:
 			assert (self.phases >= 3)
-			results = self.zGet(self.metersL3, 'consumption')
-			for r in results.values():
+			for meter in dict.fromkeys(self.metersL3):
+				r = results[meter]
 				for c in r:
-					self.consumption[3] += r[c]
-
-		# Check if we are powered
-		for phase in range(1, (self.phases+1)):
-			if not self.powered[phase]:
-				self.consumption[phase] = complex(0.0, 0.0)
-
-		consSum = complex(0.0,0.0)
-		for i in range(1, (self.phases+1)):
-			consSum += self.consumption[i]
+					consumption[3] += r[c]
 
-		return consSum
+		return consumption
 
 	def getConvergenceError(self):
 		result = 0.0
@@ -0,0 +1,233 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+
+from flow.el.elNode import ElNode
+from flow.el.elCable import ElCable
+
+# Compiled forward/backward sweep for radial grids
+# The tree below the rootNode of an ElLoadFlow is flattened once into arrays in topological order:
+#  - Node k > 0 is fed by exactly one edge, stored at the same index k. Index 0 is the rootNode.
+#  - parent[k] holds the index of the node upstream of node k
+#  - impedance[k] holds a 4x4 matrix such that the voltage drop over the feeding edge is impedance[k] @ current[k]
+# The sweeps are then executed level by level over all nodes and phases at once.
+# Only nodes and cables that use the default ElNode/ElCable sweep implementations can be compiled,
+# other components (e.g. transformers within the tree) require the object based sweep.
+
+class ElSweepEngine():
+	def __init__(self, flowSim):
+		self.flowSim = flowSim
+
+		# Topology
+		self.nodes = []
+		self.edges = [None]		# No feeding edge for the rootNode
+		self.parent = None
+		self.levels = []
+		self.impedance = None
+
+		# Conductor masks, convention is that index 0 is the neutral conductor
+		self.conductorMask = None
+		self.hasNeutral = None
+
+		# State
+		self.voltage = None
+		self.prevVoltage = None
+		self.current = None
+		self.consumption = None
+
+		# Signature of enabled edges to detect changes in the topology
+		self.enabledEdges = []
+
+	def supported(self):
+		# Check whether all components within the tree use the default sweep implementation
+		for node in self.nodes[1:]:
+			if type(node).doForwardSweep is not ElNode.doForwardSweep or \
+					type(node).doBackwardSweep is not ElNode.doBackwardSweep or \
+					type(node).getConsumption is not ElNode.getConsumption or \
+					type(node).conductors is not ElNode.conductors or \
+					node.phases != 3:
+				return False
+
+		for edge in self.edges[1:]:
+			if type(edge).voltageDrop is not ElCable.voltageDrop or \
+					type(edge).conductors is not ElCable.conductors or \
+					edge.phases != 3:
+				return False
+
+		if len(self.nodes[0].voltage) != 4:
+			return False
+
+		return True
+
+	def compile(self):
+		root = self.flowSim.rootNode
+		assert(root is not None)
+
+		# Breadth first traversal provides the topological order and the levels at once
+		self.nodes = [root]
+		self.edges = [None]
+		parent = [-1]
+		depth = [0]
+
+		idx = 0
+		while idx < len(self.nodes):
+			thisNode = self.nodes[idx]
+			prevNode = None
+			if parent[idx] >= 0:
+				prevNode = self.nodes[parent[idx]]
+
+			for edge in thisNode.edges:
+				nextNode = edge.otherNode(thisNode)
+				if nextNode != prevNode and edge.enabled == True:
+					self.nodes.append(nextNode)
+					self.edges.append(edge)
+					parent.append(idx)
+					depth.append(depth[idx] + 1)
+			idx += 1
+
+		n = len(self.nodes)
+		self.parent = np.array(parent, dtype=int)
+
+		depth = np.array(depth, dtype=int)
+		self.levels = []
+		for d in range(1, int(depth.max()) + 1):
+			self.levels.append(np.nonzero(depth == d)[0])
+
+		self.enabledEdges = [edge.enabled for edge in self.flowSim.edges]
+
+		if not self.supported():
+			return False
+
+		# Conductor masks
+		self.hasNeutral = np.array([node.hasNeutral for node in self.nodes], dtype=bool)
+		self.conductorMask = np.ones((n, 4), dtype=bool)
+		self.conductorMask[~self.hasNeutral, 0] = False
+		self.conductorMask[0, :] = False		# The rootNode voltage is fixed
+
+		# Impedance tensors, mirrors ElCable.voltageDrop():
+		# drop[phase] = sum_i current[(i+phase) % 4] * scaledImpedance[i]
+		self.impedance = np.zeros((n, 4, 4), dtype=complex)
+		for k in range(1, n):
+			edge = self.edges[k]
+			node = self.nodes[k]
+			for phase in node.conductors():
+				if phase == 0 and not edge.hasNeutral:
+					continue
+				for i in edge.conductors():
+					if not edge.hasNeutral:
+						i -= 1
+					self.impedance[k, phase, (i+phase) % 4] += edge.scaledImpedance[i]
+
+		return True
+
+	def changed(self):
+		if len(self.enabledEdges) != len(self.flowSim.edges):
+			return True
+		for i in range(0, len(self.flowSim.edges)):
+			if self.flowSim.edges[i].enabled != self.enabledEdges[i]:
+				return True
+		return False
+
+	def load(self, warm=False):
+		# Obtain the state after a reset of the objects
+		n = len(self.nodes)
+		self.voltage = np.array([node.voltage for node in self.nodes], dtype=complex)
+		self.prevVoltage = np.array(self.voltage)
+		self.current = np.zeros((n, 4), dtype=complex)
+
+		# Meter data cannot change within a loadflow, hence it is obtained once (from the ElConsumptionSnapshot if available)
+		self.consumption = np.zeros((n, 4), dtype=complex)
+		for k in range(1, n):
+			node = self.nodes[k]
+			if node.lastUpdate < self.flowSim.host.time():
+				node.lastUpdate = self.flowSim.host.time()
+			node.getConsumption()
+			self.consumption[k, :] = node.consumption[0:4]
+
+		if warm:
+			# Voltages of the previous loadflow are restored, see ElLoadFlow.restoreWarmState()
+			# The initial currents then follow from the new consumption at these voltages
+			self.backwardSweep()
+
+	def solve(self, iterations, error):
+		# Returns whether the loadflow converged and the number of iterations
+		for i in range(0, iterations):
+			self.forwardSweep()
+			self.backwardSweep()
+
+			if i>0 and self.convergenceError() <= error:
+				return True, i+1
+		return False, iterations
+
+	def forwardSweep(self):
+		self.prevVoltage = np.array(self.voltage)
+
+		# Voltage drop over all edges using the currents of the previous iteration
+		drop = np.einsum('kij,kj->ki', self.impedance, self.current)
+
+		for level in self.levels:
+			v = self.voltage[self.parent[level]] - drop[level]
+			self.voltage[level] = np.where(self.conductorMask[level], v, self.voltage[level])
+
+	def backwardSweep(self):
+		n = len(self.voltage)
+		load = np.zeros((n, 4), dtype=complex)
+
+		with np.errstate(divide='ignore', invalid='ignore'):
+			# Nodes with a neutral conductor
+			vln = self.voltage[:, 1:4] - self.voltage[:, 0:1]
+			load[self.hasNeutral, 1:4] = np.conj(self.consumption[self.hasNeutral, 1:4] / vln[self.hasNeutral])
+
+			# Nodes without neutral conductor, using line-line voltages
+			if not self.hasNeutral.all():
+				delta = ~self.hasNeutral
+				vll = self.voltage[:, 1:4] - self.voltage[:, [2, 3, 1]]
+				c = np.conj(self.consumption[delta, 1:4] / vll[delta])
+				load[delta, 1:4] += c
+				load[np.ix_(np.nonzero(delta)[0], [2, 3, 1])] -= c
+
+		# Accumulate currents from the leaves towards the root
+		downstream = np.zeros((n, 4), dtype=complex)
+		for level in reversed(self.levels):
+			current = load[level] + np.where(self.conductorMask[level], downstream[level], 0.0)
+
+			neutral = self.hasNeutral[level]
+			current[neutral, 0] = -current[neutral, 1:4].sum(axis=1)
+
+			self.current[level] = current
+			np.add.at(downstream, self.parent[level], current)
+
+	def convergenceError(self):
+		error = np.abs(np.abs(self.voltage) - np.abs(self.prevVoltage))
+		error[~self.conductorMask] = 0.0
+		return error.max()
+
+	def store(self):
+		# Write the results back into the objects such that all other functionality keeps working
+		for k in range(1, len(self.nodes)):
+			node = self.nodes[k]
+			edge = self.edges[k]
+
+			node.prevVoltage = self.prevVoltage[k].tolist()
+			node.voltage = self.voltage[k].tolist()
+			edge.current = self.current[k].tolist()
+
+			parentVoltage = self.voltage[self.parent[k]]
+			for conductor in node.conductors():
+				if abs(self.voltage[k, conductor]) - abs(parentVoltage[conductor]) < 0:
+					edge.flowDirection[conductor] = 1
+				else:
+					edge.flowDirection[conductor] = -1
@@ -0,0 +1,130 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy
+
+from flow.el.reliability.relLvCable import RelLvCable
+
+# Batched evaluation of the thermal model (Olsen et al.) and insulation ageing of all RelLvCables of an ElLoadFlow
+# Cables are grouped by their thermal model, which holds the eigendecomposition of the system matrix shared by all
+# cables of the same type. Per group, the temperatures of all cables are advanced at once:
+#  - The constants of the solution follow from the cached inverse of the eigenvectors, instead of a linear solve per cable
+#  - The new temperatures are a single matrix product of the constants (scaled by the exponents) with the eigenvectors
+# The ageing (loss of life and reliability) is evaluated elementwise over all cables.
+# Results equal those of RelLvCable.estimateReliability() up to floating point rounding.
+# Only cables that use the default RelLvCable implementation are evaluated, others keep their own estimateReliability()
+
+class CableThermalEngine():
+	def __init__(self, flowSim):
+		self.flowSim = flowSim
+
+		self.groups = [] 		# Lists of cables with the same thermal model and jacket index
+		self.cables = set()		# All cables evaluated by the engine
+
+	def supported(self, edge):
+		return isinstance(edge, RelLvCable) and edge.thermalModel is not None and \
+			type(edge).estimateReliability is RelLvCable.estimateReliability and \
+			type(edge).estimateHottestSpotTemperature is RelLvCable.estimateHottestSpotTemperature and \
+			type(edge).estimateHottestSpotTemperatureOlsen is RelLvCable.estimateHottestSpotTemperatureOlsen
+
+	def compile(self):
+		groups = {}
+		for edge in self.flowSim.edges:
+			if self.supported(edge):
+				key = (id(edge.thermalModel), edge.cableSections[-1].numberOfSegments)
+				if key not in groups:
+					groups[key] = []
+				groups[key].append(edge)
+
+		self.groups = list(groups.values())
+		self.cables = set()
+		for cables in self.groups:
+			self.cables.update(cables)
+
+		return len(self.cables) > 0
+
+	def handles(self, edge):
+		return edge in self.cables
+
+	def estimateReliability(self):
+		for cables in self.groups:
+			cables = [cable for cable in cables if cable.enableReliability]
+			if len(cables) > 0:
+				self.estimateGroup(cables)
+
+	def estimateGroup(self, cables):
+		model = cables[0].thermalModel
+		host = cables[0].host
+		deltaT = host.timeInterval()
+		n = len(model.cumulativeResistances)
+		jacketIndex = n - (n - cables[0].cableSections[-1].numberOfSegments) - 1
+
+		# Normalized losses, see RelLvCable.estimateHottestSpotTemperatureOlsen()
+		loss = numpy.array([len(cable.conductors()) * cable.getPerPhaseLossMax() / cable.length for cable in cables])
+		soilTemperature = numpy.array([cable.soilTemperature for cable in cables], dtype=float)
+
+		# Calculate Steady State Temperatures
+		infTemperatures = loss[:, None] * model.cumulativeResistances[None, :]
+
+		# Previous temperatures, cables without history start at the steady state
+		prevTemperatures = numpy.array(infTemperatures)
+		for i in range(0, len(cables)):
+			if len(cables[i].temperatures) != 0:
+				prevTemperatures[i] = cables[i].temperatures
+
+		# Constants and solution of the system of differential equations for all cables at once
+		c = (prevTemperatures - infTemperatures) @ model.inverse().T
+		temperatures = (c * model.exponents(deltaT)[None, :]) @ model.eigenVectors.T + infTemperatures
+
+		hottestSpotTemperatureOlsen = soilTemperature + temperatures[:, -1]
+		jacketTemperatureOlsen = soilTemperature + temperatures[:, jacketIndex]
+		hottestSpotTemperature60287 = soilTemperature + infTemperatures[:, -1]
+		jacketTemperature60287 = soilTemperature + infTemperatures[:, jacketIndex]
+
+		# Loss of life and reliability, see RelLvCable.estimateReliability()
+		gasConstant = 8.3144598
+		B = numpy.array([cable.activationEnergy for cable in cables]) / gasConstant
+		ratedHotSpotTemperature = numpy.array([cable.ratedHotSpotTemperature for cable in cables])
+		lifeScaleParameter = numpy.array([cable.lifeScaleParameter for cable in cables])
+		timeStep = host.timeInterval()
+
+		lossOfLifeFactor60287 = numpy.exp(B / ratedHotSpotTemperature - B / (273.15 + hottestSpotTemperature60287))
+		lossOfLifeFactorOlsen = numpy.exp(B / ratedHotSpotTemperature - B / (273.15 + hottestSpotTemperatureOlsen))
+
+		lossOfLife60287 = numpy.array([cable.lossOfLife60287 for cable in cables]) + timeStep * lossOfLifeFactor60287
+		lossOfLifeOlsen = numpy.array([cable.lossOfLifeOlsen for cable in cables]) + timeStep * lossOfLifeFactorOlsen
+
+		weibullBeta = 3.3
+		scale = lifeScaleParameter * numpy.exp(B / ratedHotSpotTemperature)
+		reliability60287 = numpy.exp(-(lossOfLife60287 / scale) ** weibullBeta)
+		reliabilityOlsen = numpy.exp(-(lossOfLifeOlsen / scale) ** weibullBeta)
+
+		# Store Results
+		results = zip(cables, temperatures, hottestSpotTemperatureOlsen.tolist(), jacketTemperatureOlsen.tolist(),
+			hottestSpotTemperature60287.tolist(), jacketTemperature60287.tolist(),
+			lossOfLifeFactor60287.tolist(), lossOfLifeFactorOlsen.tolist(), lossOfLife60287.tolist(), lossOfLifeOlsen.tolist(),
+			reliability60287.tolist(), reliabilityOlsen.tolist())
+
+		for cable, t, hotOlsen, jacketOlsen, hot60287, jacket60287, factor60287, factorOlsen, lol60287, lolOlsen, rel60287, relOlsen in results:
+			cable.temperatures = t
+			cable.hottestSpotTemperatureOlsen = hotOlsen
+			cable.jacketTemperatureOlsen = jacketOlsen
+			cable.hottestSpotTemperature60287 = hot60287
+			cable.jacketTemperature60287 = jacket60287
+			cable.lossOfLifeFactor60287 = factor60287
+			cable.lossOfLifeFactorOlsen = factorOlsen
+			cable.lossOfLife60287 = lol60287
+			cable.lossOfLifeOlsen = lolOlsen
+			cable.reliability60287 = rel60287
+			cable.reliabilityOlsen = relOlsen
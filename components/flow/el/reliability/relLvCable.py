@@ -26,6 +26,69 @@ import numpy
 # Download: http://essay.utwente.nl/74878/1/Groen_MA_EEMCS.pdf
 # And references therein
 
+# Cables of the same type share the thermal network of the Olsen et al. model, hence the eigendecomposition of its
+# system matrix is cached per set of thermal resistances and capacitances.
+thermalModels = {}
+
+class ThermalModel():
+	def __init__(self, thermalResistances, thermalCapacitances):
+		# Create System Matrix for Olsen Model
+		m = len(thermalResistances)
+		A = numpy.zeros(shape=(m, m))
+		T = thermalResistances
+		C = thermalCapacitances
+
+		A[0, 0] = -1/(T[0]*C[0])
+		A[0, 1] = 1/(T[0]*C[0])
+
+		for i in range(1, m-1):
+			A[i, i + 1] = 1/(T[i]*C[i])
+			A[i, i] = -(1 / (T[i]*C[i]) + 1 / (T[i-1]*C[i]))
+			A[i, i - 1] = 1/(T[i-1]*C[i])
+
+		A[m-1, m-1] = -(1 / (T[m-1]*C[m-1]) + 1 / (T[m-2]*C[m-1]))
+		A[m-1, m-2] = 1/(T[m-2]*C[m-1])
+
+		A = numpy.fliplr(numpy.flipud(A))
+
+		# Calculate Eigen Vectors/Values
+		w, v = numpy.linalg.eig(A)
+		self.eigenValues = w
+		self.eigenVectors = v
+		self.eigenVectors.flags.writeable = False
+		self.eigenValues.flags.writeable = False
+		self.inverseEigenVectors = None
+
+		# Precalculate Cumulative Thermal Resistance Vector
+		accumulator = 0.0
+		result = []
+		for resistance in reversed(thermalResistances):
+			accumulator += resistance
+			result.append(accumulator)
+
+		self.cumulativeResistances = numpy.asarray(result)
+		self.cumulativeResistances.flags.writeable = False
+
+		# Exponents of the eigenvalues per time step
+		self.ePowers = {}
+
+	def inverse(self):
+		# Used by the batched evaluation, see cableThermalEngine
+		if self.inverseEigenVectors is None:
+			self.inverseEigenVectors = numpy.linalg.inv(self.eigenVectors)
+		return self.inverseEigenVectors
+
+	def exponents(self, deltaT):
+		if deltaT not in self.ePowers:
+			self.ePowers[deltaT] = numpy.exp(self.eigenValues * deltaT)
+		return self.ePowers[deltaT]
+
+def thermalModel(thermalResistances, thermalCapacitances):
+	key = (tuple(thermalResistances), tuple(thermalCapacitances))
+	if key not in thermalModels:
+		thermalModels[key] = ThermalModel(thermalResistances, thermalCapacitances)
+	return thermalModels[key]
+
 class RelLvCable(LvCable):
 	def __init__(self, name, flowSim, nodeFrom, nodeTo, host):
 		LvCable.__init__(self, name, flowSim, nodeFrom, nodeTo, host)
@@ -74,6 +137,7 @@ class RelLvCable(LvCable):
 		self.temperatures = numpy.empty(0)
 		self.eigenVectors = numpy.empty(0)
 		self.eigenValues = numpy.empty(0)
+		self.thermalModel = None  # Shared per cable type, see startup()
 
 		# Olsen et al. with Differential Equations
 		self.temperaturesDE = numpy.empty(0)
@@ -104,7 +168,7 @@ class RelLvCable(LvCable):
 			self.installedDepth / (self.diameter / 2.))
 
 		# Olsen et al.
-		if len(self.cableSections) is 0:
+		if len(self.cableSections) == 0:
 			# Default value
 
 			self.cableSections = [CableSection(0.0, 0.0, 0.0, 0.0, 1, 950.0),       # Al
@@ -135,40 +199,15 @@ class RelLvCable(LvCable):
 		# DEBUG
 		assert abs(sumOlsen-sumT60287) < 0.1
 
-		# Create System Matrix for Olsen Model
-		m = len(self.thermalResistances)
-		A = numpy.zeros(shape=(m, m))
-		T = self.thermalResistances
-		C = self.thermalCapacitances
-
-		A[0, 0] = -1/(T[0]*C[0])
-		A[0, 1] = 1/(T[0]*C[0])
-
-		for i in range(1, m-1):
-			A[i, i + 1] = 1/(T[i]*C[i])
-			A[i, i] = -(1 / (T[i]*C[i]) + 1 / (T[i-1]*C[i]))
-			A[i, i - 1] = 1/(T[i-1]*C[i])
-
-		A[m-1, m-1] = -(1 / (T[m-1]*C[m-1]) + 1 / (T[m-2]*C[m-1]))
-		A[m-1, m-2] = 1/(T[m-2]*C[m-1])
-
-		A = numpy.fliplr(numpy.flipud(A))
-
-		# Calculate Eigen Vectors/Values
-		w, v = numpy.linalg.eig(A)
-		self.eigenValues = w
-		self.eigenVectors = v
-
-		# Precalculate Cumulative Thermal Resistance Vector
-		accumulator = 0.0
-		result = []
-		for resistance in reversed(self.thermalResistances):
-			accumulator += resistance
-			result.append(accumulator)
-
-		self.cumulativeResistances = numpy.asarray(result)
+		# Eigendecomposition of the system matrix, shared by all cables of the same type
+		self.thermalModel = thermalModel(self.thermalResistances, self.thermalCapacitances)
+		self.eigenValues = self.thermalModel.eigenValues
+		self.eigenVectors = self.thermalModel.eigenVectors
+		self.cumulativeResistances = self.thermalModel.cumulativeResistances
 
 		# Olsen et al. with Differential Equations
+		T = self.thermalResistances
+		C = self.thermalCapacitances
 		self.TiCi = numpy.multiply(T, C)
 		self.Ti1Ci = numpy.multiply([float('nan')] + T[:-1], C)
 
@@ -213,7 +252,9 @@ class RelLvCable(LvCable):
 					self.lifeScaleParameter * math.exp(B / self.ratedHotSpotTemperature))) ** weibullBeta)
 
 	def estimateHottestSpotTemperature(self):
+		self.estimateHottestSpotTemperatureOlsen(self.getPerPhaseLossMax())
 
+	def getPerPhaseLossMax(self):
 		# Get maximum conductor losses
 		perPhaseLossMax = 0.0
 		for conductor in self.conductors():
@@ -221,7 +262,7 @@ class RelLvCable(LvCable):
 			if loss > perPhaseLossMax:
 				perPhaseLossMax = loss
 
-		self.estimateHottestSpotTemperatureOlsen(perPhaseLossMax)
+		return perPhaseLossMax
 
 	def estimateHottestSpotTemperature60287(self, perPhaseLossMax):
 		# Deprecated, use Olsen in stead to calculate steady state temperatures
@@ -249,7 +290,7 @@ class RelLvCable(LvCable):
 		infTemperatures = self.cumulativeResistances * loss
 
 		# Other Inputs
-		if len(self.temperatures) is 0:
+		if len(self.temperatures) == 0:
 			self.temperatures = infTemperatures
 
 		prevTemperatures = self.temperatures
@@ -260,7 +301,7 @@ class RelLvCable(LvCable):
 		c = numpy.linalg.solve(self.eigenVectors, deltaPrevInf)
 
 		# Calculate Solution to the System of Differential Equations
-		ePowers = numpy.exp(self.eigenValues * deltaT)
+		ePowers = self.thermalModel.exponents(deltaT)
 		self.temperatures = numpy.inner(c * self.eigenVectors, ePowers) + infTemperatures
 
 		# Jacket Temperature
@@ -282,7 +323,7 @@ class RelLvCable(LvCable):
 		conductors = len(self.conductors())
 		loss = conductors * perPhaseLossMax / self.length
 
-		if len(self.temperaturesDE) is 0:
+		if len(self.temperaturesDE) == 0:
 			infTemperatures = self.cumulativeResistances * loss
 			self.temperaturesDE = infTemperatures[::-1]
 
@@ -37,7 +37,7 @@ class AsyncSimHost(ZHost):
 				tm.sleep(10)
 
 			if connState == False:
-				self.zCall("bus", "connectSlave")
+				self.zConnectBus("connectSlave")
 				connState = True
 
 			self.zPoll()
@@ -45,10 +45,10 @@ class ClockHost(ZHost):
 		self.shutdown()
 	
 	def startup(self):
-		self.zCall("bus", "connectMaster")
+		self.zConnectBus("connectMaster")
 
 		# retrieve list of connected slaves to the bus
-		self.slaves = self.zCall('bus', 'listOfSlaves')
+		self.slaves = self.zListOfSlaves()
 
 		Host.startup(self)
 
@@ -23,6 +23,7 @@ from datetime import datetime
 import pytz
 from pytz import timezone
 import random
+import heapq
 
 from util.serverCsvReader import ServerCsvReader
 
@@ -58,9 +59,13 @@ class Host(Core):
 		self.randomSeed = 42
 		self.executionTime = time.time()
 
-		# Ticket queue
+		# Ticket queue, kept as a heap
 		self.tickets = []
 
+		# Entities subscribed to a ticket, such that tickets are only announced to entities that registered for them
+		self.ticketSubscribers = {}
+		self.ticketDispatches = 0 # Number of ticket announcements to entities within this interval
+
 		# Special devices
 		self.localControlDevices = []
 
@@ -132,6 +137,10 @@ class Host(Core):
 		for e in self.entities:
 			e.startup()
 
+		# References between entities are known after the startup
+		for e in self.entities:
+			self.indexReferences(e)
+
 	def shutdown(self):
 		self.logMsg("Shutting down")
 		for e in self.entities:
@@ -141,7 +150,7 @@ class Host(Core):
 			self.zCall(self.slaves, 'shutdown')
 
 		#write data
-		self.db.writeData(True)
+		self.db.shutdown()
 
 		# Save the state
 		self.storeStates()
@@ -149,10 +158,17 @@ class Host(Core):
 		self.logMsg("Total execution time: "+str(time.time() - self.executionTime))
 		#self.logCsvLine('stats/sim/time', self.name+";"+str(time.time() - self.executionTime) )
 
+		# Write the remaining log lines
+		self.logger.close()
+
 		# Do a hard exit
 		exit()
 
 	def timeTick(self, time, absolute = True):
+		# Logs of the previous tick
+		if self.flushLogsPerTick:
+			self.logger.flush()
+
 		if absolute:
 			self.currentTime = time
 		else:
@@ -200,10 +216,11 @@ class Host(Core):
 
 
 	# Ticket system to request the control
-	def requestTickets(self, time):
+	def requestTickets(self, time, network = True):
 		result = []
 		self.tickets.clear()
 		self.deltatime = 0
+		self.ticketDispatches = 0
 
 		# Inserting default tickets for objects to respond to:
 		self.registerTicket(self.staticTicketPreTickEnvs )  # preTick Environment
@@ -227,7 +244,7 @@ class Host(Core):
 			e.requestTickets(time)
 
 		# External entities
-		if self.networkMaster:
+		if self.networkMaster and network:
 			self.zCall(self.slaves, 'requestTickets', time)
 
 		return result
@@ -240,37 +257,48 @@ class Host(Core):
 		assert(number > self.deltatime) 			# Ticket needs to be in the "future" for this time interval
 
 		if number not in self.tickets:
-			self.tickets.append(number)
+			heapq.heappush(self.tickets, number)
 
+	def subscribeTicket(self, number, entity):
+		if number not in self.ticketSubscribers:
+			self.ticketSubscribers[number] = {}
+		self.ticketSubscribers[number][entity] = True
 
-	def announceNextTicket(self, time):
+
+	def announceNextTicket(self, time, number=None, network = True):
 		# First obtain tickets from slaves
-		if self.networkMaster:
+		if self.networkMaster and network:
 			r = self.zCall(self.slaves, 'retrieveTicketList')
 			for val in r.values():
 				try:
 					if isinstance(val, list):
-						for number in val:
-							self.registerTicket(number)
+						for ticket in val:
+							self.registerTicket(ticket)
 					else:
 						self.registerTicket(val)
 				except:
 					pass
 
-		# Obtain the next ticket in the queue
-		self.tickets.sort()
-		number = self.tickets.pop(0)
+		# Obtain the next ticket in the queue, unless a network master tells us which ticket is next
+		if number is None:
+			number = heapq.heappop(self.tickets)
+		elif number in self.tickets:
+			self.tickets.remove(number)
+			heapq.heapify(self.tickets)
 
 		# Announce the next ticket unless we have reached a predefined maximum
 		if number <= self.maxDeltaTime:
 			self.deltatime = number
 
-			# Local entities:
-			for e in self.entities:
+			# Local entities that subscribed to this ticket, in the order in which they were added to the host
+			subscribers = [e for e in self.ticketSubscribers.pop(number, {}) if e in self.entityOrder]
+			subscribers.sort(key=self.entityOrder.get)
+			for e in subscribers:
 				e.announceTicket(time, number)
+			self.ticketDispatches += len(subscribers)
 
 			# External entities:
-			if self.networkMaster:
+			if self.networkMaster and network:
 				self.zCall(self.slaves, 'announceNextTicket', time, number)
 
 
@@ -280,7 +308,7 @@ class Host(Core):
 
 
 
-	def postTickLogging(self, time, force = False):
+	def postTickLogging(self, time, force = False, network = True):
 		if self.logDevices:
 			for d in self.devices:
 				d.logStats(self.currentTime)
@@ -306,12 +334,20 @@ class Host(Core):
 				for edge in f.edges:
 					edge.logStats(self.currentTime)
 
-		if self.networkMaster:
+		if self.networkMaster and network:
 			self.zCall(self.slaves, 'postTickLogging', time)
 
 		# Overall stats
 		self.logDeviceStats(self.currentTime)
 
+		if self.extendedLogging:
+			self.logValuePrepared("host,devtype=total,name="+self.name+" n-dispatches.tickets="+str(self.ticketDispatches))
+
+			metrics = self.db.getMetrics()
+			self.logValuePrepared("host,devtype=total,name="+self.name+" n-database.points.rate="+str(metrics['points/s']))
+			self.logValuePrepared("host,devtype=total,name="+self.name+" B-database.bytes.rate="+str(metrics['bytes/s']))
+			self.logValuePrepared("host,devtype=total,name="+self.name+" n-database.queue="+str(metrics['queue']))
+
 		self.db.writeData(force)
 
 	def logHostValue(self, measurement,  value, time=None, deltatime=None):
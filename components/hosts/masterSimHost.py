@@ -29,6 +29,9 @@ class MasterSimHost(ZHost):
 		self.liveOperation = True
 
 		self.connState = False
+
+		# Tick protocol with one round per ticket, see lockstepTimeTick(). Requires slaves that implement it (SlaveSimHost)
+		self.lockstep = True
 		
 	def startSimulation(self):
 		self.zInit()
@@ -55,12 +58,12 @@ class MasterSimHost(ZHost):
 			tm.sleep(10)
 
 		if self.connState is False:
-			self.zCall("bus", "connectMaster")
+			self.zConnectBus("connectMaster")
 			self.connState = True
 
 		if True: #try:
 			print("starting")
-			self.slaves = self.zCall('bus', 'listOfSlaves')
+			self.slaves = self.zListOfSlaves()
 			print(self.slaves)
 
 			Host.startup(self)
@@ -88,22 +91,72 @@ class MasterSimHost(ZHost):
 			time.sleep(10)
 
 		if self.connState == False:
-			self.zCall("bus", "connectMaster")
+			self.zConnectBus("connectMaster")
 			self.connState = True
 
 		try:
 			self.executeCmdQueue()
 			Host.timeTick(self, time, absolute)
 
-			#Update the time in other hosts for synchronization
-			self.zCall(self.slaves, 'timeTick', self.currentTime)
+			if self.lockstep:
+				self.lockstepTimeTick(time)
+
+			else:
+				#Update the time in other hosts for synchronization
+				self.zCall(self.slaves, 'timeTick', self.currentTime)
 
-			#Now simulate the time
-			self.requestTickets(time)
-			while (len(self.tickets) > 0):
-				self.announceNextTicket(time)
+				#Now simulate the time
+				self.requestTickets(time)
+				while (len(self.tickets) > 0):
+					self.announceNextTicket(time)
 
-			self.storeStates()
-			self.postTickLogging(time)
+				self.storeStates()
+				self.postTickLogging(time)
 		except:
-			pass
\ No newline at end of file
+			pass
+
+	# Lockstep tick protocol
+	# The slaves obtain the time tick and request their tickets in one round. Each acknowledgement contains the tickets of the slave
+	# and the tickets it has subscribers for. A ticket is announced in one round to the slaves with subscribers only, hence
+	# slaves without subscribers in the rest of the interval are skipped. The logging of the slaves is cast without waiting.
+	# When remote calls were made while handling a ticket, tickets may be registered elsewhere and all slaves report their tickets.
+	def lockstepTimeTick(self, time):
+		self.requestTickets(time, network=False)
+
+		subscribed = {}
+		sent = self.zMsgId
+		r = self.zCall(self.slaves, 'lockstepTick', self.currentTime, time)
+		refresh = self.lockstepUpdate(r, subscribed, self.zMsgId - sent > 1)
+
+		while (len(self.tickets) > 0):
+			if refresh:
+				refresh = self.lockstepUpdate(self.zCall(self.slaves, 'lockstepTickets'), subscribed, False)
+
+			number = self.tickets[0]
+			sent = self.zMsgId
+			self.announceNextTicket(time, network=False)
+			if number > self.maxDeltaTime:
+				break
+
+			receivers = [slave for slave in self.slaves if number in subscribed[slave]]
+			if len(receivers) > 0:
+				r = self.zCall(receivers, 'lockstepTicket', time, number)
+				refresh = self.lockstepUpdate(r, subscribed, self.zMsgId - sent > 1)
+			else:
+				refresh = self.zMsgId != sent
+
+		self.storeStates()
+		self.postTickLogging(time, network=False)
+		self.zCast(self.slaves, 'lockstepLogging', time, self.deltatime)
+
+	# Registers the tickets of the slaves, returns whether remote calls were made meanwhile
+	def lockstepUpdate(self, results, subscribed, calls):
+		for slave, state in results.items():
+			for number in state['tickets']:
+				try:
+					self.registerTicket(number)
+				except:
+					pass
+			subscribed[slave] = set(state['subscribed'])
+			calls = calls or state['calls'] > 0
+		return calls
@@ -18,6 +18,7 @@ from hosts.zhost import ZHost
 from hosts.host import Host
 import time as tm
 import random
+import heapq
 
 class SlaveSimHost(ZHost):
 	def __init__(self, name, res = None):
@@ -33,7 +34,7 @@ class SlaveSimHost(ZHost):
 		newThread = threading.Thread(target=self.zPoll, args=[])
 		newThread.start()
 
-		self.zCall("bus", "connectSlave")
+		self.zConnectBus("connectSlave")
 		self.connState = True
 
 		# Start the socket loop
@@ -43,7 +44,7 @@ class SlaveSimHost(ZHost):
 				tm.sleep(10)
 
 			if self.connState == False:
-				self.zCall("bus", "connectSlave")
+				self.zConnectBus("connectSlave")
 				self.connState = True
 
 			#self.zPoll()
@@ -60,3 +61,34 @@ class SlaveSimHost(ZHost):
 
 	def retrieveTicketList(self):
 		return self.tickets
+
+	# Lockstep tick protocol, see MasterSimHost.lockstepTimeTick()
+	def lockstepTick(self, currentTime, time):
+		sent = self.zMsgId
+		self.timeTick(currentTime)
+		self.requestTickets(time)
+		return self.lockstepState(sent)
+
+	def lockstepTicket(self, time, number):
+		sent = self.zMsgId
+		self.announceNextTicket(time, number)
+
+		# Tickets up to this one were announced by the master, also the ones skipped by this host
+		self.tickets = [n for n in self.tickets if n > number]
+		heapq.heapify(self.tickets)
+		return self.lockstepState(sent)
+
+	def lockstepTickets(self):
+		return self.lockstepState(self.zMsgId)
+
+	def lockstepLogging(self, time, deltatime):
+		# Log with the last ticket of the interval, also when this host skipped it
+		self.deltatime = deltatime
+		self.postTickLogging(time)
+
+	def lockstepState(self, sent):
+		r = {}
+		r['tickets'] = list(self.tickets)
+		r['subscribed'] = list(self.ticketSubscribers.keys())
+		r['calls'] = self.zMsgId - sent
+		return r
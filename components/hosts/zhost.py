@@ -34,6 +34,10 @@ class ZHost(ZCore, Host):
 		self.timezone = timezone('Europe/Amsterdam')
 		self.timeformat = "%d-%m-%Y %H:%M:%S %Z%z"
 
+		self.timezonestr = 'Europe/Amsterdam'  # This is not a pytz object for Astral!
+		self.latitude = 52.2215372
+		self.longitude = 6.8936619
+
 		# Setting the starttime and (default) offset for CSV files
 		self.startTime = int(self.timezone.localize(datetime(2018, 1, 29)).timestamp())
 		self.timeOffset = -1 * int(self.timezone.localize(datetime(2018, 1, 1)).timestamp())
@@ -41,16 +45,29 @@ class ZHost(ZCore, Host):
 
 		# Internal bookkeeping
 		self.currentTime = 0
+		self.deltatime = 0
+		self.maxDeltaTime = 1000000
 		self.previousTime = 0
 
 		# Simulation settings
 		self.timeBase = 60
 		self.intervals = 7*1440
+		self.extendedLogging = False
 		self.randomSeed = 42
 		self.executionTime = time.time()
 
+		# Ticket queue, kept as a heap
+		self.tickets = []
+		self.ticketSubscribers = {}
+		self.ticketDispatches = 0
+
+		# Special devices
+		self.localControlDevices = []
+
 		# Persistence
 		self.persistence = None
+		self.watchlist = []
+		self.enablePersistence = False
 
 		# network master used to propagate ticks through the network.
 		self.networkMaster = False
@@ -64,4 +81,25 @@ class ZHost(ZCore, Host):
 		self.pause = False
 
 		# File servers
-		self.csvServers = {}
\ No newline at end of file
+		self.csvServers = {}
+
+		# Static ticket registration configuration, see Host
+
+		# PreTick
+		self.staticTicketPreTickEnvs = 10000
+		self.staticTicketPreTickDevs = 11000
+		self.staticTicketPreTickCtrl = 12000
+
+		# TimeTick
+		self.staticTicketTickCtrl = 20000
+		self.staticTicketTickEnvs = 21000
+		self.staticTicketTickDevs = 22000
+
+		# Physical
+		self.staticTicketMeasure = 30000
+		self.staticTicketLoadFlow = 31000
+
+		# Real time control
+		self.staticTicketRTDevs = 100000
+		self.staticTicketRTMeasure = 101000
+		self.staticTicketRTLoadFlow = 102000
\ No newline at end of file
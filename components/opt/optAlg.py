@@ -31,12 +31,65 @@
 import math
 import sys
 
+import numpy as np
+
+
+# Helpers for the NumPy implementations
+emptyArray = np.zeros(0)
+
+def realArray(values):
+	return np.real(np.array(values)).astype(float)
+
+def priceArray(prices, n):
+	if prices is None:
+		return np.zeros(n)
+	return np.array(prices)
+
+def sequentialSum(values):
+	# Sum in the order of the values, equal to summing in a loop
+	if len(values) == 0:
+		return 0.0
+	return np.add.accumulate(values)[-1]
+
+def firstFalse(values):
+	# Index of the first False value, or the length if all values are True
+	if values.all():
+		return len(values)
+	return int(np.argmin(values))
+
+def fillSorted(values, amount):
+	# Fill the sorted values with the given amount as long as the remainder per unfilled value exceeds the next value
+	# Returns the number of filled values, the last filled value and the remainder
+	n = len(values)
+	sortedValues = np.sort(values)
+	remainder = np.subtract.accumulate(np.concatenate(([amount], sortedValues)))
+	position = firstFalse(remainder[:n] / (n - np.arange(n)) > sortedValues)
+	breakpoint = 0.0
+	if position > 0:
+		breakpoint = sortedValues[position - 1]
+	return position, breakpoint, remainder[position]
+
+def lowerChargingIndices(effPowers, limits):
+	# Vectorized OptAlg.lowerChargingIndex(): first index with a power of at least the limit, excluding the last
+	below = effPowers[None, :-1] < limits[:, None]
+	return np.where(below.all(axis=1), len(effPowers) - 1, np.argmin(below, axis=1))
+
+def upperChargingIndices(effPowers, limits):
+	# Vectorized OptAlg.upperChargingIndex(): last index with a power of at most the limit, excluding the first
+	fits = effPowers[None, 1:] <= limits[:, None]
+	return np.where(fits.any(axis=1), len(effPowers) - 1 - np.argmax(fits[:, ::-1], axis=1), 0)
+
 
 class OptAlg:
-	def __init__(self):
+	def __init__(self, vectorized=False):
 		self.fillLevel = 0
+		self.vectorized = vectorized	# Use the NumPy implementations of the buffer planning algorithms (opt-in, results differ in rounding)
+		self.vectorizedLength = 32		# Minimum horizon for the NumPy implementations, shorter horizons are faster in plain Python
 
 	def continuousBufferPlanning(self, desired, chargeRequired, powerMin, powerMax, powerLimitsLower=[], powerLimitsUpper=[], prices=None, beta=1):
+		if self.vectorized and len(desired) >= self.vectorizedLength:
+			return self.continuousBufferPlanningArray(realArray(desired), chargeRequired, powerMin, powerMax, realArray(powerLimitsLower), realArray(powerLimitsUpper), priceArray(prices, len(desired)), beta).tolist()
+
 		if prices is None:
 			prices = [0] * len(desired)
 
@@ -201,6 +254,9 @@ class OptAlg:
 			return result
 
 	def continuousBufferPlanningPositive(self, desired, chargeRequired, powerMax, powerLimitsUpper=[], prices=None, beta=1):
+		if self.vectorized and len(desired) >= self.vectorizedLength:
+			return self.continuousBufferPlanningPositiveArray(realArray(desired), chargeRequired, powerMax, realArray(powerLimitsUpper), priceArray(prices, len(desired)), beta).tolist()
+
 		if prices is None:
 			prices = [0] * len(desired)
 
@@ -333,6 +389,9 @@ class OptAlg:
 
 	def continuousBufferPlanningPrices(self, chargeRequired, powerMax, powerLimitsUpper, prices):
 		assert (prices != None)
+		if self.vectorized and len(prices) >= self.vectorizedLength:
+			return self.continuousBufferPlanningPricesArray(chargeRequired, powerMax, realArray(powerLimitsUpper), np.array(prices)).tolist()
+
 		result = [0] * len(prices)
 
 		powerLimits = [powerMax] * len(prices)
@@ -382,6 +441,9 @@ class OptAlg:
 		else:
 			assert (len(intervalMerge) == len(desired))
 
+		if self.vectorized and len(desired) >= self.vectorizedLength:
+			return self.discreteBufferPlanningArray(np.array(desired), chargeRequired, chargingPowers, realArray(powerLimitsLower), realArray(powerLimitsUpper), priceArray(prices, len(desired)), beta, efficiency, realArray(intervalMerge)).tolist()
+
 		result = [0] * len(desired)
 		remainingCharge = chargeRequired
 
@@ -543,6 +605,9 @@ class OptAlg:
 		else:
 			assert (len(intervalMerge) == len(desired))
 
+		if self.vectorized and len(desired) >= self.vectorizedLength:
+			return self.discreteBufferPlanningPositiveArray(np.array(desired), chargeRequired, chargingPowers, realArray(powerLimitsUpper), priceArray(prices, len(desired)), beta, efficiency, realArray(intervalMerge)).tolist()
+
 		chargingPowers.sort()
 		assert (len(chargingPowers) >= 1)
 
@@ -604,6 +669,14 @@ class OptAlg:
 
 	# The main bufferplanning function that does all the magic!
 	def bufferPlanning(self, desired, targetSoC, initialSoC, capacity, demand, chargingPowers, powerMin=0, powerMax=0, powerLimitsLower=[], powerLimitsUpper=[], reactivePower=False, prices=None, beta=1, efficiency=None, intervalMerge=None):
+		if self.vectorized and len(desired) >= self.vectorizedLength:
+			if isinstance(capacity, list):
+				capacity = realArray(capacity)
+			if intervalMerge is not None:
+				intervalMerge = realArray(intervalMerge)
+			result = self.bufferPlanningArray(np.array(desired), targetSoC, initialSoC, capacity, realArray(demand), chargingPowers, powerMin, powerMax, realArray(powerLimitsLower), realArray(powerLimitsUpper), reactivePower, priceArray(prices, len(desired)), beta, efficiency, intervalMerge)
+			return result.tolist()
+
 		if prices is None:
 			prices = [0] * len(desired)
 
@@ -1174,3 +1247,428 @@ class OptAlg:
 		self.fillLevel = Optimal_breakpoint_final
 
 		return result
+
+
+	# NumPy implementations of the buffer planning algorithms
+	# These follow the algorithms above step by step, but operate on arrays:
+	#  - Breakpoints of the water-filling are sorted with argsort and the fill level is found through cumulative sums and searchsorted
+	#  - The greedy selection of discrete charging steps is replaced by one lexicographic sort of all steps
+	#  - Loops that update remainders one by one use np.subtract.accumulate, such that the remainders are equal to the loops above
+	# The results are equal up to floating point rounding of the fill level, hence these are only used with vectorized=True
+	# (e.g. OptCtrl.vectorizedPlanning). See opt/optAlgCheck.py for the comparison with the original implementation.
+	def continuousBufferPlanningArray(self, desired, chargeRequired, powerMin, powerMax, powerLimitsLower, powerLimitsUpper, prices, beta=1):
+		n = len(desired)
+
+		# Option to have positive lower limits
+		positiveLowerBound = len(powerLimitsLower) > 0 and bool((powerLimitsLower > 0.0).any())
+
+		# Check for negative values, if so, we need to scale!
+		if powerMin < -0.0001 or powerMin > 0.0001 or positiveLowerBound:
+			if len(powerLimitsLower) != n or len(powerLimitsUpper) != n:
+				# scale first, we can omit power limits here as they do not exist apparently
+				result = self.continuousBufferPlanningPositiveArray(desired - powerMin, chargeRequired - powerMin * n, powerMax - powerMin, emptyArray, prices, beta)
+				return result + powerMin
+
+			# We have power limits!
+			assert ((powerLimitsLower <= powerLimitsUpper).all())
+			lowerLimits = np.maximum(powerMin, powerLimitsLower)
+			upperLimits = np.minimum(powerMax, powerLimitsUpper)
+			totalLower = sequentialSum(lowerLimits)
+			totalUpper = sequentialSum(upperLimits)
+
+			# If the power bounds are too restrictive we need to find a best possible solution
+			if chargeRequired < powerMin * n:
+				return np.full(n, float(powerMin))
+
+			elif chargeRequired > powerMax * n:
+				return np.full(n, float(powerMax))
+
+			elif chargeRequired < totalLower:
+				sortedLowerLimits = np.sort(lowerLimits)
+				steps = sortedLowerLimits - powerMin
+				underLimits = np.subtract.accumulate(np.concatenate(([totalLower - chargeRequired], steps)))
+
+				# Fixing rounding: the remainder is set to 0 below 0.0001, which stops the filling
+				proceed = steps < underLimits[:n] / (n - np.arange(n))
+				proceed[1:] &= underLimits[1:n] >= 0.0001
+				position = firstFalse(proceed)
+				breakpoint = 0
+				underLimit = underLimits[position]
+				if position > 0:
+					breakpoint = sortedLowerLimits[position - 1]
+					if underLimit < 0.0001:
+						underLimit = 0
+
+				result = np.full(n, float(powerMin))
+				if position < n:
+					sel = lowerLimits > breakpoint
+					result[sel] = lowerLimits[sel] - (underLimit / (n - position))
+
+				self.fillLevel = breakpoint
+				return result
+
+			elif chargeRequired > totalUpper:
+				remaining = powerMax - upperLimits
+				position, breakpoint, overLimits = fillSorted(remaining, chargeRequired - totalUpper)
+
+				result = np.full(n, float(powerMax))
+				if position < n:
+					sel = remaining > breakpoint
+					result[sel] = upperLimits[sel] + (overLimits / (n - position))
+
+				self.fillLevel = breakpoint
+				return result
+
+			# Now we know we can find a feasible planning within the power limits, so we can use a transformation
+			result = self.continuousBufferPlanningPositiveArray(desired - lowerLimits, chargeRequired - totalLower, powerMax - powerMin, upperLimits - lowerLimits, prices, beta)
+			return result + lowerLimits
+
+		# If PowerMin == 0 we can use the positive only variant
+		return self.continuousBufferPlanningPositiveArray(desired, chargeRequired, powerMax, powerLimitsUpper, prices, beta)
+
+	def continuousBufferPlanningPositiveArray(self, desired, chargeRequired, powerMax, powerLimitsUpper, prices, beta=1):
+		n = len(desired)
+		result = np.zeros(n)
+
+		# Check whether we need to charge anyways (trivial..)
+		if chargeRequired <= 0:
+			return result
+
+		powerLimits = np.full(n, float(powerMax))
+		if len(powerLimitsUpper) == n:
+			powerLimits = np.minimum(powerLimitsUpper, powerMax)
+			assert ((powerLimits >= -0.0001).all())  # very small negative floats may occur, ignore these.
+			powerLimits[powerLimits < 0] = 0
+
+		# Maximal charging on each time interval is the best we can do
+		if chargeRequired > powerMax * n:
+			return np.full(n, float(powerMax))
+
+		# Go over the limits by as little as possible to get our job done
+		elif len(powerLimitsUpper) == n:
+			totalAvailable = sequentialSum(powerLimits)
+			if totalAvailable < chargeRequired:
+				remaining = powerMax - powerLimits
+				position, breakpoint, overLimits = fillSorted(remaining, chargeRequired - totalAvailable)
+
+				result = np.full(n, float(powerMax))
+				if position < n:
+					sel = remaining > breakpoint
+					result[sel] = powerLimits[sel] + (overLimits / (n - position))
+
+				self.fillLevel = breakpoint
+				return result
+
+		if beta == 0:
+			# Price steering:
+			return self.continuousBufferPlanningPricesArray(chargeRequired, powerMax, powerLimitsUpper, prices)
+
+		if beta == 1:
+			prices = np.zeros(n)
+		assert (len(prices) == n)
+		assert (beta > 0)
+
+		lowerLevels = (np.real(prices) / (2 * beta)) - desired
+		upperLevels = lowerLevels + powerLimits
+
+		# Water-filling: the amount charged at a fill level is piecewise linear in the level with breakpoints at all levels.
+		# The slope of each piece equals the number of intervals that are filled partially at that level.
+		levels = np.concatenate((lowerLevels, upperLevels))
+		order = np.argsort(levels, kind='stable')
+		sortedLevels = levels[order]
+		active = np.cumsum(np.where(order < n, 1, -1))
+		charged = np.concatenate(([0.0], np.cumsum(active[:-1] * np.diff(sortedLevels))))
+
+		k = int(np.searchsorted(charged, chargeRequired))
+		if k >= 2 * n:
+			breakpoint = sortedLevels[-1]
+		else:
+			breakpoint = sortedLevels[k - 1] + (chargeRequired - charged[k - 1]) / active[k - 1]
+
+		result = np.where(breakpoint >= upperLevels, powerLimits, np.where(breakpoint > lowerLevels, breakpoint - lowerLevels, 0.0))
+
+		self.fillLevel = breakpoint
+		return result
+
+	def continuousBufferPlanningPricesArray(self, chargeRequired, powerMax, powerLimitsUpper, prices):
+		n = len(prices)
+		result = np.zeros(n)
+
+		powerLimits = np.full(n, float(powerMax))
+		if len(powerLimitsUpper) == n:
+			powerLimits = np.minimum(powerLimitsUpper, powerMax)
+
+		if chargeRequired <= 0:
+			return result
+
+		# Fill the cheapest intervals first
+		order = np.argsort(np.real(prices), kind='stable')
+		limits = powerLimits[order]
+		remainingCharge = np.subtract.accumulate(np.concatenate(([chargeRequired], limits)))
+		position = firstFalse(remainingCharge[:n] > limits)
+
+		result[order[:position]] = limits[:position]
+		if position < n:
+			result[order[position]] = remainingCharge[position]
+
+		return result
+
+	def discreteBufferPlanningArray(self, desired, chargeRequired, chargingPowers, powerLimitsLower, powerLimitsUpper, prices, beta, efficiency, intervalMerge):
+		n = len(desired)
+		chargingPowers.sort()
+		assert (len(chargingPowers) > 1)
+
+		powers = np.array(chargingPowers, dtype=float)
+		eff = np.array(efficiency, dtype=float)
+		minPower = powers[0] * eff[0]
+		maxPower = powers[-1] * eff[-1]
+
+		# Option to have positive lower limits
+		positiveLowerBound = len(powerLimitsLower) > 0 and bool((powerLimitsLower > 0.0).any())
+
+		# Otherwise, we are positive and we can just call the normal algorithm
+		if not (positiveLowerBound or powers[0] < 0):
+			return self.discreteBufferPlanningPositiveArray(desired, chargeRequired, chargingPowers, powerLimitsUpper, prices, beta, efficiency, intervalMerge)
+
+		chargingPowersNew = list(powers - powers[0])
+		if len(powerLimitsLower) != n or len(powerLimitsUpper) != n:
+			# scale first
+			chargeRequiredNew = chargeRequired - powers[0] * intervalMerge.sum()
+			result = self.discreteBufferPlanningPositiveArray(desired - minPower, chargeRequiredNew, chargingPowersNew, emptyArray, prices, beta, efficiency, intervalMerge)
+			return result + powers[0]
+
+		# We have power limits!
+		assert ((powerLimitsLower <= powerLimitsUpper).all())
+		lowerLimits = powers[lowerChargingIndices(powers * eff, powerLimitsLower)]
+		upperLimits = powers[upperChargingIndices(powers * eff, powerLimitsUpper)]
+		totalLower = sequentialSum(lowerLimits)
+		totalUpper = sequentialSum(upperLimits)
+
+		# If the power bounds are too restrictive we need to find a best possible solution
+		if chargeRequired < powers[0] * intervalMerge.sum():
+			return np.full(int(intervalMerge.sum()), powers[0])
+
+		elif chargeRequired > powers[-1] * intervalMerge.sum():
+			return np.full(int(intervalMerge.sum()), powers[-1])
+
+		elif chargeRequired < totalLower:
+			sortedLowerLimits = np.sort(lowerLimits)
+			steps = (sortedLowerLimits - minPower) * intervalMerge
+			underLimits = np.subtract.accumulate(np.concatenate(([totalLower - chargeRequired], steps)))
+			position = firstFalse(steps < underLimits[:n] / (n - np.arange(n)))
+			assert (position < n)
+			breakpoint = 0.0
+			if position > 0:
+				breakpoint = sortedLowerLimits[position - 1]
+
+			# Too restrictive limits, but we can change the desired profile to get close to the limits
+			newDesired = np.where(lowerLimits > breakpoint, lowerLimits - (underLimits[position] / (n - position)), minPower)
+			return self.discreteBufferPlanningArray(newDesired, chargeRequired, chargingPowers, lowerLimits, upperLimits, prices, beta, efficiency, intervalMerge)
+
+		elif chargeRequired > totalUpper:
+			# Too restrictive limits, but we can change the desired profile to get close to the limits
+			# Like the original implementation, all intervals are set to do as much as possible
+			newDesired = np.full(n, maxPower)
+			return self.discreteBufferPlanningArray(newDesired, chargeRequired, chargingPowers, lowerLimits, upperLimits, prices, beta, efficiency, intervalMerge)
+
+		# Now we know we can find a feasible planning within the power limits, so we can use a transformation
+		result = self.discreteBufferPlanningPositiveArray(desired - lowerLimits, chargeRequired - totalLower, chargingPowersNew, upperLimits - lowerLimits, prices, beta, efficiency, intervalMerge)
+		return result + lowerLimits
+
+	def discreteBufferPlanningPositiveArray(self, desired, chargeRequired, chargingPowers, powerLimitsUpper, prices, beta, efficiency, intervalMerge):
+		n = len(desired)
+		result = np.zeros(n)
+
+		chargingPowers.sort()
+		assert (len(chargingPowers) >= 1)
+		if n == 0 or len(chargingPowers) < 2:
+			return result
+
+		powers = np.array(chargingPowers, dtype=float)
+		eff = np.array(efficiency, dtype=float)
+		effPowers = powers * eff
+
+		# Slopes of the cost function for each step j-1 -> j of each interval
+		cost = prices[:, None] * powers[None, :] * eff[None, :] + beta * intervalMerge[:, None] * (effPowers[None, :] - desired[:, None]) ** 2
+		slopes = np.real((cost[:, 1:] - cost[:, :-1]) / (intervalMerge[:, None] * (effPowers[1:] - effPowers[:-1])[None, :]))
+
+		# A step is only available if it fits in the power limits, and all previous steps of the interval are available
+		available = np.ones(slopes.shape, dtype=bool)
+		if len(powerLimitsUpper) > 0:
+			available = np.logical_and.accumulate(powers[None, 1:] <= powerLimitsUpper[:, None], axis=1)
+
+		# The greedy algorithm always takes the step with the lowest slope that is next for its interval.
+		# This is equal to sorting all steps on the highest slope up to and including this step, with ties broken on (interval, step)
+		keys = np.maximum.accumulate(slopes, axis=1)
+		intervals, steps = np.nonzero(available)
+		order = np.lexsort((steps, intervals, keys[intervals, steps]))
+		intervals = intervals[order]
+		steps = steps[order]
+
+		stepSizes = intervalMerge[intervals] * (powers[steps + 1] - powers[steps])
+		remainingCharge = np.subtract.accumulate(np.concatenate(([chargeRequired], stepSizes)))
+		taken = firstFalse(remainingCharge[:len(stepSizes)] > 0.001)
+		if taken == 0:
+			return result
+
+		sigma = stepSizes[:taken].copy()
+		sigma[-1] = min(remainingCharge[taken - 1], sigma[-1])
+		result += np.bincount(intervals[:taken], weights=sigma / intervalMerge[intervals[:taken]], minlength=n)
+
+		return result
+
+	def bufferPlanningArray(self, desired, targetSoC, initialSoC, capacity, demand, chargingPowers, powerMin=0, powerMax=0, powerLimitsLower=emptyArray, powerLimitsUpper=emptyArray, reactivePower=False, prices=None, beta=1, efficiency=None, intervalMerge=None):
+		n = len(desired)
+		if prices is None:
+			prices = np.zeros(n)
+
+		if efficiency is None:
+			if chargingPowers is None or len(chargingPowers) == 0:
+				efficiency = [1, 1]
+			else:
+				efficiency = [1] * len(chargingPowers)
+		else:
+			assert (len(efficiency) == len(chargingPowers))
+
+		if intervalMerge is None:
+			intervalMerge = np.ones(n)
+		else:
+			assert (len(intervalMerge) == n)
+
+		if np.ndim(capacity) == 0:
+			capacity = np.full(n, capacity)
+
+		assert (initialSoC <= capacity[0])
+		assert (n == len(demand))
+		assert (targetSoC <= capacity[-1])
+
+		# No support for negative demands yet, doesn't seem to be useful
+		assert ((demand >= -0.0001).all())
+
+		# first we need to split off the reactive part since the rest of the comparison code does not like it.
+		desiredWithReactive = desired
+		desired = np.real(desired)
+
+		continuousMode = False
+		if len(chargingPowers) == 0:
+			assert (powerMin < powerMax)
+			chargingPowers.append(powerMin)
+			chargingPowers.append(powerMax)
+			continuousMode = True
+
+		chargingPowers.sort()
+		powers = np.array(chargingPowers, dtype=float)
+		eff = np.array(efficiency, dtype=float)
+		effPowers = powers * eff
+
+		demandTotal = sequentialSum(demand * intervalMerge)
+
+		# Check whether the bounds make sense, otherwise, we change the bounds to fit
+		if len(powerLimitsUpper) == n and len(powerLimitsLower) == n:
+			powerLimitsUpper = np.where(powerLimitsUpper + 0.0001 < effPowers[0], effPowers[0], powerLimitsUpper)
+			powerLimitsLower = np.where(powerLimitsLower - 0.0001 > effPowers[-1], effPowers[-1], powerLimitsLower)
+			powerLimitsLower = np.minimum(powerLimitsLower, powerLimitsUpper)
+
+		# First we check feasibility of the given demands for the buffer with maximal charging
+		if len(powerLimitsUpper) == n:
+			if continuousMode:
+				change = np.maximum(powerLimitsUpper, effPowers[-1]) - demand
+			else:
+				# Limits are restrictive, get the maximum charging power that fits:
+				maxPower = np.full(n, effPowers[-1])
+				restricted = powerLimitsUpper < powers[-1]
+				if len(powers) > 2:
+					fits = effPowers[None, 1:-1] <= powerLimitsUpper[restricted, None]
+					idx = np.where(fits.any(axis=1), len(powers) - 2 - np.argmax(fits[:, ::-1], axis=1), 0)
+					maxPower[restricted] = effPowers[idx]
+				else:
+					maxPower[restricted] = effPowers[0]
+				change = maxPower * intervalMerge - demand * intervalMerge
+		else:
+			change = effPowers[-1] - demand * intervalMerge
+
+		# The SoC is capped at the capacity in each interval, hence this is a sequential recurrence
+		maxSoC = initialSoC
+		minSoC = 0.0
+		violationIndexMax = -1
+		cap = capacity.tolist()
+		for i, c in enumerate(change.tolist()):
+			maxSoC = min(maxSoC + c, cap[i])
+			if maxSoC < minSoC:
+				violationIndexMax = i
+				minSoC = maxSoC
+
+		# Next we determine where our scheduling freedom ends for this problem
+		violationIndexMin = violationIndexMax
+		while violationIndexMin > 0 and demand[violationIndexMin - 1] > powers[-1] * powers[-1]:
+			violationIndexMin -= 1
+
+		# Planning of a part of the horizon, short parts are planned by the original implementation
+		def sub(s, target, initial):
+			if continuousMode:
+				args = [desired[s], target, initial, capacity[s], demand[s], [], powerMin, powerMax, powerLimitsLower[s], powerLimitsUpper[s]]
+				kwargs = {'prices': prices[s], 'beta': beta}
+			else:
+				args = [desired[s], target, initial, capacity[s], demand[s], chargingPowers, 0, 0, powerLimitsLower[s], powerLimitsUpper[s]]
+				kwargs = {'prices': prices[s], 'beta': beta, 'efficiency': efficiency, 'intervalMerge': intervalMerge[s]}
+
+			if len(args[0]) >= self.vectorizedLength:
+				return self.bufferPlanningArray(*args, **kwargs)
+
+			args = [a.tolist() if isinstance(a, np.ndarray) else a for a in args]
+			kwargs = {k: a.tolist() if isinstance(a, np.ndarray) else a for k, a in kwargs.items()}
+			return np.array(self.bufferPlanning(*args, **kwargs))
+
+		# Here we make the new planning if maximal charging is not enough at some point
+		if violationIndexMax > 0:
+			plans = []
+			if violationIndexMin > 0:
+				plans.append(sub(slice(0, violationIndexMin), capacity[violationIndexMin], initialSoC))
+			plans.append(np.full(violationIndexMax - violationIndexMin + 1, powers[-1]))
+			if violationIndexMax < n - 1:
+				plans.append(sub(slice(violationIndexMax + 1, None), targetSoC, 0.0))
+			return np.concatenate(plans)
+
+		# First we try to make a naive planning where we ignore the SoC constraints
+		if continuousMode:
+			naivePlan = self.continuousBufferPlanningArray(desired, targetSoC + demandTotal - initialSoC, powerMin, powerMax, powerLimitsLower, powerLimitsUpper, prices, beta)
+		else:
+			naivePlan = self.discreteBufferPlanningArray(desired, targetSoC + demandTotal - initialSoC, chargingPowers, powerLimitsLower, powerLimitsUpper, prices, beta, efficiency, intervalMerge)
+
+		# Then we determine if this naive planning works, and if not, where it makes the largest error in SoC
+		violationIndex = -1
+		upperBound = False
+		if n > 1:
+			soc = np.add.accumulate(np.concatenate(([initialSoC], naivePlan[:n - 1] * intervalMerge[:n - 1] - demand[:n - 1] * intervalMerge[:n - 1])))[1:]
+			violationsUpper = soc - capacity[:n - 1]
+			violations = np.maximum(violationsUpper, -soc)
+			i = int(np.argmax(violations))
+			if violations[i] > 0.01:
+				violationIndex = i
+				upperBound = bool(violationsUpper[i] > -soc[i])
+
+		# In case we actually have an error in the SoC we can replan, splitting the problem at the maximum SoC violation.
+		if violationIndex > -1:
+			first = slice(0, violationIndex + 1)
+			last = slice(violationIndex + 1, None)
+			if upperBound:
+				if continuousMode:
+					result = np.concatenate((sub(first, capacity[violationIndex], initialSoC), sub(last, targetSoC, capacity[violationIndex])))
+				else:
+					result = np.concatenate((sub(first, capacity[violationIndex + 1], initialSoC), sub(last, targetSoC, capacity[violationIndex + 1])))
+			else:
+				result = np.concatenate((sub(first, 0.0, initialSoC), sub(last, targetSoC, 0.0)))
+		else:
+			result = naivePlan
+
+		# Reactive Power control, see bufferPlanning()
+		if reactivePower:
+			activeMax = max(abs(chargingPowers[0]), abs(chargingPowers[-1]))
+			reactiveMax = (activeMax * activeMax) - (result * result)
+			assert ((reactiveMax >= 0).all())
+			reactiveMax = np.sqrt(reactiveMax)
+			reactive = np.maximum(-1 * reactiveMax, np.minimum(np.imag(desiredWithReactive), reactiveMax))
+			return result + 1j * reactive
+
+		return result
+
@@ -0,0 +1,182 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+
+# Comparison of the NumPy buffer planning algorithms with the original implementation
+# Checks equivalence on randomized inputs and measures the runtime for several horizon lengths
+# THIS IS NOT A UNITTEST
+# Usage (from the components folder): python opt/optAlgCheck.py [cases] [seed]
+
+import copy
+import math
+import random
+import sys
+import time
+
+from optAlg import OptAlg
+
+reference = OptAlg(vectorized=False)
+vectorized = OptAlg(vectorized=True)
+
+# Use the NumPy implementations for all horizons in the equivalence check
+vectorizedAll = OptAlg(vectorized=True)
+vectorizedAll.vectorizedLength = 1
+
+# Allowed difference, relative to the largest charging power. Results differ in the rounding of the fill level only
+tolerance = 1e-6
+
+def compare(name, args, kwargs={}):
+	try:
+		expected = getattr(reference, name)(*copy.deepcopy(args), **copy.deepcopy(kwargs))
+	except (AssertionError, RecursionError, IndexError, ZeroDivisionError):
+		# Invalid input for the original implementation
+		return None
+
+	result = getattr(vectorizedAll, name)(*copy.deepcopy(args), **copy.deepcopy(kwargs))
+
+	scale = 1.0
+	for v in expected:
+		scale = max(scale, abs(v))
+
+	if len(result) != len(expected):
+		return False
+	for i in range(0, len(expected)):
+		if abs(result[i] - expected[i]) > tolerance * scale:
+			return False
+	return True
+
+def randomProfile(n, amplitude):
+	phase = random.uniform(0, 2*math.pi)
+	period = random.uniform(5, n)
+	return [amplitude * math.sin(phase + 2*math.pi*i/period) + random.gauss(0, amplitude/4) for i in range(0, n)]
+
+def randomLimits(n, lower, upper):
+	l = [random.uniform(lower, (lower+upper)/2) for i in range(0, n)]
+	u = [random.uniform((lower+upper)/2, upper) for i in range(0, n)]
+	return l, u
+
+def randomCase(n):
+	kind = random.choice(['continuous', 'continuousPositive', 'discrete', 'bufferContinuous', 'bufferDiscrete'])
+	desired = randomProfile(n, random.uniform(500, 5000))
+	prices = None
+	beta = 1
+	if random.random() < 0.3:
+		prices = randomProfile(n, 10)
+		beta = random.choice([0, 0.5, 1, 2])
+
+	if kind == 'continuous':
+		powerMin = random.choice([0, -3700, -1000])
+		powerMax = random.choice([3700, 11000])
+		lower, upper = [], []
+		if random.random() < 0.5:
+			lower, upper = randomLimits(n, powerMin, powerMax)
+		charge = (powerMin + random.uniform(-0.1, 1.1) * (powerMax - powerMin)) * n
+		return kind, 'continuousBufferPlanning', (desired, charge, powerMin, powerMax, lower, upper), {'prices': prices, 'beta': beta}
+
+	elif kind == 'continuousPositive':
+		powerMax = random.choice([3700, 11000])
+		upper = []
+		if random.random() < 0.5:
+			upper = randomLimits(n, 0, powerMax)[1]
+		charge = random.uniform(-0.1, 1.1) * powerMax * n
+		return kind, 'continuousBufferPlanningPositive', (desired, charge, powerMax, upper), {'prices': prices, 'beta': beta}
+
+	elif kind == 'discrete':
+		powers = random.choice([[0, 1000, 1250, 1500, 1750, 2000, 2250, 2500, 2750, 3000, 3250, 3500], [-3000, -2000, -1000, 0, 1000, 2000, 3000], [0, 3700, 7400, 11000]])
+		efficiency = None
+		if random.random() < 0.5:
+			efficiency = [random.uniform(0.85, 1.0) for p in powers]
+		lower, upper = [], []
+		if random.random() < 0.3:
+			upper = randomLimits(n, powers[0], powers[-1])[1]
+		elif random.random() < 0.3:
+			lower, upper = randomLimits(n, powers[0], powers[-1])
+		charge = random.uniform(0, powers[-1]) * n
+		if random.random() < 0.5:
+			beta = 1
+		return kind, 'discreteBufferPlanning', (desired, charge, powers, lower, upper), {'prices': prices, 'beta': max(beta, 0.5), 'efficiency': efficiency}
+
+	elif kind == 'bufferContinuous':
+		powerMin = random.choice([0, -3700])
+		powerMax = random.choice([3700, 11000])
+		capacity = random.uniform(5, 20) * powerMax
+		demand = [max(0.0, v) for v in randomProfile(n, random.choice([0, powerMax/2]))]
+		lower, upper = [], []
+		if random.random() < 0.5:
+			lower, upper = randomLimits(n, powerMin, powerMax)
+		return kind, 'bufferPlanning', (desired, random.uniform(0, capacity), random.uniform(0, capacity), capacity, demand, [], powerMin, powerMax, lower, upper, random.random() < 0.3), {'prices': prices, 'beta': max(beta, 0.5)}
+
+	else:
+		powers = random.choice([[0, 1000, 1250, 1500, 1750, 2000, 2250, 2500, 2750, 3000, 3250, 3500], [-3000, -2500, -2000, -1500, -1000, 0, 1000, 1500, 2000, 2500, 3000]])
+		capacity = random.uniform(5, 20) * powers[-1]
+		demand = [max(0.0, v) for v in randomProfile(n, random.choice([0, powers[-1]/2]))]
+		return kind, 'bufferPlanning', (desired, random.uniform(0, capacity), random.uniform(0, capacity), capacity, demand, powers, 0, 0, [], []), {'prices': prices, 'beta': max(beta, 0.5)}
+
+def equivalence(cases):
+	counts = {}
+	for c in range(0, cases):
+		n = random.choice([1, 2, 5, 24, 96, 288])
+		kind, name, args, kwargs = randomCase(n)
+		r = compare(name, args, kwargs)
+		if kind not in counts:
+			counts[kind] = [0, 0, 0]
+		if r is None:
+			counts[kind][2] += 1
+		elif r:
+			counts[kind][0] += 1
+		else:
+			counts[kind][1] += 1
+			print("Mismatch:", kind, "horizon", n)
+
+	print("Equivalence (equal / different / skipped):")
+	for kind, c in counts.items():
+		print("  %-20s %5d %5d %5d" % (kind, c[0], c[1], c[2]))
+
+def benchmark():
+	print("Runtime per call in ms (original / vectorized):")
+	for n in [96, 192, 288, 576, 1440, 2880]:
+		random.seed(n)
+		desired = randomProfile(n, 2000)
+		demand = [max(0.0, v) for v in randomProfile(n, 1000)]
+		lower, upper = randomLimits(n, -3700, 3700)
+		powers = [0, 1000, 1250, 1500, 1750, 2000, 2250, 2500, 2750, 3000, 3250, 3500]
+
+		calls = [
+			('continuous', 'continuousBufferPlanning', (desired, 0.3 * 3700 * n, -3700, 3700, lower, upper)),
+			('discrete', 'discreteBufferPlanning', (desired, 0.3 * 3500 * n, powers)),
+			('bufferContinuous', 'bufferPlanning', (desired, 20000, 10000, 40000, demand, [], -3700, 3700, lower, upper)),
+			('bufferDiscrete', 'bufferPlanning', (desired, 20000, 10000, 40000, demand, powers, 0, 0)),
+		]
+
+		line = "  %5d" % n
+		for kind, name, args in calls:
+			for opt in [reference, vectorized]:
+				repeat = 0
+				start = time.time()
+				while repeat < 3 or (time.time() - start < 0.5 and repeat < 100):
+					getattr(opt, name)(*copy.deepcopy(args))
+					repeat += 1
+				line += " %s %9.2f" % ("|" if opt is reference else "/", 1000 * (time.time() - start) / repeat)
+		print(line + "   (" + ", ".join(c[0] for c in calls) + ")")
+
+cases = 2000
+if len(sys.argv) > 1:
+	cases = int(sys.argv[1])
+random.seed(1)
+if len(sys.argv) > 2:
+	random.seed(int(sys.argv[2]))
+
+equivalence(cases)
+benchmark()
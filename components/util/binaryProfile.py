@@ -0,0 +1,132 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+import json
+import os
+import threading
+import time
+
+# Binary profile store for semicolon separated CSV files
+# A CSV file is converted once into a column-major .npy file (shape: columns x lines) next to the original file.
+# A sidecar .json index stores the properties of the source file, such that changes in the CSV trigger a new conversion,
+# also for profiles that are already open. Files with invalid cells are not converted.
+# The .npy file is opened as a read-only memory map, hence data is sliced by line index without any parsing
+# and the pages are shared between all processes that read the same file.
+
+profiles = {}
+profilesLock = threading.Lock()
+checkInterval = 1.0	# Wall time in seconds between checks of a source file for changes
+
+def binaryPath(dataSource):
+	return dataSource + ".npy", dataSource + ".json"
+
+def sourceProperties(dataSource):
+	st = os.stat(dataSource)
+	return {'source': os.path.abspath(dataSource), 'size': st.st_size, 'mtime': st.st_mtime}
+
+def isConverted(dataSource):
+	npyFile, indexFile = binaryPath(dataSource)
+	try:
+		with open(indexFile, 'r') as f:
+			index = json.load(f)
+		props = sourceProperties(dataSource)
+		return os.path.isfile(npyFile) and index['size'] == props['size'] and index['mtime'] == props['mtime']
+	except:
+		return False
+
+def convertCsv(dataSource):
+	npyFile, indexFile = binaryPath(dataSource)
+	props = sourceProperties(dataSource)
+
+	# Parse the file, the conversion is refused on invalid cells such that the readers use the CSV with its own handling
+	# Empty lines are only allowed at the end of the file
+	rows = []
+	columns = 0
+	emptyLines = 0
+	with open(dataSource, 'r') as f:
+		for lineNumber, l in enumerate(f):
+			if l.strip() == "":
+				emptyLines += 1
+				continue
+			if emptyLines > 0:
+				raise ValueError("Empty line " + str(lineNumber - 1) + " in " + dataSource)
+
+			row = []
+			for cell in l.split(';'):
+				try:
+					row.append(float(cell))
+				except ValueError:
+					raise ValueError("Invalid value " + repr(cell) + " on line " + str(lineNumber) + " of " + dataSource)
+			columns = max(columns, len(row))
+			rows.append(row)
+
+	data = np.zeros((columns, len(rows)), dtype=np.float64)
+	for i in range(0, len(rows)):
+		data[0:len(rows[i]), i] = rows[i]
+
+	# Write to temporary files first, such that concurrent readers never see partial files
+	tmp = "." + str(os.getpid()) + ".tmp"
+	with open(npyFile + tmp, 'wb') as f:
+		np.save(f, data)
+	os.replace(npyFile + tmp, npyFile)
+
+	props['lines'] = len(rows)
+	props['columns'] = columns
+	with open(indexFile + tmp, 'w') as f:
+		json.dump(props, f)
+	os.replace(indexFile + tmp, indexFile)
+
+def openProfile(dataSource, convert=True, host=None):
+	# Returns a memory map of the profile, or None if the binary file is not available
+	# The source file is checked for changes at most once per checkInterval, a changed file is converted again
+	profilesLock.acquire()
+	try:
+		now = time.monotonic()
+		entry = profiles.get(dataSource, None)
+		if entry is not None:
+			if now - entry['checked'] < checkInterval:
+				return entry['profile']
+			entry['checked'] = now
+			try:
+				props = sourceProperties(dataSource)
+				if props['size'] == entry['size'] and props['mtime'] == entry['mtime']:
+					return entry['profile']
+			except:
+				pass
+
+		result = None
+		props = {'size': None, 'mtime': None}
+		try:
+			props = sourceProperties(dataSource)
+			if not isConverted(dataSource) and convert:
+				convertCsv(dataSource)
+			if isConverted(dataSource):
+				# A plain ndarray view on the memory map avoids the overhead of the memmap subclass on indexing
+				result = np.load(binaryPath(dataSource)[0], mmap_mode='r').view(np.ndarray)
+		except Exception as e:
+			result = None
+			if host is not None:
+				host.logWarning("[binaryProfile] Reading " + dataSource + " as CSV, no binary copy: " + str(e))
+
+		profiles[dataSource] = {'profile': result, 'size': props['size'], 'mtime': props['mtime'], 'checked': now}
+		return result
+	finally:
+		profilesLock.release()
+
+def closeProfile(dataSource):
+	profilesLock.acquire()
+	profiles.pop(dataSource, None)
+	profilesLock.release()
@@ -38,3 +38,5 @@ class ClientCsvReader():
 	def readValues(self, startTime, endTime, value=None, timeBase=None, tags=None):
 		return self.server.readValues(startTime, endTime, self.column, timeBase, tags)
 
+	def readArray(self, startTime, endTime, value=None, timeBase=None, tags=None):
+		return self.server.readArray(startTime, endTime, self.column, timeBase, tags)
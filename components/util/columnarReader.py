@@ -0,0 +1,127 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+
+from util.reader import Reader
+from database.columnarStore import ColumnarStore, readSeries
+from usrconf import demCfg
+
+# Reader for results stored by database.columnarStore.ColumnarStore
+# Behaves like the InfluxDBReader: values are aggregated per timeBase and gaps are filled with the previous value
+class ColumnarReader(Reader):
+	def __init__(self, measurement, path=None, database=None, timeBase=60, aggregation='mean', offset=None, raw=False, value="W-power.real.c.ELECTRICITY", tags={}, host=None):
+		Reader.__init__(self, timeBase, -1, offset, host)
+
+		self.cacheFuture = False # Allow to cache future data. Useful in case of given simulation data
+
+		#params
+		self.timeBase = timeBase
+		self.offset = offset
+
+		if path is None:
+			self.path = demCfg['var'].get('results', "var/results/")
+		else:
+			self.path = path
+		if database is None:
+			self.database = demCfg['db']['influx']['dbname']
+		else:
+			self.database = database
+
+		self.measurement = measurement
+		self.aggregation = aggregation
+		self.raw = raw
+
+		self.value = value
+		self.tags = tags
+
+	def retrieveValues(self, startTime, endTime=None, value=None, tags=None):
+		if endTime is None:
+			endTime = startTime + self.timeBase
+		if value is None:
+			value = self.value
+		if tags is None:
+			tags = self.tags
+
+		start = int(startTime) * 1000000000
+		end = int(endTime) * 1000000000
+
+		# Use the store of the host when it is writing to the same database, such that unwritten data is included
+		store = None
+		if self.host is not None and isinstance(getattr(self.host, 'db', None), ColumnarStore):
+			if self.host.db.database == self.database and self.host.db.path == self.path:
+				store = self.host.db
+
+		if store is not None:
+			times, values = store.select(self.measurement, value, tags, start, end)
+		else:
+			times, values = readSeries(self.path + self.database + "/", self.measurement, value, tags, start, end)
+
+		return self.aggregate(times, values, startTime, endTime)
+
+	def aggregate(self, times, values, startTime, endTime):
+		length = int((endTime - startTime) / self.timeBase)
+		result = [None] * length
+
+		if len(times) > 0:
+			t = np.concatenate(times)
+			v = np.concatenate(values).astype(float)
+		else:
+			t = np.zeros(0, dtype=np.int64)
+			v = np.zeros(0)
+
+		idx = (t - int(startTime) * 1000000000) // (self.timeBase * 1000000000)
+		sel = (idx >= 0) & (idx < length)
+		idx = idx[sel]
+		v = v[sel]
+		t = t[sel]
+
+		counts = np.bincount(idx, minlength=length)
+		if self.aggregation == 'mean':
+			r = np.bincount(idx, weights=v, minlength=length) / np.maximum(counts, 1)
+		elif self.aggregation == 'sum':
+			r = np.bincount(idx, weights=v, minlength=length)
+		elif self.aggregation == 'count':
+			r = counts.astype(float)
+		elif self.aggregation == 'max':
+			r = np.full(length, -np.inf)
+			np.maximum.at(r, idx, v)
+		elif self.aggregation == 'min':
+			r = np.full(length, np.inf)
+			np.minimum.at(r, idx, v)
+		elif self.aggregation == 'first' or self.aggregation == 'last':
+			order = np.argsort(t, kind='stable')
+			if self.aggregation == 'first':
+				order = order[::-1]
+			r = np.zeros(length)
+			r[idx[order]] = v[order]
+		else:
+			assert(False) # Unsupported aggregation
+
+		# fill(previous)
+		prev = None
+		for i in range(0, length):
+			if counts[i] > 0:
+				prev = float(r[i])
+			result[i] = prev
+
+		if self.raw:
+			values = []
+			for i in range(0, length):
+				values.append([int(startTime) + i*self.timeBase, result[i]])
+			series = {'name': self.measurement, 'columns': ['time', self.aggregation], 'values': values}
+			return {'results': [{'statement_id': 0, 'series': [series]}]}
+
+		return result
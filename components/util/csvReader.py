@@ -17,6 +17,8 @@ from itertools import islice
 from util.reader import Reader
 import os
 
+import util.binaryProfile
+
 class CsvReader(Reader):
 	def __init__(self,  dataSource, timeBase = 900, column = -1, timeOffset=0):
 		Reader.__init__(self, timeBase, column, timeOffset)
@@ -26,6 +28,9 @@ class CsvReader(Reader):
 		self.column = column
 		self.timeOffset = timeOffset
 
+		# Use a memory mapped binary copy of the CSV file, falls back to reading the CSV if not possible
+		self.useBinary = True
+
 		# Check if the datasource exists
 		if dataSource != None:
 			assert(os.path.isfile(self.dataSource)) # Check if the file exists
@@ -44,6 +49,15 @@ class CsvReader(Reader):
 		if value == None:
 			value = self.dataSource
 
+		# Slice from the binary profile if possible
+		if self.useBinary:
+			profile = util.binaryProfile.openProfile(value, host=self.host)
+			if profile is not None:
+				if self.column == -1:
+					return profile[0, startLine:endLine].tolist()
+				elif self.column is not None:
+					return profile[self.column, startLine:endLine].tolist()
+
 		# Now read the data
 		with open(value,'r') as f:  # https://stackoverflow.com/questions/1767513/read-first-n-lines-of-a-file-in-python
 			tmpCache = list(islice(f, startLine, endLine))
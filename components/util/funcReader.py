@@ -15,7 +15,9 @@
 
 from itertools import islice
 from util.reader import Reader
+import numpy as np
 import math
+import random
 
 class FuncReader(Reader):
 	def __init__(self,  dataSource=None, timeBase = 900, column = -1, timeOffset=0):
@@ -30,11 +32,7 @@ class FuncReader(Reader):
 		self.powerOffset = 0.0
 
 	def retrieveValues(self, startTime, endTime = None, value = None, tags = None):
-		result = []
-		for i in range(startTime, endTime, self.timeBase):
-			result.append(self.getValue(i))
-
-		return result
+		return self.getValues(np.arange(startTime, endTime, self.timeBase)).tolist()
 
 	def getValue(self, time):
 		cons = 0.0
@@ -65,4 +63,30 @@ class FuncReader(Reader):
 		else:
 			assert(False)  # Unknown function type
 
-		return complex(cons, 0.0)
\ No newline at end of file
+		return complex(cons, 0.0)
+
+	def getValues(self, times):
+		# Vectorized version of getValue() for an array of times
+		relativeTime = (times + self.timeOffset) % self.period
+		switchPoint = self.dutyCycle * self.period
+
+		if self.functionType == "block":
+			cons = np.where(relativeTime < switchPoint, self.powerOffset + self.amplitude, self.powerOffset)
+
+		elif self.functionType == "sin":  # ignores dutyCycle
+			cons = self.powerOffset + self.amplitude * np.sin(relativeTime * 2.0*math.pi/self.period)
+
+		elif self.functionType == "sawtooth":
+			with np.errstate(divide='ignore', invalid='ignore'):
+				cons = np.where(relativeTime < switchPoint, self.powerOffset + self.amplitude * relativeTime/switchPoint, self.powerOffset)
+
+		elif self.functionType == "const":
+			cons = np.full(len(times), self.powerOffset + self.amplitude)
+
+		elif self.functionType == "noise":
+			cons = np.array([self.powerOffset + ((-0.5 + random.random()) * 2 * self.amplitude) for t in times])
+
+		else:
+			assert(False)  # Unknown function type
+
+		return cons.astype(float) + 0j
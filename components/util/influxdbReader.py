@@ -97,13 +97,12 @@ class InfluxDBReader(Reader):
 		else:
 			result = [None] * int((endTime - startTime) / self.timeBase)
 			try:
-				if('series' in r.json()['results'][0]):
-					idx = 0
-					d = r.json()['results'][0]['series'][0]['values']
-					for value in d:
-						result[idx] = value[1]
-						idx += 1
+				# Parse the response only once and copy the values in bulk
+				data = r.json()['results'][0]
+				if 'series' in data:
+					d = [value[1] for value in data['series'][0]['values'][0:len(result)]]
+					result[0:len(d)] = d
 			except:
 				pass
 
-			return result
\ No newline at end of file
+			return result
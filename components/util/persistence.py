@@ -13,10 +13,30 @@
 # limitations under the License.
 
 import pickle
+import hashlib
 
 import os
 import copy
 
+# Types of which a value cannot change in place, such that an unchanged variable is detected by the identity of its value
+immutableTypes = (bool, int, float, complex, str, bytes, type(None))
+
+# Persistent storage of the watched variables of an entity, used to recover the state after a crash (e.g. in demo sites)
+# The state is stored incrementally:
+#  - A snapshot file (self.filename) holds a dict with all watched variables
+#  - Every save appends only the variables that changed since the previous save to a write-ahead log (self.filename + '.log').
+#  - After self.compactInterval log records, the log is compacted into a new snapshot
+# Recovery reads the snapshot and replays the log records that are newer than the snapshot.
+# An incomplete record at the end of the log (a crash during a write) is ignored.
+#
+# Changes are detected without pickling where possible, see mayHaveChanged():
+#  - Immutable values (e.g. numbers) are unchanged if the variable still refers to the same object
+#  - Variables given to track() are unchanged as long as they refer to the same object and changed() is not called for them.
+#    Entities use this for large state that is changed in place at known points, e.g.:
+#		self.persistence.track(["predictor"])
+#		self.persistence.changed("predictor")	# After each update of the predictor
+#  - Other variables are pickled and compared with a digest of the pickled value at the last save
+# Snapshots are written from the pickled values of the variables, the unchanged ones are kept from the previous save.
 class Persistence():
 	def __init__(self, entity, host, watchlist = None, format = "pickle", filename = None, append = None):
 		self.entity = entity	# The entity to watch
@@ -36,6 +56,22 @@ class Persistence():
 		else:
 			self.filename = filename
 
+		# Incremental storage with a write-ahead log, set to False to write a full snapshot on every save
+		self.incremental = True
+		self.logFilename = self.filename+'.log'
+		self.compactInterval = 100	# Number of log records after which a new snapshot is written
+
+		# Change tracking
+		self.tracked = set()		# Variables of which changes in place are reported with changed()
+		self.versions = {}			# Version per tracked variable, increased by changed()
+
+		# Bookkeeping of the log
+		self.serialized = {}		# Pickled value per variable at the last save
+		self.fingerprints = {}		# Digest of the pickled value per variable at the last save
+		self.marks = {}				# Value or (version, value) per variable at the last save, see mark()
+		self.sequence = 0 			# Sequence number of the last record
+		self.records = 0			# Number of records in the log since the last snapshot
+
 		self.init()
 
 	def init(self):
@@ -60,6 +96,15 @@ class Persistence():
 					data = pickle.load(f)
 					f.close()
 
+					# Snapshots hold the pickled value of each variable, see saveSnapshot()
+					if data.pop('__serialized__', False):
+						for var in data:
+							if var != '__sequence__':
+								data[var] = pickle.loads(data[var])
+
+					# Replay the changes in the log
+					self.replayLog(data)
+
 					# Now load the data
 					# Checking the time first
 					if maxAge != None and 'time' in data:
@@ -80,33 +125,150 @@ class Persistence():
 					self.host.logWarning("Could not open persistence file: "+self.filename)
 					return False
 
+	def replayLog(self, data):
+		# Applies the log records that are newer than the snapshot to the data of the snapshot
+		self.sequence = data.pop('__sequence__', 0)
+		self.records = 0
+		if not self.incremental or not os.path.exists(self.logFilename):
+			return
+
+		f = open(self.logFilename, 'rb')
+		while True:
+			try:
+				record = pickle.load(f)
+			except:
+				# End of the log, or an incomplete record of an interrupted write
+				break
+
+			if record['sequence'] > self.sequence:
+				for var, value in record['data'].items():
+					data[var] = pickle.loads(value)
+				self.sequence = record['sequence']
+				self.records += 1
+		f.close()
+
 	def save(self):
 		if self.watchlist != None:
+			if not self.incremental or len(self.serialized) == 0 or self.records >= self.compactInterval:
+				return self.saveSnapshot()
+
+			return self.appendLog()
+
+	def track(self, variables):
+		self.tracked.update(variables)
+
+	def changed(self, *variables):
+		# Reports a change in place of tracked variables
+		for var in variables:
+			self.versions[var] = self.versions.get(var, 0) + 1
+
+	def mark(self, var, value):
+		# State of a variable that identifies an unchanged value, None if the value has to be compared by its digest
+		if var in self.tracked:
+			return (self.versions.get(var, 0), value)
+		if type(value) in immutableTypes:
+			return value
+		return None
+
+	def mayHaveChanged(self, var, value):
+		if var not in self.marks or var not in self.serialized:
+			return True
+		previous = self.marks[var]
+		current = self.mark(var, value)
+		if previous is None or current is None:
+			return True
+		if type(current) is tuple:
+			return type(previous) is not tuple or previous[0] != current[0] or previous[1] is not current[1]
+		return previous is not current
+
+	def serialize(self, onlyChanged = False):
+		# Pickled value per watched variable, optionally only of the variables that may have changed since the last save
+		# Returns the pickled values and the marks of the variables, which are stored after a successful write
+		result = {}
+		marks = {}
+		for var in self.watchlist:
 			try:
-				os.makedirs(os.path.dirname(self.filename), exist_ok=True)
-				f = open(self.filename+'.tmp', 'wb')
-
-				data = {}
-				for var in self.watchlist:
-					try:
-						if hasattr(self.entity, var):
-							data[var] = copy.deepcopy(getattr(self.entity, var))
-						else:
-							self.host.logWarning("Could not save variable: "+var)
-					except:
-						self.host.logWarning("Could not save variable: " + var)
-
-				# Write data in the tmp file
-				pickle.dump(data, f)
+				if hasattr(self.entity, var):
+					value = getattr(self.entity, var)
+					if onlyChanged and not self.mayHaveChanged(var, value):
+						continue
+					result[var] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+					marks[var] = self.mark(var, value)
+				else:
+					self.host.logWarning("Could not save variable: "+var)
+			except:
+				self.host.logWarning("Could not save variable: " + var)
+		return result, marks
+
+	def fingerprint(self, value):
+		return hashlib.blake2b(value, digest_size=16).digest()
+
+	def appendLog(self):
+		# Append the changed variables to the log
+		try:
+			values, marks = self.serialize(True)
+			data = {}
+			fingerprints = {}
+			for var, value in values.items():
+				if marks[var] is None:
+					# Only values without a mark are compared by their digest
+					fingerprints[var] = self.fingerprint(value)
+					if self.fingerprints.get(var) == fingerprints[var]:
+						continue
+				data[var] = value
+
+			if len(data) > 0:
+				self.sequence += 1
+				f = open(self.logFilename, 'ab')
+				f.write(pickle.dumps({'sequence': self.sequence, 'data': data}, protocol=pickle.HIGHEST_PROTOCOL))
 				f.close()
+				self.records += 1
 
-				# Now move (and overwrite) the old file to avoid corruption:
-				os.remove(self.filename)
-				os.rename(self.filename+'.tmp', self.filename)
+			self.serialized.update(data)
+			self.fingerprints.update(fingerprints)
+			self.marks.update(marks)
 
-			except:
-				self.host.logWarning("Could not save persistence file: "+self.filename)
-				return False
+		except:
+			self.host.logWarning("Could not save persistence file: "+self.logFilename)
+			self.serialized.clear() # Force a new snapshot
+			return False
+
+	def saveSnapshot(self):
+		# Write all variables into a new snapshot and clear the log
+		try:
+			os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+
+			# Unchanged variables are taken from the previous save, the result of the previous snapshot or log record
+			values, marks = self.serialize(True)
+			serialized = {var: self.serialized[var] for var in self.watchlist if var in self.serialized and var not in values}
+			serialized.update(values)
+
+			data = dict(serialized)
+			data['__sequence__'] = self.sequence
+			data['__serialized__'] = True
+
+			# Write data in the tmp file
+			f = open(self.filename+'.tmp', 'wb')
+			pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+			f.close()
+
+			# Now move (and overwrite) the old file to avoid corruption:
+			os.replace(self.filename+'.tmp', self.filename)
+
+			# Records up to the sequence number are part of the snapshot now
+			if os.path.exists(self.logFilename):
+				f = open(self.logFilename, 'wb')
+				f.close()
+
+			self.serialized = serialized
+			self.fingerprints = {var: self.fingerprint(value) for var, value in values.items() if marks[var] is None}
+			self.marks.update(marks)
+			self.records = 0
+
+		except:
+			self.host.logWarning("Could not save persistence file: "+self.filename)
+			self.serialized.clear()
+			return False
 
 	def setWatchlist(self, watchlist):
-		self.watchlist = list(watchlist)
\ No newline at end of file
+		self.watchlist = list(watchlist)
@@ -13,6 +13,9 @@
 # limitations under the License.
 
 
+import numpy as np
+import math
+
 class Reader():
 	def __init__(self, timeBase = 60, column=-1, timeOffset=None, host=None):
 		#params
@@ -52,15 +55,60 @@ class Reader():
 		if timeBase == -1 or timeBase == None:
 			timeBase = self.timeBase
 
-		result = []
-		t = startTime
-		while t < endTime:
-			result.append(self.readValue(t, value, timeBase, tags))
-			t += timeBase
+		return arrayToList(*self.readArrayGaps(startTime, endTime, value, timeBase, tags))
+
+	def readArray(self, startTime, endTime, value=None, timeBase = None, tags=None):
+		# Bulk version of readValues() that returns a NumPy array for the whole window
+		# Gaps (None in readValue()) are represented by NaN
+		return self.readArrayGaps(startTime, endTime, value, timeBase, tags)[0]
+
+	def readArrayGaps(self, startTime, endTime, value=None, timeBase = None, tags=None):
+		# Returns the array of readArray() and a boolean mask of the gaps, to distinguish them from NaN in the data
+		if timeBase == -1 or timeBase == None:
+			timeBase = self.timeBase
+
+		n = intervals(startTime, endTime, timeBase)
 
-		return result
+		if timeBase > self.timeBase:
+			if timeBase % self.timeBase != 0:
+				return np.full(n, np.nan), np.ones(n, dtype=bool)
+			# Read all underlying intervals at once and resample them
+			factor = int(timeBase / self.timeBase)
+			return resampleArray(*self.readCacheArray(startTime, n*factor, self.timeBase, value, tags), factor)
+
+		return self.readCacheArray(startTime, n, timeBase, value, tags)
 
 # Internal functions
+	def readCacheArray(self, startTime, n, step, value, tags={}):
+		# Obtains the same values as readCache() for n consecutive times, but slices the cache where possible
+		# Returns the values and the mask of the gaps, see valuesToArray()
+		result = [None] * n
+		lines = ((startTime + np.arange(n, dtype=np.int64) * step) / self.timeBase).astype(np.int64)
+
+		pos = 0
+		while pos < n:
+			# (Re)load the cache if required
+			val = self.readCache(startTime + pos*step, value, tags)
+			cache = self.rcache.get(value, [])
+			cacheStart = self.rcacheStart.get(value, -1)
+
+			if val is None or len(cache) == 0 or lines[pos] < cacheStart or lines[pos] >= cacheStart + self.rcacheSize:
+				result[pos] = val
+				pos += 1
+				continue
+
+			# All following times within the cached window
+			end = pos + int(np.searchsorted(lines[pos:], cacheStart + self.rcacheSize, side='left'))
+			size = len(cache)
+			for i, idx in enumerate((lines[pos:end] - cacheStart).tolist()):
+				v = 0
+				if idx < size and cache[idx] is not None:
+					v = cache[idx]
+				result[pos+i] = v
+			pos = end
+
+		return valuesToArray(result)
+
 	def readCache(self, time, value, tags={}):
 		if value not in self.rcache:
 			self.rcache[value] = []
@@ -108,4 +156,37 @@ class Reader():
 			self.rcacheStart = {}
 		else:
 			self.rcache[value] = []
-			self.rcacheStart[value] = -1
\ No newline at end of file
+			self.rcacheStart[value] = -1
+
+
+# Helper functions for the bulk interface
+def intervals(startTime, endTime, timeBase):
+	# Number of intervals in [startTime, endTime)
+	if endTime <= startTime:
+		return 0
+	return int(math.ceil((endTime - startTime) / timeBase))
+
+def valuesToArray(values):
+	# Returns the values as array with NaN for gaps (None), and the mask of these gaps
+	data = np.array([np.nan if v is None else v for v in values])
+	gaps = np.array([v is None for v in values], dtype=bool)
+	return data, gaps
+
+def arrayToList(data, gaps):
+	# Only gaps become None, NaN values in the data are kept like readValue() does
+	result = data.tolist()
+	for i in np.flatnonzero(gaps).tolist():
+		result[i] = None
+	return result
+
+def resampleArray(data, gaps, factor):
+	# Averages each block of factor values, a block that contains a gap results in a gap
+	if factor == 1:
+		return data, gaps
+
+	blocks = data.reshape(-1, factor)
+	# Summed in the same order as readValue() does, such that results are identical
+	total = np.zeros(len(blocks), dtype=np.result_type(data.dtype, np.float64))
+	for i in range(0, factor):
+		total += blocks[:, i]
+	return total / float(factor), gaps.reshape(-1, factor).any(axis=1)
@@ -14,6 +14,10 @@
 
 from itertools import islice
 import os
+import numpy as np
+
+import util.binaryProfile
+from util.reader import intervals, valuesToArray, arrayToList, resampleArray
 
 class ServerCsvReader():
 	def __init__(self, dataSource=None, timeBase=60, timeOffset=None, host=None):
@@ -29,10 +33,19 @@ class ServerCsvReader():
 		self.cacheFuture = True  # Allow to cache future data. Useful in case of given simulation data
 		self.host = host  # Above feature requires also a host to know wha tis the future
 
+		# Use a memory mapped binary copy of the CSV file, falls back to reading the CSV if not possible
+		self.useBinary = True
+
 		# Check if the datasource exists
 		if dataSource != None:
 			assert (os.path.isfile(self.dataSource))  # Check if the file exists
 
+	def getProfile(self):
+		# Not kept in the reader, such that changes in the source file are picked up by binaryProfile
+		if self.useBinary and self.dataSource is not None:
+			return util.binaryProfile.openProfile(self.dataSource, host=self.host)
+		return None
+
 	def readValue(self, time, value=None, timeBase=None, tags=None):
 		if timeBase == -1 or timeBase == None:
 			timeBase = self.timeBase
@@ -56,16 +69,45 @@ class ServerCsvReader():
 		return val
 
 	def readValues(self, startTime, endTime, value=None, timeBase=None, tags=None):
+		return arrayToList(*self.readArrayGaps(startTime, endTime, value, timeBase, tags))
+
+	def readArray(self, startTime, endTime, value=None, timeBase=None, tags=None):
+		# Bulk version of readValues() that returns a NumPy array for the whole window
+		# Gaps (None in readValue()) are represented by NaN
+		return self.readArrayGaps(startTime, endTime, value, timeBase, tags)[0]
+
+	def readArrayGaps(self, startTime, endTime, value=None, timeBase=None, tags=None):
+		# Returns the array of readArray() and a boolean mask of the gaps, to distinguish them from NaN in the data
 		if timeBase == -1 or timeBase == None:
 			timeBase = self.timeBase
 
+		n = intervals(startTime, endTime, timeBase)
+
+		factor = 1
+		if timeBase > self.timeBase:
+			if timeBase % self.timeBase != 0:
+				return np.full(n, np.nan), np.ones(n, dtype=bool)
+			factor = int(timeBase / self.timeBase)
+
+		# Slice directly from the binary profile if possible
+		profile = self.getProfile()
+		if profile is not None and timeBase >= self.timeBase and startTime >= self.timeOffset:
+			startLine = int((startTime + self.timeOffset) / self.timeBase)
+			if 0 <= value < profile.shape[0] and 0 <= startLine and startLine + n*factor <= profile.shape[1]:
+				data = np.array(profile[value, startLine:startLine + n*factor])
+				gaps = np.zeros(n*factor, dtype=bool)
+				if not self.cacheFuture:
+					gaps = (startTime + np.arange(n*factor) * self.timeBase) > self.host.time()
+					data[gaps] = np.nan
+				return resampleArray(data, gaps, factor)
+
 		result = []
 		t = startTime
 		while t < endTime:
 			result.append(self.readValue(t, value, timeBase, tags))
 			t += timeBase
 
-		return result
+		return valuesToArray(result)
 
 	# Internal functions
 	def readCache(self, time, value, tags={}):
@@ -76,6 +118,18 @@ class ServerCsvReader():
 		if time < self.timeOffset:
 			return 0.0 # Could also return None, but it seems that 0 is less likely to break algorithms
 
+		# Read directly from the binary profile if possible
+		profile = self.getProfile()
+		if profile is not None:
+			if not self.cacheFuture and time > self.host.time():
+				return None
+
+			assert(0 <= value < profile.shape[0]) # Data point does not exist!
+			line = int((time + self.timeOffset) / self.timeBase)
+			if line < 0:
+				raise IndexError("Time before the start of "+self.dataSource)
+			return profile.item(value, line)
+
 		line = int(time / self.timeBase)
 
 		if True: #try:
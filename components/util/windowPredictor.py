@@ -14,6 +14,21 @@
 
 import util.helpers
 
+import itertools
+import numpy as np
+
+def timestamps(time, n, timeBase):
+	# Timestamps of n consecutive intervals, float times are accumulated like the original loops did
+	if n <= 0:
+		return np.zeros(0, dtype=np.int64)
+	if isinstance(time, (int, np.integer)) and isinstance(timeBase, (int, np.integer)):
+		return time + np.arange(n, dtype=np.int64) * timeBase
+	return np.fromiter(itertools.accumulate([time] + [timeBase] * (n - 1)), dtype=float, count=n)
+
+# The window is stored in NumPy arrays, a mask per array denotes which slots contain a value.
+# Complex samples are supported: the imaginary parts are stored separately once the first complex sample is added,
+# and the mask self.isComplex marks the slots with a complex value. All arithmetic follows the Python semantics of the
+# original list based implementation, such that predictions (including their float or complex type) are identical.
 class WindowPredictor():
 	def __init__(self, timeBase = 60, timeWindow = 604800):
 		#params
@@ -28,39 +43,87 @@ class WindowPredictor():
 
 		self.historyFactor = 0.5 # How much to keep of the previous sample
 
-		self.data = [None] * int(timeWindow / timeBase)
-		self.confidence = [None] * int(timeWindow / timeBase)
-		self.deviation = [None] * int(timeWindow / timeBase)
-		
+		n = int(timeWindow / timeBase)
+		self.data = np.zeros(n)
+		self.dataImag = None 	# Imaginary parts, allocated on the first complex sample
+		self.hasData = np.zeros(n, dtype=bool)
+		self.isComplex = np.zeros(n, dtype=bool)
+
+		self.confidence = np.zeros(n)
+		self.hasConfidence = np.zeros(n, dtype=bool)
+		self.deviation = np.zeros(n)
+		self.hasDeviation = np.zeros(n, dtype=bool)
+
 		self.lastSample = -1
 
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		if isinstance(self.data, list):
+			# Predictor persisted by the list based implementation
+			self.dataImag = None
+			self.isComplex = np.zeros(len(state['data']), dtype=bool)
+			for name in ['data', 'confidence', 'deviation']:
+				values = state[name]
+				mask = np.array([v is not None for v in values], dtype=bool)
+				setattr(self, 'has' + name[0].upper() + name[1:], mask)
+				setattr(self, name, np.array([v.real if v is not None else 0.0 for v in values], dtype=float))
+
+			for index, v in enumerate(state['data']):
+				if isinstance(v, complex):
+					self.storeValue(index, v)
+
+	def value(self, index):
+		# Python value of a data slot
+		if self.isComplex[index]:
+			return complex(self.data[index].item(), self.dataImag[index].item())
+		return self.data[index].item()
+
+	def storeValue(self, index, value):
+		if isinstance(value, complex):
+			if self.dataImag is None:
+				self.dataImag = np.zeros(len(self.data))
+			self.data[index] = value.real
+			self.dataImag[index] = value.imag
+			self.isComplex[index] = True
+		else:
+			self.data[index] = value
+			self.isComplex[index] = False
+			if self.dataImag is not None:
+				self.dataImag[index] = 0.0
+		self.hasData[index] = True
+
 	# Add a single measurement sample to the predictor
 	def addSample(self, sample, time):
 		if sample != None and time >= self.lastSample + self.timeBase:
 			t = time - (time % self.timeBase) #Ensure alignment
 			self.lastSample = t
-			
+
 			index = int((t % self.timeWindow) / self.timeBase)
-			# Determine the confidence based on historical statistics
-			if self.data[index] != None and self.data[index].real > 0:
-				if self.confidence[index] == None and self.data[index] != None:
-					self.confidence[index] = max(0, 1 - abs( abs(sample.real - self.data[index].real) / self.data[index].real ))
-				elif self.confidence[index] != None:
-					self.confidence[index] = self.confidence[index] * self.historyFactor.real + max(0, (1 - abs( abs( sample.real -self.data[index].real ) / self.data[index].real) ) ) * (1-self.historyFactor)
-
-			# Determine the deviation (how much the sample deviates from the predicted value)
-			if self.deviation[index] == None and self.data[index] != None:
-				self.deviation[index] = sample.real - self.data[index].real
-			elif self.deviation[index] != None:
-				self.deviation[index] = self.deviation[index] * self.historyFactor.real + ( (sample.real - self.data[index].real) * (1-self.historyFactor) )
-
-			# Now add the sample
-			if self.data[index] == None:
-				self.data[index] = sample
+			if isinstance(sample, np.generic):
+				sample = sample.item()
+
+			if self.hasData[index]:
+				data = self.value(index)
+
+				# Determine the confidence based on historical statistics
+				if data.real > 0:
+					if not self.hasConfidence[index]:
+						self.confidence[index] = max(0, 1 - abs( abs(sample.real - data.real) / data.real ))
+					else:
+						self.confidence[index] = self.confidence[index].item() * self.historyFactor.real + max(0, (1 - abs( abs( sample.real - data.real ) / data.real) ) ) * (1-self.historyFactor)
+					self.hasConfidence[index] = True
+
+				# Determine the deviation (how much the sample deviates from the predicted value)
+				if not self.hasDeviation[index]:
+					self.deviation[index] = sample.real - data.real
+				else:
+					self.deviation[index] = self.deviation[index].item() * self.historyFactor.real + ( (sample.real - data.real) * (1-self.historyFactor) )
+				self.hasDeviation[index] = True
+
+				# Now add the sample
+				self.storeValue(index, data * self.historyFactor + sample * (1-self.historyFactor))
 			else:
-				self.data[index] = self.data[index] * self.historyFactor + sample * (1-self.historyFactor)
-
-
+				self.storeValue(index, sample)
 
 	def addSamples(self, samples, startTime, timeBase):
 		if timeBase != self.timeBase:
@@ -69,106 +132,170 @@ class WindowPredictor():
 		else:
 			s = list(samples)
 
-		# now add all samples one by one
-		time = startTime
-		for sample in s:
-			if sample != None:
-				self.addSample(sample, time)
-			time += self.timeBase
-
-	def predictValue(self, time, weights = None):
-		t = time - (time % self.timeBase) #Ensure alignment
-
+		# Samples are added in bulk, which is equal to adding all samples one by one with addSample()
+		times = timestamps(startTime, len(s), self.timeBase)
+		samples = np.empty(len(s), dtype=object)
+		samples[:] = s
+		present = np.flatnonzero(np.not_equal(samples, None))
+		if len(present) == 0:
+			return
+
+		# Only the first samples may be rejected, as consecutive samples are one timeBase apart
+		accepted = present[times[present] >= self.lastSample + self.timeBase]
+		if len(accepted) == 0:
+			return
+
+		t = times[accepted]
+		t = t - (t % self.timeBase) #Ensure alignment
+		self.lastSample = t[-1].item()
+		indices = ((t % self.timeWindow) / self.timeBase).astype(np.int64)
+
+		samples = samples[accepted]
+		try:
+			real = samples.astype(float)
+			imag = None
+			complexSamples = np.zeros(len(samples), dtype=bool)
+		except TypeError:
+			# Complex samples
+			complexSamples = np.array([isinstance(v, (complex, np.complexfloating)) for v in samples], dtype=bool)
+			values = samples.astype(complex)
+			real = values.real.copy()
+			imag = values.imag.copy()
+
+		# Samples with the same window index are applied in order of time, one round per occurrence
+		order = np.argsort(indices, kind='stable')
+		sortedIndices = indices[order]
+		first = np.r_[0, np.flatnonzero(np.diff(sortedIndices)) + 1]
+		counts = np.diff(np.r_[first, len(sortedIndices)])
+		rank = np.empty(len(indices), dtype=np.int64)
+		rank[order] = np.arange(len(indices)) - np.repeat(first, counts)
+
+		for r in range(0, int(counts.max())):
+			selection = np.flatnonzero(rank == r)
+			self.updateSlots(indices[selection], real[selection], None if imag is None else imag[selection], complexSamples[selection])
+
+	def updateSlots(self, indices, real, imag, complexSamples):
+		# Vectorized version of addSample() for a set of unique window indices
+		hf = self.historyFactor
+		hasData = self.hasData[indices]
+		data = self.data[indices]
+
+		# Determine the confidence based on historical statistics
+		with np.errstate(divide='ignore', invalid='ignore'):
+			c = 1 - np.abs( np.abs(real - data) / data )
+		c = np.where(c > 0, c, 0.0) # max(0, c)
+		c = np.where(self.hasConfidence[indices], self.confidence[indices] * hf.real + c * (1-hf), c)
+		update = hasData & (data > 0)
+		self.confidence[indices[update]] = c[update]
+		self.hasConfidence[indices[update]] = True
+
+		# Determine the deviation
+		d = real - data
+		d = np.where(self.hasDeviation[indices], self.deviation[indices] * hf.real + ( d * (1-hf) ), d)
+		self.deviation[indices[hasData]] = d[hasData]
+		self.hasDeviation[indices[hasData]] = True
+
+		# Now add the samples
+		if imag is None and self.dataImag is None:
+			self.data[indices] = np.where(hasData, data * hf + real * (1-hf), real)
+		else:
+			# Complex multiplication with the (real) history factor as done by Python
+			if self.dataImag is None:
+				self.dataImag = np.zeros(len(self.data))
+			if imag is None:
+				imag = np.zeros(len(real))
+			dataImag = self.dataImag[indices]
+			isComplex = self.isComplex[indices]
+
+			newReal = (data * hf - dataImag * 0.0) + (real * (1-hf) - imag * 0.0)
+			newImag = (data * 0.0 + dataImag * hf) + (real * 0.0 + imag * (1-hf))
+			self.data[indices] = np.where(hasData, newReal, real)
+			self.dataImag[indices] = np.where(hasData, newImag, imag)
+			self.isComplex[indices] = np.where(hasData, isComplex | complexSamples, complexSamples)
+			self.dataImag[indices[~self.isComplex[indices]]] = 0.0
+		self.hasData[indices] = True
+
+	def windowIndices(self, times, key):
+		t = times - (times % self.timeBase) #Ensure alignment
+		return (((t + key) % self.timeWindow) / self.timeBase).astype(np.int64)
+
+	def predictArray(self, times, values, mask, weights, requireWeight):
+		# Weighted average of the historical values for an array of times
 		if weights == None:
 			weights = self.weights
 
-		result = 0.0
-		weight = 0.0
+		result = np.zeros(len(times))
+		weight = np.zeros(len(times))
 		for key, value in weights.items():
-			index = int(((t + key) % self.timeWindow) / self.timeBase)
-			if self.data[index] != None:
-				result += self.data[index] * value
-				weight += value
+			index = self.windowIndices(times, key)
+			valid = mask[index]
+			result = np.where(valid, result + values[index] * value, result)
+			weight = np.where(valid, weight + value, weight)
 
-		if value >= 0.0001 and weight >= 0.0001:
-			result = result / weight
+		if requireWeight:
+			divide = (weight >= 0.0001) if value >= 0.0001 else np.zeros(len(times), dtype=bool)
+		else:
+			divide = np.full(len(times), value >= 0.0001)
+			if np.any(divide & (weight == 0.0)):
+				raise ZeroDivisionError("float division by zero")
 
-		return result
+		with np.errstate(divide='ignore', invalid='ignore'):
+			return np.where(divide, result / weight, result), divide, weight
 
-	def predictConfidence(self, time, weights = None):
-		t = time - (time % self.timeBase) #Ensure alignment
+	def predictData(self, times, weights = None):
+		if self.dataImag is None:
+			return self.predictArray(times, self.data, self.hasData, weights, True)[0].tolist()
 
 		if weights == None:
 			weights = self.weights
 
-		result = 0.0
-		weight = 0.0
+		# Complex values, follow the Python semantics of mixed float and complex arithmetic
+		real, divide, weight = self.predictArray(times, self.data, self.hasData, weights, True)
+		imag = np.zeros(len(times))
+		isComplex = np.zeros(len(times), dtype=bool)
 		for key, value in weights.items():
-			index = int(((t + key) % self.timeWindow) / self.timeBase)
-			if self.confidence[index] != None:
-				result += self.confidence[index] * value
-				weight += value
-
-		if value >= 0.0001:
-			result = result / weight
-
-		return result
+			index = self.windowIndices(times, key)
+			valid = self.hasData[index]
+			isComplex |= valid & self.isComplex[index]
+		if not np.any(isComplex):
+			return real.tolist()
 
-	def predictDeviation(self, time, weights = None):
-		t = time - (time % self.timeBase) #Ensure alignment
+		result = np.zeros(len(times))
+		for key, value in weights.items():
+			index = self.windowIndices(times, key)
+			valid = self.hasData[index]
+			result = np.where(valid, result + (self.data[index] * value - self.dataImag[index] * 0.0), result)
+			imag = np.where(valid, imag + (self.data[index] * 0.0 + self.dataImag[index] * value), imag)
 
-		if weights == None:
-			weights = self.weights
+		with np.errstate(divide='ignore', invalid='ignore'):
+			complexReal = np.where(divide, (result + imag * 0.0) / weight, result)
+			complexImag = np.where(divide, (imag - result * 0.0) / weight, imag)
 
-		result = 0.0
-		weight = 0.0
-		for key, value in weights.items():
-			index = int(((t + key) % self.timeWindow) / self.timeBase)
-			if self.deviation[index] != None:
-				result += self.deviation[index] * value
-				weight += value
+		return [complex(r, i) if c else v for v, r, i, c in zip(real.tolist(), complexReal.tolist(), complexImag.tolist(), isComplex.tolist())]
 
-		if value >= 0.0001:
-			result = result / weight
+	def predictValue(self, time, weights = None):
+		return self.predictData(np.asarray([time]), weights)[0]
 
-		return result
+	def predictConfidence(self, time, weights = None):
+		return self.predictArray(np.asarray([time]), self.confidence, self.hasConfidence, weights, False)[0].tolist()[0]
 
+	def predictDeviation(self, time, weights = None):
+		return self.predictArray(np.asarray([time]), self.deviation, self.hasDeviation, weights, False)[0].tolist()[0]
 
 	def predictValues(self, time, intervals = 1, timeBase = None):
-		result = []
-
 		if timeBase == None:
 			timeBase = self.timeBase
 
-		t = time
-		for i in range(0, intervals):
-			result.append(self.predictValue(t))
-			t += timeBase
-
-		return result
+		return self.predictData(timestamps(time, intervals, timeBase))
 
 	def predictConfidences(self, time, intervals = 1, timeBase = None):
-		result = []
-
 		if timeBase == None:
 			timeBase = self.timeBase
 
-		t = time
-		for i in range(0, intervals):
-			result.append(self.predictConfidence(t))
-			t += timeBase
-
-		return result
+		return self.predictArray(timestamps(time, intervals, timeBase), self.confidence, self.hasConfidence, None, False)[0].tolist()
 
 	def predictDeviations(self, time, intervals = 1, timeBase = None):
-		result = []
-
 		if timeBase == None:
 			timeBase = self.timeBase
 
-		t = time
-		for i in range(0, intervals):
-			result.append(self.predictDeviation(t))
-			t += timeBase
-
-		return result
+		return self.predictArray(timestamps(time, intervals, timeBase), self.deviation, self.hasDeviation, None, False)[0].tolist()
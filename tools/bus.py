@@ -23,7 +23,9 @@ import time
 import threading
 
 sys.path.insert(0, '../conf')
+sys.path.insert(0, '../components')
 from usrconf import demCfg
+from core.zBusDirectory import ZBusDirectory
 
 context = zmq.Context()
 
@@ -49,6 +51,9 @@ nodes = {}
 #List of controllers
 controllers = []
 
+#Entities per host, for hosts that send their info when connecting
+directory = ZBusDirectory()
+
 #Here we go!
 print("Message bus is up and running")
 
@@ -83,7 +88,10 @@ def h(data):
 			if(what == "listOfSlaves"):
 				#print("list of slaves wanted")
 				#results.send(pickle.dumps([b"listOfSlaves", receiver.encode(), msgid.encode(), sender.encode(), pickle.dumps(slaves)]) )
-				tx.send_multipart([snd.encode(), receiver.encode(), msgid.encode(), pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(slaves)]) 
+				r = slaves
+				if len(args) > 0 and args[0]:
+					r = {'slaves': slaves, 'hosts': directory.getHosts()}
+				tx.send_multipart([snd.encode(), receiver.encode(), msgid.encode(), pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(r)]) 
 
 			elif(what == "heartbeat"):
 				print("receiving a heartbeat")
@@ -113,26 +121,36 @@ def h(data):
 					if not sender in slaves:
 						slaves.append(sender)
 					nodes[sender] = int(time.time())
+					r = None
+					if len(args) > 0:
+						directory.register(sender, args[0])
+						r = directory.getHosts()
 					print("send")
 					#results.send(pickle.dumps([what.encode(), receiver.encode(), msgid.encode(), sender.encode(), pickle.dumps(None)]) )
-					tx.send_multipart([snd.encode(), receiver.encode(), msgid.encode(), pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(None)]) 
+					tx.send_multipart([snd.encode(), receiver.encode(), msgid.encode(), pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(r)]) 
 					#print([snd.encode(), receiver.encode(), msgid.encode(), pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(None)])
 					print("done")
 				elif(what == "disconnectSlave"):
 					print("disconnecting slave: "+sender)
 					if sender in slaves:
 						slaves.remove(sender)
+					directory.unregister(sender)
 					#results.send(pickle.dumps([what.encode(), receiver.encode(), msgid.encode(), sender.encode(), pickle.dumps(None)]) )
 					tx.send_multipart([snd.encode(), receiver.encode(), msgid.encode(), pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(None)]) 
 				elif(what == "connectMaster"):
 					print("connecting master: "+sender)
 					master = sender
 					nodes[sender] = int(time.time())
+					r = None
+					if len(args) > 0:
+						directory.register(sender, args[0])
+						r = directory.getHosts()
 					#results.send(pickle.dumps([what.encode(), receiver.encode(), msgid.encode(), sender.encode(), pickle.dumps(None)]) )
-					tx.send_multipart([snd.encode(), receiver.encode(), msgid.encode(), pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(None)]) 
+					tx.send_multipart([snd.encode(), receiver.encode(), msgid.encode(), pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(r)]) 
 				elif(what == "disconnectMaster"):
 					print("disconnecting master: "+sender)
 					master = ""
+					directory.unregister(sender)
 					del nodes[sender]
 					#results.send(pickle.dumps([what.encode(), receiver.encode(), msgid.encode(), sender.encode(), pickle.dumps(None)]) )
 					tx.send_multipart([snd.encode(), receiver.encode(), msgid.encode(), pickle.dumps(None), 'retval'.encode(), pickle.dumps(None), pickle.dumps(None)]) 
@@ -160,7 +178,7 @@ def h(data):
 				# results.disconnect(ret)
 
 		else:
-			tx.send_multipart(data)
+			tx.send_multipart(directory.route(data))
 	except:
 		print("Something went wrong..")
 	
@@ -0,0 +1,104 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Throughput benchmark of the bus protocol versions (see components/core/zProtocol.py), using a bus within this process
+# A master calls all entities of the slaves with a profile steering signal, like a group controller does during a planning.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 busBenchmark.py [slaves] [entities per slave] [horizon] [calls]
+
+import sys
+import threading
+import time
+
+sys.path.insert(0, '../conf')
+sys.path.insert(0, '../components')
+
+from core.zCore import ZCore
+from core.zLocalBus import ZLocalBus
+from data.psData import PSData
+
+class Device():
+	def __init__(self, name):
+		self.name = name
+
+	def doPlanning(self, signal):
+		# Return a profile of the same size, like a device controller
+		result = PSData(signal)
+		result.profile = {'ELECTRICITY': [v * 0.5 for v in signal.desired['ELECTRICITY']]}
+		return result
+
+slaveCount = 4
+entityCount = 25
+horizon = 192
+calls = 20
+if len(sys.argv) > 1:
+	slaveCount = int(sys.argv[1])
+if len(sys.argv) > 2:
+	entityCount = int(sys.argv[2])
+if len(sys.argv) > 3:
+	horizon = int(sys.argv[3])
+if len(sys.argv) > 4:
+	calls = int(sys.argv[4])
+
+def createHost(bus, name, protocol):
+	host = ZCore(name)
+	host.enableWarning = False
+	host.zProtocolVersion = protocol
+	bus.attach(host)
+	host.zInit()
+	threading.Thread(target=host.zPoll, daemon=True).start()
+	return host
+
+def run(masterProtocol, slaveProtocols):
+	bus = ZLocalBus("bench" + str(masterProtocol) + "".join(str(p) for p in slaveProtocols))
+	bus.start()
+
+	master = createHost(bus, "master", masterProtocol)
+	names = []
+	for i in range(0, len(slaveProtocols)):
+		slave = createHost(bus, "slave" + str(i), slaveProtocols[i])
+		for j in range(0, entityCount):
+			slave.addEntity(Device("dev" + str(i) + "-" + str(j)))
+			names.append("dev" + str(i) + "-" + str(j))
+		slave.zSubscribe()
+	time.sleep(0.1)
+
+	signal = PSData()
+	signal.desired = {'ELECTRICITY': [complex(i, -i) for i in range(0, horizon)]}
+
+	# The first call reveals the hosts of the entities
+	expected = [v * 0.5 for v in signal.desired['ELECTRICITY']]
+	r = master.zCall(names, "doPlanning", signal)
+	assert (all(r[name].profile['ELECTRICITY'] == expected for name in names))
+	forwarded = bus.forwarded
+
+	start = time.time()
+	for i in range(0, calls):
+		r = master.zCall(names, "doPlanning", signal)
+	duration = time.time() - start
+
+	assert (len(r) == len(names))
+	assert (all(r[name].profile['ELECTRICITY'] == expected for name in names))
+	assert (isinstance(r[names[0]].profile['ELECTRICITY'], list))
+	messages = (bus.forwarded - forwarded) / calls
+
+	bus.stop()
+	return duration, messages
+
+print("%d slaves, %d entities each, horizon %d, %d calls to all entities" % (slaveCount, entityCount, horizon, calls))
+print("%-28s %10s %12s %10s" % ("protocol (master/slaves)", "calls/s", "entities/s", "messages"))
+for masterProtocol, slaveProtocols in [(1, [1] * slaveCount), (2, [2] * slaveCount), (2, [1, 2] * (slaveCount // 2) + [1] * (slaveCount % 2))]:
+	duration, messages = run(masterProtocol, slaveProtocols)
+	label = str(masterProtocol) + "/" + ",".join(str(p) for p in slaveProtocols)
+	print("%-28s %10.1f %12.1f %10.1f" % (label, calls / duration, calls * slaveCount * entityCount / duration, messages))
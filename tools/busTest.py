@@ -0,0 +1,198 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Small test script for the bus protocol between hosts, using a bus within this process
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 busTest.py [calls]
+
+import sys
+import threading
+import time
+
+sys.path.insert(0, '../conf')
+sys.path.insert(0, '../components')
+
+from core.zCore import ZCore
+from core.zLocalBus import ZLocalBus
+
+class Echo():
+	def __init__(self, name, host):
+		self.name = name
+		self.host = host
+		self.value = 0
+		self.received = []
+		self.lock = threading.Lock()
+
+	def echo(self, *args):
+		return args
+
+	def slow(self, duration):
+		time.sleep(duration)
+		return duration
+
+	def append(self, value):
+		with self.lock:
+			self.received.append(value)
+
+	def lockedCall(self, receiver, func, *args):
+		# Remote call while holding the lock that other messages for this entity require
+		with self.lock:
+			self.received.append("start")
+			r = self.host.zCall(receiver, func, *args)
+			self.received.append("end")
+		return r
+
+	def callBack(self, receiver, func, *args):
+		return self.host.zCall(receiver, func, *args)
+
+def createHost(bus, name):
+	host = ZCore(name)
+	host.enableWarning = False
+	bus.attach(host)
+	host.zInit()
+	threading.Thread(target=host.zPoll, daemon=True).start()
+	return host
+
+calls = 200
+if len(sys.argv) > 1:
+	calls = int(sys.argv[1])
+
+bus = ZLocalBus()
+bus.start()
+
+master = createHost(bus, "master")
+master.addEntity(Echo("echoMaster", master))
+master.zSubscribe()
+slaves = []
+for i in range(0, 4):
+	slave = createHost(bus, "slave" + str(i))
+	for j in range(0, 4):
+		slave.addEntity(Echo("echo" + str(i) + "-" + str(j), slave))
+	slave.zSubscribe()
+	slaves.append(slave)
+time.sleep(0.1)
+
+names = [e.name for s in slaves for e in s.entities]
+
+# Correctness of calls, getters and setters
+assert (master.zCall("echo0-0", "echo", 1, "a") == (1, "a"))
+assert (master.zCall(names, "echo", 2) == {name: (2,) for name in names})
+assert (master.zSet("echo1-1", "value", 42) == True)
+assert (master.zGet("echo1-1", "value") == 42)
+assert (master.zGet(names, "value")["echo1-1"] == 42)
+
+# Nested calls back into the same host must not deadlock
+assert (master.zCall("echo0-0", "callBack", "echoMaster", "callBack", "echo0-1", "echo", 5) == (5,))
+for name in names[1:]:		# All entities but the caller
+	assert (master.zCall("echo0-0", "callBack", "echoMaster", "callBack", name, "echo", 5) == (5,))
+
+# Calls back into the entity that waits, as a parent on another host that plans all its children when one of them requests
+# an incentive, also nested and from a callback handler that waits itself
+assert (master.zCall("echo0-0", "callBack", "echoMaster", "callBack", "echo0-0", "echo", 5) == (5,))
+assert (master.zCall("echo0-0", "callBack", "echo1-0", "callBack", names, "echo", 6) == {name: (6,) for name in names})
+assert (master.zCall("echo0-0", "callBack", "echoMaster", "callBack", "echo0-0", "callBack", "echoMaster", "callBack", "echo0-0", "echo", 7) == (7,))
+
+# Messages for an entity that waits for a remote call while holding its lock are handled in order, once the lock is released
+master.zCast("echo0-2", "lockedCall", "echoMaster", "slow", 0.2)
+for i in range(0, 10):
+	master.zCast("echo0-2", "append", i)
+	master.zCast("echo0-3", "append", i)
+deadline = time.time() + 5.0
+while len(master.zGet("echo0-2", "received")) < 12 and time.time() < deadline:
+	time.sleep(0.01)
+assert (master.zGet("echo0-2", "received") == ["start", "end"] + list(range(0, 10)))
+assert (master.zGet("echo0-3", "received") == list(range(0, 10)))
+
+# Messages for the same entity are handled in order
+for i in range(0, 1000):
+	master.zCast("echo1-0", "append", i)
+while len(master.zGet("echo1-0", "received")) < 1000:
+	time.sleep(0.01)
+assert (master.zGet("echo1-0", "received") == list(range(0, 1000)))
+
+# Timeouts
+master.zTimeout = 0.2
+try:
+	master.zCall("echo2-2", "slow", 1.0)
+	assert (False)
+except Warning:
+	pass
+master.zTimeout = -1
+assert (len(master.retData) == 0)
+# The late reply of the slow call is sent before the reply of a next call to the same entity
+assert (master.zCall("echo2-2", "echo", 0) == (0,))
+
+# Latency of single calls and calls to all entities
+start = time.time()
+for i in range(0, calls):
+	master.zCall("echo3-3", "echo", i)
+single = (time.time() - start) / calls
+
+start = time.time()
+for i in range(0, calls):
+	master.zCall(names, "echo", i)
+multiple = (time.time() - start) / calls
+
+print("Single call:                 %.3f ms" % (1000 * single))
+print("Call to %d entities:         %.3f ms" % (len(names), 1000 * multiple))
+print("Latency per function (count, mean ms, max ms):")
+for key, stats in master.zGetLatency().items():
+	print("  %-16s %6d %9.3f %9.3f" % (key, stats['count'], 1000 * stats['mean'], 1000 * stats['max']))
+print("Message handling at the slaves (handled, mean latency ms, max latency ms, queue):")
+for slave in slaves:
+	m = slave.zGetDispatchMetrics()
+	print("  %-16s %6d %9.3f %9.3f %6d" % (slave.name, m['handled'], 1000 * m['latency'], 1000 * m['maxLatency'], m['queue']))
+
+# Host routing: hosts only subscribe to their own topic and obtain the directory from the bus
+routed = []
+for i in range(0, 2):
+	host = ZCore("routed" + str(i))
+	host.enableWarning = False
+	host.zHostRouting = True
+	bus.attach(host)
+	host.zInit()
+	threading.Thread(target=host.zPoll, daemon=True).start()
+	for j in range(0, 4):
+		host.addEntity(Echo("routedEcho" + str(i) + "-" + str(j), host))
+	host.zSubscribe()
+	routed.append(host)
+time.sleep(0.1)
+for host in routed:
+	host.zConnectBus("connectSlave")
+master.zConnectBus("connectMaster")
+assert ("routed0" in master.zListOfSlaves())
+assert (master.zDirectory["routedEcho1-2"] == "routed1")
+
+routedNames = [e.name for host in routed for e in host.entities]
+forwarded = bus.forwarded
+assert (master.zCall(routedNames, "echo", 3) == {name: (3,) for name in routedNames})
+assert (bus.forwarded - forwarded == 4) # One call and one reply per host
+assert (master.zCall("routedEcho0-1", "echo", 4) == (4,))
+assert (master.zSet("routedEcho0-1", "value", 7) == True)
+assert (master.zGet(routedNames, "value")["routedEcho0-1"] == 7)
+assert (routed[1].zCall("routedEcho0-0", "callBack", "routedEcho1-0", "echo", 6) == (6,))
+
+# A host with protocol version 1 addresses entities, the bus routes these to the host
+legacy = ZCore("legacy")
+legacy.enableWarning = False
+legacy.zProtocolVersion = 1
+bus.attach(legacy)
+legacy.zInit()
+threading.Thread(target=legacy.zPoll, daemon=True).start()
+time.sleep(0.1)
+assert (legacy.zCall(routedNames, "echo", 5) == {name: (5,) for name in routedNames})
+assert (legacy.zGet("routedEcho1-3", "value") == 0)
+
+bus.stop()
+print("OK")
@@ -0,0 +1,96 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the thermal and reliability models of RelLvCables, as evaluated by an ElLoadFlow every tick
+# Compares RelLvCable.estimateReliability() per cable to the batched CableThermalEngine, results must be equal up to rounding.
+# A synthetic host is used, such that no simulation setup is required.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 cableThermalBenchmark.py [cables] [ticks]
+
+import sys
+import time
+import random
+
+sys.path.insert(0, '../components')
+
+import numpy
+
+from flow.el.elLoadFlow import ElLoadFlow
+from flow.el.lvNode import LvNode
+from flow.el.mvLvTransformer import MvLvTransformer
+from flow.el.reliability.relLvCable import RelLvCable
+from flow.el.reliability.cableThermalEngine import CableThermalEngine
+from syntheticHost import SyntheticHost
+
+cables = 1000
+ticks = 96
+if len(sys.argv) > 1:
+	cables = int(sys.argv[1])
+if len(sys.argv) > 2:
+	ticks = int(sys.argv[2])
+
+def createGrid():
+	random.seed(1)
+	host = SyntheticHost()
+	loadFlow = ElLoadFlow("loadflow", host)
+	root = MvLvTransformer("transformer", loadFlow, host)
+	loadFlow.rootNode = root
+
+	for i in range(0, cables):
+		node = LvNode("node"+str(i), loadFlow, host)
+		cable = RelLvCable("cable"+str(i), loadFlow, root, node, host)
+		cable.length = random.uniform(10, 100)
+		cable.soilTemperature = random.uniform(5, 20)
+		if i % 2 == 0:
+			# A second cable type
+			cable.soilResistivity = 1.0
+		cable.startup()
+
+	return host, loadFlow
+
+def run(batched):
+	host, loadFlow = createGrid()
+	engine = None
+	if batched:
+		engine = CableThermalEngine(loadFlow)
+		engine.compile()
+
+	random.seed(2)
+	duration = 0.0
+	for tick in range(0, ticks):
+		host.previousTime = host.currentTime
+		host.currentTime += host.timeBase
+		for cable in loadFlow.edges:
+			cable.current = [complex(random.uniform(-150, 150), random.uniform(-20, 20)) for i in range(0, 4)]
+
+		start = time.time()
+		if batched:
+			engine.estimateReliability()
+		else:
+			for cable in loadFlow.edges:
+				cable.estimateReliability()
+		duration += time.time() - start
+
+	return duration, numpy.array([[c.hottestSpotTemperatureOlsen, c.jacketTemperatureOlsen, c.lossOfLifeOlsen, c.reliabilityOlsen, c.lossOfLife60287] for c in loadFlow.edges])
+
+durationSequential, sequential = run(False)
+durationBatched, batched = run(True)
+
+assert (numpy.allclose(sequential, batched, rtol=1e-12, atol=0.0))
+
+print("%d cables, %d ticks" % (cables, ticks))
+print("%-24s %10s" % ("method", "time (s)"))
+print("%-24s %10.3f" % ("estimateReliability", durationSequential))
+print("%-24s %10.3f" % ("CableThermalEngine", durationBatched))
+print("%-24s %10.3g" % ("max. relative difference", numpy.max(numpy.abs(sequential - batched) / numpy.abs(sequential))))
@@ -0,0 +1,136 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Round trip check of the columnar result store and its reader
+# Values are written through the InfluxDB interface of ColumnarStore and read back with the reader of createReader(),
+# both from the .npz files and from data that has not been written yet. The aggregation per timeBase and the fill
+# with the previous value are compared with a plain Python implementation of the Influx query.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 columnarStoreCheck.py
+
+import sys
+
+sys.path.insert(0, '../conf')
+sys.path.insert(0, '../components')
+
+import os
+import random
+import shutil
+import tempfile
+
+from usrconf import demCfg
+from hosts.host import Host
+from database.columnarStore import ColumnarStore, readSeries
+from util.columnarReader import ColumnarReader
+
+random.seed(42)
+
+host = Host()
+host.enableMsg = False
+host.enableWarning = False
+
+folder = tempfile.mkdtemp() + "/"
+demCfg['var']['results'] = folder
+
+store = ColumnarStore(host)
+assert (store.path == folder)
+store.database = "check"
+store.initialSize = 4		# Forces the columns to grow
+host.db = store
+
+def expected(points, startTime, endTime, timeBase, aggregation):
+	# Influx: SELECT <aggregation>(value) ... GROUP BY time(timeBase) fill(previous)
+	result = []
+	prev = None
+	for start in range(startTime, endTime, timeBase):
+		values = [v for t, v in points if start <= t < start + timeBase]
+		if len(values) > 0:
+			if aggregation == 'mean':
+				prev = sum(values) / len(values)
+			elif aggregation == 'sum':
+				prev = sum(values)
+			elif aggregation == 'max':
+				prev = max(values)
+			elif aggregation == 'min':
+				prev = min(values)
+			elif aggregation == 'first':
+				prev = values[0]
+			elif aggregation == 'last':
+				prev = values[-1]
+			elif aggregation == 'count':
+				prev = float(len(values))
+		result.append(prev)
+	return result
+
+def close(a, b):
+	if len(a) != len(b):
+		return False
+	for x, y in zip(a, b):
+		if (x is None) != (y is None):
+			return False
+		if x is not None and abs(x - y) > 1e-9:
+			return False
+	return True
+
+# Two devices with irregular samples and a gap, written in three parts: two files and unwritten data
+points = {"dev1": [], "dev2": []}
+time = 1000
+for i in range(0, 300):
+	time += random.choice([1, 7, 15, 60, 61])
+	if 100 <= i < 120:
+		time += 900		# Gap
+	for name in points:
+		value = round(random.uniform(-5000, 5000), 3)
+		points[name].append((time, value))
+		store.appendValue("devices", {"name": name}, {"W-power.real.c.ELECTRICITY": value, "state": "on"}, time)
+	if i == 99 or i == 199:
+		store.writeData(True)
+
+endTime = time - (time % 900) + 1800	# Whole intervals
+files = [f for f in os.listdir(store.directory()) if f.endswith(".npz")]
+assert (len(files) == 2)
+assert (store.points > 0)
+
+for aggregation in ['mean', 'sum', 'max', 'min', 'first', 'last', 'count']:
+	for timeBase in [60, 900]:
+		reader = store.createReader("devices", timeBase=timeBase, tags={"name": "dev1"}, aggregation=aggregation)
+		assert (isinstance(reader, ColumnarReader))
+		r = reader.retrieveValues(900, endTime)
+		assert (close(r, expected(points["dev1"], 900, endTime, timeBase, aggregation)))
+print("Aggregation of written and unwritten data: OK")
+
+# Everything written: the files alone give the same result, also for a reader without host
+store.writeData(True)
+assert (store.points == 0)
+reader = ColumnarReader("devices", database="check", timeBase=300, tags={"name": "dev2"})
+r = reader.retrieveValues(900, endTime)
+assert (close(r, expected(points["dev2"], 900, endTime, 300, 'mean')))
+assert (store.getMetrics()['points'] == 300 * 2 * 2)
+print("Round trip through the .npz files: OK")
+
+# Non numerical fields are stored as strings
+times, values = readSeries(store.directory(), "devices", "state", {"name": "dev1"}, 0, endTime * 1000000000)
+assert (sum(len(t) for t in times) == 300)
+assert (all(str(v) == "on" for part in values for v in part))
+print("String fields: OK")
+
+# Reading through the cache of the Reader
+reader = store.createReader("devices", timeBase=60, tags={"name": "dev1"})
+reader.cacheFuture = True	# The host did not simulate up to these times
+assert (close(reader.readValues(1200, 4800), expected(points["dev1"], 1200, 4800, 60, 'mean')))
+print("Reader cache: OK")
+
+store.clearDatabase()
+assert ([f for f in os.listdir(store.directory()) if f.endswith(".npz")] == [])
+shutil.rmtree(folder)
@@ -0,0 +1,78 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of obtaining meter data during an ElLoadFlow with the object based sweep
+# Compares querying the meters in every sweep to the ElConsumptionSnapshot, results must be equal.
+# A synthetic host emulates remote meters by adding a fixed latency to every zGet.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 consumptionSnapshotBenchmark.py [nodes] [latency in ms]
+
+import sys
+import time
+import random
+
+sys.path.insert(0, '../components')
+
+from flow.el.elLoadFlow import ElLoadFlow
+from flow.el.lvNode import LvNode
+from flow.el.lvCable import LvCable
+from flow.el.mvLvTransformer import MvLvTransformer
+from syntheticHost import SyntheticHost
+
+nodes = 200
+latency = 0.5
+if len(sys.argv) > 1:
+	nodes = int(sys.argv[1])
+if len(sys.argv) > 2:
+	latency = float(sys.argv[2])
+
+def run(snapshot):
+	random.seed(1)
+	host = SyntheticHost(latency=latency)
+	loadFlow = ElLoadFlow("loadflow", host)
+	root = MvLvTransformer("transformer", loadFlow, host)
+	loadFlow.rootNode = root
+	if not snapshot:
+		loadFlow.consumptionSnapshot = None
+
+	grid = [root]
+	for i in range(0, nodes):
+		node = LvNode("node"+str(i), loadFlow, host)
+		cable = LvCable("cable"+str(i), loadFlow, random.choice(grid[-20:]), node, host)
+		cable.length = random.uniform(5, 60)
+		grid.append(node)
+
+		meter = "meter"+str(i)
+		host.meters[meter] = {'EL1': complex(random.uniform(-1000, 1000), random.uniform(-100, 100))}
+		node.addMeter(meter, random.choice([None, 1, 2, 3]))
+
+	for edge in loadFlow.edges:
+		edge.startup()
+	loadFlow.startup()
+
+	start = time.time()
+	iterations = loadFlow.executeLoadflow(loadFlow.maxIterations, loadFlow.maxError)
+	duration = time.time() - start
+
+	return duration, host.requests, iterations, [node.voltage for node in loadFlow.nodes]
+
+durationSweep, requestsSweep, iterations, voltagesSweep = run(False)
+durationSnapshot, requestsSnapshot, _, voltagesSnapshot = run(True)
+
+assert (voltagesSweep == voltagesSnapshot)
+
+print("%d nodes, %d iterations, %.1f ms latency per request" % (nodes, iterations, latency))
+print("%-12s %10s %10s" % ("meter data", "time (s)", "requests"))
+print("%-12s %10.3f %10d" % ("per sweep", durationSweep, requestsSweep))
+print("%-12s %10.3f %10d" % ("snapshot", durationSnapshot, requestsSnapshot))
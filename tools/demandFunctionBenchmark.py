@@ -0,0 +1,65 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the aggregation of demand functions, as done by an AggregatorCtrl with many buffer controllers as children
+# Compares adding the functions one by one with DemandFunction.addFunction() to DemandFunction.addFunctions(), results must be identical.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 demandFunctionBenchmark.py [max children]
+
+import sys
+import time
+import random
+
+sys.path.insert(0, '../components')
+
+from ctrl.auction.demandFunction import DemandFunction
+
+maxChildren = 10000
+if len(sys.argv) > 1:
+	maxChildren = int(sys.argv[1])
+
+def createFunctions(n):
+	# Functions shaped like the ones of the BufAuctionCtrl
+	random.seed(n)
+	result = []
+	for i in range(0, n):
+		f = DemandFunction()
+		soc = random.random()
+		f.addLine(random.uniform(500, 4000), 0.0, f.minComfort, (f.minComfort + 100 + (1-soc)*400))
+		f.addLine(0.0, -random.uniform(500, 4000), (f.maxComfort - soc*400 - 100), f.maxComfort)
+		result.append(f)
+	return result
+
+print("%10s %14s %14s %12s" % ("children", "addFunction s", "addFunctions s", "price"))
+n = 10
+while n <= maxChildren:
+	functions = createFunctions(n)
+
+	start = time.time()
+	sequential = DemandFunction()
+	for f in functions:
+		sequential.addFunction(f)
+	durationSequential = time.time() - start
+
+	start = time.time()
+	aggregate = DemandFunction()
+	aggregate.addFunctions(functions)
+	durationAggregate = time.time() - start
+
+	assert (sequential.function == aggregate.function)
+	price = aggregate.priceForDemand(0.0)
+	assert (price == sequential.priceForDemand(0.0))
+
+	print("%10d %14.4f %14.4f %12.4f" % (n, durationSequential, durationAggregate, price))
+	n *= 10
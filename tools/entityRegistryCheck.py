@@ -0,0 +1,72 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Check of the removal of entities that are created at runtime through the API of the host
+# Objects are created, started and removed with createObject(), callFunction() and removeObject(), after which
+# no entity may refer to the removed objects anymore (see Core.entityReferences).
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 entityRegistryCheck.py
+
+import sys
+
+sys.path.insert(0, '../conf')
+sys.path.insert(0, '../components')
+
+from hosts.host import Host
+from ctrl.groupCtrl import GroupCtrl
+from dev.bufDev import BufDev
+from dev.meterDev import MeterDev
+
+host = Host()
+host.enableMsg = False
+host.enableWarning = False
+
+meter = MeterDev("meter", host)
+parent = GroupCtrl("parent", host)
+host.startup()
+
+def refersTo(entity, obj):
+	for value in vars(entity).values():
+		if value is obj:
+			return True
+		if isinstance(value, list) and any(v is obj for v in value):
+			return True
+		if isinstance(value, dict) and any(v is obj for v in value.values()):
+			return True
+	return False
+
+# Group controller: startup() appends the child to its parent
+child = host.createObject("GroupCtrl", [{"name": "child"}, {"host": "host"}, {"obj": "parent"}])
+host.callFunction("child", "startup")
+assert (refersTo(parent, child))
+assert (host.removeObject("child"))
+assert (not refersTo(parent, child))
+print("Group controller removed from its parent: OK")
+
+# Device with a controller: startup() of the controller connects the device to the controller
+device = host.createObject("BufDev", [{"name": "buffer"}, {"host": "host"}])
+controller = host.createObject("BufCtrl", [{"name": "controller"}, {"obj": "buffer"}, {"obj": "parent"}, {"host": "host"}])
+host.callFunction("buffer", "startup")
+host.callFunction("controller", "startup")
+assert (refersTo(device, controller) and refersTo(parent, controller))
+assert (host.removeObject("controller"))
+for e in host.entities:
+	assert (not refersTo(e, controller))
+print("Controller removed from its device and parent: OK")
+
+# References set through the API
+host.setObj("buffer", "meter", "meter")
+assert (host.removeObject("meter"))
+assert (device.meter is None)
+print("Meter removed from a device: OK")
@@ -0,0 +1,222 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Check of the InfluxDB connector and its background writer against a local stand-in HTTP server
+# Covers the batching of requests, gzip compressed bodies, a full write queue (with blockOnFull and with backup files),
+# the retry of data after an error response and the final flush on shutdown().
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 influxWriterCheck.py
+
+import sys
+
+sys.path.insert(0, '../conf')
+sys.path.insert(0, '../components')
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import gzip
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from hosts.host import Host
+from database.influxDB import InfluxDB
+
+class StandInHandler(BaseHTTPRequestHandler):
+	def do_POST(self):
+		body = self.rfile.read(int(self.headers['Content-Length']))
+
+		if self.path.startswith('/query'):
+			self.reply(200)
+			return
+
+		self.server.arrived.set()
+		self.server.gate.wait()
+
+		if self.headers.get('Content-Encoding') == 'gzip':
+			body = gzip.decompress(body)
+		lines = [line for line in body.decode().split("\n") if line != ""]
+
+		with self.server.lock:
+			self.server.requests.append((self.headers.get('Content-Encoding'), lines))
+			if self.server.failures > 0:
+				self.server.failures -= 1
+				status = 500
+			else:
+				self.server.lines.extend(lines)
+				status = 204
+		self.reply(status)
+
+	def reply(self, status):
+		self.send_response(status)
+		self.send_header('Content-Length', '0')
+		self.end_headers()
+
+	def log_message(self, format, *args):
+		pass
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+server.lock = threading.Lock()
+server.gate = threading.Event()
+server.arrived = threading.Event()
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+host = Host()
+host.enableMsg = False
+host.enableWarning = False
+
+backupFolder = tempfile.mkdtemp()
+
+def reset(failures=0):
+	server.requests = []
+	server.lines = []
+	server.failures = failures
+	server.gate.set()
+	server.arrived.clear()
+
+def connector(name):
+	db = InfluxDB(host)
+	db.address = 'http://127.0.0.1'
+	db.port = str(server.server_address[1])
+	db.database = 'check'
+	db.filepath = backupFolder + "/" + name + "/"
+	return db
+
+def points(db, start, n):
+	lines = []
+	for i in range(start, start+n):
+		db.appendValuePrepared("check,name=point value=" + str(i), i)
+		lines.append("check,name=point value=" + str(i) + " " + str(i * 1000000000))
+	return lines
+
+def backupFiles(db):
+	if not os.path.isdir(db.filepath):
+		return []
+	return os.listdir(db.filepath)
+
+def waitForRestore(db):
+	deadline = time.time() + 5.0
+	while db.errorFlag and time.time() < deadline:
+		time.sleep(0.01)
+	db.writer.flush()
+
+def blockServer():
+	# Requests wait at the server until the gate is opened, the writer is busy once the first request has arrived
+	server.gate.clear()
+	server.arrived.clear()
+
+# Batching: a buffer is split into requests of at most batchSize points, in order
+reset()
+db = connector("batching")
+db.batchSize = 3
+expected = points(db, 0, 10)
+db.flush()
+assert ([len(lines) for encoding, lines in server.requests] == [3, 3, 3, 1])
+assert (server.lines == expected)
+assert (db.getMetrics()['points'] == 10 and db.getMetrics()['requests'] == 4)
+db.shutdown()
+print("Batching: OK")
+
+# Compression: the body is gzip compressed and marked as such
+reset()
+db = connector("gzip")
+db.compress = True
+expected = points(db, 0, 100)
+db.flush()
+assert (len(server.requests) == 1)
+assert (server.requests[0][0] == 'gzip')
+assert (server.lines == expected)
+assert (db.getMetrics()['bytes'] < len("\n".join(expected)))
+db.shutdown()
+print("Gzip body: OK")
+
+# Full queue with blockOnFull: writeData() waits until the writer has room, nothing is stored in backup files
+reset()
+db = connector("block")
+db.maxQueue = 1
+db.blockOnFull = True
+blockServer()
+expected = points(db, 0, 5)
+db.writeData(True)
+assert (server.arrived.wait(5.0))	# First buffer is being written
+expected += points(db, 5, 5)
+db.writeData(True)					# Second buffer fills the queue
+expected += points(db, 10, 5)
+writer = threading.Thread(target=db.writeData, args=[True])
+writer.start()
+writer.join(0.2)
+assert (writer.is_alive())			# Third buffer waits for the writer
+server.gate.set()
+writer.join(5.0)
+assert (not writer.is_alive())
+db.flush()
+assert (server.lines == expected)
+assert (backupFiles(db) == [] and not db.errorFlag)
+db.shutdown()
+print("Queue overflow with blockOnFull: OK")
+
+# Full queue without blockOnFull: the buffer is stored in a backup file and restored once the writer succeeds
+reset()
+db = connector("backup")
+db.maxQueue = 1
+db.blockOnFull = False
+blockServer()
+expected = points(db, 0, 5)
+db.writeData(True)
+assert (server.arrived.wait(5.0))
+expected += points(db, 5, 5)
+db.writeData(True)
+overflow = points(db, 10, 5)
+db.writeData(True)					# Does not block
+assert (db.errorFlag)
+assert (len(backupFiles(db)) == 1)
+server.gate.set()
+db.flush()
+waitForRestore(db)
+assert (not db.errorFlag)
+assert (sorted(server.lines) == sorted(expected + overflow))
+assert (backupFiles(db) == [])
+db.shutdown()
+print("Queue overflow with backup: OK")
+
+# Error response: a batch that is answered with a 5xx is stored and written again after a successful request
+reset(failures=1)
+db = connector("retry")
+failed = points(db, 0, 5)
+db.flush()
+assert (len(server.requests) == 1 and server.lines == [])
+assert (db.errorFlag and len(backupFiles(db)) == 1)
+expected = points(db, 5, 5)
+db.flush()
+waitForRestore(db)
+assert (not db.errorFlag)
+assert (server.lines == expected + failed)
+assert (backupFiles(db) == [])
+db.shutdown()
+print("Retry after a 5xx: OK")
+
+# Shutdown: points that are still buffered are written before the writer stops
+reset()
+db = connector("shutdown")
+expected = points(db, 0, 7)
+db.writeData()						# Buffer not full, nothing written yet
+assert (server.requests == [])
+db.shutdown()
+assert (server.lines == expected)
+assert (db.writer.thread is None)
+print("Final flush on shutdown: OK")
+
+server.shutdown()
+shutil.rmtree(backupFolder)
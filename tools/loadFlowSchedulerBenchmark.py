@@ -0,0 +1,150 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the loadflows of multiple independent LV feeders, each with its own ElLoadFlow
+# Compares solving the feeders one by one to the ElLoadFlowScheduler with worker processes, results must be equal.
+# Afterwards, the warm start from the previous tick is compared to a flat start.
+# A feeder that skips a ticket is checked to obtain the result of the next ticket.
+# All loadflows must converge, otherwise the comparison is meaningless (large feeders with long cables may not converge).
+# A synthetic host with changing meter data is used, such that no simulation setup is required.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 loadFlowSchedulerBenchmark.py [feeders] [nodes per feeder] [ticks] [workers]
+
+import sys
+import os
+import time
+import random
+
+sys.path.insert(0, '../components')
+
+import numpy
+
+from flow.el.elLoadFlow import ElLoadFlow
+from flow.el.lvNode import LvNode
+from flow.el.lvCable import LvCable
+from flow.el.mvLvTransformer import MvLvTransformer
+from flow.el.elLoadFlowScheduler import ElLoadFlowScheduler
+from syntheticHost import SyntheticHost
+
+feeders = 8
+nodes = 500
+ticks = 10
+workers = os.cpu_count()
+if len(sys.argv) > 1:
+	feeders = int(sys.argv[1])
+if len(sys.argv) > 2:
+	nodes = int(sys.argv[2])
+if len(sys.argv) > 3:
+	ticks = int(sys.argv[3])
+if len(sys.argv) > 4:
+	workers = int(sys.argv[4])
+
+def createGrid(host, feeder):
+	loadFlow = ElLoadFlow("loadflow"+str(feeder), host)
+	loadFlow.vectorized = True
+	root = MvLvTransformer("transformer"+str(feeder), loadFlow, host)
+	loadFlow.rootNode = root
+
+	grid = [root]
+	for i in range(0, nodes):
+		name = str(feeder)+"-"+str(i)
+		node = LvNode("node"+name, loadFlow, host)
+		cable = LvCable("cable"+name, loadFlow, random.choice(grid[-20:]), node, host)
+		cable.length = random.uniform(5, 30)
+		grid.append(node)
+
+		host.meters["meter"+name] = {'EL1': complex(0.0, 0.0)}
+		node.addMeter("meter"+name, random.choice([None, 1, 2, 3]))
+
+	for edge in loadFlow.edges:
+		edge.startup()
+	loadFlow.startup()
+	return loadFlow
+
+def run(scheduled, warmStart, workers):
+	random.seed(1)
+	host = SyntheticHost()
+	loadFlows = [createGrid(host, feeder) for feeder in range(0, feeders)]
+
+	scheduler = None
+	if scheduled:
+		scheduler = ElLoadFlowScheduler(host, workers)
+		for loadFlow in loadFlows:
+			scheduler.addFeeder(loadFlow)
+	for loadFlow in loadFlows:
+		loadFlow.warmStart = warmStart
+
+	duration = 0.0
+	iterations = 0
+	failed = 0
+	results = []
+	for tick in range(0, ticks):
+		host.currentTime += host.timeBase
+		# Loads change gradually between ticks
+		for meter in sorted(host.meters):
+			host.meters[meter] = {'EL1': host.meters[meter]['EL1'] * 0.95 + complex(random.uniform(-50, 150), random.uniform(-5, 5))}
+
+		start = time.time()
+		outcome = []
+		for loadFlow in loadFlows:
+			if scheduled:
+				outcome.append(scheduler.executeLoadflow(loadFlow))
+			else:
+				outcome.append(loadFlow.executeLoadflow(loadFlow.maxIterations, loadFlow.maxError))
+		duration += time.time() - start
+
+		# Number of iterations, -1 if a loadflow did not converge
+		iterations += sum(n for n in outcome if n > 0)
+		failed += outcome.count(-1)
+
+		for loadFlow in loadFlows:
+			results.append([list(node.voltage) for node in loadFlow.nodes] + [list(edge.current) for edge in loadFlow.edges])
+
+	if scheduler is not None:
+		scheduler.shutdown()
+
+	return duration, iterations, failed, numpy.array(results)
+
+durationSequential, iterationsSequential, failedSequential, sequential = run(False, False, 1)
+durationScheduled, iterationsScheduled, failedScheduled, scheduled = run(True, False, workers)
+durationWarm, iterationsWarm, failedWarm, warm = run(True, True, workers)
+
+assert (failedSequential == 0 and failedScheduled == 0 and failedWarm == 0), "Not all loadflows converged, use smaller feeders"
+assert (numpy.array_equal(sequential, scheduled))
+assert (iterationsSequential == iterationsScheduled)
+
+# A feeder that skips a ticket must not obtain the result of that ticket in the next one
+random.seed(2)
+host = SyntheticHost()
+loadFlows = [createGrid(host, feeder) for feeder in range(0, 2)]
+scheduler = ElLoadFlowScheduler(host, 2)
+for loadFlow in loadFlows:
+	scheduler.addFeeder(loadFlow)
+scheduler.executeLoadflow(loadFlows[0])
+host.currentTime += host.timeBase
+for meter in sorted(host.meters):
+	host.meters[meter] = {'EL1': complex(random.uniform(-50, 150), random.uniform(-5, 5))}
+skipped = scheduler.executeLoadflow(loadFlows[1])
+voltages = [list(node.voltage) for node in loadFlows[1].nodes]
+scheduler.executeLoadflow(loadFlows[0])
+scheduler.shutdown()
+assert (loadFlows[1].executeLoadflow(loadFlows[1].maxIterations, loadFlows[1].maxError) == skipped)
+assert (voltages == [list(node.voltage) for node in loadFlows[1].nodes])
+
+print("%d feeders, %d nodes per feeder, %d ticks, %d workers" % (feeders, nodes, ticks, workers))
+print("%-24s %10s %12s" % ("loadflow", "time (s)", "iterations"))
+print("%-24s %10.3f %12d" % ("sequential", durationSequential, iterationsSequential))
+print("%-24s %10.3f %12d" % ("scheduler", durationScheduled, iterationsScheduled))
+print("%-24s %10.3f %12d" % ("scheduler, warm start", durationWarm, iterationsWarm))
+print("%-24s %10.3g" % ("max. voltage difference", numpy.max(numpy.abs(sequential[:, :nodes+1] - warm[:, :nodes+1]))))
@@ -0,0 +1,124 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of writing log files, as done by Core.logMsg(), logWarning(), logError() and logDebug()
+# Compares opening, appending and closing the file per line to the Logger with a writer thread.
+# The written files must be equal. Console output is disabled, files are written to a temporary folder.
+# Afterwards, forked processes log into the same file as their parent, all lines must be whole.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 loggerBenchmark.py [lines] [ticks]
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, '../conf')
+sys.path.insert(0, '../components')
+
+from usrconf import demCfg
+from core.logger import Logger, ConsoleSink
+from syntheticHost import SyntheticHost
+
+lines = 1000
+ticks = 100
+if len(sys.argv) > 1:
+	lines = int(sys.argv[1])
+if len(sys.argv) > 2:
+	ticks = int(sys.argv[2])
+
+levels = [("MESSAGE", '.log'), ("WARNING", '.warning'), ("DEBUG", '.debug')]
+
+# Per line, as done previously
+def logDirect(host, level, extension, msg):
+	t = host.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%X")
+	name = host.timeObject(time.time()).astimezone(demCfg['timezone']).strftime("%Y%m%d")
+	filename = demCfg['var']['log'] + name + extension
+
+	os.makedirs(os.path.dirname(demCfg['var']['log']), exist_ok=True)
+	f = open(filename, 'a')
+	f.write(t + " | " + level + ": " + msg + "\n")
+	f.close()
+
+def run(folder, buffered):
+	demCfg['var']['log'] = os.path.join(folder, '')
+	host = SyntheticHost()
+	logger = Logger(host)
+	# No console output
+	logger.sinks = [sink for sink in logger.sinks if not isinstance(sink, ConsoleSink)]
+
+	start = time.time()
+	for tick in range(0, ticks):
+		for i in range(0, lines):
+			level, extension = levels[i % len(levels)]
+			msg = "tick " + str(tick) + " line " + str(i)
+			if buffered:
+				logger.log(level, msg, True)
+			else:
+				logDirect(host, level, extension, msg)
+		if buffered:
+			logger.flush()
+	logger.close()
+
+	return time.time() - start
+
+folder = tempfile.mkdtemp()
+log = demCfg['var']['log']
+durationDirect = run(os.path.join(folder, "direct"), False)
+durationBuffered = run(os.path.join(folder, "buffered"), True)
+demCfg['var']['log'] = log
+
+# Files must be equal, apart from the timestamps
+def content(folder):
+	result = {}
+	for filename in os.listdir(folder):
+		f = open(os.path.join(folder, filename))
+		result[filename[8:]] = [line[8:] for line in f.readlines()]
+		f.close()
+	return result
+
+assert (content(os.path.join(folder, "direct")) == content(os.path.join(folder, "buffered")))
+
+# Forked processes write into the same files, using the logger of the parent
+demCfg['var']['log'] = os.path.join(folder, "forked", '')
+logger = Logger(SyntheticHost())
+logger.sinks = [sink for sink in logger.sinks if not isinstance(sink, ConsoleSink)]
+logger.log("MESSAGE", "parent", True)		# Starts the writer thread, which the children do not have
+pids = []
+for p in range(0, 4):
+	pid = os.fork()
+	if pid == 0:
+		for i in range(0, lines):
+			logger.log("MESSAGE", "process " + str(p) + " line " + str(i) + " " + "x" * 200, True)
+		logger.flush()
+		os._exit(0)
+	pids.append(pid)
+for i in range(0, lines):
+	logger.log("MESSAGE", "process parent line " + str(i) + " " + "x" * 200, True)
+for pid in pids:
+	os.waitpid(pid, 0)
+logger.close()
+demCfg['var']['log'] = log
+
+written = [line for lines in content(os.path.join(folder, "forked")).values() for line in lines]
+assert (len(written) == 5 * lines + 1)
+assert (all(line.endswith(" " + "x" * 200 + "\n") or line.endswith(": parent\n") for line in written))
+
+print("%d lines, %d ticks" % (lines, ticks))
+print("%-12s %10s" % ("logging", "time (s)"))
+print("%-12s %10.3f" % ("direct", durationDirect))
+print("%-12s %10.3f" % ("buffered", durationBuffered))
+
+shutil.rmtree(folder)
@@ -0,0 +1,137 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the persistence of entities, as done by a LiveHost on every tick
+# Compares full snapshots on every save to the incremental storage with a write-ahead log.
+# The large variables are tracked (Persistence.track()), such that these are only pickled when they changed.
+# Afterwards, a crash during a write is emulated by cutting the log, the recovered state must equal the last complete save.
+# Files are written to a temporary folder.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 persistenceBenchmark.py [entities] [ticks]
+
+import sys
+import os
+import copy
+import time
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, '../components')
+
+from util.persistence import Persistence
+from syntheticHost import SyntheticHost
+
+entities = 100
+ticks = 500
+if len(sys.argv) > 1:
+	entities = int(sys.argv[1])
+if len(sys.argv) > 2:
+	ticks = int(sys.argv[2])
+
+class SyntheticEntity():
+	def __init__(self, name):
+		self.name = name
+		# Some state that changes each tick, and larger state (e.g. a predictor or plan) that changes occasionally
+		self.soc = 0.0
+		self.consumption = {'EL1': complex(0.0, 0.0)}
+		self.plan = [random.uniform(0, 1000) for i in range(0, 2000)]
+		self.jobs = [(i*900, {'setpoint': 21.0}) for i in range(0, 500)]
+
+	def tick(self, t):
+		self.soc += random.uniform(-100, 100)
+		self.consumption = {'EL1': complex(random.uniform(-1000, 1000), 0.0)}
+		if t % 15 == 0:
+			self.plan = [random.uniform(0, 1000) for i in range(0, 2000)]
+		if t % 50 == 0:
+			# Change in place, reported to the persistence
+			self.jobs[t % len(self.jobs)] = (t*900, {'setpoint': random.uniform(18, 22)})
+			self.persistence.changed("jobs")
+
+def state(entity):
+	return (entity.soc, entity.consumption, entity.plan, entity.jobs)
+
+def run(folder, incremental):
+	random.seed(1)
+	host = SyntheticHost()
+	fleet = []
+	for i in range(0, entities):
+		entity = SyntheticEntity("entity"+str(i))
+		entity.persistence = Persistence(entity, host, ["soc", "consumption", "plan", "jobs"], filename=os.path.join(folder, entity.name+'.dem'))
+		entity.persistence.incremental = incremental
+		entity.persistence.track(["plan", "jobs"])
+		fleet.append(entity)
+
+	duration = 0.0
+	written = 0
+	snapshots = {}
+	logs = {}
+	for t in range(0, ticks):
+		for entity in fleet:
+			entity.tick(t)
+
+		start = time.time()
+		for entity in fleet:
+			entity.persistence.save()
+		duration += time.time() - start
+
+		# Bytes written: new snapshots and the growth of the logs
+		for entity in fleet:
+			snapshot = os.stat(entity.persistence.filename)
+			if snapshot.st_ino != snapshots.get(entity.name):
+				written += snapshot.st_size
+				snapshots[entity.name] = snapshot.st_ino
+				logs[entity.name] = 0
+			if os.path.exists(entity.persistence.logFilename):
+				size = os.path.getsize(entity.persistence.logFilename)
+				written += max(0, size - logs[entity.name])
+				logs[entity.name] = size
+
+	return duration, written, fleet
+
+folder = tempfile.mkdtemp()
+durationFull, writtenFull, _ = run(os.path.join(folder, "full"), False)
+durationIncremental, writtenIncremental, fleet = run(os.path.join(folder, "incremental"), True)
+
+print("%d entities, %d saves" % (entities, ticks))
+print("%-12s %10s %14s" % ("storage", "time (s)", "written (MB)"))
+print("%-12s %10.3f %14.1f" % ("full", durationFull, writtenFull / 1e6))
+print("%-12s %10.3f %14.1f" % ("incremental", durationIncremental, writtenIncremental / 1e6))
+
+# Recovery of the last complete save
+host = SyntheticHost()
+for entity in fleet:
+	restored = SyntheticEntity(entity.name)
+	restored.persistence = Persistence(restored, host, ["soc", "consumption", "plan", "jobs"], filename=entity.persistence.filename)
+	assert (restored.persistence.load())
+	assert (state(restored) == state(entity))
+
+# Emulate a crash during a write: the last record is incomplete and must be ignored
+entity = fleet[0]
+complete = copy.deepcopy(state(entity))
+entity.tick(ticks)
+entity.persistence.save()
+size = os.path.getsize(entity.persistence.logFilename)
+if size > 0:
+	f = open(entity.persistence.logFilename, 'r+b')
+	f.truncate(size - 10)
+	f.close()
+
+	restored = SyntheticEntity(entity.name)
+	restored.persistence = Persistence(restored, host, ["soc", "consumption", "plan", "jobs"], filename=entity.persistence.filename)
+	assert (restored.persistence.load())
+	assert (state(restored) == complete)
+	print("Recovery after an interrupted write: OK")
+
+shutil.rmtree(folder)
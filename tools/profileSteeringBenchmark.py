@@ -0,0 +1,174 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of profile steering with group controllers
+# Simulates two groups of buffers under a root GroupCtrl, where the second group has a congestion point.
+# Reports the wall time and the time per iterativePlanning() call. With --allocations, the number of (recursive)
+# copy.deepcopy() calls and the peak of the allocated memory are reported instead, which slows down the simulation.
+# The digests of the plans and of the logged data identify the results, they must be equal for each revision of the
+# profile steering code (e.g. run this script before and after a change to GroupCtrl or data.psData), and with and
+# without a ctrl.planningExecutor.PlanningExecutor (--workers).
+# With --vectorized, the controllers use the NumPy buffer planning of OptAlg (OptCtrl.vectorizedPlanning), which rounds
+# differently than the default implementation, hence plans are only comparable between runs with the same setting.
+# The data is not sent to a database. The desired profile is synthetic, such that no data files are required.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 profileSteeringBenchmark.py [buffers per group] [intervals] [--allocations] [--vectorized] [--workers N]
+
+import sys
+
+sys.path.insert(0, '../conf')
+sys.path.insert(0, '../components')
+
+import copy
+import hashlib
+import random
+import time
+import tracemalloc
+
+from hosts.host import Host
+from hosts.simHost import SimHost
+from database.influxDB import InfluxDB
+from dev.bufDev import BufDev
+from dev.meterDev import MeterDev
+from ctrl.bufCtrl import BufCtrl
+from ctrl.groupCtrl import GroupCtrl
+from ctrl.congestionPoint import CongestionPoint
+from ctrl.planningExecutor import PlanningExecutor
+from util.funcReader import FuncReader
+
+buffers = 100
+intervals = 96
+if len(sys.argv) > 1 and sys.argv[1][0] != '-':
+	buffers = int(sys.argv[1])
+if len(sys.argv) > 2 and sys.argv[2][0] != '-':
+	intervals = int(sys.argv[2])
+allocations = '--allocations' in sys.argv
+vectorized = '--vectorized' in sys.argv
+workers = 0
+if '--workers' in sys.argv:
+	workers = int(sys.argv[sys.argv.index('--workers') + 1])
+
+class MemoryDB(InfluxDB):
+	# Keeps the logged lines in memory
+	def __init__(self, host):
+		InfluxDB.__init__(self, host)
+		self.lines = []
+
+	def writeData(self, force=False):
+		self.lines.extend(self.data)
+		self.data = []
+
+	def createDatabase(self):
+		pass
+
+	def shutdown(self):
+		self.writeData(True)
+
+# Counters
+deepcopies = 0
+deepcopyCode = copy.deepcopy.__code__
+def profiler(frame, event, arg):
+	# The copy module calls deepcopy() recursively through default arguments, hence calls are counted by code object
+	global deepcopies
+	if event == 'call' and frame.f_code is deepcopyCode:
+		deepcopies += 1
+
+planningTime = 0.0
+planningCalls = 0
+iterativePlanning = GroupCtrl.iterativePlanning
+def timedIterativePlanning(self, signal):
+	global planningTime, planningCalls
+	t = time.perf_counter()
+	result = iterativePlanning(self, signal)
+	planningTime += time.perf_counter() - t
+	planningCalls += 1
+	return result
+GroupCtrl.iterativePlanning = timedIterativePlanning
+
+# Model
+random.seed(1)
+sim = SimHost()
+sim.timeBase = 900
+sim.intervals = intervals
+sim.enableMsg = False
+sim.enableWarning = False
+sim.db = MemoryDB(sim)
+
+meter = MeterDev("meter", sim)
+
+root = GroupCtrl("root", sim)
+desired = FuncReader(timeOffset=sim.timeOffset)
+desired.functionType = 'sin'
+desired.amplitude = -3000.0 * buffers
+desired.period = 24*3600
+root.desired = {'ELECTRICITY': desired}
+
+controllers = [root]
+for g in range(0, 2):
+	congestionPoint = None
+	if g == 1:
+		congestionPoint = CongestionPoint()
+		congestionPoint.setUpperLimit('ELECTRICITY', complex(2000 * buffers, 0))
+		congestionPoint.setLowerLimit('ELECTRICITY', complex(-2000 * buffers, 0))
+	group = GroupCtrl("group"+str(g), sim, root, congestionPoint)
+	controllers.append(group)
+
+	for i in range(0, buffers):
+		buf = BufDev("buffer"+str(g)+"-"+str(i), sim, meter=meter)
+		buf.initialSoC = random.uniform(1000, 11000)
+		buf.capacity = 12000
+		ctrl = BufCtrl("ctrl"+str(g)+"-"+str(i), buf, group, sim)
+		ctrl.vectorizedPlanning = vectorized
+		buf.ctrl = ctrl
+		controllers.append(ctrl)
+
+if workers > 0:
+	executor = PlanningExecutor(sim, workers)
+	for ctrl in controllers:
+		if isinstance(ctrl, GroupCtrl):
+			ctrl.planningExecutor = executor
+
+# Simulation, without the shutdown of SimHost.startSimulation() which exits
+if allocations:
+	tracemalloc.start()
+	sys.setprofile(profiler)
+t = time.perf_counter()
+Host.startSimulation(sim)
+for i in range(0, sim.intervals):
+	sim.timeTick(sim.currentTime)
+	sim.currentTime += sim.timeBase
+sim.db.shutdown()
+if workers > 0:
+	executor.shutdown()
+duration = time.perf_counter() - t
+if allocations:
+	sys.setprofile(None)
+	current, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+# Results
+plans = hashlib.md5()
+for ctrl in controllers:
+	for c in sorted(ctrl.plan):
+		plans.update(repr([(int(t), complex(v)) for t, v in sorted(ctrl.plan[c].items())]).encode())
+data = hashlib.md5("\n".join(sim.db.lines).encode())
+
+print("Groups: 2 x " + str(buffers) + " buffers, " + str(intervals) + " intervals, " + str(workers) + " workers")
+print("Wall time:           " + str(round(duration, 3)) + " s")
+print("Planning calls:      " + str(planningCalls) + ", " + str(round(1000 * planningTime / max(planningCalls, 1), 3)) + " ms per call")
+if allocations:
+	print("Deepcopy calls:      " + str(deepcopies))
+	print("Peak memory:         " + str(round(peak / 1048576, 2)) + " MiB (timings include tracing)")
+print("Plans digest:        " + plans.hexdigest())
+print("Logged data digest:  " + data.hexdigest() + " (" + str(len(sim.db.lines)) + " lines)")
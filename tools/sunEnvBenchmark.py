@@ -0,0 +1,71 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the irradiance on planes (solar panels, windows) during a planning round, as done by many devices sharing one SunEnv
+# Compares calling SunEnv.powerOnPlane() per plane and timestep to one SunEnv.powerOnPlanes() call, results must be identical.
+# The irradiance data is synthetic, such that no weather data is required.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 sunEnvBenchmark.py [planes] [horizon]
+
+import sys
+import time
+import random
+
+sys.path.insert(0, '../components')
+
+from environment.sunEnv import SunEnv
+from syntheticHost import SyntheticHost
+
+planes = 100
+horizon = 192
+if len(sys.argv) > 1:
+	planes = int(sys.argv[1])
+if len(sys.argv) > 2:
+	horizon = int(sys.argv[2])
+
+class SyntheticReader():
+	def readValue(self, time, value=None, timeBase=None):
+		# KNMI like hourly irradiation in J/cm^2
+		return random.Random(time).uniform(0, 300)
+
+startTime = 1561939200	# 1 July 2019
+
+def createSun():
+	sun = SunEnv("sun", None)
+	sun.host = SyntheticHost(startTime=startTime)
+	sun.irradianceReader = SyntheticReader()
+	return sun
+
+random.seed(1)
+orientations = [(random.uniform(0, 90), random.uniform(0, 360)) for i in range(0, planes)]
+now = startTime
+times = [now + i * 900 for i in range(0, horizon)]
+
+for perfect in [True, False]:
+	sun = createSun()
+	start = time.time()
+	original = [[sun.powerOnPlane(p[0], p[1], t, perfect) for t in times] for p in orientations]
+	durationOriginal = time.time() - start
+
+	sun = createSun()
+	start = time.time()
+	matrix = sun.powerOnPlanes(orientations, times, perfect).tolist()
+	durationMatrix = time.time() - start
+
+	assert (original == matrix)
+
+	print("%d planes, horizon %d, perfect predictions %s" % (planes, horizon, perfect))
+	print("%-15s %10s" % ("method", "time (s)"))
+	print("%-15s %10.3f" % ("powerOnPlane", durationOriginal))
+	print("%-15s %10.3f" % ("powerOnPlanes", durationMatrix))
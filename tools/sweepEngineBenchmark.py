@@ -0,0 +1,118 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the vectorized sweep engine (ElLoadFlow.vectorized) against the object based sweep
+# The same grids are solved with both sweeps, node voltages and edge currents must be equal up to rounding.
+# Grids: an LV grid, an LV grid with delta connected (no neutral) MV nodes and cables, and an MV grid.
+# A synthetic host is used, such that no simulation setup is required.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 sweepEngineBenchmark.py [nodes] [ticks]
+
+import sys
+import time
+import random
+
+sys.path.insert(0, '../components')
+
+import numpy
+
+from flow.el.elLoadFlow import ElLoadFlow
+from flow.el.lvNode import LvNode
+from flow.el.lvCable import LvCable
+from flow.el.mvNode import MvNode
+from flow.el.mvCable import MvCable
+from flow.el.mvLvTransformer import MvLvTransformer
+from syntheticHost import SyntheticHost
+
+nodes = 500
+ticks = 5
+if len(sys.argv) > 1:
+	nodes = int(sys.argv[1])
+if len(sys.argv) > 2:
+	ticks = int(sys.argv[2])
+
+def createGrid(host, grid, vectorized):
+	loadFlow = ElLoadFlow("loadflow", host)
+	loadFlow.vectorized = vectorized
+
+	if grid == "mv":
+		root = MvNode("root", loadFlow, host)
+	else:
+		root = MvLvTransformer("transformer", loadFlow, host)
+	loadFlow.rootNode = root
+
+	scale = 1.0
+	if grid == "mv":
+		scale = 100.0
+
+	allNodes = [root]
+	for i in range(0, nodes):
+		parent = random.choice(allNodes[-20:])
+		if grid == "mv" or (grid == "delta" and i % 5 == 0):
+			node = MvNode("node"+str(i), loadFlow, host)
+			cable = MvCable("cable"+str(i), loadFlow, parent, node, host)
+			cable.length = random.uniform(5, 50)
+		else:
+			node = LvNode("node"+str(i), loadFlow, host)
+			cable = LvCable("cable"+str(i), loadFlow, parent, node, host)
+			cable.length = random.uniform(5, 30)
+		allNodes.append(node)
+
+		meter = "meter"+str(i)
+		host.meters[meter] = {'EL1': complex(0.0, 0.0)}
+		node.addMeter(meter, random.choice([None, 1, 2, 3]))
+
+	for edge in loadFlow.edges:
+		edge.startup()
+	loadFlow.startup()
+	return loadFlow, scale
+
+def run(grid, vectorized):
+	random.seed(1)
+	host = SyntheticHost()
+	loadFlow, scale = createGrid(host, grid, vectorized)
+	if vectorized:
+		assert (loadFlow.sweepEngine is not None)
+
+	duration = 0.0
+	iterations = []
+	voltages = []
+	currents = []
+	for tick in range(0, ticks):
+		host.currentTime += host.timeBase
+		for meter in sorted(host.meters):
+			host.meters[meter] = {'EL1': scale * complex(random.uniform(-300, 600), random.uniform(-30, 30))}
+
+		start = time.time()
+		iterations.append(loadFlow.executeLoadflow(loadFlow.maxIterations, loadFlow.maxError))
+		duration += time.time() - start
+
+		voltages.append([list(node.voltage) for node in loadFlow.nodes])
+		currents.append([list(edge.current) for edge in loadFlow.edges])
+
+	return duration, iterations, numpy.array(voltages), numpy.array(currents)
+
+print("%d nodes, %d ticks" % (nodes, ticks))
+print("%-8s %14s %14s %12s %14s %14s" % ("grid", "objects (s)", "vectorized (s)", "iterations", "max. dV (V)", "max. dI (A)"))
+for grid in ["lv", "delta", "mv"]:
+	durationObjects, iterationsObjects, voltagesObjects, currentsObjects = run(grid, False)
+	durationVectorized, iterationsVectorized, voltagesVectorized, currentsVectorized = run(grid, True)
+
+	assert (min(iterationsObjects) > 0)
+	assert (iterationsObjects == iterationsVectorized)
+	assert (numpy.allclose(voltagesObjects, voltagesVectorized, rtol=1e-9, atol=1e-9))
+	assert (numpy.allclose(currentsObjects, currentsVectorized, rtol=1e-9, atol=1e-9))
+
+	print("%-8s %14.3f %14.3f %12d %14.3g %14.3g" % (grid, durationObjects, durationVectorized, sum(iterationsObjects),
+		numpy.max(numpy.abs(voltagesObjects - voltagesVectorized)), numpy.max(numpy.abs(currentsObjects - currentsVectorized))))
@@ -0,0 +1,80 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Synthetic host for the benchmarks and checks in the tools folder
+# Provides the parts of the host interface that flows, environments and devices use, without a simulation setup.
+# Meters are emulated with a dict of consumptions per meter name, optionally with a latency (in ms) for every zGet.
+# Usage (from a script in the tools folder): from syntheticHost import SyntheticHost
+
+import threading
+import time
+from datetime import datetime
+import pytz
+
+class SyntheticHost():
+	name = "host"
+	timeOffset = 0
+	enablePersistence = False
+	staticTicketLoadFlow = 31000
+	staticTicketRTLoadFlow = 102000
+
+	def __init__(self, timeBase=60, startTime=1548720000, latency=0.0):
+		self.timeBase = timeBase
+		self.startTime = startTime
+		self.currentTime = startTime
+		self.previousTime = startTime
+		self.deltatime = 0
+		self.latency = latency
+
+		self.meters = {}
+		self.requests = 0
+
+	def addEntity(self, entity):
+		pass
+
+	def addComponent(self, component):
+		pass
+
+	def addFlow(self, flow):
+		pass
+
+	def time(self, timeBase=None):
+		return self.currentTime
+
+	def timeInterval(self):
+		if self.currentTime == self.previousTime:
+			return self.timeBase
+		return self.currentTime - self.previousTime
+
+	def timeObject(self, time):
+		return datetime.fromtimestamp(time, tz=pytz.utc)
+
+	def prepareFork(self):
+		# No writer threads, see Core.prepareFork()
+		return threading.active_count() == 1
+
+	def logWarning(self, msg):
+		print(msg)
+
+	def logError(self, msg):
+		print(msg)
+
+	def logValuePrepared(self, data, time=None, deltatime=None):
+		pass
+
+	def zGet(self, receivers, var):
+		self.requests += 1
+		if self.latency > 0:
+			time.sleep(self.latency / 1000.0)
+		return {r: self.meters[r] for r in receivers}
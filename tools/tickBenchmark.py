@@ -0,0 +1,116 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the tick protocol of the MasterSimHost against the number of slaves, using a bus within this process
+# Compares the original protocol with the lockstep protocol and checks that all hosts log the same data.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 tickBenchmark.py [intervals] [max slaves]
+
+import sys
+import threading
+import time
+import hashlib
+
+sys.path.insert(0, '../conf')
+sys.path.insert(0, '../components')
+
+from core.zLocalBus import ZLocalBus
+from hosts.masterSimHost import MasterSimHost
+from hosts.slaveSimHost import SlaveSimHost
+from hosts.host import Host
+from dev.bufDev import BufDev
+from dev.meterDev import MeterDev
+
+intervals = 60
+maxSlaves = 8
+if len(sys.argv) > 1:
+	intervals = int(sys.argv[1])
+if len(sys.argv) > 2:
+	maxSlaves = int(sys.argv[2])
+
+def setupHost(bus, host, data):
+	host.enableMsg = False
+	host.enableWarning = False
+	host.db.createDatabase = lambda: None
+	def writeData(force=False):
+		data.extend(host.db.data)
+		host.db.data.clear()
+	host.db.writeData = writeData
+
+	# Some devices with tickets in every interval
+	meter = MeterDev(host.name + "-meter", host)
+	for i in range(0, 3):
+		b = BufDev(host.name + "-buf" + str(i), host, meter=meter)
+		b.initialSoC = 1000 * i
+		b.lossOverTime = 0.01 * (i + 1)
+		meter.devices.append(b.name)
+
+	bus.attach(host)
+	host.zInit()
+	host.zSubscribe()
+	threading.Thread(target=host.zPoll, daemon=True).start()
+
+def run(slaveCount, lockstep):
+	bus = ZLocalBus("tick" + str(slaveCount) + str(lockstep))
+	bus.start()
+
+	data = {}
+	master = MasterSimHost("master")
+	master.lockstep = lockstep
+	data[master.name] = []
+	setupHost(bus, master, data[master.name])
+
+	slaves = []
+	for i in range(0, slaveCount):
+		slave = SlaveSimHost("slave" + str(i))
+		data[slave.name] = []
+		setupHost(bus, slave, data[slave.name])
+		slave.zConnectBus("connectSlave")
+		slaves.append(slave)
+
+	master.zConnectBus("connectMaster")
+	master.connState = True
+	master.slaves = master.zListOfSlaves()
+	Host.startup(master)
+	master.zCall(master.slaves, 'startup')
+
+	start = time.time()
+	for i in range(0, intervals):
+		master.timeTick(master.currentTime)
+		master.currentTime += master.timeBase
+	duration = time.time() - start
+
+	# Wait for the logging of the slaves
+	master.zCall(master.slaves, 'retrieveTicketList')
+	for host in [master] + slaves:
+		host.db.writeData()
+
+	bus.stop()
+
+	digest = hashlib.md5()
+	lines = 0
+	for name in sorted(data.keys()):
+		digest.update('\n'.join(data[name]).encode())
+		lines += len(data[name])
+	return duration, lines, digest.hexdigest()
+
+print("%d intervals" % intervals)
+print("%8s %14s %14s %9s" % ("slaves", "original t/s", "lockstep t/s", "speedup"))
+slaveCount = 1
+while slaveCount <= maxSlaves:
+	original = run(slaveCount, False)
+	lockstep = run(slaveCount, True)
+	assert (original[1] > 0 and original[1:] == lockstep[1:])
+	print("%8d %14.1f %14.1f %9.2f" % (slaveCount, intervals / original[0], intervals / lockstep[0], original[0] / lockstep[0]))
+	slaveCount *= 2
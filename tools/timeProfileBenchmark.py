@@ -0,0 +1,125 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the timestamped plan bookkeeping of controllers, dicts versus data.timeProfile.TimeProfile
+# Mimics a group controller that replans every interval, merges the realized profiles of its children and prunes old intervals.
+# Both variants must result in the same profile.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 timeProfileBenchmark.py [children] [horizon] [intervals]
+
+import sys
+import time
+import random
+
+sys.path.insert(0, '../components')
+
+from data.timeProfile import TimeProfile
+
+children = 100
+horizon = 192
+intervals = 96
+if len(sys.argv) > 1:
+	children = int(sys.argv[1])
+if len(sys.argv) > 2:
+	horizon = int(sys.argv[2])
+if len(sys.argv) > 3:
+	intervals = int(sys.argv[3])
+
+timeBase = 900
+random.seed(1)
+profiles = [[complex(random.uniform(-1000, 1000), random.uniform(-100, 100)) for i in range(0, horizon)] for j in range(0, children)]
+
+def runDict():
+	plan = {}
+	realized = {}
+	for n in range(0, intervals):
+		now = n * timeBase
+
+		# Prune, as in the original OptCtrl.prunePlan()
+		for profile in [plan, realized]:
+			for k in list(profile.keys()):
+				if k <= now - timeBase:
+					del profile[k]
+				else:
+					break
+
+		# Timestamped plan
+		for i in range(0, horizon):
+			plan[now + i * timeBase] = profiles[n % children][i]
+
+		# Merge the realized profiles of the children
+		result = {}
+		for p in profiles:
+			child = {}
+			for i in range(0, horizon):
+				child[now + i * timeBase] = p[i]
+			for t in child.keys():
+				if t in result:
+					result[t] += child[t]
+				else:
+					result[t] = child[t]
+		realized = result
+
+		# Updates of the realized profile
+		for p in profiles[:10]:
+			for i in range(0, horizon):
+				if now + i * timeBase in realized:
+					realized[now + i * timeBase] += p[i]
+
+		# Steering signal
+		desired = [plan[now + i * timeBase] - realized[now + i * timeBase] for i in range(0, horizon)]
+	return plan, realized, desired
+
+def runTimeProfile():
+	plan = TimeProfile(timeBase)
+	realized = TimeProfile(timeBase)
+	for n in range(0, intervals):
+		now = n * timeBase
+
+		plan.prune(now - timeBase)
+		realized.prune(now - timeBase)
+
+		plan.setRange(now, profiles[n % children])
+
+		result = TimeProfile(timeBase)
+		for p in profiles:
+			child = TimeProfile(timeBase)
+			child.setRange(now, p)
+			result.add(child)
+		realized = result
+
+		for p in profiles[:10]:
+			realized.addRange(now, p)
+
+		plan_ = plan.getRange(now, horizon)
+		realized_ = realized.getRange(now, horizon)
+		desired = [plan_[i] - realized_[i] for i in range(0, horizon)]
+	return plan, realized, desired
+
+start = time.time()
+d = runDict()
+durationDict = time.time() - start
+
+start = time.time()
+p = runTimeProfile()
+durationTimeProfile = time.time() - start
+
+assert (d[0] == dict(p[0].items()))
+assert (d[1] == dict(p[1].items()))
+assert (d[2] == p[2])
+
+print("%d children, horizon %d, %d intervals" % (children, horizon, intervals))
+print("%-12s %10s" % ("container", "time (s)"))
+print("%-12s %10.3f" % ("dict", durationDict))
+print("%-12s %10.3f" % ("TimeProfile", durationTimeProfile))
@@ -0,0 +1,84 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the startup warm-up of WindowPredictors, as done by thermostats and zones with four weeks of history
+# Compares adding the samples one by one with WindowPredictor.addSample() to WindowPredictor.addSamples(), predictions must be identical.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 windowPredictorBenchmark.py [predictors] [timeBase]
+
+import sys
+import time
+import random
+
+sys.path.insert(0, '../components')
+
+from util.windowPredictor import WindowPredictor
+
+predictors = 100
+timeBase = 60
+if len(sys.argv) > 1:
+	predictors = int(sys.argv[1])
+if len(sys.argv) > 2:
+	timeBase = int(sys.argv[2])
+
+startTime = 1514764800
+history = 4*7*24*3600
+random.seed(1)
+
+# Setpoint like profiles with some gaps in the data
+profiles = []
+for i in range(0, predictors):
+	profile = []
+	for t in range(0, history, timeBase):
+		if random.random() < 0.01:
+			profile.append(None)
+		elif (t % 86400) > 7*3600 + i*60 and (t % 86400) < 22*3600:
+			profile.append(21.0 + random.uniform(-0.5, 0.5))
+		else:
+			profile.append(17.0)
+	profiles.append(profile)
+
+start = time.time()
+sequential = []
+for profile in profiles:
+	p = WindowPredictor(timeBase)
+	t = startTime
+	for sample in profile:
+		p.addSample(sample, t)
+		t += timeBase
+	sequential.append(p)
+durationSequential = time.time() - start
+
+start = time.time()
+bulk = []
+for profile in profiles:
+	p = WindowPredictor(timeBase)
+	p.addSamples(profile, startTime, timeBase)
+	bulk.append(p)
+durationBulk = time.time() - start
+
+intervals = int(86400 / timeBase)
+start = time.time()
+for p, q in zip(sequential, bulk):
+	r = q.predictValues(startTime + history, intervals)
+	assert (p.predictValues(startTime + history, intervals) == r)
+	assert (p.predictDeviations(startTime + history, intervals) == q.predictDeviations(startTime + history, intervals))
+	assert (p.predictConfidences(startTime + history, intervals) == q.predictConfidences(startTime + history, intervals))
+durationPrediction = time.time() - start
+
+print("%d predictors, %d samples each" % (predictors, len(profiles[0])))
+print("%-24s %10s" % ("method", "time (s)"))
+print("%-24s %10.3f" % ("addSample", durationSequential))
+print("%-24s %10.3f" % ("addSamples", durationBulk))
+print("%-24s %10.3f" % ("predictions (3x2 days)", durationPrediction))
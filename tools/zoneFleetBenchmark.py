@@ -0,0 +1,113 @@
+# Copyright 2023 University of Twente
+
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+
+# http://www.apache.org/licenses/LICENSE-2.0
+
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmark of the ZoneFleet engine that simulates many thermal zones (ZoneDev2R2C) at once
+# Compares the prediction of the heat demand per zone (as done by the thermostats) with one batched ZoneFleet.doPredictions() call,
+# results must be identical. Also reports the time to advance all zones one interval.
+# The weather and irradiance data is synthetic, such that no data files are required.
+# Removal of zones (ZoneFleet.unregister()) is checked against the advance of the full fleet.
+# THIS IS NOT A UNITTEST
+# Usage (from the tools folder): python3 zoneFleetBenchmark.py [zones] [horizon]
+
+import sys
+import time
+import random
+
+sys.path.insert(0, '../components')
+
+from environment.sunEnv import SunEnv
+from dev.thermal.zoneDev2R2C import ZoneDev2R2C
+from dev.thermal.zoneFleet import ZoneFleet
+from syntheticHost import SyntheticHost
+
+zones = 1000
+horizon = 96
+if len(sys.argv) > 1:
+	zones = int(sys.argv[1])
+if len(sys.argv) > 2:
+	horizon = int(sys.argv[2])
+
+class SyntheticReader():
+	def readValue(self, time, value=None, timeBase=None):
+		return random.Random(time).uniform(0, 300)
+
+class SyntheticWeather():
+	temperature = 5.0
+	def doTemperaturePrediction(self, startTime, endTime, timeBase, perfect = False):
+		return [random.Random(t).uniform(-5, 15) for t in range(startTime, endTime, timeBase)]
+
+host = SyntheticHost(timeBase=900, startTime=1548763200)	# Noon, such that windows have solar gains
+sun = SunEnv("sun", None)
+sun.host = host
+sun.irradianceReader = SyntheticReader()
+sun.preTick(host.time())
+weather = SyntheticWeather()
+
+random.seed(1)
+fleet = ZoneFleet("2R2C")
+fleetZones = []
+for i in range(0, zones):
+	zone = ZoneDev2R2C("zone" + str(i), weather, sun, None, fleet)
+	zone.host = host
+	zone.commodities = ['HEAT']
+	zone.perfectPredictions = True
+	zone.temperature = random.uniform(15, 20)
+	zone.floorTemperature = zone.temperature
+	zone.heatSupply = {'HEAT': random.uniform(0, 5000)}
+	for w in range(0, i % 4):
+		zone.addWindow(random.uniform(1, 5), random.choice([90, 180, 270]), random.choice([45, 90]))
+	fleet.activate(zone)
+	fleetZones.append(zone)
+
+startTime = host.time()
+endTime = startTime + horizon * host.timeBase
+lower = [[random.choice([15.0, 20.0])] * horizon for i in range(0, zones)]
+upper = [[23.0] * horizon for i in range(0, zones)]
+
+start = time.time()
+single = [zone.doPrediction(startTime, endTime, lower[i], upper[i], -5000, 8000, host.timeBase) for i, zone in enumerate(fleetZones)]
+durationSingle = time.time() - start
+
+start = time.time()
+batched = fleet.doPredictions(fleetZones, startTime, endTime, lower, upper, [-5000] * zones, [8000] * zones, host.timeBase)
+durationBatched = time.time() - start
+
+assert (single == batched)
+
+start = time.time()
+for i in range(0, 10):
+	fleet.preTick(startTime + i * host.timeBase)
+durationTick = (time.time() - start) / 10
+
+# Removed zones are no longer advanced, the other zones advance as before
+state = fleet.data.copy()
+fleet.preTick(startTime + 10 * host.timeBase)
+advanced = fleet.data.copy()
+fleet.data = state.copy()
+removed = fleetZones[1::3]
+for zone in removed:
+	fleet.unregister(zone)
+fleet.preTick(startTime + 11 * host.timeBase)
+for zone in fleetZones:
+	expected = advanced
+	if zone in removed:
+		expected = state
+	assert (fleet.data['temperature'][zone.fleetIndex] == expected['temperature'][zone.fleetIndex])
+	assert (fleet.data['floorTemperature'][zone.fleetIndex] == expected['floorTemperature'][zone.fleetIndex])
+
+print("%d zones, horizon %d" % (zones, horizon))
+print("%-30s %10s" % ("method", "time (s)"))
+print("%-30s %10.3f" % ("doPrediction per zone", durationSingle))
+print("%-30s %10.3f" % ("ZoneFleet.doPredictions", durationBatched))
+print("%-30s %10.4f" % ("ZoneFleet.preTick per interval", durationTick))